@@ -3,7 +3,7 @@ import re
 import json as json_module  # Renamed to avoid shadowing
 import html
 import logging
-from typing import List, Dict, Tuple, Any, Optional, Pattern, Union # Added Union
+from typing import List, Dict, Tuple, Any, Optional, Pattern, TypedDict, Union # Added Union
 import xml.etree.ElementTree as ET # Import ElementTree for robust parsing
 
 # Import BaseTool definition for type hinting tool schema
@@ -16,6 +16,11 @@ ParsingErrorDict = Dict[str, Union[str, bool, Tuple[int, int]]]
 # Define the structure for valid calls explicitly
 ValidCallTuple = Tuple[str, Dict[str, Any], Tuple[int, int]]
 
+
+class ToolCallParseResult(TypedDict):
+    valid_calls: List[ValidCallTuple]
+    parsing_errors: List[ParsingErrorDict]
+
 # Regex for <tool_call>{"name": "...", "arguments": {...}}</tool_call> format (qwen3, etc.)
 TOOL_CALL_JSON_PATTERN = re.compile(
     r'<tool_call>\s*(\{.*?\})\s*</tool_call>',
@@ -127,7 +132,7 @@ def find_and_parse_xml_tool_calls(
     agent_core_raw_xml_pattern: Optional[Pattern],
     agent_core_markdown_xml_pattern: Optional[Pattern],
     agent_id: str # For logging
-    ) -> Dict[str, Union[List[ValidCallTuple], List[ParsingErrorDict]]]: # Updated return type
+    ) -> ToolCallParseResult:
     """
     Finds *all* occurrences of valid XML tool calls (raw or fenced)
     in the text_buffer, avoiding nested matches. Parses them and returns validated info.
@@ -506,4 +511,105 @@ def find_and_parse_xml_tool_calls(
          logger.info(f"Agent {agent_id}: Encountered {len(parsing_errors)} tool call parsing error(s) in buffer.")
 
     return {"valid_calls": found_calls_details, "parsing_errors": parsing_errors}
+
+THINK_OPEN_PATTERN = re.compile(r"<think>", re.IGNORECASE)
+THINK_BLOCK_PATTERN = re.compile(r"<think>.*?</think>", re.IGNORECASE | re.DOTALL)
+# Only the tail of the text can contain a closing tag that was completed by the newest chunk
+CLOSE_TAG_LOOKBACK_CHARS = 256
+
+
+class StreamingToolCallParser:
+    """
+    Incremental companion to find_and_parse_xml_tool_calls for streamed LLM output.
+
+    feed() consumes chunks as they arrive. Only when a chunk completes a tool block
+    (</tool_name>, a self-closing <tool_name .../> or </tool_call>) is the text so far
+    handed to find_and_parse_xml_tool_calls, so every call reported here is exactly
+    what the batch parser returns for that prefix. Calls are only reported once later
+    text can no longer change them: blocks closed by their own </tool_name> tag
+    (raw or fenced). Self-closing tags (a later </tool_name> re-matches them) and
+    <tool_call> JSON blocks (dropped by the batch parser if any XML call follows) are
+    left to the final parse. Text inside an unclosed <think> block is ignored.
+
+    The batch parse of the final response remains authoritative: ready calls are an
+    early signal (e.g. to stop generation once a terminal tool call is complete).
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, BaseTool],
+        agent_core_raw_xml_pattern: Optional[Pattern],
+        agent_core_markdown_xml_pattern: Optional[Pattern],
+        agent_id: str
+    ):
+        self._tools = tools
+        self._raw_pattern = agent_core_raw_xml_pattern
+        self._markdown_pattern = agent_core_markdown_xml_pattern
+        self._agent_id = agent_id
+        tool_names_group = '|'.join(re.escape(name.lower()) for name in tools)
+        self._close_pattern = re.compile(
+            rf"</(?:{tool_names_group}|tool_call)\s*>|<(?:{tool_names_group})\b[^<>]*/>" if tool_names_group else r"</tool_call\s*>",
+            re.IGNORECASE
+        )
+        self._chunks: List[str] = []
+        self._text = ""
+        self._length = 0
+        self._reported: Dict[str, int] = {} # call signature -> times reported
+        self.ready_calls: List[ValidCallTuple] = []
+
+    @property
+    def text(self) -> str:
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._chunks = []
+        return self._text
+
+    @staticmethod
+    def _signature(tool_name: str, tool_args: Dict[str, Any]) -> str:
+        try: return f"{tool_name}:{json_module.dumps(tool_args, sort_keys=True, default=str)}"
+        except (TypeError, ValueError): return f"{tool_name}:{tool_args!r}"
+
+    @staticmethod
+    def _is_final(call: ValidCallTuple, parse_text: str) -> bool:
+        block = parse_text[call[2][0]:call[2][1]].strip()
+        if block.lower().startswith("<tool_call>"):
+            return False
+        if block.endswith("```"):
+            return True
+        return re.search(rf"</{re.escape(call[0])}\s*>$", block, re.IGNORECASE) is not None
+
+    def feed(self, chunk: str) -> List[ValidCallTuple]:
+        """Consumes one streamed chunk. Returns the tool calls that became complete with it."""
+        if not chunk:
+            return []
+        previous_length = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if '>' not in chunk:
+            return []
+
+        text = self.text
+        if not self._close_pattern.search(text, max(0, previous_length - CLOSE_TAG_LOOKBACK_CHARS)):
+            return []
+        if len(THINK_OPEN_PATTERN.findall(text)) > text.lower().count("</think>"):
+            return [] # Still thinking; tool-like XML in there is not a call (yet)
+
+        parse_text = THINK_BLOCK_PATTERN.sub("", text).strip()
+        parsed = find_and_parse_xml_tool_calls(
+            parse_text, self._tools, self._raw_pattern, self._markdown_pattern, self._agent_id
+        )
+        new_calls: List[ValidCallTuple] = []
+        seen: Dict[str, int] = {}
+        for call in parsed["valid_calls"]:
+            if not self._is_final(call, parse_text):
+                continue
+            signature = self._signature(call[0], call[1])
+            seen[signature] = seen.get(signature, 0) + 1
+            # A block can be re-matched with a different span (e.g. once its markdown fence closes)
+            if seen[signature] > self._reported.get(signature, 0):
+                self._reported[signature] = seen[signature]
+                new_calls.append(call)
+        self.ready_calls.extend(new_calls)
+        return new_calls
+
 # END OF FILE src/agents/agent_tool_parser.py
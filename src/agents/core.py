@@ -5,7 +5,7 @@ import re # For XML parsing
 import os
 import time # For call IDs
 import traceback # For detailed error logging
-from typing import Dict, Any, List, Optional, Tuple, AsyncGenerator
+from typing import Dict, Any, Callable, List, Optional, Tuple, AsyncGenerator
 from pathlib import Path
 import html # For unescaping XML parameter values
 import logging
@@ -16,9 +16,12 @@ from src.config.settings import settings, BASE_DIR
 
 # Import BaseLLMProvider for type hinting and interface adherence
 from src.llm_providers.base import BaseLLMProvider, MessageDict, ToolResultDict
+from src.llm_providers.request_scheduler import priority_for_agent, stream_with_request_context
 
 # Import the parser function
-from src.agents.agent_tool_parser import find_and_parse_xml_tool_calls
+from src.agents.agent_tool_parser import find_and_parse_xml_tool_calls, StreamingToolCallParser
+from src.agents.message_history import MessageHistory
+from src.agents.stream_buffer import StreamTextBuffer, AutoregressiveLoopDetector
 
 # --- Import status and state constants ---
 from src.agents.constants import (
@@ -49,26 +52,11 @@ THINK_TAG_PATTERN = r"<think>([\s\S]*?)</think>"
 ROBUST_THINK_TAG_PATTERN = re.compile(r"<think>(.*?)(?:</think>|<(?=[^/]))", re.DOTALL | re.IGNORECASE)
 
 def detect_autoregressive_loop(text: str, min_pattern_length: int = 20, min_repetitions: int = 4) -> bool:
-    """Detects if the end of the text contains a strictly repeating autoregressive loop."""
-    text_len = len(text)
-    if text_len < min_pattern_length * min_repetitions:
-        return False
-    
-    max_pattern = min(1000, text_len // min_repetitions)
-    
-    for pattern_length in range(min_pattern_length, max_pattern + 1):
-        pattern = text[-pattern_length:]
-        is_loop = True
-        for i in range(1, min_repetitions):
-            start_idx = -(pattern_length * (i + 1))
-            end_idx = -(pattern_length * i)
-            segment = text[start_idx:] if end_idx == 0 else text[start_idx:end_idx]
-            if segment != pattern:
-                is_loop = False
-                break
-        if is_loop:
-            return True
-    return False
+    """Detects if the end of the text contains a strictly repeating autoregressive loop.
+    One-shot helper; process_message feeds an AutoregressiveLoopDetector incrementally instead."""
+    detector = AutoregressiveLoopDetector(min_pattern_length=min_pattern_length, min_repetitions=min_repetitions)
+    detector.feed(text)
+    return detector.is_looping()
 
 class Agent:
     def __init__(
@@ -97,14 +85,17 @@ class Agent:
         self.current_plan: Optional[str] = None
         self.current_task_id: Optional[str] = None
         self.current_task_description: Optional[str] = None # Holds the task for the current work state
-        self.message_history: List[MessageDict] = []
+        self._history_loader: Optional[Callable[[], List[MessageDict]]] = None # Set while a saved history is not loaded yet
+        self._deferred_history_info: Tuple[int, int] = (0, 0) # (length, estimated tokens) of the deferred history
+        self._message_history = MessageHistory(model_getter=lambda: self.model)
         self._last_api_key_used: Optional[str] = None
         self._failed_models_this_cycle: set = set()
         self._pm_needs_initial_list_tools: bool = False
         self._awaiting_project_approval: bool = False
         self.needs_priority_recheck: bool = False
         self.intervention_applied_for_build_team_tasks: bool = False
-        self.text_buffer: str = ""
+        self.stream_buffer: StreamTextBuffer = StreamTextBuffer() # Text streamed in the current LLM call
+        self.last_llm_usage: Optional[Dict[str, Any]] = None # Normalized 'usage' event of the current LLM call, if the provider sent one
         self._pm_report_check_cycle_count: int = 0
         self._pm_audit_cycle_count: int = 0
         self._pm_audit_attempt_count: int = 0
@@ -233,7 +224,8 @@ class Agent:
             self.set_status(AGENT_STATUS_ERROR)
             yield {"type": "error", "content": "[Agent Error: Manager not configured]", "_exception_obj": ValueError("Manager not configured")}; return
 
-        self.text_buffer = ""
+        self.stream_buffer = StreamTextBuffer()
+        self.last_llm_usage = None
         complete_assistant_response = ""
         stream_had_error = False
         last_error_obj = None
@@ -320,34 +312,44 @@ class Agent:
 
             from contextlib import aclosing
             
+            # Tag the provider call for the LLM request scheduler (Admin AI turns are served first)
             async with aclosing(self.llm_provider.stream_completion(
                 messages=history_to_use, model=self.model, temperature=self.temperature,
                 max_tokens=max_tokens_override, tools=tool_schemas, **self.provider_kwargs
             )) as provider_stream:
-                
+            
                 native_tool_calls_received = []
                 chunk_counter = 0
+                loop_detector = AutoregressiveLoopDetector()
+                # XML/JSON tool blocks are detected as they close (native tool calls arrive separately)
+                stream_tool_parser: Optional[StreamingToolCallParser] = None
+                if tool_schemas is None and self.manager.tool_executor and self.raw_xml_tool_call_pattern:
+                    stream_tool_parser = StreamingToolCallParser(
+                        self.manager.tool_executor.tools, self.raw_xml_tool_call_pattern,
+                        self.markdown_xml_tool_call_pattern, self.agent_id
+                    )
+                stopped_at_terminal_tool = False
     
-                async for event in provider_stream:
+                async for event in stream_with_request_context(provider_stream, priority_for_agent(self), self.agent_id):
                     event_type = event.get("type")
                     if event_type == "response_chunk":
                         content = event.get("content", "")
                         if content: 
-                            self.text_buffer += content
-                            complete_assistant_response += content
+                            self.stream_buffer.append(content)
+                            loop_detector.feed(content)
                             yielded_chunks = True
                             chunk_counter += 1
-                            
-                            if chunk_counter % 25 == 0 and detect_autoregressive_loop(self.text_buffer):
+                        
+                            if chunk_counter % 25 == 0 and loop_detector.is_looping():
                                 error_msg = "[LLM Error] Autoregressive string loop detected. Terminating stream to prevent hang."
                                 logger.error(f"Agent {self.agent_id}: {error_msg}")
                                 error_event = {"type": "error", "content": error_msg, "_exception_obj": ValueError(error_msg), "agent_id": self.agent_id}
                                 yield error_event
                                 stream_had_error = True
                                 break
-                            
+                        
                             # CRITICAL FIX: Hard limit on output size to prevent runaway hallucinations bloating KV cache
-                            if len(self.text_buffer) > 32000:  # ~8k tokens max
+                            if len(self.stream_buffer) > 32000:  # ~8k tokens max
                                 error_msg = "[LLM Error] Runaway generation detected (exceeded 32,000 chars). Terminating stream to prevent KV cache exhaustion."
                                 logger.error(f"Agent {self.agent_id}: {error_msg}")
                                 error_event = {"type": "error", "content": error_msg, "_exception_obj": ValueError(error_msg), "agent_id": self.agent_id}
@@ -357,9 +359,20 @@ class Agent:
 
 
                         yield {"type": "response_chunk", "content": content, "agent_id": self.agent_id}
+
+                        if stream_tool_parser and content:
+                            for ready_tool_name, ready_tool_args, _ in stream_tool_parser.feed(content):
+                                yield {"type": "tool_call_ready", "tool_name": ready_tool_name, "arguments": ready_tool_args, "agent_id": self.agent_id}
+                                if settings.STREAM_TOOL_EARLY_STOP and ready_tool_name in settings.STREAM_TOOL_TERMINAL_TOOLS:
+                                    stopped_at_terminal_tool = True
+                            if stopped_at_terminal_tool:
+                                # Everything after a complete terminal tool call would be discarded anyway
+                                logger.info(f"Agent {self.agent_id}: Terminal tool call complete after {len(self.stream_buffer)} chars. Stopping generation early.")
+                                break
                     elif event_type == "native_tool_calls":
                         native_tool_calls_received.extend(event.get("tool_calls", []))
                     elif event_type == "status": event["agent_id"] = self.agent_id; yield event
+                    elif event_type == "usage": self.last_llm_usage = event # Read by CycleHandler for the performance tracker
                     elif event_type == "error":
                         error_content = f"[{self.provider_name} Error] {event.get('content', 'Unknown provider error')}"
                         last_error_obj = event.get('_exception_obj', ValueError(error_content))
@@ -368,12 +381,13 @@ class Agent:
                     else: logger.warning(f"Agent {self.agent_id}: Received unknown event type '{event_type}' from provider.")
             logger.debug(f"Agent {self.agent_id}: Provider stream finished. Stream error: {stream_had_error}. Processing buffer.")
 
+            complete_assistant_response = self.stream_buffer.getvalue()
             if not stream_had_error:
                 logger.debug(f"Agent {self.agent_id}: Raw response before post-processing:\n>>>\n{complete_assistant_response}\n<<<")
                 # Send raw response to UI for Internal Comms visibility
                 if complete_assistant_response.strip():
                     yield {"type": "agent_raw_response", "content": complete_assistant_response, "agent_id": self.agent_id}
-                buffer_to_process = self.text_buffer.strip() # Strip here for workflow processing
+                buffer_to_process = complete_assistant_response.strip() # Strip here for workflow processing
                 original_complete_response = complete_assistant_response # Retain the full original response for potential error reporting
 
                 # --- Check for Workflow Triggers First ---
@@ -676,18 +690,66 @@ class Agent:
             logger.error(error_msg, exc_info=True)
             yield {"type": "error", "agent_id": self.agent_id, "content": f"[Agent Error: {error_msg}]", "_exception_obj": e}; return
         finally:
-            self.text_buffer = ""
+            self.stream_buffer = StreamTextBuffer() # New object: CycleHandler may still hold the old one
             logger.info(f"Agent {self.agent_id}: Finished processing cycle attempt. Status before CycleHandler: {self.status}")
 
+    @property
+    def message_history(self) -> MessageHistory:
+        if self._history_loader is not None: self._load_deferred_history()
+        return self._message_history
+
+    @message_history.setter
+    def message_history(self, messages: List[MessageDict]):
+        # Always store a ledger-backed MessageHistory, whatever list type is assigned
+        self._history_loader = None # An explicit assignment replaces a deferred history
+        if messages is getattr(self, '_message_history', None): return
+        self._message_history = MessageHistory(messages, model_getter=lambda: self.model)
+
+    def defer_history(self, loader: Callable[[], List[MessageDict]], length: int, estimated_tokens: int = 0):
+        """
+        Installs a saved history without reading it yet (used by session loading).
+        The loader runs on first access of message_history unless load_deferred_history()
+        delivers the messages first; get_state() reports the given length/tokens meanwhile.
+        """
+        self._message_history = MessageHistory(model_getter=lambda: self.model)
+        self._history_loader = loader
+        self._deferred_history_info = (length, estimated_tokens)
+
+    @property
+    def history_deferred(self) -> bool:
+        return self._history_loader is not None
+
+    async def load_deferred_history(self):
+        """Runs a deferred history's loader in a worker thread and installs the result."""
+        loader = self._history_loader
+        if loader is None: return
+        try:
+            messages = await asyncio.to_thread(loader)
+        except Exception as e:
+            logger.error(f"Agent {self.agent_id}: Failed loading deferred message history: {e}", exc_info=True)
+            return # Left deferred: the next access retries synchronously
+        if self._history_loader is loader: # Not loaded, replaced or re-deferred meanwhile
+            self.message_history = messages
+
+    def _load_deferred_history(self):
+        loader = self._history_loader
+        if loader is None: return
+        self._history_loader = None
+        logger.warning(f"Agent {self.agent_id}: Message history accessed before its background load finished; reading it synchronously.")
+        try:
+            self.message_history = loader()
+        except Exception as e:
+            logger.error(f"Agent {self.agent_id}: Failed to load deferred message history: {e}", exc_info=True)
+            self.message_history = []
+
     def get_state(self) -> Dict[str, Any]:
         estimated_tokens = 0
         max_tokens = 8192 # default Fallback
         
-        # Estimate context sequence tokens
+        # Estimate context sequence tokens (maintained incrementally by the history ledger)
+        history_length, deferred_tokens = self._deferred_history_info if self.history_deferred else (len(self.message_history), 0)
         if self.manager:
-            from src.agents.cycle_components.context_summarizer import get_context_summarizer
-            summarizer = get_context_summarizer(self.manager)
-            estimated_tokens = summarizer.estimate_token_count(self.message_history)
+            estimated_tokens = deferred_tokens if self.history_deferred else self.message_history.token_total()
             
             # Extract actual numerical maximum from provider's model details
             try:
@@ -704,7 +766,7 @@ class Agent:
         state_info = {
             "agent_id": self.agent_id, "persona": self.persona, "status": self.status, "state": self.state,
             "agent_type": self.agent_type, "provider": self.provider_name, "model": self.model,
-            "temperature": self.temperature, "message_history_length": len(self.message_history),
+            "temperature": self.temperature, "message_history_length": history_length,
             "estimated_tokens": estimated_tokens, "max_tokens": max_tokens,
             "sandbox_path": str(self.sandbox_path),
             "xml_tool_parsing_enabled": (self.raw_xml_tool_call_pattern is not None)
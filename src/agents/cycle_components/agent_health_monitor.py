@@ -20,6 +20,7 @@ from src.agents.constants import (
 
 # Import for automatic contaminated history cleanup
 from src.config.settings import settings
+from src.llm_providers.request_scheduler import llm_request_context, RequestPriority
 from src.core.database_manager import Interaction
 from sqlalchemy import select, delete
 
@@ -1463,6 +1464,9 @@ class ConstitutionalGuardianHealthMonitor:
         try:
             if not hasattr(self._manager, 'db_manager') or not self._manager.db_manager:
                 return 0
+
+            # Interactions are written in batches; make sure queued ones are in the table before scanning it
+            await self._manager.db_manager.flush_interactions()
                 
             async with self._manager.db_manager.get_session() as session:
                 # Get current session interactions if available
@@ -1595,14 +1599,15 @@ class ConstitutionalGuardianHealthMonitor:
         try:
             from contextlib import aclosing
             full_verdict_text = ""
-            async with aclosing(cg_agent.llm_provider.stream_completion(
-                messages=[{"role": "system", "content": eval_prompt}], 
-                model=cg_agent.model,
-                temperature=0.1, max_tokens=150
-            )) as stream:
-                async for event in stream:
-                    if event.get("type") == "response_chunk":
-                        full_verdict_text += event.get("content", "")
+            with llm_request_context(RequestPriority.GOVERNANCE, cg_agent.agent_id):
+                async with aclosing(cg_agent.llm_provider.stream_completion(
+                    messages=[{"role": "system", "content": eval_prompt}], 
+                    model=cg_agent.model,
+                    temperature=0.1, max_tokens=150
+                )) as stream:
+                    async for event in stream:
+                        if event.get("type") == "response_chunk":
+                            full_verdict_text += event.get("content", "")
                         
             lines = [line for line in full_verdict_text.strip().split('\\n') if line.strip()]
             if not lines:
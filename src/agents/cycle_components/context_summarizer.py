@@ -8,12 +8,14 @@ manageable chunks and using the Constitutional Guardian for summarization.
 """
 
 import logging
-import json
 from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Optional
 import asyncio
 from datetime import datetime
 
 from src.agents.constants import CONSTITUTIONAL_GUARDIAN_AGENT_ID
+from src.agents.cycle_components.summary_cache import summary_cache
+from src.utils.token_counter import token_counter
+from src.llm_providers.request_scheduler import llm_request_context, RequestPriority
 
 if TYPE_CHECKING:
     from src.agents.manager import AgentManager
@@ -28,10 +30,12 @@ class ContextSummarizer:
         self._manager = manager
         self.max_chunk_size = 8000  # Conservative chunk size for small local LLMs
         self.overlap_size = 200     # Small overlap between chunks
+        self.prefix_block_messages = 8  # The first chunk ends on a multiple of this many messages
         
     async def should_summarize_context(self, agent_id: str, context_length: int, max_tokens: int,
                                         message_history: Optional[List[Dict[str, Any]]] = None,
-                                        model_num_ctx: Optional[int] = None) -> bool:
+                                        model_num_ctx: Optional[int] = None,
+                                        summary_count: Optional[int] = None) -> bool:
         """
         Determine if context should be summarized based on token limits.
         
@@ -41,6 +45,7 @@ class ContextSummarizer:
             max_tokens: Maximum tokens allowed for the model
             message_history: Optional message history to check for existing summaries
             model_num_ctx: Optional model-specific context window size for dynamic threshold
+            summary_count: Optional number of summaries already in the history (skips rescanning it)
             
         Returns:
             True if summarization should be triggered
@@ -57,10 +62,11 @@ class ContextSummarizer:
         if context_length > threshold:
             # CRITICAL FIX: Prevent infinite summarization loops, but allow EMERGENCY truncation.
             if message_history:
-                summary_count = sum(
-                    1 for msg in message_history
-                    if msg.get('role') == 'system' and '[CONTEXT SUMMARY' in msg.get('content', '')
-                )
+                if summary_count is None:
+                    summary_count = sum(
+                        1 for msg in message_history
+                        if msg.get('role') == 'system' and '[CONTEXT SUMMARY' in msg.get('content', '')
+                    )
                 
                 hard_limit = int(model_num_ctx * 0.9) if (model_num_ctx and model_num_ctx > 0) else 29000
                 
@@ -128,13 +134,16 @@ class ContextSummarizer:
             # Split context into two manageable chunks
             chunk1, chunk2 = self._split_context_into_chunks(message_history)
             
-            # Summarize each chunk separately using Constitutional Guardian
-            summary1 = await self._summarize_chunk(chunk1, 1, agent_id)
+            # Summarize both chunks concurrently using Constitutional Guardian.
+            # Both are tagged RequestPriority.SUMMARIZATION; the LLM request scheduler decides
+            # when each is admitted and bounds how many actually run at once.
+            summary1, summary2 = await asyncio.gather(
+                self._summarize_chunk(chunk1, 1, agent_id),
+                self._summarize_chunk(chunk2, 2, agent_id)
+            )
             if not summary1:
                 logger.error("Failed to summarize first context chunk")
                 return False, None
-                
-            summary2 = await self._summarize_chunk(chunk2, 2, agent_id) 
             if not summary2:
                 logger.error("Failed to summarize second context chunk")
                 return False, None
@@ -155,7 +164,12 @@ class ContextSummarizer:
             return False, None
     
     def _split_context_into_chunks(self, message_history: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Split message history into two roughly equal chunks with overlap."""
+        """
+        Split message history into two roughly equal chunks with overlap.
+
+        The first chunk ends on a multiple of prefix_block_messages, so it stays the same
+        whole-message prefix while the history grows and its cached summary keeps hitting.
+        """
         if len(message_history) <= 4:
             # Very short history, split in half
             mid_point = len(message_history) // 2
@@ -165,12 +179,14 @@ class ContextSummarizer:
         system_msg = message_history[0] if message_history[0].get('role') == 'system' else None
         working_history = message_history[1:] if system_msg else message_history
         
-        # Split the working history
+        # Split the working history on a block boundary at or before the midpoint
         mid_point = len(working_history) // 2
-        overlap_start = max(0, mid_point - 2)  # Small overlap
+        block = max(1, self.prefix_block_messages)
+        split_point = (mid_point // block) * block or mid_point
+        overlap_start = max(0, split_point - 2)  # Small overlap
         
         chunk1 = [system_msg] if system_msg else []
-        chunk1.extend(working_history[:mid_point])
+        chunk1.extend(working_history[:split_point])
         
         chunk2 = [system_msg] if system_msg else []
         chunk2.extend(working_history[overlap_start:])
@@ -194,6 +210,13 @@ class ContextSummarizer:
             
             # Create summarization prompt for Constitutional Guardian
             chunk_text = self._format_chunk_for_summarization(chunk)
+
+            # Identical chunks (re-summarized prefixes, failover retries) reuse the cached summary
+            cache_key = summary_cache.make_key(original_agent_id, chunk)
+            cached_summary = await summary_cache.get(cache_key)
+            if cached_summary:
+                logger.debug(f"Using cached summary for chunk {chunk_num} ({len(cached_summary)} characters)")
+                return cached_summary
             
             summarization_prompt = f"""You are being asked to summarize conversation history for agent '{original_agent_id}' to help manage context length for small local LLMs.
 
@@ -215,30 +238,28 @@ Please provide your summary as plain text (no XML tags needed for this summariza
                 {"role": "user", "content": summarization_prompt}
             ]
             
-            # Temporarily set CG history and get summary
-            original_history = cg_agent.message_history
-            cg_agent.message_history = temp_history
+            # The temporary history is passed straight to the provider; the CG's own history is left
+            # untouched so concurrent chunk summaries cannot clobber each other's swap/restore.
             from contextlib import aclosing
             
             # Use the CG's LLM provider directly for summarization
             summary_chunks = []
-            async with aclosing(cg_agent.llm_provider.stream_completion(
-                model=cg_agent.model,
-                messages=temp_history,
-                temperature=0.3,  # Lower temperature for more focused summaries
-                max_tokens=800    # Limit summary length
-            )) as stream:
-                async for response_chunk in stream:
-                    if isinstance(response_chunk, dict) and response_chunk.get("type") == "response_chunk" and response_chunk.get("content"):
-                        summary_chunks.append(response_chunk["content"])
-            
-            # Restore original CG history
-            cg_agent.message_history = original_history
+            with llm_request_context(RequestPriority.SUMMARIZATION, original_agent_id):
+                async with aclosing(cg_agent.llm_provider.stream_completion(
+                    model=cg_agent.model,
+                    messages=temp_history,
+                    temperature=0.3,  # Lower temperature for more focused summaries
+                    max_tokens=800    # Limit summary length
+                )) as stream:
+                    async for response_chunk in stream:
+                        if isinstance(response_chunk, dict) and response_chunk.get("type") == "response_chunk" and response_chunk.get("content"):
+                            summary_chunks.append(response_chunk["content"])
             
             summary = ''.join(summary_chunks).strip()
             
             if summary:
                 logger.debug(f"Generated summary for chunk {chunk_num}: {len(summary)} characters")
+                await summary_cache.put(cache_key, summary)
                 return summary
             else:
                 logger.warning(f"Empty summary generated for chunk {chunk_num}")
@@ -310,31 +331,13 @@ Please provide your summary as plain text (no XML tags needed for this summariza
         
         return condensed
     
-    def estimate_token_count(self, messages: List[Dict[str, Any]]) -> int:
+    def estimate_token_count(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
         """
-        Rough estimation of token count for message history.
-        Uses a simple heuristic: ~4 characters per token.
+        Token count for message history (content, tool calls and per-message overhead).
+        Uses the model family's tokenizer when available, otherwise a calibrated estimate.
+        Per-message counts are cached, so only new messages are tokenized each cycle.
         """
-        total_chars = 0
-        for msg in messages:
-            content = msg.get('content') # Get content, which can be None
-            if content:
-                total_chars += len(content)
-
-            # Also account for tool calls, which add to the context size
-            if msg.get("tool_calls"):
-                try:
-                    total_chars += len(json.dumps(msg["tool_calls"]))
-                except (TypeError, ValueError):
-                    pass # Ignore if not serializable
-        
-        # Rough conversion: 4 characters per token
-        estimated_tokens = total_chars // 4
-        
-        # Add overhead for message structure
-        overhead = len(messages) * 5  # ~5 tokens overhead per message
-        
-        return estimated_tokens + overhead
+        return token_counter.count_messages(messages, model_id=model)
 
 # Global instance for framework use
 context_summarizer = None
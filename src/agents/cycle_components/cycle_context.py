@@ -24,6 +24,7 @@ class CycleContext(BaseModel):
     
     # Cycle Execution State
     history_for_call: List[MessageDict] = Field(default_factory=list, description="Message history prepared for the LLM call.")
+    injected_messages: List[MessageDict] = Field(default_factory=list, description="Ephemeral messages added to history_for_call on top of the agent's message_history.")
     final_system_prompt: str = Field(default="", description="The system prompt used for this cycle.")
     start_time: float = Field(default_factory=time.perf_counter, description="Cycle start time for duration calculation.")
     llm_call_duration_ms: float = Field(default=0.0, description="Duration of the LLM call in milliseconds.")
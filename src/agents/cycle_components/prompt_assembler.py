@@ -4,8 +4,11 @@ import json
 from typing import TYPE_CHECKING, List, Optional
 
 from src.llm_providers.base import MessageDict
+from src.llm_providers.request_tracing import request_tracer
 from src.agents.constants import BOOTSTRAP_AGENT_ID, AGENT_TYPE_WORKER, AGENT_TYPE_PM, WORKER_STATE_REPORT, WORKER_STATE_WORK, WORKER_STATE_WAIT
 from src.config.settings import settings
+from src.utils.workspace_snapshot import workspace_snapshot
+from src.tools.task_index import task_index
 
 if TYPE_CHECKING:
     from src.agents.core import Agent
@@ -18,11 +21,29 @@ class PromptAssembler:
     """
     Assembles the system prompt and message history for an LLM call within a cycle.
     Handles injection of system health reports for Admin AI.
+
+    Ephemeral per-cycle blocks are placed according to settings.PROMPT_LAYOUT: 'legacy'
+    inserts each at its own position, 'prefix_stable' appends them all as one trailing
+    system message so everything before the newest turn is byte-identical to the
+    previous cycle's prompt and stays in the backend's prompt-prefix cache.
     """
 
     def __init__(self, manager: 'AgentManager'):
         self._manager = manager
 
+    @staticmethod
+    def _inject_block(history_for_call: List[MessageDict], msg: MessageDict, position: Optional[int],
+                      injected_messages: List[MessageDict], trailing_blocks: Optional[List[str]]):
+        """Inserts msg at position (None appends), or defers it to the trailing block in prefix_stable layout."""
+        if trailing_blocks is not None:
+            trailing_blocks.append(msg["content"])
+            return
+        if position is None:
+            history_for_call.append(msg)
+        else:
+            history_for_call.insert(position, msg)
+        injected_messages.append(msg)
+
     async def _generate_system_health_report(self, agent: 'Agent') -> Optional[str]:
         """
         Generates a concise system health report and task context for Admin AI.
@@ -143,47 +164,13 @@ class PromptAssembler:
         if not self._manager.current_project or not self._manager.current_session:
             return None
             
-        import os
         import re
         
         safe_project_name = re.sub(r'[^\w\-. ]', '_', self._manager.current_project)
         workspace_path = settings.PROJECTS_BASE_DIR / safe_project_name / self._manager.current_session / "shared_workspace"
         
-        if not workspace_path.exists():
-            return None
-            
-        EXCLUDE_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env', 'dist', 'build', '.idea', '.vscode'}
-        MAX_FILES = 200
-        MAX_DEPTH = 4
-        
-        # Build tree string
-        tree_lines = []
-        file_count = 0
-        
-        for root, dirs, files in os.walk(workspace_path):
-            # Prune excluded directories from traversal
-            dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
-            
-            level = str(root).replace(str(workspace_path), '').count(os.sep)
-            
-            # Prune directories based on max depth
-            if level > MAX_DEPTH:
-                continue
-                
-            indent = '  ' * level
-            if level > 0:
-                tree_lines.append(f"{indent}|-- {os.path.basename(root)}/")
-                
-            for f in files:
-                if file_count >= MAX_FILES:
-                    break
-                tree_lines.append(f"{indent}  |-- {f}")
-                file_count += 1
-                
-            if file_count >= MAX_FILES:
-                tree_lines.append(f"{indent}  |-- ... (Truncated: Maximum {MAX_FILES} files returned)")
-                break
-                
+        # Shared, change-driven snapshot: built off the event loop once and reused by every agent
+        tree_lines = await workspace_snapshot.get_tree_lines(workspace_path)
         if not tree_lines:
             return None
             
@@ -193,7 +180,7 @@ class PromptAssembler:
                 f"Read them to avoid duplicating work. Deep dependency directories like node_modules "
                 f"and .git are hidden for brevity.)")
 
-    def _generate_worker_tasks_report(self, agent: 'Agent') -> Optional[str]:
+    async def _generate_worker_tasks_report(self, agent: 'Agent') -> Optional[str]:
         """
         Generates a concise report of tasks assigned to this worker agent.
         This ensures the worker always knows its task UUIDs for state transitions.
@@ -202,18 +189,10 @@ class PromptAssembler:
             return None
 
         try:
-            from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-            if not TASKLIB_AVAILABLE:
-                return None
-
-            pm_tool = ProjectManagementTool()
-            tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-            if not tw:
-                return None
-
-            # Query tasks assigned to this specific worker
-            tasks = tw.tasks.filter(assignee=agent.agent_id, status='pending')
-            task_list = list(tasks)
+            # Cached per-assignee view; only re-queried after a task mutation
+            task_list = await task_index.get_pending_tasks_for_assignee(
+                self._manager.current_project, self._manager.current_session, agent.agent_id
+            )
 
             if not task_list:
                 return None
@@ -224,10 +203,7 @@ class PromptAssembler:
             for task in task_list:
                 uuid = task['uuid']
                 desc = task['description'] or 'No description'
-                try:
-                    progress = task['task_progress'] or 'todo'
-                except (KeyError, AttributeError):
-                    progress = 'todo'
+                progress = task['task_progress'] or 'todo'
                 truncated_desc = (desc[:80] + '...') if len(desc) > 80 else desc
                 active_marker = " ◄ ACTIVE" if active_task_id and str(uuid) == str(active_task_id) else ""
                 lines.append(f"  - [{progress}] {truncated_desc} (task_id: {uuid}){active_marker}")
@@ -289,26 +265,20 @@ class PromptAssembler:
             if needs_new_context:
                 agent._needs_initial_work_context = False
 
-        # 1.5 Filter read messages from history
+        # 1.5 Filter read messages from history (the ledger's message_id map avoids a full scan
+        # unless something actually needs removing)
         if getattr(agent, 'read_message_ids', None):
-            filtered_history = []
-            for msg in agent.message_history:
-                if msg.get("message_id") and msg.get("message_id") in agent.read_message_ids:
-                    logger.debug(f"PromptAssembler '{agent.agent_id}': Filtering out read message {msg.get('message_id')}")
-                    continue
-                filtered_history.append(msg)
-            agent.message_history = filtered_history
+            read_ids_present = {mid for mid in agent.message_history.message_ids() if mid in agent.read_message_ids}
+            if read_ids_present:
+                logger.debug(f"PromptAssembler '{agent.agent_id}': Filtering out read messages {sorted(read_ids_present)}")
+                agent.message_history = [msg for msg in agent.message_history if msg.get("message_id") not in read_ids_present]
 
         # 1.6 Prune stale tool error results from history (Fix +47)
         # Failed tool results persist across cycles and pollute context.
         # Keep only the most recent 1 error message to provide corrective context
         # without overwhelming the LLM with stale failures.
-        STALE_ERROR_MARKERS = ["[Tool Execution Failed]", "[Tool Execution Blocked]", "Code edit failed:"]
-        error_indices = []
-        for idx, msg in enumerate(agent.message_history):
-            content = msg.get("content", "")
-            if msg.get("role") in ("system", "tool") and any(marker in content for marker in STALE_ERROR_MARKERS):
-                error_indices.append(idx)
+        # Error positions are tracked by the history ledger (see STALE_ERROR_MARKERS).
+        error_indices = agent.message_history.error_positions()
         
         MAX_ERROR_MESSAGES = 1
         if len(error_indices) > MAX_ERROR_MESSAGES:
@@ -327,7 +297,11 @@ class PromptAssembler:
 
         # 2. Prepare History for LLM Call
         history_for_call = agent.message_history.copy() # Start with agent's current history
-        logger.debug(f"PromptAssembler '{agent.agent_id}': Raw agent.message_history (len {len(agent.message_history)}) before modifications: {json.dumps(agent.message_history, indent=2)}")
+        injected_messages: List[MessageDict] = [] # Ephemeral blocks added below, tracked for token accounting
+        trailing_blocks: Optional[List[str]] = [] if settings.PROMPT_LAYOUT == "prefix_stable" else None
+        trace_request = request_tracer.should_trace()
+        if trace_request:
+            request_tracer.trace_payload(f"PromptAssembler '{agent.agent_id}'", agent.model, agent.message_history, label=f"Raw agent.message_history (len {len(agent.message_history)}) before modifications")
 
         if last_prompt_state != current_state_key:
             # State changed - inject new prompt and persist to both copy AND original
@@ -349,11 +323,8 @@ class PromptAssembler:
             system_health_report = await self._generate_system_health_report(agent)
             if system_health_report:
                 health_msg: MessageDict = {"role": "system", "content": system_health_report}
-                # Insert *after* the main system prompt but before other history
-                if len(history_for_call) > 1:
-                    history_for_call.insert(1, health_msg)
-                else:
-                    history_for_call.append(health_msg) # Append if only system prompt was there
+                # Insert *after* the main system prompt but before other history (append if only the system prompt is there)
+                self._inject_block(history_for_call, health_msg, 1 if len(history_for_call) > 1 else None, injected_messages, trailing_blocks)
                 logger.debug(f"Injected system health report for Admin AI '{agent.agent_id}'.")
 
         # 3.5 Inject Workspace Tree (PM and Worker only)
@@ -363,31 +334,24 @@ class PromptAssembler:
                 tree_msg: MessageDict = {"role": "system", "content": workspace_tree_report}
                 # Insert closer to the bottom to ensure the agent is aware of the current file system state.
                 # We place it before the last 2 messages (which are typically the latest action/feedback).
-                insert_pos = max(1, len(history_for_call) - 2)
-                if len(history_for_call) <= 2:
-                    history_for_call.append(tree_msg)
-                else:
-                    history_for_call.insert(insert_pos, tree_msg)
+                insert_pos = max(1, len(history_for_call) - 2) if len(history_for_call) > 2 else None
+                self._inject_block(history_for_call, tree_msg, insert_pos, injected_messages, trailing_blocks)
                 logger.debug(f"Injected shared_workspace tree report for {agent.agent_type} '{agent.agent_id}'.")
 
         # 3.55 Inject Worker Assigned Tasks Report (Worker only)
         if hasattr(agent, 'agent_type') and agent.agent_type == AGENT_TYPE_WORKER:
-            worker_tasks_report = self._generate_worker_tasks_report(agent)
+            worker_tasks_report = await self._generate_worker_tasks_report(agent)
             if worker_tasks_report:
                 tasks_msg: MessageDict = {"role": "system", "content": worker_tasks_report}
                 # Insert after system prompt (and workspace tree if present)
-                insert_pos = min(2, len(history_for_call))
-                history_for_call.insert(insert_pos, tasks_msg)
+                self._inject_block(history_for_call, tasks_msg, min(2, len(history_for_call)), injected_messages, trailing_blocks)
                 logger.debug(f"Injected assigned tasks report for worker '{agent.agent_id}'.")
 
         # 3.6 Inject Message Read/Ack instructions (Workers and PMs)
         if hasattr(agent, 'agent_type') and agent.agent_type in [AGENT_TYPE_WORKER, AGENT_TYPE_PM]:
-            # Count unread messages in history
-            unread_messages = []
-            for msg in history_for_call:
-                msg_id = msg.get("message_id")
-                if msg_id and msg_id not in getattr(agent, 'read_message_ids', set()):
-                    unread_messages.append(msg_id)
+            # Collect unread message IDs from the history ledger (injected blocks carry no message_id)
+            read_ids = getattr(agent, 'read_message_ids', None) or set()
+            unread_messages = [msg_id for msg_id in agent.message_history.message_ids() if msg_id not in read_ids]
 
             if unread_messages:
                 read_instruction = (
@@ -400,8 +364,7 @@ class PromptAssembler:
                 )
                 read_msg: MessageDict = {"role": "system", "content": read_instruction}
                 # Insert after system prompt position
-                insert_pos = min(2, len(history_for_call))
-                history_for_call.insert(insert_pos, read_msg)
+                self._inject_block(history_for_call, read_msg, min(2, len(history_for_call)), injected_messages, trailing_blocks)
                 logger.debug(f"Injected mark_message_read instructions for {agent.agent_type} '{agent.agent_id}' with {len(unread_messages)} unread messages.")
 
             # 3.7 Report-state safety check: remind worker of unread messages before reporting
@@ -432,53 +395,42 @@ class PromptAssembler:
                     f"If you find a missed instruction, switch back to worker_work to address it before reporting."
                 )
                 safety_system_msg: MessageDict = {"role": "system", "content": safety_msg}
-                history_for_call.append(safety_system_msg)
+                self._inject_block(history_for_call, safety_system_msg, None, injected_messages, trailing_blocks)
                 logger.info(f"Injected report safety check for worker '{agent.agent_id}' with {len(unread_messages)} unread messages.")
 
             # 3.8 Task Reminder Pin for workers in work state
-            if agent.agent_type == AGENT_TYPE_WORKER and agent.state == WORKER_STATE_WORK and len(history_for_call) > 8:
+            if agent.agent_type == AGENT_TYPE_WORKER and agent.state == WORKER_STATE_WORK and len(history_for_call) + len(trailing_blocks or ()) > 8:
                 active_task_id = getattr(agent, 'active_task_id', None)
                 if active_task_id:
                     try:
-                        from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                        if TASKLIB_AVAILABLE:
-                            pm_tool = ProjectManagementTool()
-                            proj_name = self._manager.current_project or ""
-                            sess_name = self._manager.current_session or ""
-                            tw = pm_tool._get_taskwarrior_instance(proj_name, sess_name)
-                            if tw:
-                                aliases = pm_tool._load_aliases(proj_name, sess_name)
-                                resolved_id = str(active_task_id).strip()
-                                if resolved_id in aliases:
-                                    resolved_id = aliases[resolved_id]
-                                task = None
-                                if '-' in resolved_id and len(resolved_id) > 10:
-                                    task = tw.tasks.get(uuid=resolved_id)
-                                elif resolved_id.isdigit():
-                                    task = tw.tasks.get(id=int(resolved_id))
-                                
-                                if task:
-                                    desc = task['description']
-                                    reminder_msg = (
-                                        f"[TASK FOCUS REMINDER - IMPORTANT]\n"
-                                        f"You are currently working on task_id: {active_task_id}\n"
-                                        f"Goal: {desc}\n"
-                                        f"Please review your recent tool results above and take the next concrete step to complete this task.\n"
-                                        f"If the task is complete, call the 'request_state' tool with state='worker_report'."
-                                    )
-                                    history_for_call.append({"role": "system", "content": reminder_msg})
-                                    logger.debug(f"Injected task reminder pin for worker '{agent.agent_id}'.")
+                        proj_name = self._manager.current_project or ""
+                        sess_name = self._manager.current_session or ""
+                        task = await task_index.get_task(proj_name, sess_name, str(active_task_id))
+                        if task:
+                            desc = task['description']
+                            reminder_msg = (
+                                f"[TASK FOCUS REMINDER - IMPORTANT]\n"
+                                f"You are currently working on task_id: {active_task_id}\n"
+                                f"Goal: {desc}\n"
+                                f"Please review your recent tool results above and take the next concrete step to complete this task.\n"
+                                f"If the task is complete, call the 'request_state' tool with state='worker_report'."
+                            )
+                            reminder_system_msg: MessageDict = {"role": "system", "content": reminder_msg}
+                            self._inject_block(history_for_call, reminder_system_msg, None, injected_messages, trailing_blocks)
+                            logger.debug(f"Injected task reminder pin for worker '{agent.agent_id}'.")
                     except Exception as e:
                         logger.warning(f"PromptAssembler: Failed to fetch task for reminder pin: {e}")
 
+        # 3.9 Prefix-stable layout: all ephemeral context goes after the newest turn, as one message
+        if trailing_blocks:
+            trailing_msg: MessageDict = {"role": "system", "content": "\n\n".join(trailing_blocks)}
+            history_for_call.append(trailing_msg)
+            injected_messages.append(trailing_msg)
+            logger.debug(f"PromptAssembler: Appended {len(trailing_blocks)} ephemeral block(s) as one trailing message for '{agent.agent_id}'.")
+
         context.history_for_call = history_for_call
+        context.injected_messages = injected_messages
 
-        # 4. Log the history being sent to the LLM
-        logger.debug(f"PromptAssembler: Final history being sent to LLM for agent '{agent.agent_id}' (state: {agent.state}, length {len(context.history_for_call)}):")
-        for i, msg_to_log in enumerate(context.history_for_call):
-            content_preview = str(msg_to_log.get('content'))[:200]
-            tool_calls_preview = msg_to_log.get('tool_calls')
-            log_line = f"  [{i}] Role: {msg_to_log.get('role')}, Content: {content_preview}{'...' if len(str(msg_to_log.get('content'))) > 200 else ''}"
-            if tool_calls_preview:
-                log_line += f", ToolCalls: {json.dumps(tool_calls_preview)}"
-            logger.debug(log_line)
+        # 4. Log the history being sent to the LLM (only when request tracing is active)
+        if trace_request:
+            request_tracer.trace_messages(f"PromptAssembler final history for '{agent.agent_id}' (state: {agent.state})", agent.model, context.history_for_call)
@@ -0,0 +1,182 @@
+# START OF FILE src/agents/cycle_components/summary_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.settings import settings, BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_VERSION = 2
+
+
+class SummaryCache:
+    """
+    LRU cache of context chunk summaries, keyed by the hash of the chunk's whole messages.
+
+    The ContextSummarizer splits history on fixed message-block boundaries, so the
+    leading chunk stays identical while the history grows and its summary is looked up
+    here before asking the Constitutional Guardian (failover retries hit the same way).
+    Bounded by SUMMARY_CACHE_MAX_ENTRIES; persisted to SUMMARY_CACHE_FILE if set, as an
+    append-only JSON lines log that is compacted once it holds twice that many records.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._save_lock = asyncio.Lock()
+        self._log_records: Optional[int] = 0 # Records in the persisted log; None forces a rewrite
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(agent_id: str, messages: List[Dict[str, Any]]) -> str:
+        """Hashes the agent id and the messages' role, content and tool call fields, in order."""
+        digest = hashlib.sha256(agent_id.encode('utf-8', errors='replace'))
+        for msg in messages:
+            fields = {field: msg.get(field) for field in ("role", "content", "name", "tool_call_id", "tool_calls")}
+            digest.update(b"\n")
+            digest.update(json.dumps(fields, sort_keys=True, default=str).encode('utf-8', errors='replace'))
+        return digest.hexdigest()
+
+    def _cache_file(self) -> Optional[Path]:
+        if not settings.SUMMARY_CACHE_FILE:
+            return None
+        path = Path(settings.SUMMARY_CACHE_FILE)
+        return path if path.is_absolute() else BASE_DIR / "data" / path
+
+    @staticmethod
+    def _read_cache_file_sync(cache_file: Path) -> Tuple[List[Tuple[str, str]], Optional[int]]:
+        """Returns the logged (key, summary) records, oldest first, and the record count (None if the file needs rewriting)."""
+        if not cache_file.exists():
+            return [], 0
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except json.JSONDecodeError:
+            header = None
+        if not isinstance(header, dict) or header.get("version") != SUMMARY_CACHE_VERSION:
+            return [], None
+        records = []
+        for line in lines[1:]:
+            try:
+                key, summary = json.loads(line)
+            except (json.JSONDecodeError, ValueError, TypeError):
+                continue # A record torn by a crash mid-append
+            records.append((key, summary))
+        return records, len(records)
+
+    async def _ensure_loaded(self):
+        """Loads the persisted cache once, off the event loop, on first use."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            cache_file = self._cache_file()
+            if cache_file:
+                try:
+                    loaded, self._log_records = await asyncio.to_thread(self._read_cache_file_sync, cache_file)
+                    # Entries stored while the file was being read are newer; keep them most recent
+                    for key, summary in reversed(loaded):
+                        if key not in self._entries:
+                            self._entries[key] = summary
+                            self._entries.move_to_end(key, last=False)
+                    self._evict()
+                    if loaded:
+                        logger.info(f"SummaryCache: Loaded {len(self._entries)} cached summaries from {cache_file}.")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"SummaryCache: Could not load {cache_file}: {e}. Starting empty.")
+                    self._log_records = None
+            self._loaded = True
+
+    def _evict(self):
+        max_entries = max(0, settings.SUMMARY_CACHE_MAX_ENTRIES)
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Returns the cached summary for key (marking it most recently used), or None."""
+        if settings.SUMMARY_CACHE_MAX_ENTRIES <= 0:
+            return None
+        await self._ensure_loaded()
+        summary = self._entries.get(key)
+        if summary is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return summary
+
+    async def put(self, key: str, summary: str):
+        """Stores a summary, evicting the least recently used entries, and persists if configured."""
+        if settings.SUMMARY_CACHE_MAX_ENTRIES <= 0 or not summary:
+            return
+        await self._ensure_loaded()
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        self._evict()
+        await self._save(key, summary)
+
+    async def _save(self, key: str, summary: str):
+        """Appends the new record to the log, or rewrites the log from memory when it has grown stale."""
+        cache_file = self._cache_file()
+        if not cache_file:
+            return
+        async with self._save_lock:
+            if self._log_records is not None and self._log_records < 2 * max(1, settings.SUMMARY_CACHE_MAX_ENTRIES):
+                def append_sync():
+                    with open(cache_file, 'a', encoding='utf-8') as f:
+                        if f.tell() == 0:
+                            f.write(json.dumps({"version": SUMMARY_CACHE_VERSION}) + "\n")
+                        f.write(json.dumps([key, summary]) + "\n")
+                try:
+                    await asyncio.to_thread(lambda: cache_file.parent.mkdir(parents=True, exist_ok=True))
+                    await asyncio.to_thread(append_sync)
+                    self._log_records += 1
+                except Exception as e:
+                    logger.error(f"SummaryCache: Error appending to {cache_file}: {e}", exc_info=True)
+                    self._log_records = None
+                return
+            await self._compact(cache_file)
+
+    async def _compact(self, cache_file: Path):
+        """Atomically rewrites the log with only the live entries. Caller holds _save_lock."""
+        entries = list(self._entries.items())
+        temp_file_path: Optional[Path] = None
+        try:
+            await asyncio.to_thread(lambda: cache_file.parent.mkdir(parents=True, exist_ok=True))
+            temp_fd, temp_path_str = await asyncio.to_thread(
+                lambda: tempfile.mkstemp(suffix=".tmp", prefix=cache_file.name + '_', dir=cache_file.parent)
+            )
+            temp_file_path = Path(temp_path_str)
+
+            def write_log_sync():
+                with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps({"version": SUMMARY_CACHE_VERSION}) + "\n")
+                    for entry in entries:
+                        f.write(json.dumps(list(entry)) + "\n")
+
+            await asyncio.to_thread(write_log_sync)
+            await asyncio.to_thread(os.replace, temp_file_path, cache_file)
+            temp_file_path = None
+            self._log_records = len(entries)
+        except Exception as e:
+            logger.error(f"SummaryCache: Error saving {cache_file}: {e}", exc_info=True)
+        finally:
+            if temp_file_path and temp_file_path.exists():
+                try: await asyncio.to_thread(os.remove, temp_file_path)
+                except Exception as rm_err: logger.error(f"SummaryCache: Error removing temporary file {temp_file_path}: {rm_err}")
+
+
+# --- Singleton Instance ---
+summary_cache = SummaryCache()
+# END OF FILE src/agents/cycle_components/summary_cache.py
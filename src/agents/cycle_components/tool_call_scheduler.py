@@ -0,0 +1,95 @@
+# START OF FILE src/agents/cycle_components/tool_call_scheduler.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from src.tools.base import ToolEffects, effects_conflict
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCallScheduler:
+    """
+    Runs the independent tool calls of one agent turn concurrently.
+
+    The cycle still walks the calls in their original order and awaits run(i) for each
+    call it decides to execute, so results land in history in call order. Behind it, read
+    calls whose earlier conflicting calls have settled are started eagerly (at most
+    max_concurrency at a time); writes and exclusive calls only start when the cycle
+    reaches them, after every earlier conflicting call has finished. Calls the cycle walks
+    past without running (duplicates, blocked calls) count as settled; a read prefetched
+    for such a call is simply discarded, so callers should only mark calls for prefetch
+    once they have passed the cycle's skip checks. execute(index, speculative) is called
+    with speculative=True for prefetches, which must leave no side effects beyond the read.
+    """
+
+    def __init__(self, execute: Callable[[int, bool], Awaitable[Any]], effects: List[ToolEffects],
+                 max_concurrency: int = 4, prefetch: Optional[List[bool]] = None):
+        self._execute = execute
+        self._effects = effects
+        self._enabled = max_concurrency > 1 and len(effects) > 1
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._prefetch = prefetch if prefetch is not None else [True] * len(effects)
+        self._deps: List[List[int]] = [
+            [j for j in range(i) if effects_conflict(effects[j], effects[i])] for i in range(len(effects))
+        ] if self._enabled else []
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._settled: Set[int] = set() # Finished, or walked past by the cycle without running
+        self._claimed: Set[int] = set()
+
+    @property
+    def prefetched_count(self) -> int:
+        return len(self._tasks)
+
+    def start(self):
+        if self._enabled:
+            self._start_ready_reads()
+
+    async def run(self, index: int) -> Any:
+        """Result of call index. The cycle must call this in ascending index order."""
+        if not self._enabled:
+            return await self._execute(index, False)
+        self._claimed.add(index)
+        for j in range(index):
+            if j not in self._claimed and j not in self._tasks:
+                self._settled.add(j)
+        self._start_ready_reads()
+        task = self._tasks.get(index)
+        if task is not None:
+            return await task
+        pending = [self._tasks[j] for j in self._deps[index] if j in self._tasks and not self._tasks[j].done()]
+        if pending:
+            await asyncio.wait(pending)
+        try:
+            async with self._semaphore:
+                return await self._execute(index, False)
+        finally:
+            self._settled.add(index)
+            self._start_ready_reads()
+
+    def close(self):
+        """Cancels prefetched calls the cycle never claimed. Call once the cycle is done with the turn."""
+        for index, task in self._tasks.items():
+            if index not in self._claimed and not task.done():
+                task.cancel()
+
+    def _start_ready_reads(self):
+        for i, effects in enumerate(self._effects):
+            if (effects.mode != "read" or not self._prefetch[i] or i in self._tasks
+                    or i in self._settled or i in self._claimed):
+                continue
+            if all(j in self._settled for j in self._deps[i]):
+                task = asyncio.create_task(self._run_limited(i))
+                task.add_done_callback(lambda t, i=i: self._on_prefetch_done(i, t))
+                self._tasks[i] = task
+
+    async def _run_limited(self, index: int) -> Any:
+        async with self._semaphore:
+            return await self._execute(index, True)
+
+    def _on_prefetch_done(self, index: int, task: asyncio.Task):
+        self._settled.add(index)
+        if not task.cancelled() and task.exception() is not None and index not in self._claimed:
+            logger.debug(f"ToolCallScheduler: Prefetched call {index} failed and was never claimed: {task.exception()}")
+        self._start_ready_reads()
+# END OF FILE src/agents/cycle_components/tool_call_scheduler.py
@@ -8,7 +8,9 @@ from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
 
 from src.llm_providers.base import ToolResultDict, MessageDict  # type: ignore[import]
 from src.agents.core import Agent  # type: ignore[import]
+from src.agents.message_history import MessageHistory  # type: ignore[import]
 from src.config.settings import settings  # type: ignore[import]
+from src.llm_providers.request_scheduler import llm_request_context, RequestPriority  # type: ignore[import]
 
 from src.agents.constants import (  # type: ignore[import]
     AGENT_STATUS_IDLE, AGENT_STATUS_PROCESSING, AGENT_STATUS_PLANNING,
@@ -38,6 +40,9 @@ from src.agents.cycle_components import (  # type: ignore[import]
     AgentHealthMonitor
 )
 from src.agents.cycle_components.json_validator import JSONValidator  # type: ignore[import]
+from src.agents.cycle_components.tool_call_scheduler import ToolCallScheduler  # type: ignore[import]
+from src.tools.base import ToolEffects  # type: ignore[import]
+from src.tools.task_index import task_index  # type: ignore[import]
 from src.agents.cycle_components.context_summarizer import ContextSummarizer  # type: ignore[import]
 
 from src.workflows.base import WorkflowResult  # type: ignore[import]
@@ -67,7 +72,7 @@ class AgentCycleHandler:
         self._tool_execution_stats: Dict[str, int] = {"total_calls": 0, "successful_calls": 0, "failed_calls": 0}
         logger.info("AgentCycleHandler initialized with enhanced tool execution monitoring, JSON validation, context summarization, and agent health monitoring.")
 
-    def _handle_worker_task_tracking(self, agent: 'Agent', requested_state: str, task_id: Optional[str] = None) -> None:
+    async def _handle_worker_task_tracking(self, agent: 'Agent', requested_state: str, task_id: Optional[str] = None) -> None:
         """
         When a worker transitions to worker_work with a task_id, automatically:
         1. Set agent.active_task_id so the UI can display it.
@@ -87,7 +92,7 @@ class AgentCycleHandler:
             self._missing_task_id_counts[agent.agent_id] = count
 
             if count >= 2:
-                inferred_task_id = self._infer_worker_task(agent.agent_id)
+                inferred_task_id = await self._infer_worker_task(agent.agent_id)
                 if inferred_task_id:
                     logger.warning(f"CycleHandler: Auto-inferred task '{inferred_task_id}' for worker '{agent.agent_id}' after multiple omissions.")
                     task_id = inferred_task_id
@@ -103,102 +108,110 @@ class AgentCycleHandler:
         agent.active_task_id = task_id
         logger.info(f"CycleHandler: Worker '{agent.agent_id}' set active_task_id='{task_id}' for work state transition.")
 
-        # Auto-update Taskwarrior progress to doing
+        # Auto-update Taskwarrior progress to doing (Taskwarrior I/O runs on the session's task worker)
+        project_name, session_name = self._manager.current_project, self._manager.current_session
+        tw = task_index.get_taskwarrior(project_name, session_name)
+        if not tw:
+            return
+
+        def mark_doing_sync() -> Tuple[Optional[str], str]:
+            """Returns (progress before the update or None if not found, resolved id). Raises ValueError for decomposed tasks."""
+            # Resolve aliases (workers use short IDs like "15", not UUIDs)
+            resolved_id = task_id.strip() if task_id else ""
+            resolved_id = task_index.get_aliases(project_name, session_name).get(resolved_id, resolved_id)
+
+            # Look up task by UUID or numeric ID
+            if '-' in resolved_id and len(resolved_id) > 10:
+                task = tw.tasks.get(uuid=resolved_id)
+            elif resolved_id.isdigit():
+                task = tw.tasks.get(id=int(resolved_id))
+            else:
+                task = None
+            if not task:
+                return None, resolved_id
+
+            # CRITICAL FIX: Prevent worker from selecting a task that is already decomposed
+            # tasklib Task uses bracket access, not .get()
+            try:
+                current_progress = task['task_progress']
+            except (KeyError, AttributeError):
+                current_progress = None
+
+            if current_progress == 'decomposed':
+                raise ValueError(f"Task '{task_id}' has already been marked as 'decomposed'. You MUST select one of the new sub-tasks you created, NOT the parent task.")
+            if current_progress not in ['finished', 'completed', 'deleted', 'waiting']:
+                task['task_progress'] = 'doing'
+                task.save()
+            return current_progress or "", resolved_id
+
         try:
-            if self._manager.current_project and self._manager.current_session:
-                from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                if TASKLIB_AVAILABLE:
-                    pm_tool = ProjectManagementTool()
-                    tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-                    if tw:
-                        try:
-                            # Resolve aliases (workers use short IDs like "15", not UUIDs)
-                            aliases = pm_tool._load_aliases(self._manager.current_project, self._manager.current_session)
-                            resolved_id = task_id.strip() if task_id else ""
-                            if resolved_id in aliases:
-                                resolved_id = aliases[resolved_id]
-                            
-                            # Look up task by UUID or numeric ID
-                            if '-' in resolved_id and len(resolved_id) > 10:
-                                task = tw.tasks.get(uuid=resolved_id)
-                            elif resolved_id.isdigit():
-                                task = tw.tasks.get(id=int(resolved_id))
-                            else:
-                                task = None
-                            
-                            if task:
-                                # CRITICAL FIX: Prevent worker from selecting a task that is already decomposed
-                                # tasklib Task uses bracket access, not .get()
-                                try:
-                                    current_progress = task['task_progress']
-                                except (KeyError, AttributeError):
-                                    current_progress = None
-                                    
-                                if current_progress == 'decomposed':
-                                    raise ValueError(f"Task '{task_id}' has already been marked as 'decomposed'. You MUST select one of the new sub-tasks you created, NOT the parent task.")
-                                elif current_progress in ['finished', 'completed', 'deleted', 'waiting']:
-                                    logger.info(f"CycleHandler: Task '{task_id}' (resolved: '{resolved_id}') is already '{current_progress}'. Not auto-updating to 'doing'.")
-                                else:
-                                    task['task_progress'] = 'doing'
-                                    task.save()
-                                    logger.info(f"CycleHandler: Auto-updated task '{task_id}' (resolved: '{resolved_id}') to 'doing' for worker '{agent.agent_id}'.")
-                                # Auto-trigger UI refresh for tasks
-                                try:
-                                    import asyncio
-                                    import json
-                                    from src.api.websocket_manager import broadcast
-                                    try:
-                                        asyncio.get_running_loop().create_task(
-                                            broadcast(json.dumps({
-                                                "type": "project_tasks_updated",
-                                                "project_name": self._manager.current_project,
-                                                "session_name": self._manager.current_session
-                                            }))
-                                        )
-                                    except RuntimeError:
-                                        pass # Not in an event loop, should rarely happen here
-                                except Exception as e:
-                                    logger.warning(f"CycleHandler: Failed to trigger UI task refresh: {e}")
-                            else:
-                                logger.warning(f"CycleHandler: Could not find task '{task_id}' (resolved: '{resolved_id}') in Taskwarrior for auto-update.")
-                        except ValueError:
-                            raise # Re-raise our validation error
-                        except Exception as tw_err:
-                            logger.warning(f"CycleHandler: Failed to auto-update task '{task_id}': {tw_err}")
+            current_progress, resolved_id = await task_index.run(project_name, session_name, mark_doing_sync)
         except ValueError:
-            raise # Re-raise validation error
+            raise # Re-raise our validation error
+        except Exception as tw_err:
+            logger.warning(f"CycleHandler: Failed to auto-update task '{task_id}': {tw_err}")
+            return
+
+        if current_progress is None:
+            logger.warning(f"CycleHandler: Could not find task '{task_id}' (resolved: '{resolved_id}') in Taskwarrior for auto-update.")
+            return
+        if current_progress in ['finished', 'completed', 'deleted', 'waiting']:
+            logger.info(f"CycleHandler: Task '{task_id}' (resolved: '{resolved_id}') is already '{current_progress}'. Not auto-updating to 'doing'.")
+        else:
+            task_index.invalidate(project_name, session_name)
+            logger.info(f"CycleHandler: Auto-updated task '{task_id}' (resolved: '{resolved_id}') to 'doing' for worker '{agent.agent_id}'.")
+        # Auto-trigger UI refresh for tasks
+        try:
+            from src.api.websocket_manager import broadcast_event
+            asyncio.get_running_loop().create_task(
+                broadcast_event({
+                    "type": "project_tasks_updated",
+                    "project_name": project_name,
+                    "session_name": session_name
+                })
+            )
         except Exception as e:
-            logger.warning(f"CycleHandler: Error auto-updating task '{task_id}' to in_progress: {e}")
+            logger.warning(f"CycleHandler: Failed to trigger UI task refresh: {e}")
+
+    async def _infer_worker_task(self, agent_id: str) -> Optional[str]:
+        project_name, session_name = self._manager.current_project, self._manager.current_session
+        tw = task_index.get_taskwarrior(project_name, session_name)
+        if not tw:
+            return None
+
+        def infer_sync() -> Optional[str]:
+            for task in tw.tasks.filter(status="pending"):
+                try:
+                    is_assigned = False
+                    if 'assignee' in task and task['assignee'] == agent_id:
+                        is_assigned = True
+                    elif 'tags' in task and task['tags']:
+                        tags = task['tags']
+                        if 'assigned' in tags and (agent_id in tags or f"+{agent_id}" in tags):
+                            is_assigned = True
+
+                    if is_assigned:
+                        progress = task.get('task_progress')
+                        if progress in ['doing', 'in_progress', 'todo', 'pending', None]:
+                            return str(task['uuid'])
+                except Exception:
+                    pass
+            return None
 
-    def _infer_worker_task(self, agent_id: str) -> Optional[str]:
         try:
-            if self._manager.current_project and self._manager.current_session:
-                from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                if TASKLIB_AVAILABLE:
-                    pm_tool = ProjectManagementTool()
-                    tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-                    if tw:
-                        tasks = tw.tasks.filter(status="pending")
-                        for task in tasks:
-                            try:
-                                is_assigned = False
-                                if 'assignee' in task and task['assignee'] == agent_id:
-                                    is_assigned = True
-                                elif 'tags' in task and task['tags']:
-                                    tags = task['tags']
-                                    if 'assigned' in tags and (agent_id in tags or f"+{agent_id}" in tags):
-                                        is_assigned = True
-                                        
-                                if is_assigned:
-                                    progress = task.get('task_progress')
-                                    if progress in ['doing', 'in_progress', 'todo', 'pending', None]:
-                                        return str(task['uuid'])
-                            except Exception:
-                                pass
+            return await task_index.run(project_name, session_name, infer_sync)
         except Exception as e:
             logger.warning(f"Failed to infer task for {agent_id}: {e}")
         return None
 
+    async def _count_pending_tasks(self) -> Optional[int]:
+        """Number of pending tasks in the current session, or None without a task backend. Runs on the session's task worker."""
+        project_name, session_name = self._manager.current_project, self._manager.current_session
+        tw = task_index.get_taskwarrior(project_name, session_name)
+        if not tw:
+            return None
+        return await task_index.run(project_name, session_name, lambda: len(tw.tasks.filter(status='pending')))
+
     def _report_tool_execution_stats(self):
         """Report current tool execution statistics"""
         if self._tool_execution_stats["total_calls"] > 0:
@@ -363,18 +376,19 @@ class AgentCycleHandler:
                     from contextlib import aclosing
                     
                     logger.info(f"Requesting CG verdict via stream_completion for text: '{original_agent_final_text[:100]}...'")
-                    async with aclosing(cg_agent.llm_provider.stream_completion(
-                        messages=cg_history, model=cg_agent.model,
-                        temperature=cg_agent.temperature, max_tokens=max_tokens_for_verdict
-                    )) as stream:
-                        full_verdict_text = ""
-                        async for event in stream:
-                            if event.get("type") == "response_chunk":
-                                full_verdict_text += event.get("content", "")
-                            elif event.get("type") == "error":
-                                logger.error(f"Error during CG LLM stream: {event.get('content')}", exc_info=event.get('_exception_obj'))
-                                full_verdict_text = "<OK/>" # Fail-open
-                                break
+                    with llm_request_context(RequestPriority.GOVERNANCE, cg_agent.agent_id):
+                        async with aclosing(cg_agent.llm_provider.stream_completion(
+                            messages=cg_history, model=cg_agent.model,
+                            temperature=cg_agent.temperature, max_tokens=max_tokens_for_verdict
+                        )) as stream:
+                            full_verdict_text = ""
+                            async for event in stream:
+                                if event.get("type") == "response_chunk":
+                                    full_verdict_text += event.get("content", "")
+                                elif event.get("type") == "error":
+                                    logger.error(f"Error during CG LLM stream: {event.get('content')}", exc_info=event.get('_exception_obj'))
+                                    full_verdict_text = "<OK/>" # Fail-open
+                                    break
                     stripped_verdict = full_verdict_text.strip()
                     logger.info(f"CG Verdict received (raw full text from stream): '{stripped_verdict}'")
 
@@ -603,139 +617,98 @@ class AgentCycleHandler:
                 f"history reduced from {original_len} to {len(agent.message_history)} messages."
             )
 
+    def _is_manage_monitoring_read(self, agent: Agent, tool_name: Optional[str], tool_args: Any) -> bool:
+        # FIX: In pm_manage, list_tasks and list_agents are monitoring operations whose
+        # results change over time as workers act. Exempt them
+        # from duplicate detection so the PM always gets fresh status.
+        return (
+            agent.agent_type == AGENT_TYPE_PM
+            and agent.state == PM_STATE_MANAGE
+            and isinstance(tool_args, dict)
+            and (
+                (tool_name == "project_management" and tool_args.get("action") == "list_tasks")
+                or
+                (tool_name == "manage_team" and tool_args.get("action") == "list_agents")
+            )
+        )
+
+    def _applies_cross_cycle_checks(self, agent: Agent, tool_name: Optional[str], tool_args: Any) -> bool:
+        """Whether the tool loop checks this call against previous cycles' duplicates and identical failures."""
+        is_eligible_pm = agent.agent_type == AGENT_TYPE_PM and agent.state in [PM_STATE_ACTIVATE_WORKERS, PM_STATE_BUILD_TEAM_TASKS, PM_STATE_MANAGE]
+        is_eligible_worker = agent.agent_type == AGENT_TYPE_WORKER
+        return (is_eligible_pm or is_eligible_worker) and not self._is_manage_monitoring_read(agent, tool_name, tool_args)
+
+    def _build_tool_call_scheduler(self, agent: Agent, tool_calls: List[Dict[str, Any]]) -> ToolCallScheduler:
+        """
+        Scheduler for one turn's tool calls, using each tool's declared effects. Only reads the
+        tool loop will actually run are prefetched: calls its cross-cycle checks would answer
+        from history (or block) are left to the loop, and send_message never runs early.
+        """
+        def execute(index: int, speculative: bool):
+            call_data = tool_calls[index]
+            return self._interaction_handler.execute_single_tool(
+                agent, call_data.get("id"), call_data.get("name"), call_data.get("arguments", {}),
+                self._manager.current_project, self._manager.current_session, speculative=speculative
+            )
+
+        max_concurrency = settings.TOOL_PARALLEL_MAX_CONCURRENCY if len(tool_calls) > 1 else 1
+        effects: List[ToolEffects] = []
+        prefetch: List[bool] = []
+        for call_data in tool_calls:
+            tool_name = call_data.get("name"); tool_args = call_data.get("arguments", {})
+            tool = self._manager.tool_executor.tools.get(tool_name) if self._manager.tool_executor else None
+            try:
+                effects.append(tool.get_effects(tool_args) if tool and isinstance(tool_args, dict) else ToolEffects())
+            except Exception as e:
+                logger.warning(f"CycleHandler: Could not determine effects of tool '{tool_name}', running it exclusively: {e}")
+                effects.append(ToolEffects())
+            prefetch.append(
+                tool_name is not None and max_concurrency > 1 and effects[-1].mode == "read" and tool_name != "send_message"
+                and not (
+                    self._applies_cross_cycle_checks(agent, tool_name, tool_args)
+                    and (self._detect_cross_cycle_duplicate_tool_call(agent, tool_name, tool_args) is not None
+                         or self._detect_cross_cycle_identical_failure(agent, tool_name, tool_args) is not None)
+                )
+            )
+        return ToolCallScheduler(execute, effects, max_concurrency=max_concurrency, prefetch=prefetch)
+
+    async def _run_scheduled_tool_call(self, tool_call_scheduler: ToolCallScheduler, index: int) -> Any:
+        """Result of one call of the turn; UI events of a prefetched call are published now, in call order."""
+        result_dict = await tool_call_scheduler.run(index)
+        deferred_events = result_dict.pop("_deferred_events", None) if isinstance(result_dict, dict) else None
+        if deferred_events:
+            from src.api.websocket_manager import broadcast_event
+            for event in deferred_events:
+                await broadcast_event(event)
+        return result_dict
+
     def _detect_cross_cycle_duplicate_tool_call(self, agent: Agent, tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
         """
         Detect if a tool call with the same name and arguments already succeeded
         in a previous cycle (i.e., it exists as an assistant+tool pair in history).
         
         Returns the content of the previous successful tool result if a duplicate
-        is found, or None if this is a fresh call.
+        is found, or None if this is a fresh call. Answered from the history's
+        tool-call signature index, so the lookup does not scan the history.
         """
-        if not agent.message_history:
+        history = agent.message_history
+        if not history:
             return None
-        
-        # Create signature for the current call
-        current_sig = (tool_name, json.dumps(tool_args, sort_keys=True))
-        
-        def _is_equivalent(sig1: Tuple[str, str], sig2: Tuple[str, str]) -> bool:
-            if sig1 == sig2:
-                return True
-            tname1, targs1_json = sig1
-            tname2, targs2_json = sig2
-            if tname1 != tname2:
-                return False
-            if tname1 == "manage_team":
-                try:
-                    args1 = json.loads(targs1_json)
-                    args2 = json.loads(targs2_json)
-                    if args1.get("action") == "create_agent" and args2.get("action") == "create_agent":
-                        r1 = args1.get("role")
-                        r2 = args2.get("role")
-                        if r1 and r2 and str(r1).strip().lower() == str(r2).strip().lower():
-                            return True
-                except Exception:
-                    pass
-            return False
-
-        # Scan history in reverse for assistant messages with matching tool calls
-        for i in range(len(agent.message_history) - 1, -1, -1):
-            msg = agent.message_history[i]
-            if msg.get("role") != "assistant":
-                continue
-            
-            for tc in msg.get("tool_calls", []):
-                prev_sig = (tc.get("name"), json.dumps(tc.get("arguments", {}), sort_keys=True))
-                if _is_equivalent(prev_sig, current_sig):
-                    # Found a matching call - now look for its successful tool result
-                    tc_id = tc.get("id")
-                    for j in range(i + 1, len(agent.message_history)):
-                        result_msg = agent.message_history[j]
-                        if (result_msg.get("role") == "tool" and
-                            result_msg.get("tool_call_id") == tc_id):
-                            result_content = result_msg.get("content", "")
-                            # Check if the result was successful
-                            try:
-                                result_data = json.loads(result_content)
-                                if isinstance(result_data, dict) and result_data.get("status") == "error":
-                                    continue  # Previous call failed, allow retry
-                            except (json.JSONDecodeError, TypeError):
-                                pass
-                            
-                            # Also check for plain text error markers often used by native framework tools
-                            if isinstance(result_content, str):
-                                if (
-                                    "[Tool Execution Failed]" in result_content or 
-                                    "[Framework Error]" in result_content or 
-                                    "[Error]" in result_content or
-                                    result_content.strip() == ""
-                                ):
-                                    continue # Previous call essentially failed, allow retry
-                            
-                            return result_content  # Found a successful duplicate
-        
-        return None
+        if not isinstance(history, MessageHistory):
+            history = MessageHistory(history)
+        return history.last_successful_tool_result(tool_name, tool_args)
 
     def _detect_cross_cycle_identical_failure(self, agent: Agent, tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
         """
         Detect if a tool call with the same name and arguments already failed
         in a previous cycle. Returns the failure message if found.
         """
-        if not agent.message_history:
+        history = agent.message_history
+        if not history:
             return None
-        
-        current_sig = (tool_name, json.dumps(tool_args, sort_keys=True))
-        
-        def _is_equivalent(sig1: Tuple[str, str], sig2: Tuple[str, str]) -> bool:
-            if sig1 == sig2:
-                return True
-            tname1, targs1_json = sig1
-            tname2, targs2_json = sig2
-            if tname1 != tname2: return False
-            try:
-                dict1 = json.loads(targs1_json)
-                dict2 = json.loads(targs2_json)
-                return dict1 == dict2
-            except json.JSONDecodeError:
-                return False
-                
-        for i in range(len(agent.message_history) - 1, 0, -1):
-            msg = agent.message_history[i]
-            if msg.get("role") == "assistant":
-                tc_json = msg.get("tool_calls_json") or msg.get("tool_calls")
-                if tc_json:
-                    try:
-                        tcs = json.loads(tc_json) if isinstance(tc_json, str) else tc_json
-                    except json.JSONDecodeError:
-                        continue
-                    
-                    for tc in tcs:
-                        prev_name = tc.get("name") or (tc.get("function", {}).get("name") if isinstance(tc, dict) else None)
-                        prev_args = tc.get("arguments") or (tc.get("function", {}).get("arguments") if isinstance(tc, dict) else {})
-                        
-                        if isinstance(prev_args, str):
-                            try:
-                                prev_args = json.loads(prev_args)
-                            except json.JSONDecodeError:
-                                prev_args = {}
-                                
-                        prev_sig = (str(prev_name) if prev_name is not None else "", json.dumps(prev_args, sort_keys=True))
-                        
-                        if _is_equivalent(current_sig, prev_sig):
-                            tc_id = tc.get("id")
-                            if i + 1 < len(agent.message_history):
-                                result_msg = agent.message_history[i + 1]
-                                if result_msg.get("role") == "tool" and (not tc_id or result_msg.get("tool_call_id") == tc_id):
-                                    result_content = result_msg.get("content", "")
-                                    if isinstance(result_content, str):
-                                        if (
-                                            "[Tool Execution Failed]" in result_content or 
-                                            "[Framework Error]" in result_content or 
-                                            "[Error]" in result_content or
-                                            "ERROR:" in result_content or
-                                            result_content.strip() == ""
-                                        ):
-                                            return result_content  # Found an identical failure
-        return None
+        if not isinstance(history, MessageHistory):
+            history = MessageHistory(history)
+        return history.last_identical_failure(tool_name, tool_args)
 
     async def run_cycle(self, agent: Agent, retry_count: int = 0): # pyright: ignore[reportGeneralTypeIssues]
         import asyncio
@@ -755,6 +728,10 @@ class AgentCycleHandler:
 
     async def _run_cycle_internal(self, agent: Agent, retry_count: int = 0): # pyright: ignore[reportGeneralTypeIssues]
         logger.critical(f"!!! CycleHandler: run_cycle TASK STARTED for Agent '{agent.agent_id}' (Retry: {retry_count}) !!!")
+        await self._manager.workflow_manager.wait_for_pending_validation(agent.agent_id)
+        if agent.history_deferred:
+            # Activated before the background prefetch reached it: read the saved history off the event loop
+            await agent.load_deferred_history()
         
         # --- NEW: Watchdog for Agent Stalls (cycles without state transitions) ---
         if not hasattr(agent, '_cycles_without_transition'):
@@ -858,6 +835,7 @@ class AgentCycleHandler:
             agent._failed_models_this_cycle = {context.current_model_key_for_tracking}
 
             agent_generator = None # Ensure generator is reset for each iteration of the while True loop
+            tool_call_scheduler: Optional[ToolCallScheduler] = None # Closed in the finally below if the tool loop is cut short
             thought_content_for_history = None # <<<< MODIFICATION: Initialize var to hold thought
             cycle_text_content = "" # <<<< FIX: Track text buffer before it gets cleared
 
@@ -870,8 +848,9 @@ class AgentCycleHandler:
                 
                 # Check if context summarization is needed for small local LLMs
                 try:
-                    # Estimate current token count
-                    estimated_tokens = self._context_summarizer.estimate_token_count(context.history_for_call)
+                    # Token count = agent history (from the incremental ledger) + this cycle's injected blocks
+                    estimated_tokens = agent.message_history.token_total(agent.model) + \
+                        self._context_summarizer.estimate_token_count(context.injected_messages, model=agent.model)
                     # Get max tokens from agent's LLM provider (default to 8000 if not available)
                     max_tokens = getattr(agent.llm_provider, 'max_tokens', 8000) if agent.llm_provider else 8000
                     
@@ -882,7 +861,7 @@ class AgentCycleHandler:
                         if _model_info:
                             model_num_ctx = _model_info.get('model_num_ctx')
                     
-                    if await self._context_summarizer.should_summarize_context(agent.agent_id, estimated_tokens, max_tokens, message_history=context.history_for_call, model_num_ctx=model_num_ctx):
+                    if await self._context_summarizer.should_summarize_context(agent.agent_id, estimated_tokens, max_tokens, message_history=context.history_for_call, model_num_ctx=model_num_ctx, summary_count=agent.message_history.summary_count):
                         logger.info(f"CycleHandler: Context summarization needed for agent '{agent.agent_id}' due to token limits")
                         try:
                             # CRITICAL FIX: Preserve context anchors for Admin AI work state
@@ -937,12 +916,15 @@ class AgentCycleHandler:
                 agent_generator = agent.process_message(history_override=context.history_for_call)
 
                 llm_stream_ended_cleanly = True # Flag to see if the event loop finished or broke early
+                cycle_stream_buffer = None # The agent's StreamTextBuffer for this call; joined only when read
                 async for event in agent_generator:
-                    current_buffer = getattr(agent, 'text_buffer', '')
-                    if current_buffer:
-                        cycle_text_content = current_buffer
-                        
                     event_type = event.get("type")
+                    current_buffer = getattr(agent, 'stream_buffer', None)
+                    if current_buffer:
+                        cycle_stream_buffer = current_buffer
+                        if event_type != "response_chunk": # Chunks are only forwarded; skip the join per token
+                            cycle_text_content = current_buffer.getvalue()
+
                     if event_type != "response_chunk":
                         logger.debug(f"CycleHandler '{agent.agent_id}': Received Event from Agent.process_message: Type='{event_type}', Keys={list(event.keys())}")
 
@@ -1230,16 +1212,9 @@ class AgentCycleHandler:
                                 is_actually_complete = True
                                 pending_count = 0
                                 try:
-                                    if self._manager.current_project and self._manager.current_session:
-                                        from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                                        if TASKLIB_AVAILABLE:
-                                            pm_tool = ProjectManagementTool()
-                                            tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-                                            if tw:
-                                                active_tasks = tw.tasks.filter(status='pending')
-                                                pending_count = len(active_tasks)
-                                                if pending_count > 0:
-                                                    is_actually_complete = False
+                                    pending_count = await self._count_pending_tasks() or 0
+                                    if pending_count > 0:
+                                        is_actually_complete = False
                                 except Exception as e:
                                     logger.warning(f"CycleHandler: Failed to verify task completion for Admin AI hard gate: {e}")
                                 
@@ -1270,7 +1245,7 @@ class AgentCycleHandler:
 
                         # Auto-track worker task when transitioning to work state
                         try:
-                            self._handle_worker_task_tracking(agent, requested_state, event_task_id)
+                            await self._handle_worker_task_tracking(agent, requested_state, event_task_id)
                         except ValueError as ve:
                             logger.warning(f"CycleHandler: State transition blocked for '{agent.agent_id}': {ve}")
                             err_msg = f"[Framework Error]: State transition rejected: {ve}"
@@ -1556,34 +1531,22 @@ class AgentCycleHandler:
                         # --- END PRE-PROCESS ---
 
                         send_message_blocked_by_multi_tool = False
+                        # Independent reads start ahead of the loop; results are still consumed (and appended) in call order
+                        tool_call_scheduler = self._build_tool_call_scheduler(agent, deduplicated_tool_calls)
+                        tool_call_scheduler.start()
                         for i, call_data in enumerate(deduplicated_tool_calls):
                             tool_name = call_data.get("name"); tool_id = call_data.get("id"); tool_args = call_data.get("arguments", {})
                             
                             # --- CROSS-CYCLE DUPLICATE DETECTION ---
                             # Check if this exact tool call already succeeded in a previous cycle.
                             # If so, skip re-execution and inject a forceful directive to advance.
-                            is_eligible_pm = agent.agent_type == AGENT_TYPE_PM and agent.state in [PM_STATE_ACTIVATE_WORKERS, PM_STATE_BUILD_TEAM_TASKS, PM_STATE_MANAGE]
-                            is_eligible_worker = agent.agent_type == AGENT_TYPE_WORKER
-                            
-                            # FIX: In pm_manage, list_tasks and list_agents are monitoring operations whose
-                            # results change over time as workers act. Exempt them
-                            # from duplicate detection so the PM always gets fresh status.
-                            is_manage_monitoring_read = (
-                                agent.agent_type == AGENT_TYPE_PM
-                                and agent.state == PM_STATE_MANAGE
-                                and (
-                                    (tool_name == "project_management" and tool_args.get("action") == "list_tasks")
-                                    or
-                                    (tool_name == "manage_team" and tool_args.get("action") == "list_agents")
-                                )
-                            )
-                            if is_manage_monitoring_read:
+                            if self._is_manage_monitoring_read(agent, tool_name, tool_args):
                                 logger.debug(
                                     f"CycleHandler: Allowing {tool_args.get('action')} for PM '{agent.agent_id}' in pm_manage "
                                     f"(monitoring read - exempt from duplicate detection)."
                                 )
                             
-                            if (is_eligible_pm or is_eligible_worker) and not is_manage_monitoring_read:
+                            if self._applies_cross_cycle_checks(agent, tool_name, tool_args):
                                 prev_result = self._detect_cross_cycle_duplicate_tool_call(agent, tool_name, tool_args)
                                 if prev_result is not None:
                                     # Track duplicate count for escalation
@@ -1871,7 +1834,7 @@ class AgentCycleHandler:
                                 
                                 if has_only_state_change_companion:
                                     logger.info(f"Agent {agent.agent_id}: send_message paired with state change '{deferred_state_change}' — allowing both.")
-                                    result_dict = await self._interaction_handler.execute_single_tool(agent, tool_id, tool_name, tool_args, self._manager.current_project, self._manager.current_session)
+                                    result_dict = await self._run_scheduled_tool_call(tool_call_scheduler, i)
                                 else:
                                     other_tool_names = [t.get("name") for t in non_send_message_tools]
                                     logger.warning(f"Agent {agent.agent_id} attempted to use send_message alongside {other_tool_names}. Blocking send_message only.")
@@ -1889,7 +1852,7 @@ class AgentCycleHandler:
                                         "name": tool_name
                                     }
                             else:
-                                result_dict = await self._interaction_handler.execute_single_tool(agent, tool_id, tool_name, tool_args, self._manager.current_project, self._manager.current_session)
+                                result_dict = await self._run_scheduled_tool_call(tool_call_scheduler, i)
                             # --- END SEND_MESSAGE MULTI-TOOL CONSTRAINT ---
                             
                             if result_dict:
@@ -1930,6 +1893,10 @@ class AgentCycleHandler:
                                 all_tool_results_for_history.append({"role": "tool", "tool_call_id": tool_id or f"unknown_call_{i}", "name": tool_name or f"unknown_tool_{i}", "content": "[Tool Error: No result object]"})
                                 tool_results_text += f"\n\n[Tool Result: {tool_name}]\n[Tool Error: No result object]"
                         
+                        tool_call_scheduler.close()
+                        if tool_call_scheduler.prefetched_count:
+                            logger.debug(f"CycleHandler: Prefetched {tool_call_scheduler.prefetched_count} of {len(deduplicated_tool_calls)} tool calls for '{agent.agent_id}' concurrently.")
+
                         # NOTE: Tool results are appended as separate 'tool' role messages by
                         # NextStepScheduler.schedule_next_step (via context.all_tool_results).
                         # Do NOT also inline them into the assistant message content, as that
@@ -2329,21 +2296,16 @@ class AgentCycleHandler:
                                 if agent.state == PM_STATE_AUDIT and ("complete" in msg_content_lower or "audit" in msg_content_lower):
                                     # Verify task counts before allowing the PM to report completion
                                     try:
-                                        from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                                        if TASKLIB_AVAILABLE and self._manager.current_project and self._manager.current_session:
-                                            pm_tool = ProjectManagementTool()
-                                            tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-                                            if tw:
-                                                pending_count = len(tw.tasks.filter(status='pending'))
-                                                if pending_count > 0:
-                                                    logger.warning(f"CycleHandler: PM AUDIT GATE ACTIVATED. PM '{agent.agent_id}' tried to report completion to Admin AI but {pending_count} tasks are still pending. Blocking send_message.")
-                                                    # Override the tool result to inform the PM
-                                                    directive_message_content = (
-                                                        f"[Framework System Message - AUDIT GATE BLOCK]: Your completion report was BLOCKED. "
-                                                        f"The task database still has {pending_count} PENDING tasks. "
-                                                        "You MUST transition back to pm_manage to address the remaining work. "
-                                                        "Call the 'request_state' tool with state='pm_manage'."
-                                                    )
+                                        pending_count = await self._count_pending_tasks() or 0
+                                        if pending_count > 0:
+                                            logger.warning(f"CycleHandler: PM AUDIT GATE ACTIVATED. PM '{agent.agent_id}' tried to report completion to Admin AI but {pending_count} tasks are still pending. Blocking send_message.")
+                                            # Override the tool result to inform the PM
+                                            directive_message_content = (
+                                                f"[Framework System Message - AUDIT GATE BLOCK]: Your completion report was BLOCKED. "
+                                                f"The task database still has {pending_count} PENDING tasks. "
+                                                "You MUST transition back to pm_manage to address the remaining work. "
+                                                "Call the 'request_state' tool with state='pm_manage'."
+                                            )
                                     except Exception as e:
                                         logger.warning(f"CycleHandler: Failed to verify tasks in PM audit gate: {e}")
 
@@ -2380,7 +2342,7 @@ class AgentCycleHandler:
                             else:
                                 try:
                                     # Auto-track worker task when transitioning to work state
-                                    self._handle_worker_task_tracking(agent, deferred_state_change, deferred_task_id)
+                                    await self._handle_worker_task_tracking(agent, deferred_state_change, deferred_task_id)
                                     
                                     if self._manager.workflow_manager.change_state(agent, deferred_state_change, task_description=deferred_task_desc):
                                         logger.info(f"CycleHandler: Successfully changed agent '{agent.agent_id}' state to '{deferred_state_change}' after tool processing")
@@ -2431,31 +2393,24 @@ class AgentCycleHandler:
                                 lower_fc = final_content.lower()
                                 if ("complete" in lower_fc or "finished" in lower_fc or "done" in lower_fc) and "project" in lower_fc:
                                     try:
-                                        if self._manager.current_project and self._manager.current_session:
-                                            from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-                                            if TASKLIB_AVAILABLE:
-                                                pm_tool = ProjectManagementTool()
-                                                tw = pm_tool._get_taskwarrior_instance(self._manager.current_project, self._manager.current_session)
-                                                if tw:
-                                                    pending_tasks = tw.tasks.filter(status='pending')
-                                                    pending_count = len(pending_tasks)
-                                                    if pending_count > 0:
-                                                        logger.warning(f"CycleHandler: FINAL_RESPONSE HARD GATE ACTIVATED. Admin AI attempted to report completion while {pending_count} tasks are pending. Blocking delivery to user.")
-                                                        gate_msg = (
-                                                            f"[Framework System Message - HARD GATE BLOCK]: Your response was BLOCKED from reaching the user. "
-                                                            f"You claimed the project was complete, but the backend database shows {pending_count} PENDING tasks. "
-                                                            "You MUST use project_management list_tasks to verify the actual task status, "
-                                                            "or message the PM for an explanation. Do not falsely report completion."
-                                                        )
-                                                        agent.message_history.append({"role": "system", "content": gate_msg})
-                                                        # Send a sanitized notification to the UI instead of the false completion
-                                                        await self._manager.send_to_ui({
-                                                            "type": "system_event",
-                                                            "agent_id": agent.agent_id,
-                                                            "content": f"[Framework] Blocked false completion report from Admin AI. {pending_count} tasks still pending."
-                                                        })
-                                                        context.needs_reactivation_after_cycle = True
-                                                        continue  # Skip delivering this final_response to the user
+                                        pending_count = await self._count_pending_tasks() or 0
+                                        if pending_count > 0:
+                                            logger.warning(f"CycleHandler: FINAL_RESPONSE HARD GATE ACTIVATED. Admin AI attempted to report completion while {pending_count} tasks are pending. Blocking delivery to user.")
+                                            gate_msg = (
+                                                f"[Framework System Message - HARD GATE BLOCK]: Your response was BLOCKED from reaching the user. "
+                                                f"You claimed the project was complete, but the backend database shows {pending_count} PENDING tasks. "
+                                                "You MUST use project_management list_tasks to verify the actual task status, "
+                                                "or message the PM for an explanation. Do not falsely report completion."
+                                            )
+                                            agent.message_history.append({"role": "system", "content": gate_msg})
+                                            # Send a sanitized notification to the UI instead of the false completion
+                                            await self._manager.send_to_ui({
+                                                "type": "system_event",
+                                                "agent_id": agent.agent_id,
+                                                "content": f"[Framework] Blocked false completion report from Admin AI. {pending_count} tasks still pending."
+                                            })
+                                            context.needs_reactivation_after_cycle = True
+                                            continue  # Skip delivering this final_response to the user
                                     except Exception as e:
                                         logger.warning(f"CycleHandler: Failed to verify task completion in final_response hard gate: {e}")
                             # --- END ADMIN FINAL_RESPONSE HARD GATE ---
@@ -2559,6 +2514,10 @@ class AgentCycleHandler:
                             await self._manager.send_to_ui(event)
                         else: await self._manager.send_to_ui(event) # response_chunk, status
     
+                    elif event_type == "tool_call_ready":
+                        # Early signal only; the calls are executed from the 'tool_requests' event after the stream ends
+                        logger.debug(f"CycleHandler '{agent.agent_id}': Tool call '{event.get('tool_name')}' complete mid-stream.")
+
                     elif event_type == "pm_startup_missing_task_list_after_think":
                         # ... (feedback prep, append to history, db log) ...
                         feedback_content = ("Framework Feedback for PM Retry]\nYour previous output consisted only of a <think> block. In the PM_STATE_STARTUP, you must provide the <task_list> JSON structure after your thoughts. Please ensure your entire response includes the JSON task list as specified in your instructions.")
@@ -2608,6 +2567,9 @@ class AgentCycleHandler:
                         llm_stream_ended_cleanly = False; break
                     else: logger.warning(f"CycleHandler: Unknown event type '{event_type}' from agent '{agent.agent_id}'.")
 
+                if cycle_stream_buffer:
+                    cycle_text_content = cycle_stream_buffer.getvalue()
+
                 # This block handles cases where the LLM stream finished without any specific break-worthy event.
                 if llm_stream_ended_cleanly and not context.last_error_obj and not context.action_taken_this_cycle:
                     # This block is now primarily for handling final text responses that are not part of other events.
@@ -2866,6 +2828,7 @@ class AgentCycleHandler:
                 await self._manager.send_to_ui({"type": "error", "agent_id": agent.agent_id, "content": context.last_error_content})
                 break # Exit while True loop, proceed to outer finally
             finally:
+                if tool_call_scheduler is not None: tool_call_scheduler.close() # Cancels prefetched reads the tool loop never claimed
                 if agent_generator: # Ensure generator from this iteration is closed if it was opened
                     try:
                         logger.info(f"CycleHandler '{agent.agent_id}': Closing agent_generator in finally block (ag_running={getattr(agent_generator, 'ag_running', 'N/A')}, ag_frame={'set' if getattr(agent_generator, 'ag_frame', None) else 'None'}).")
@@ -2966,7 +2929,8 @@ class AgentCycleHandler:
             success_for_metrics = context.cycle_completed_successfully and not context.is_key_related_error
             await self._manager.performance_tracker.record_call(
                 provider=context.current_provider_name or "unknown", model_id=context.current_model_name or "unknown",
-                duration_ms=context.llm_call_duration_ms, success=success_for_metrics
+                duration_ms=context.llm_call_duration_ms, success=success_for_metrics,
+                usage=getattr(agent, 'last_llm_usage', None), agent_type=agent.agent_type
             )
 
         await self._next_step_scheduler.schedule_next_step(context)
@@ -402,18 +402,27 @@ class AgentInteractionHandler:
         tool_name: str,
         tool_args: Dict[str, Any],
         project_name: Optional[str],
-        session_name: Optional[str]
+        session_name: Optional[str],
+        speculative: bool = False
         ) -> Optional[Dict]:
         """
         Executes a single tool call via the ToolExecutor, passing necessary context including project/session names.
         The AgentCycleHandler is responsible for any subsequent agent reactivation.
+
+        speculative=True runs a read call the cycle has not reached yet (ToolCallScheduler prefetch):
+        the agent's status is not touched and the tool's UI events are returned under
+        "_deferred_events" instead of being broadcast. send_message is never run speculatively.
         """
         if not self._manager.tool_executor:
             logger.error("InteractionHandler: ToolExecutor unavailable in AgentManager. Cannot execute tool.")
             return {"call_id": call_id, "name": tool_name, "content": "[ToolExec Error: ToolExecutor unavailable]", "_raw_result": None} 
+        if speculative and tool_name == SendMessageTool.name:
+            raise ValueError("send_message cannot be executed speculatively.")
+        deferred_events: Optional[List[Dict[str, Any]]] = [] if speculative else None
 
         tool_info = {"name": tool_name, "call_id": call_id}
-        agent.set_status(AGENT_STATUS_EXECUTING_TOOL, tool_info=tool_info)
+        if not speculative:
+            agent.set_status(AGENT_STATUS_EXECUTING_TOOL, tool_info=tool_info)
         raw_result: Optional[Any] = None
         result_content: str = "[Tool Execution Error: Unknown]"
 
@@ -467,7 +476,8 @@ class AgentInteractionHandler:
                 tool_args=tool_args,
                 project_name=project_name,
                 session_name=session_name,
-                manager=self._manager
+                manager=self._manager,
+                deferred_events=deferred_events
             )
             logger.debug(f"InteractionHandler: Tool '{tool_name}' completed execution.")
             
@@ -567,7 +577,10 @@ class AgentInteractionHandler:
                     logger.debug(f"InteractionHandler: ProjectManagementTool action '{action_performed}' was successful but is not an assignment action. No worker activation needed from this handler.")
 
 
-        return {"call_id": call_id, "name": tool_name, "content": result_content, "_raw_result": raw_result} 
+        result = {"call_id": call_id, "name": tool_name, "content": result_content, "_raw_result": raw_result}
+        if deferred_events is not None:
+            result["_deferred_events"] = deferred_events
+        return result
 
 
     async def failed_tool_result(self, call_id: Optional[str], tool_name: Optional[str]) -> Optional[ToolResultDict]:
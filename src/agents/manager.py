@@ -4,7 +4,6 @@ logging.info("manager.py: Module loading started...")
 
 import asyncio
 from typing import Dict, Any, Optional, List, Tuple, Set
-import json
 import os
 import traceback
 import time
@@ -39,7 +38,7 @@ from src.config.settings import settings, model_registry, BASE_DIR
 logging.info("manager.py: Imported settings.")
 
 logging.info("manager.py: Importing websocket_manager...")
-from src.api.websocket_manager import broadcast
+from src.api.websocket_manager import broadcast_event
 logging.info("manager.py: Imported websocket_manager.")
 
 logging.info("manager.py: Importing ToolExecutor...")
@@ -92,7 +91,7 @@ class AgentManager:
     def __init__(self, websocket_manager: Optional[Any] = None): # websocket_manager is no longer used here
         self.bootstrap_agents: List[str] = []
         self.agents: Dict[str, Agent] = {}
-        self.send_to_ui_func = broadcast
+        self.send_to_ui_func = broadcast_event # Serializes once; streamed chunks are coalesced per agent
         self.current_project: Optional[str] = None
         self.current_session: Optional[str] = None
         self.db_manager = db_manager
@@ -136,6 +135,7 @@ class AgentManager:
         asyncio.create_task(self._ensure_default_db_session())
         asyncio.create_task(self.start_pm_manage_timer())
         asyncio.create_task(self.start_cg_heartbeat_timer())
+        asyncio.create_task(self.performance_tracker.start_periodic_snapshots())
 
     async def _ensure_default_db_session(self):
         if self.current_session_db_id is None:
@@ -354,9 +354,9 @@ class AgentManager:
             logger.info(f"Manager: Sending {event_type} event to UI for agent {message_data.get('agent_id', 'unknown')}")
         
         try: 
-            await self.send_to_ui_func(json.dumps(message_data))
+            await self.send_to_ui_func(message_data)
             if event_type in ["agent_thought", "agent_raw_response", "tool_result"]:
-                logger.info(f"Manager: Successfully sent {event_type} event to UI via broadcast")
+                logger.info(f"Manager: Successfully queued {event_type} event for UI broadcast")
         except Exception as e: 
             logger.error(f"Error sending to UI: {e}. Data: {message_data}", exc_info=True)
 
@@ -389,6 +389,7 @@ class AgentManager:
     async def cleanup_providers(self):
         logger.info("Manager: Cleaning up LLM providers, saving metrics, quarantine, stopping timers, closing DB...");
         await self.stop_pm_manage_timer()
+        await self.performance_tracker.stop_periodic_snapshots()
         if self.current_session_db_id: await self.db_manager.end_session(self.current_session_db_id); self.current_session_db_id = None # type: ignore
         active_providers = {agent.llm_provider for agent in self.agents.values() if agent.llm_provider}
         provider_tasks = [asyncio.create_task(self._close_provider_safe(p)) for p in active_providers if hasattr(p, 'close_session')]
@@ -602,11 +603,13 @@ class AgentManager:
                                 # Workers in WAIT might have pending tasks assigned to them but got pushed here by the CG
                                 # Watchdog will verify if they truly have no pending tasks.
                                 try:
-                                    from src.tools.project_management import ProjectManagementTool
-                                    pm_tool = ProjectManagementTool()
-                                    tw_instance = pm_tool._get_taskwarrior_instance(self.current_project, self.current_session)
+                                    from src.tools.task_index import task_index
+                                    tw_instance = task_index.get_taskwarrior(self.current_project, self.current_session)
                                     if tw_instance:
-                                        pending_tasks = tw_instance.tasks.pending().filter(assignee=agent.agent_id)
+                                        pending_tasks = await task_index.run(
+                                            self.current_project, self.current_session,
+                                            lambda: [{"uuid": t['uuid'], "description": t['description']} for t in tw_instance.tasks.pending().filter(assignee=agent.agent_id)]
+                                        )
                                         if len(pending_tasks) > 0:
                                             target_task = pending_tasks[0]
                                             logger.warning(
@@ -0,0 +1,359 @@
+# START OF FILE src/agents/message_history.py
+import hashlib
+import json
+import logging
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, SupportsIndex, Tuple
+
+from src.utils.token_counter import token_counter
+
+logger = logging.getLogger(__name__)
+
+# Tool error results that the PromptAssembler prunes down to the most recent one
+STALE_ERROR_MARKERS = ("[Tool Execution Failed]", "[Tool Execution Blocked]", "Code edit failed:")
+CONTEXT_SUMMARY_MARKER = "[CONTEXT SUMMARY"
+# Tool results that do not count as a success for cross-cycle duplicate detection
+UNSUCCESSFUL_RESULT_MARKERS = ("[Tool Execution Failed]", "[Framework Error]", "[Error]")
+# Tool results that count as a failure for the identical-failure circuit breaker
+FAILED_RESULT_MARKERS = UNSUCCESSFUL_RESULT_MARKERS + ("ERROR:",)
+
+
+def is_stale_error_message(msg: Dict[str, Any]) -> bool:
+    content = msg.get("content") or ""
+    return msg.get("role") in ("system", "tool") and isinstance(content, str) and any(marker in content for marker in STALE_ERROR_MARKERS)
+
+
+def is_context_summary_message(msg: Dict[str, Any]) -> bool:
+    content = msg.get("content") or ""
+    return msg.get("role") == "system" and isinstance(content, str) and CONTEXT_SUMMARY_MARKER in content
+
+
+def _normalize_tool_args(args: Any) -> Any:
+    if isinstance(args, str):
+        try:
+            return json.loads(args)
+        except json.JSONDecodeError:
+            return args
+    return {} if args is None else args
+
+
+def tool_call_signature(tool_name: Optional[str], args: Any) -> str:
+    """Canonical hash of (tool name, arguments); JSON-string arguments are parsed and keys sorted."""
+    canonical = json.dumps(_normalize_tool_args(args), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{tool_name or ''}\n{canonical}".encode('utf-8', errors='replace')).hexdigest()
+
+
+def tool_call_duplicate_key(tool_name: Optional[str], args: Any) -> str:
+    """Signature used for success duplicates: create_agent calls for the same role count as one call."""
+    args = _normalize_tool_args(args)
+    if tool_name == "manage_team" and isinstance(args, dict) and args.get("action") == "create_agent" and args.get("role"):
+        return tool_call_signature(tool_name, {"action": "create_agent", "role": str(args["role"]).strip().lower()})
+    return tool_call_signature(tool_name, args)
+
+
+def is_successful_tool_result(content: Any) -> bool:
+    if not isinstance(content, str):
+        return True
+    try:
+        result_data = json.loads(content)
+        if isinstance(result_data, dict) and result_data.get("status") == "error":
+            return False
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return not (content.strip() == "" or any(marker in content for marker in UNSUCCESSFUL_RESULT_MARKERS))
+
+
+def is_failed_tool_result(content: Any) -> bool:
+    return isinstance(content, str) and (content.strip() == "" or any(marker in content for marker in FAILED_RESULT_MARKERS))
+
+
+def iter_message_tool_calls(msg: Dict[str, Any]) -> Iterable[Tuple[Optional[str], Optional[str], Any]]:
+    """(call id, tool name, arguments) of each tool call stored on an assistant message."""
+    tool_calls = msg.get("tool_calls_json") or msg.get("tool_calls")
+    if isinstance(tool_calls, str):
+        try:
+            tool_calls = json.loads(tool_calls)
+        except json.JSONDecodeError:
+            return
+    for tc in tool_calls or []:
+        if not isinstance(tc, dict):
+            continue
+        function = tc.get("function")
+        if not isinstance(function, dict): function = {}
+        name = tc.get("name") or function.get("name")
+        yield tc.get("id"), (str(name) if name is not None else None), tc.get("arguments") or function.get("arguments") or {}
+
+
+class ToolCallRecord:
+    """One indexed tool call and the results recorded for it, oldest first."""
+
+    __slots__ = ("assistant_position", "call_id", "signature", "results")
+
+    def __init__(self, assistant_position: int, call_id: Optional[str], signature: str):
+        self.assistant_position = assistant_position
+        self.call_id = call_id
+        self.signature = signature
+        self.results: List[Tuple[int, Any, bool]] = [] # (position, content, successful)
+
+
+def _newest_message_first(records: List[ToolCallRecord]) -> Iterable[ToolCallRecord]:
+    """Records by assistant message, newest first; calls of one message in their original order."""
+    end = len(records)
+    while end > 0:
+        start = end - 1
+        while start > 0 and records[start - 1].assistant_position == records[end - 1].assistant_position:
+            start -= 1
+        yield from records[start:end]
+        end = start
+
+
+class MessageHistory(list):
+    """
+    An Agent's message history with an incrementally maintained ledger.
+
+    Behaves exactly like a list, but keeps running token totals, the positions of
+    stale tool-error messages, a message_id -> position map and the number of
+    context summaries, plus an index of tool calls by signature with their results.
+    Appends (the hot path) update the ledger in O(1); other structural edits
+    (insert, delete, slicing, summarization) mark it dirty and it is rebuilt once
+    on the next query. Messages are treated as immutable once stored:
+    replace them by index assignment rather than editing the dict in place.
+
+    edit_count counts the non-append edits, which lets the session journal tell
+    whether the messages it already persisted are still an untouched prefix.
+    """
+
+    def __init__(self, iterable: Iterable[Dict[str, Any]] = (), model_getter: Optional[Callable[[], Optional[str]]] = None):
+        super().__init__(iterable)
+        self._model_getter = model_getter
+        self._reset_ledger()
+        self._ledger_valid = False
+        self._reset_tool_index()
+        self._tool_index_valid = False
+        self.edit_count = 0
+        self._journal_checkpoint: Optional[Tuple[str, int, int]] = None # (journal key, persisted length, edit_count)
+        if isinstance(iterable, MessageHistory) and iterable._journal_checkpoint:
+            # A copy starts with the same messages, so it inherits a still-valid checkpoint
+            journal_key = iterable._journal_checkpoint[0]
+            persisted = iterable.persisted_length(journal_key)
+            if persisted is not None and persisted <= len(self):
+                self._journal_checkpoint = (journal_key, persisted, 0)
+
+    def __reduce__(self):
+        # Copies/pickles are rebuilt from the messages; the ledger is recomputed lazily.
+        return (self.__class__, (list(self),))
+
+    # --- Ledger maintenance ---
+    def _reset_ledger(self):
+        self._message_tokens: List[Optional[int]] = []
+        self._token_total = 0
+        self._uncounted_positions: List[int] = []
+        self._token_model: Optional[str] = None
+        self._error_positions: List[int] = []
+        self._message_positions: Dict[str, int] = {}
+        self._summary_count = 0
+        self._ledger_valid = True
+
+    def _index_message(self, position: int, msg: Dict[str, Any]):
+        self._message_tokens.append(None)
+        self._uncounted_positions.append(position)
+        if is_stale_error_message(msg): self._error_positions.append(position)
+        if is_context_summary_message(msg): self._summary_count += 1
+        message_id = msg.get("message_id")
+        if message_id: self._message_positions[message_id] = position
+
+    def _unindex_message(self, position: int, msg: Dict[str, Any]):
+        tokens = self._message_tokens[position]
+        if tokens is not None: self._token_total -= tokens
+        if is_stale_error_message(msg) and position in self._error_positions: self._error_positions.remove(position)
+        if is_context_summary_message(msg): self._summary_count -= 1
+        message_id = msg.get("message_id")
+        if message_id and self._message_positions.get(message_id) == position: del self._message_positions[message_id]
+
+    def _reset_tool_index(self):
+        self._tool_calls_by_signature: Dict[str, List[ToolCallRecord]] = {}
+        self._tool_calls_by_duplicate_key: Dict[str, List[ToolCallRecord]] = {}
+        self._tool_calls_by_id: Dict[str, ToolCallRecord] = {} # Latest call per id
+        self._tool_calls_at: Dict[int, List[ToolCallRecord]] = {} # Assistant position -> its calls
+        self._tool_index_valid = True
+
+    def _index_tool_message(self, position: int, msg: Dict[str, Any]):
+        role = msg.get("role")
+        if role == "assistant":
+            records = []
+            for call_id, name, args in iter_message_tool_calls(msg):
+                record = ToolCallRecord(position, call_id, tool_call_signature(name, args))
+                records.append(record)
+                self._tool_calls_by_signature.setdefault(record.signature, []).append(record)
+                self._tool_calls_by_duplicate_key.setdefault(tool_call_duplicate_key(name, args), []).append(record)
+                if call_id: self._tool_calls_by_id[call_id] = record
+            if records: self._tool_calls_at[position] = records
+        elif role == "tool":
+            content = msg.get("content", "")
+            call_id = msg.get("tool_call_id")
+            matched = [self._tool_calls_by_id[call_id]] if call_id in self._tool_calls_by_id else []
+            # A result right after its assistant message also answers that message's calls without an id
+            matched += [r for r in self._tool_calls_at.get(position - 1, ()) if not r.call_id]
+            for record in matched:
+                record.results.append((position, content, is_successful_tool_result(content)))
+
+    def _ensure_tool_index(self):
+        if self._tool_index_valid:
+            return
+        self._reset_tool_index()
+        for position, msg in enumerate(self):
+            self._index_tool_message(position, msg)
+
+    def _ensure_ledger(self):
+        if self._ledger_valid:
+            return
+        self._reset_ledger()
+        for position, msg in enumerate(self):
+            self._index_message(position, msg)
+
+    def _invalidate(self):
+        self._ledger_valid = False
+        self._tool_index_valid = False
+        self.edit_count += 1
+
+    # --- list mutators ---
+    def append(self, msg):
+        super().append(msg)
+        if self._ledger_valid: self._index_message(len(self) - 1, msg)
+        if self._tool_index_valid: self._index_tool_message(len(self) - 1, msg)
+
+    def extend(self, msgs):
+        for msg in msgs: self.append(msg)
+
+    def __iadd__(self, msgs):
+        self.extend(msgs)
+        return self
+
+    def __setitem__(self, index, value):
+        if self._ledger_valid and isinstance(index, int):
+            self.edit_count += 1
+            self._tool_index_valid = False
+            position = index if index >= 0 else len(self) + index
+            old_msg = self[position]
+            super().__setitem__(index, value)
+            self._unindex_message(position, old_msg)
+            self._message_tokens[position] = None
+            self._uncounted_positions.append(position)
+            if is_stale_error_message(value): self._error_positions.append(position); self._error_positions.sort()
+            if is_context_summary_message(value): self._summary_count += 1
+            message_id = value.get("message_id")
+            if message_id: self._message_positions[message_id] = position
+            return
+        super().__setitem__(index, value)
+        self._invalidate()
+
+    def pop(self, index: SupportsIndex = -1, /):
+        if self._ledger_valid and self and operator.index(index) in (-1, len(self) - 1):
+            self.edit_count += 1
+            self._tool_index_valid = False
+            position = len(self) - 1
+            self._unindex_message(position, self[position])
+            self._message_tokens.pop()
+            self._uncounted_positions = [p for p in self._uncounted_positions if p != position]
+            return super().pop()
+        msg = super().pop(index)
+        self._invalidate()
+        return msg
+
+    def clear(self):
+        super().clear()
+        self._reset_ledger()
+        self._reset_tool_index()
+        self.edit_count += 1
+
+    def __delitem__(self, index):
+        super().__delitem__(index); self._invalidate()
+
+    def insert(self, index, msg):
+        super().insert(index, msg); self._invalidate()
+
+    def remove(self, msg):
+        super().remove(msg); self._invalidate()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs); self._invalidate()
+
+    def reverse(self):
+        super().reverse(); self._invalidate()
+
+    def __imul__(self, n):
+        result = super().__imul__(n); self._invalidate(); return result
+
+    # --- Ledger queries ---
+    def token_total(self, model: Optional[str] = None) -> int:
+        """Token count of the whole history. Only messages added since the last call are tokenized."""
+        self._ensure_ledger()
+        if model is None and self._model_getter: model = self._model_getter()
+        if model != self._token_model:
+            # Model switched (e.g. failover): counts depend on the tokenizer, so recount everything
+            self._token_model = model
+            self._token_total = 0
+            self._message_tokens = [None] * len(self)
+            self._uncounted_positions = list(range(len(self)))
+        for position in self._uncounted_positions:
+            if position < len(self) and self._message_tokens[position] is None:
+                tokens = token_counter.count_message(self[position], model)
+                self._message_tokens[position] = tokens
+                self._token_total += tokens
+        self._uncounted_positions = []
+        return self._token_total
+
+    def error_positions(self) -> List[int]:
+        """Positions of stale tool-error messages, oldest first."""
+        self._ensure_ledger()
+        return list(self._error_positions)
+
+    def position_of(self, message_id: str) -> Optional[int]:
+        self._ensure_ledger()
+        return self._message_positions.get(message_id)
+
+    def message_ids(self) -> List[str]:
+        """message_ids present in the history, in history order."""
+        self._ensure_ledger()
+        return sorted(self._message_positions, key=self._message_positions.__getitem__)
+
+    @property
+    def summary_count(self) -> int:
+        self._ensure_ledger()
+        return self._summary_count
+
+    def last_successful_tool_result(self, tool_name: Optional[str], args: Any) -> Optional[Any]:
+        """Content of the latest successful result of an equivalent earlier call, or None."""
+        self._ensure_tool_index()
+        for record in _newest_message_first(self._tool_calls_by_duplicate_key.get(tool_call_duplicate_key(tool_name, args), [])):
+            for _, content, successful in record.results:
+                if successful:
+                    return content
+        return None
+
+    def last_identical_failure(self, tool_name: Optional[str], args: Any) -> Optional[Any]:
+        """Content of the latest failed result of an identical earlier call (result right after its call), or None."""
+        self._ensure_tool_index()
+        for record in _newest_message_first(self._tool_calls_by_signature.get(tool_call_signature(tool_name, args), [])):
+            if record.assistant_position == 0:
+                continue
+            for position, content, _ in record.results:
+                if position == record.assistant_position + 1 and is_failed_tool_result(content):
+                    return content
+        return None
+
+    # --- Journal checkpoints ---
+    def mark_persisted(self, journal_key: str, length: int, edit_count: Optional[int] = None):
+        """Records that the first `length` messages (as of edit_count) are stored in the given journal."""
+        self._journal_checkpoint = (journal_key, length, self.edit_count if edit_count is None else edit_count)
+
+    def clear_persisted(self):
+        self._journal_checkpoint = None
+
+    def persisted_length(self, journal_key: str) -> Optional[int]:
+        """Number of leading messages already in the journal, or None if they must all be rewritten."""
+        checkpoint = self._journal_checkpoint
+        if checkpoint and checkpoint[0] == journal_key and checkpoint[2] == self.edit_count and checkpoint[1] <= len(self):
+            return checkpoint[1]
+        return None
+# END OF FILE src/agents/message_history.py
@@ -10,8 +10,14 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 import copy
 
+from src.agents.latency_histogram import LatencyHistogram, LatencySeries
+from src.config.settings import settings
+
 # Define path for storing metrics (consider making this configurable later)
 METRICS_FILE_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "model_performance_metrics.json"
+LATENCY_FILE_PATH = METRICS_FILE_PATH.with_name("model_latency_histograms.json")
+LATENCY_FILE_VERSION = 1
+RANK_BY_PERCENTILE = {"p50": 50.0, "p90": 90.0, "p99": 99.0}
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +29,24 @@ class ModelMetrics(Dict):
         self.setdefault("failure_count", 0)
         self.setdefault("total_duration_ms", 0.0) # Use float for potentially fractional ms
         self.setdefault("call_count", 0)
+        # Usage telemetry (from the providers' normalized 'usage' events)
+        self.setdefault("usage_call_count", 0)
+        self.setdefault("usage_duration_ms", 0.0) # Summed duration_ms of the calls that reported usage
+        self.setdefault("total_prompt_tokens", 0)
+        self.setdefault("total_completion_tokens", 0)
+        self.setdefault("cache_reported_prompt_tokens", 0) # Prompt tokens of calls that reported cached tokens
+        self.setdefault("total_cached_prompt_tokens", 0)
+        self.setdefault("ttft_count", 0)
+        self.setdefault("total_ttft_ms", 0.0)
+        self.setdefault("load_count", 0)
+        self.setdefault("total_load_ms", 0.0)
+        self.setdefault("prefill_tokens", 0) # Prompt tokens of calls with a prefill time
+        self.setdefault("total_prefill_ms", 0.0)
+        self.setdefault("decode_tokens", 0) # Completion tokens of calls with a decode time
+        self.setdefault("total_decode_ms", 0.0)
+        self.setdefault("generation_tokens", 0) # Completion tokens of calls with both TTFT and decode time
+        self.setdefault("total_generation_ms", 0.0) # TTFT + decode time of those calls
         # Optional future additions:
-        # self.setdefault("total_prompt_tokens", 0)
-        # self.setdefault("total_completion_tokens", 0)
         # self.setdefault("last_success_ts", 0)
         # self.setdefault("last_failure_ts", 0)
         # self.setdefault("cumulative_score", 0.0) # For more advanced ranking
@@ -34,20 +55,37 @@ class ModelPerformanceTracker:
     """
     Tracks performance metrics (success rate, latency) for different LLM models.
     Loads and saves metrics to a JSON file. Provides basic ranking capabilities.
+
+    Calls that come with a provider 'usage' event also accumulate token counts and
+    server-side timings (TTFT, prefill, decode, model load). Throughputs are kept as token
+    and time totals, so averages are token-weighted rather than a mean of per-call rates.
+
+    Call durations also go into log-bucketed latency histograms per (provider, model,
+    agent type), with per-minute rollups, for percentile queries (see latency_histogram).
+    They are saved to a second file next to the metrics file, and both files are
+    snapshotted periodically (start_periodic_snapshots) so a crash loses little.
     """
 
-    def __init__(self, metrics_file: Path = METRICS_FILE_PATH):
+    def __init__(self, metrics_file: Path = METRICS_FILE_PATH, latency_file: Optional[Path] = None):
         """
         Initializes the tracker and loads existing metrics.
 
         Args:
             metrics_file (Path): The path to the JSON file for storing metrics.
+            latency_file (Optional[Path]): The path for the latency histograms. Defaults to
+                model_latency_histograms.json next to metrics_file.
         """
         self.metrics_file: Path = metrics_file
+        self.latency_file: Path = latency_file or metrics_file.with_name(LATENCY_FILE_PATH.name)
         # Metrics structure: { "provider": { "model_id": ModelMetrics(...) } }
         self._metrics: Dict[str, Dict[str, ModelMetrics]] = {}
+        # Latency structure: { (provider, model_id, agent_type): LatencySeries }
+        self._latency: Dict[Tuple[str, str, str], LatencySeries] = {}
         self._lock = asyncio.Lock() # Lock for safe concurrent updates
+        self._dirty = False # Recorded calls not yet saved
+        self._snapshot_task: Optional[asyncio.Task] = None
         self._load_metrics_sync() # Load metrics synchronously on init
+        self._load_latency_sync()
 
     def _ensure_data_dir(self):
         """Ensures the directory for the metrics file exists."""
@@ -95,44 +133,70 @@ class ModelPerformanceTracker:
             logger.error(f"Error loading metrics file {self.metrics_file}: {e}. Initializing empty metrics.", exc_info=True)
             self._metrics = {}
 
+    def _new_latency_series(self) -> LatencySeries:
+        return LatencySeries(settings.LATENCY_ROLLUP_WINDOW_SECONDS, settings.LATENCY_ROLLUP_RETENTION_HOURS * 3600)
+
+    def _load_latency_sync(self):
+        """Synchronously loads the latency histograms. A missing or unreadable file starts them empty."""
+        if not self.latency_file.exists():
+            return
+        try:
+            with open(self.latency_file, 'r', encoding='utf-8') as f:
+                loaded_data = json.load(f)
+            for entry in loaded_data.get("series", []):
+                series = self._new_latency_series()
+                series.load_dict(entry)
+                self._latency[(entry["provider"], entry["model_id"], entry.get("agent_type") or "unknown")] = series
+            logger.info(f"Loaded latency histograms for {len(self._latency)} provider/model/agent type combinations.")
+        except Exception as e:
+            logger.error(f"Error loading latency histograms from {self.latency_file}: {e}. Starting with empty histograms.", exc_info=True)
+            self._latency = {}
+
     async def save_metrics(self):
-        """Asynchronously saves the current metrics to the JSON file."""
+        """Asynchronously and atomically saves the current metrics and latency histograms."""
         async with self._lock:
             logger.info(f"Saving performance metrics to: {self.metrics_file}")
-            temp_file_path: Optional[Path] = None
+            # Snapshot under the lock; convert to plain dicts for JSON serialization
+            metrics_to_save = copy.deepcopy(self._metrics)
+            latency_to_save = {
+                "version": LATENCY_FILE_VERSION,
+                "series": [{"provider": provider, "model_id": model_id, "agent_type": agent_type, **series.to_dict()}
+                           for (provider, model_id, agent_type), series in self._latency.items()],
+            }
+            self._dirty = False
             try:
-                # Ensure directory exists just before saving
                 await asyncio.to_thread(self._ensure_data_dir)
-
-                # Use temp file for atomic write
-                temp_fd, temp_path_str = await asyncio.to_thread(
-                    lambda: tempfile.mkstemp(suffix=".tmp", prefix=self.metrics_file.name + '_', dir=self.metrics_file.parent)
-                )
-                temp_file_path = Path(temp_path_str)
-
-                # Convert metrics to plain dicts for JSON serialization
-                metrics_to_save = copy.deepcopy(self._metrics)
-
-                def write_json_sync():
-                    with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
-                        json.dump(metrics_to_save, f, indent=2)
-
-                await asyncio.to_thread(write_json_sync)
-                logger.debug(f"Successfully wrote metrics to temporary file: {temp_file_path}")
-
-                # Atomically replace the original file
-                await asyncio.to_thread(os.replace, temp_file_path, self.metrics_file)
-                logger.info(f"Successfully saved metrics to {self.metrics_file}")
-                temp_file_path = None # Avoid deletion in finally block
+                await asyncio.to_thread(_write_json_atomic_sync, self.metrics_file, metrics_to_save, 2)
+                await asyncio.to_thread(_write_json_atomic_sync, self.latency_file, latency_to_save, None)
+                logger.info(f"Successfully saved metrics to {self.metrics_file} and {self.latency_file}")
             except Exception as e:
+                self._dirty = True
                 logger.error(f"Error saving metrics file {self.metrics_file}: {e}", exc_info=True)
-            finally:
-                if temp_file_path and temp_file_path.exists():
-                     try: await asyncio.to_thread(os.remove, temp_file_path); logger.debug(f"Removed temporary metrics file: {temp_file_path}")
-                     except Exception as rm_err: logger.error(f"Error removing temporary metrics file {temp_file_path}: {rm_err}")
 
+    async def _periodic_snapshot_loop(self, interval: float):
+        logger.info(f"Starting periodic performance metrics snapshots (Interval: {interval}s)...")
+        while True:
+            await asyncio.sleep(interval)
+            if self._dirty:
+                await self.save_metrics()
+
+    async def start_periodic_snapshots(self):
+        """Starts saving metrics every PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS when calls were recorded (0 disables)."""
+        interval = settings.PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS
+        if interval <= 0:
+            logger.info("Periodic performance metrics snapshots disabled.")
+            return
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._periodic_snapshot_loop(interval))
+
+    async def stop_periodic_snapshots(self):
+        if self._snapshot_task and not self._snapshot_task.done():
+            self._snapshot_task.cancel()
+            try: await self._snapshot_task
+            except asyncio.CancelledError: logger.info("Performance metrics snapshot task cancelled.")
+        self._snapshot_task = None
 
-    async def record_call(self, provider: str, model_id: str, duration_ms: float, success: bool):
+    async def record_call(self, provider: str, model_id: str, duration_ms: float, success: bool, usage: Optional[Dict[str, Any]] = None, agent_type: Optional[str] = None):
         """
         Records the outcome of a single LLM call, updating metrics.
 
@@ -141,6 +205,8 @@ class ModelPerformanceTracker:
             model_id (str): The specific model ID used.
             duration_ms (float): The duration of the LLM call in milliseconds.
             success (bool): True if the call completed without provider/stream errors, False otherwise.
+            usage (Optional[Dict[str, Any]]): The provider's normalized 'usage' event for the call, if any.
+            agent_type (Optional[str]): Type of the calling agent, for the latency histograms.
         """
         if not provider or not model_id:
              logger.warning("Attempted to record call with missing provider or model_id.")
@@ -165,6 +231,16 @@ class ModelPerformanceTracker:
             else:
                 model_stats["failure_count"] += 1
                 # model_stats["last_failure_ts"] = int(time.time())
+            if usage:
+                self._record_usage(model_stats, usage, duration_ms)
+
+            # Failed calls count too: their durations are often the tail stalls
+            latency_key = (provider, model_id, agent_type or "unknown")
+            series = self._latency.get(latency_key)
+            if series is None:
+                series = self._latency[latency_key] = self._new_latency_series()
+            series.record(duration_ms)
+            self._dirty = True
 
             logger.debug(f"Updated metrics for {provider}/{model_id}: {model_stats}")
 
@@ -172,6 +248,75 @@ class ModelPerformanceTracker:
             # if model_stats["call_count"] % 10 == 0: # Save every 10 calls for this model, for example
             #     asyncio.create_task(self.save_metrics())
 
+    @staticmethod
+    def _record_usage(stats: ModelMetrics, usage: Dict[str, Any], duration_ms: float):
+        """Adds one normalized usage event to the model's totals. Caller holds the lock."""
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        stats["usage_call_count"] += 1
+        stats["usage_duration_ms"] += duration_ms
+        stats["total_prompt_tokens"] += prompt_tokens
+        stats["total_completion_tokens"] += completion_tokens
+        if usage.get("cached_prompt_tokens") is not None:
+            stats["cache_reported_prompt_tokens"] += prompt_tokens
+            stats["total_cached_prompt_tokens"] += usage["cached_prompt_tokens"]
+        ttft_ms, decode_ms = usage.get("ttft_ms"), usage.get("decode_ms")
+        if ttft_ms is not None:
+            stats["ttft_count"] += 1
+            stats["total_ttft_ms"] += ttft_ms
+        if usage.get("load_ms") is not None:
+            stats["load_count"] += 1
+            stats["total_load_ms"] += usage["load_ms"]
+        if usage.get("prefill_ms"):
+            stats["prefill_tokens"] += prompt_tokens
+            stats["total_prefill_ms"] += usage["prefill_ms"]
+        if decode_ms:
+            stats["decode_tokens"] += completion_tokens
+            stats["total_decode_ms"] += decode_ms
+        if ttft_ms is not None and decode_ms is not None:
+            stats["generation_tokens"] += completion_tokens
+            stats["total_generation_ms"] += ttft_ms + decode_ms
+
+    @staticmethod
+    def summarize_usage(stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Derived usage figures for one model's metrics: averages per call, token-weighted
+        prefill/decode/effective throughput (tokens/s) and where the average call's time goes
+        (load, prefill, decode and everything else, e.g. queueing, rechecks and parsing).
+        Values are None when no call reported the underlying data.
+        """
+        def ratio(numerator: float, denominator: float, scale: float = 1.0) -> Optional[float]:
+            return round(numerator / denominator * scale, 2) if denominator else None
+
+        calls = stats.get("usage_call_count", 0)
+        avg_ttft_ms = ratio(stats.get("total_ttft_ms", 0.0), stats.get("ttft_count", 0))
+        avg_load_ms = ratio(stats.get("total_load_ms", 0.0), stats.get("load_count", 0))
+        avg_duration_ms = ratio(stats.get("usage_duration_ms", 0.0), calls)
+        time_breakdown = None
+        if calls:
+            load_ms = stats.get("total_load_ms", 0.0) / calls
+            prefill_ms = stats.get("total_prefill_ms", 0.0) / calls
+            decode_ms = stats.get("total_decode_ms", 0.0) / calls
+            time_breakdown = {
+                "load_ms": round(load_ms, 2), "prefill_ms": round(prefill_ms, 2), "decode_ms": round(decode_ms, 2),
+                "other_ms": round(max(0.0, (avg_duration_ms or 0.0) - load_ms - prefill_ms - decode_ms), 2),
+            }
+        return {
+            "usage_calls": calls,
+            "avg_prompt_tokens": ratio(stats.get("total_prompt_tokens", 0), calls),
+            # Prompt tokens the backend actually evaluated (Ollama already leaves its cached prefix out of prompt_eval_count)
+            "avg_prefill_tokens": ratio(stats.get("total_prompt_tokens", 0) - stats.get("total_cached_prompt_tokens", 0), calls),
+            "avg_completion_tokens": ratio(stats.get("total_completion_tokens", 0), calls),
+            "cached_prompt_ratio": ratio(stats.get("total_cached_prompt_tokens", 0), stats.get("cache_reported_prompt_tokens", 0)),
+            "avg_ttft_ms": avg_ttft_ms,
+            "avg_load_ms": avg_load_ms,
+            "prefill_tokens_per_s": ratio(stats.get("prefill_tokens", 0), stats.get("total_prefill_ms", 0.0), 1000.0),
+            "decode_tokens_per_s": ratio(stats.get("decode_tokens", 0), stats.get("total_decode_ms", 0.0), 1000.0),
+            "effective_tokens_per_s": ratio(stats.get("generation_tokens", 0), stats.get("total_generation_ms", 0.0), 1000.0),
+            "avg_duration_ms": avg_duration_ms,
+            "time_breakdown": time_breakdown,
+        }
+
     def get_metrics(self, provider: Optional[str] = None, model_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Retrieves metrics, optionally filtered by provider and/or model.
@@ -221,8 +366,37 @@ class ModelPerformanceTracker:
 
         return round(score, 4)
 
+    def _calculate_throughput_score(self, stats: ModelMetrics, min_calls_threshold: int = 5) -> float:
+        """
+        Ranks by measured throughput: completion tokens per second of wall time from request
+        to last token (token-weighted over the calls that reported usage), scaled by success
+        rate. Sparse data is scaled down as in _calculate_score. Higher is better; -1.0
+        without usage data.
+        """
+        call_count = stats["call_count"]
+        if call_count == 0 or stats["total_generation_ms"] <= 0:
+            return -1.0
+        tokens_per_s = stats["generation_tokens"] / (stats["total_generation_ms"] / 1000.0)
+        score = tokens_per_s * (stats["success_count"] / call_count)
+        if stats["usage_call_count"] < min_calls_threshold:
+            score *= (stats["usage_call_count"] / min_calls_threshold)
+        return round(score, 4)
 
-    def get_ranked_models(self, provider: Optional[str] = None, min_calls: int = 3) -> List[Tuple[str, str, float, Dict]]:
+    def _calculate_tail_latency_score(self, histogram: LatencyHistogram, stats: ModelMetrics, percentile: float, min_calls_threshold: int = 5) -> float:
+        """
+        Ranks by tail latency: 1000 / (latency at the percentile in ms), i.e. calls per second
+        at that latency, scaled by success rate and scaled down for sparse data as in
+        _calculate_score. Higher is better; -1.0 without latency samples.
+        """
+        latency_ms = histogram.percentile(percentile)
+        if not latency_ms or stats["call_count"] == 0:
+            return -1.0
+        score = (1000.0 / latency_ms) * (stats["success_count"] / stats["call_count"])
+        if histogram.count < min_calls_threshold:
+            score *= (histogram.count / min_calls_threshold)
+        return round(score, 4)
+
+    def get_ranked_models(self, provider: Optional[str] = None, min_calls: int = 3, rank_by: str = "score", period_seconds: Optional[float] = None) -> List[Tuple[str, str, float, Dict]]:
         """
         Returns a list of models ranked by performance score (higher is better).
         Can be filtered by provider.
@@ -230,10 +404,26 @@ class ModelPerformanceTracker:
         Args:
             provider (Optional[str]): If specified, rank only models for this provider.
             min_calls (int): Minimum number of calls required for a model to be fully ranked.
+            rank_by (str): 'score' (success rate and latency, see _calculate_score),
+                'throughput' (measured tokens/s, see _calculate_throughput_score) or
+                'p50'/'p90'/'p99' (tail latency, see _calculate_tail_latency_score).
+            period_seconds (Optional[float]): For the latency ranks, only consider calls of the
+                last period_seconds (all time if None).
 
         Returns:
             List[Tuple[str, str, float, Dict]]: List of (provider, model_id, score, metrics_dict) sorted by score descending.
         """
+        if rank_by not in ("score", "throughput", *RANK_BY_PERCENTILE):
+            raise ValueError(f"Unknown rank_by '{rank_by}'. Expected 'score', 'throughput', {', '.join(repr(key) for key in RANK_BY_PERCENTILE)}.")
+
+        def score_fn(prov_name: str, model_id: str, stats: ModelMetrics, min_calls_threshold: int) -> float:
+            if rank_by == "throughput":
+                return self._calculate_throughput_score(stats, min_calls_threshold=min_calls_threshold)
+            if rank_by in RANK_BY_PERCENTILE:
+                histogram = self.get_latency_histogram(prov_name, model_id, period_seconds=period_seconds)
+                return self._calculate_tail_latency_score(histogram, stats, RANK_BY_PERCENTILE[rank_by], min_calls_threshold=min_calls_threshold)
+            return self._calculate_score(stats, min_calls_threshold=min_calls_threshold)
+
         ranked_list = []
         metrics_to_rank = self.get_metrics(provider=provider) # Get relevant part of metrics
 
@@ -241,14 +431,14 @@ class ModelPerformanceTracker:
              prov_name = provider
              for model_id, stats_dict in metrics_to_rank.items():
                  stats = ModelMetrics(stats_dict) # Ensure it's ModelMetrics obj
-                 score = self._calculate_score(stats, min_calls_threshold=min_calls)
+                 score = score_fn(prov_name, model_id, stats, min_calls_threshold=min_calls)
                  ranked_list.append((prov_name, model_id, score, stats))
         elif not provider and isinstance(metrics_to_rank, dict): # Ranking across all providers
             for prov_name, models_dict in metrics_to_rank.items():
                  if isinstance(models_dict, dict):
                     for model_id, stats_dict in models_dict.items():
                          stats = ModelMetrics(stats_dict)
-                         score = self._calculate_score(stats, min_calls_threshold=min_calls)
+                         score = score_fn(prov_name, model_id, stats, min_calls_threshold=min_calls)
                          ranked_list.append((prov_name, model_id, score, stats))
 
         # Sort by score descending (higher score is better)
@@ -256,4 +446,68 @@ class ModelPerformanceTracker:
 
         return ranked_list
 
+    def get_usage_report(self, provider: Optional[str] = None, rank_by: str = "throughput", min_calls: int = 3) -> List[Dict[str, Any]]:
+        """Ranked models with their usage summary (see summarize_usage), for the metrics API."""
+        return [
+            {"provider": prov_name, "model_id": model_id, "rank_by": rank_by, "score": score,
+             "success_rate": round(stats["success_count"] / stats["call_count"], 4) if stats["call_count"] else None,
+             "call_count": stats["call_count"], **self.summarize_usage(stats)}
+            for prov_name, model_id, score, stats in self.get_ranked_models(provider=provider, min_calls=min_calls, rank_by=rank_by)
+        ]
+
+    # --- Latency histograms ---
+    def get_latency_histogram(self, provider: str, model_id: str, agent_type: Optional[str] = None, period_seconds: Optional[float] = None) -> LatencyHistogram:
+        """Merged latency histogram of a model (all agent types unless agent_type is given), optionally over the last period_seconds."""
+        return LatencyHistogram.merged(
+            series.histogram(period_seconds)
+            for (prov_name, m_id, a_type), series in list(self._latency.items())
+            if prov_name == provider and m_id == model_id and (agent_type is None or a_type == agent_type)
+        )
+
+    def get_latency_report(self, provider: Optional[str] = None, period_seconds: Optional[float] = None,
+                           group_by: str = "agent_type", include_rollups: bool = False) -> List[Dict[str, Any]]:
+        """
+        Latency percentiles (p50/p90/p99, mean, min, max) per provider/model/agent type, or per
+        provider/model with group_by='model'. period_seconds limits them to recent calls;
+        include_rollups adds the per-window summaries the figures were merged from.
+        """
+        if group_by not in ("agent_type", "model"):
+            raise ValueError(f"Unknown group_by '{group_by}'. Expected 'agent_type' or 'model'.")
+        groups: Dict[Tuple[str, ...], List[LatencySeries]] = {}
+        for (prov_name, model_id, agent_type), series in list(self._latency.items()):
+            if provider and prov_name != provider:
+                continue
+            key = (prov_name, model_id, agent_type) if group_by == "agent_type" else (prov_name, model_id)
+            groups.setdefault(key, []).append(series)
+
+        report = []
+        for key, series_list in sorted(groups.items()):
+            histogram = LatencyHistogram.merged(series.histogram(period_seconds) for series in series_list)
+            if histogram.count == 0:
+                continue
+            entry: Dict[str, Any] = {"provider": key[0], "model_id": key[1]}
+            if group_by == "agent_type":
+                entry["agent_type"] = key[2]
+            entry.update(histogram.summary())
+            if include_rollups:
+                by_window: Dict[int, LatencyHistogram] = {}
+                for series in series_list:
+                    for start, window in series.window_histograms(period_seconds):
+                        by_window.setdefault(start, LatencyHistogram()).merge(window)
+                entry["rollups"] = [{"window_start": start, **window.summary()} for start, window in sorted(by_window.items())]
+            report.append(entry)
+        return report
+
+
 # --- Helper for atomic writes (needed for save_metrics) ---
+def _write_json_atomic_sync(path: Path, data: Any, indent: Optional[int] = None):
+    temp_fd, temp_path_str = tempfile.mkstemp(suffix=".tmp", prefix=path.name + '_', dir=path.parent)
+    try:
+        with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(temp_path_str, path)
+        temp_path_str = None
+    finally:
+        if temp_path_str and os.path.exists(temp_path_str):
+            os.remove(temp_path_str)
+# END OF FILE src/agents/performance_tracker.py
@@ -46,7 +46,7 @@ async def update_agent_prompt_team_id(manager: 'AgentManager', agent_id: str, ne
 
                 # Update the history if the system prompt is the first message
                 if agent.message_history and agent.message_history[0]["role"] == "system":
-                    agent.message_history[0]["content"] = agent.final_system_prompt
+                    agent.message_history[0] = {**agent.message_history[0], "content": agent.final_system_prompt}
 
                 logger.info(f"Updated team ID ({new_team_id or 'N/A'}) in live prompt state for dynamic agent '{agent_id}'.")
             else:
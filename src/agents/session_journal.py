@@ -0,0 +1,178 @@
+# START OF FILE src/agents/session_journal.py
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.agents.message_history import MessageHistory
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR_NAME = "session_journal"
+MANIFEST_FILE_NAME = "manifest.json"
+SEGMENT_SUFFIX = ".jsonl"
+LEGACY_SESSION_FILE_NAME = "agent_session_data.json" # Single-file format written by older versions
+JOURNAL_FORMAT_VERSION = 1
+
+
+def session_has_saved_state(session_dir: Path) -> bool:
+    """True if session_dir holds a saved session in either the journal or the legacy format."""
+    return (session_dir / JOURNAL_DIR_NAME / MANIFEST_FILE_NAME).is_file() or (session_dir / LEGACY_SESSION_FILE_NAME).is_file()
+
+
+def segment_file_name(agent_id: str) -> str:
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', agent_id)
+    if safe_name != agent_id or safe_name.startswith('.'):
+        safe_name = f"{safe_name}-{hashlib.sha1(agent_id.encode('utf-8')).hexdigest()[:8]}"
+    return safe_name + SEGMENT_SUFFIX
+
+
+def _encode_message(agent_id: str, msg: Dict[str, Any]) -> str:
+    try:
+        return json.dumps(msg, ensure_ascii=False) + "\n"
+    except (TypeError, ValueError) as e:
+        logger.error(f"Session journal: Message in history of '{agent_id}' is not JSON serializable: {e}. Saving placeholder.")
+        return json.dumps({"role": "system", "content": f"[History Serialization Error: {e}]"}) + "\n"
+
+
+def _atomic_write_text(path: Path, text: str):
+    temp_fd, temp_path_str = tempfile.mkstemp(suffix=".tmp", prefix=path.name + '_', dir=path.parent)
+    try:
+        with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path_str, path)
+        temp_path_str = None
+    finally:
+        if temp_path_str and os.path.exists(temp_path_str):
+            os.remove(temp_path_str)
+
+
+@dataclass
+class SegmentWrite:
+    """One agent's pending history write: either an appended tail or a full snapshot."""
+    agent_id: str
+    file_name: str
+    messages: List[Dict[str, Any]]
+    append: bool
+    history: MessageHistory
+    edit_count: int
+    length: int # History length once written
+    error: Optional[Exception] = None
+
+
+class SessionJournal:
+    """
+    Append-only storage for one saved session (<session_dir>/session_journal/).
+
+    Each agent's history lives in its own JSONL segment, one message per line. A save
+    appends only the messages added since the history's last checkpoint (recorded on the
+    MessageHistory itself); when a history stopped being an extension of what was
+    persisted (summarization, pruning, clears, another session) its segment is compacted,
+    i.e. atomically rewritten as a snapshot of the current history. Teams, dynamic agent
+    configs, workflow states and the per-agent segment index go to a small manifest that is
+    atomically replaced on every save. A crash therefore loses at most the unsaved tail,
+    and a torn trailing line is skipped on load (and compacted away on the next save).
+    """
+
+    def __init__(self, session_dir: Path):
+        self.session_dir = session_dir
+        self.journal_dir = session_dir / JOURNAL_DIR_NAME
+        self.manifest_path = self.journal_dir / MANIFEST_FILE_NAME
+        self.legacy_path = session_dir / LEGACY_SESSION_FILE_NAME
+        self.key = str(session_dir.resolve())
+
+    # --- Saving ---
+    def plan_history_write(self, agent_id: str, history: MessageHistory) -> Optional[SegmentWrite]:
+        """Returns the write that brings the agent's segment up to date, or None if it already is."""
+        persisted = history.persisted_length(self.key)
+        if persisted is not None and persisted == len(history):
+            return None
+        append = persisted is not None
+        messages = history[persisted:] if append else list(history)
+        return SegmentWrite(agent_id=agent_id, file_name=segment_file_name(agent_id), messages=messages,
+                            append=append, history=history, edit_count=history.edit_count, length=len(history))
+
+    def write_sync(self, writes: List[SegmentWrite], manifest: Dict[str, Any]):
+        """
+        Blocking: writes the segments, then the manifest, then removes segments of agents
+        that are no longer in the session. A failed segment write is recorded on the
+        SegmentWrite (see apply_checkpoints); a failed manifest write raises.
+        """
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        for write in writes:
+            path = self.journal_dir / write.file_name
+            try:
+                data = "".join(_encode_message(write.agent_id, msg) for msg in write.messages)
+                if write.append:
+                    with open(path, 'a', encoding='utf-8') as f:
+                        f.write(data)
+                else:
+                    _atomic_write_text(path, data)
+            except Exception as e:
+                logger.error(f"Session journal: Failed writing history segment for '{write.agent_id}' to {path}: {e}", exc_info=True)
+                write.error = e
+
+        _atomic_write_text(self.manifest_path, json.dumps(manifest, ensure_ascii=False))
+
+        live_segments = {entry["segment"] for entry in manifest.get("agents", {}).values()}
+        for path in self.journal_dir.glob(f"*{SEGMENT_SUFFIX}"):
+            if path.name not in live_segments:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"Session journal: Could not remove stale segment {path}: {e}")
+
+    def apply_checkpoints(self, writes: List[SegmentWrite]):
+        """Records successful writes on their histories. Call on the event loop after write_sync."""
+        for write in writes:
+            if write.error is not None:
+                write.history.clear_persisted() # The segment may hold a partial tail: compact it next time
+            elif write.history.edit_count == write.edit_count: # Not edited while the write ran
+                write.history.mark_persisted(self.key, write.length, write.edit_count)
+
+    # --- Loading ---
+    def read_manifest_sync(self) -> Optional[Dict[str, Any]]:
+        """Blocking: the manifest dict, or None if the session was never saved in the journal format."""
+        if not self.manifest_path.is_file():
+            return None
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def read_segment_sync(self, agent_id: str, entry: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Blocking: (messages, intact). Unreadable lines are skipped and reported via intact=False."""
+        path = self.journal_dir / entry.get("segment", segment_file_name(agent_id))
+        messages: List[Dict[str, Any]] = []
+        intact = True
+        if not path.is_file():
+            logger.warning(f"Session journal: History segment for '{agent_id}' not found at {path}.")
+            return messages, False
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Session journal: Skipping unreadable line {line_number} in {path}.")
+                    intact = False
+                    continue
+                if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+                    messages.append(msg)
+                else:
+                    logger.warning(f"Session journal: Skipping invalid message on line {line_number} in {path}.")
+                    intact = False
+        return messages, intact
+
+    def load_history_sync(self, agent_id: str, entry: Dict[str, Any]) -> MessageHistory:
+        """Blocking: the agent's history, checkpointed against this journal if its segment was intact."""
+        messages, intact = self.read_segment_sync(agent_id, entry)
+        history = MessageHistory(messages)
+        if intact:
+            history.mark_persisted(self.key, len(history))
+        return history
+# END OF FILE src/agents/session_journal.py
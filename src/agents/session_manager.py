@@ -1,5 +1,6 @@
 # START OF FILE src/agents/session_manager.py
 import asyncio
+import functools
 import json
 import logging
 import time
@@ -20,6 +21,7 @@ if TYPE_CHECKING:
 
 # Import the agent lifecycle module for agent creation/deletion
 from src.agents import agent_lifecycle
+from src.agents.session_journal import SessionJournal, JOURNAL_FORMAT_VERSION, segment_file_name
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +42,18 @@ class SessionManager:
         """
         self._manager = manager
         self._state_manager = state_manager
+        self._save_lock = asyncio.Lock()
+        # Histories of the last loaded session that are read lazily (see load_session)
+        self._deferred_journal: Optional[SessionJournal] = None
+        self._deferred_entries: Dict[str, Dict[str, Any]] = {}
+        self._prefetch_task: Optional[asyncio.Task] = None
         logger.info("SessionManager initialized.")
 
     async def save_session(self, project_name: str, session_name: Optional[str] = None) -> Tuple[bool, str]:
-        # (No changes needed in save_session - still reads from manager state)
+        """
+        Saves teams, dynamic agent configs, workflow states and histories to the session journal.
+        Only messages added since the previous save of the same session are written.
+        """
         if not project_name:
             logger.error("Save session failed: Project name cannot be empty.")
             return False, "Project name cannot be empty."
@@ -51,101 +61,141 @@ class SessionManager:
             session_name = f"session_{int(time.time())}"
             logger.info(f"No session name provided, using generated name: {session_name}")
 
-        session_file_path = settings.PROJECTS_BASE_DIR / project_name / session_name / "agent_session_data.json"
-        logger.info(f"Preparing to save session state to: {session_file_path}")
-
-        current_teams = self._state_manager.teams
-        current_agent_to_team = self._state_manager.agent_to_team
-
-        session_data = {
-            "project": project_name,
-            "session": session_name,
-            "timestamp": time.time(),
-            "teams": current_teams,
-            "agent_to_team": current_agent_to_team,
-            "dynamic_agents_config": {},
-            "agent_histories": {},
-            "agent_states": {} # NEW: To store workflow states
-        }
+        journal = SessionJournal(settings.PROJECTS_BASE_DIR / project_name / session_name)
+        logger.info(f"Preparing to save session state to: {journal.journal_dir}")
+
+        async with self._save_lock: # Concurrent saves would append the same tail twice
+            current_teams = self._state_manager.teams
+            current_agent_to_team = self._state_manager.agent_to_team
+
+            manifest = {
+                "format": JOURNAL_FORMAT_VERSION,
+                "project": project_name,
+                "session": session_name,
+                "timestamp": time.time(),
+                "teams": current_teams,
+                "agent_to_team": current_agent_to_team,
+                "dynamic_agents_config": {},
+                "agent_states": {},
+                "agents": {} # agent_id -> {"segment", "messages", "estimated_tokens"}
+            }
+
+            logger.info(f"Gathering data for save. Current Teams: {list(current_teams.keys())}. Agent Mappings: {len(current_agent_to_team)}")
+            dynamic_agent_ids_found = []
+            all_agent_ids_found = list(self._manager.agents.keys())
+            writes = []
+
+            for agent_id, agent in list(self._manager.agents.items()):
+                deferred_entry = self._deferred_entries.get(agent_id)
+                if agent.history_deferred and deferred_entry and self._deferred_journal and self._deferred_journal.key == journal.key:
+                    # Never loaded since the session was loaded, so its segment is already current
+                    manifest["agents"][agent_id] = deferred_entry
+                    logger.debug(f"  History for agent '{agent_id}' unchanged since load (not loaded yet).")
+                else:
+                    await agent.load_deferred_history() # Off the event loop; no-op if already loaded
+                    history = agent.message_history
+                    write = journal.plan_history_write(agent_id, history)
+                    if write: writes.append(write)
+                    manifest["agents"][agent_id] = {"segment": segment_file_name(agent_id), "messages": len(history), "estimated_tokens": history.token_total()}
+                    logger.debug(f"  History for agent '{agent_id}' (Length: {len(history)}): {'nothing new' if not write else ('appending ' + str(len(write.messages)) + ' messages' if write.append else 'writing snapshot')}")
+
+                # Save workflow state if it exists (primarily for Admin AI)
+                if hasattr(agent, 'state') and agent.state is not None:
+                    manifest["agent_states"][agent_id] = agent.state
+                    logger.debug(f"  Added workflow state '{agent.state}' for agent '{agent_id}'.")
+
+                if agent_id not in self._manager.bootstrap_agents:
+                    dynamic_agent_ids_found.append(agent_id)
+                    try:
+                        # Save the entire agent_config dictionary associated with the agent instance
+                        agent_full_config = getattr(agent, 'agent_config', None)
+                        if agent_full_config and isinstance(agent_full_config, dict) and "config" in agent_full_config:
+                            manifest["dynamic_agents_config"][agent_id] = agent_full_config["config"] # Save the inner 'config' dict
+                            logger.debug(f"  Added config for dynamic agent '{agent_id}'. Keys: {list(agent_full_config['config'].keys())}")
+                        else:
+                            logger.warning(f"  Could not find valid 'config' dictionary for dynamic agent '{agent_id}'. Config not saved.")
+                    except Exception as e_cfg:
+                        logger.warning(f"  Error accessing/processing config for dynamic agent '{agent_id}': {e_cfg}. Config not saved.", exc_info=True)
+                else:
+                     logger.debug(f"  Skipping config save for bootstrap agent '{agent_id}'.")
 
-        logger.info(f"Gathering data for save. Current Teams: {list(current_teams.keys())}. Agent Mappings: {len(current_agent_to_team)}")
-        dynamic_agent_ids_found = []
-        all_agent_ids_found = list(self._manager.agents.keys())
+            logger.info(f"Data gathering complete. Found {len(all_agent_ids_found)} total agents.")
+            logger.info(f"Found {len(dynamic_agent_ids_found)} dynamic agents to save config for: {dynamic_agent_ids_found}")
+            logger.info(f"Saving {len(manifest['dynamic_agents_config'])} dynamic configs and {len(manifest['agents'])} histories ({len(writes)} segments to write).")
 
-        for agent_id, agent in self._manager.agents.items():
             try:
-                json.dumps(agent.message_history)
-                session_data["agent_histories"][agent_id] = agent.message_history
-                logger.debug(f"  Added history for agent '{agent_id}' (Length: {len(agent.message_history)})")
-            except TypeError as e:
-                logger.error(f"History for agent '{agent_id}' is not JSON serializable: {e}. Saving placeholder.")
-                session_data["agent_histories"][agent_id] = [{"role": "system", "content": f"[History Serialization Error: {e}]"}]
-
-            # Save workflow state if it exists (primarily for Admin AI)
-            if hasattr(agent, 'state') and agent.state is not None:
-                session_data["agent_states"][agent_id] = agent.state
-                logger.debug(f"  Added workflow state '{agent.state}' for agent '{agent_id}'.")
-
-            if agent_id not in self._manager.bootstrap_agents:
-                dynamic_agent_ids_found.append(agent_id)
                 try:
-                    # Save the entire agent_config dictionary associated with the agent instance
-                    agent_full_config = getattr(agent, 'agent_config', None)
-                    if agent_full_config and isinstance(agent_full_config, dict) and "config" in agent_full_config:
-                        session_data["dynamic_agents_config"][agent_id] = agent_full_config["config"] # Save the inner 'config' dict
-                        logger.debug(f"  Added config for dynamic agent '{agent_id}'. Keys: {list(agent_full_config['config'].keys())}")
-                    else:
-                        logger.warning(f"  Could not find valid 'config' dictionary for dynamic agent '{agent_id}'. Config not saved.")
-                except Exception as e_cfg:
-                    logger.warning(f"  Error accessing/processing config for dynamic agent '{agent_id}': {e_cfg}. Config not saved.", exc_info=True)
-            else:
-                 logger.debug(f"  Skipping config save for bootstrap agent '{agent_id}'.")
-
-        logger.info(f"Data gathering complete. Found {len(all_agent_ids_found)} total agents.")
-        logger.info(f"Found {len(dynamic_agent_ids_found)} dynamic agents to save config for: {dynamic_agent_ids_found}")
-        logger.info(f"Saving {len(session_data['dynamic_agents_config'])} dynamic configs and {len(session_data['agent_histories'])} histories.")
-
-        try:
-            def save_sync():
-                session_file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(session_file_path, 'w', encoding='utf-8') as f:
-                     json.dump(session_data, f, indent=2)
-            await asyncio.to_thread(save_sync)
-            logger.info(f"Session saved successfully: {session_file_path}")
-            self._manager.current_project, self._manager.current_session = project_name, session_name
-            await self._manager.send_to_ui({"type": "system_event", "event": "session_saved", "project": project_name, "session": session_name})
-            return True, f"Session '{session_name}' saved successfully in project '{project_name}'."
-        except Exception as e:
-            logger.error(f"Error saving session file to {session_file_path}: {e}", exc_info=True)
-            return False, f"Error saving session file: {e}"
+                    await asyncio.to_thread(journal.write_sync, writes, manifest)
+                finally:
+                    journal.apply_checkpoints(writes)
+            except Exception as e:
+                logger.error(f"Error saving session journal to {journal.journal_dir}: {e}", exc_info=True)
+                return False, f"Error saving session file: {e}"
+
+        failed_writes = [write.agent_id for write in writes if write.error is not None]
+        if failed_writes:
+            logger.error(f"Session saved with failed history writes for: {failed_writes}")
+            return False, f"Error saving history for agents: {', '.join(failed_writes)}"
+        logger.info(f"Session saved successfully: {journal.journal_dir}")
+        self._manager.current_project, self._manager.current_session = project_name, session_name
+        await self._manager.send_to_ui({"type": "system_event", "event": "session_saved", "project": project_name, "session": session_name})
+        return True, f"Session '{session_name}' saved successfully in project '{project_name}'."
+
+    async def _prefetch_deferred_histories(self, agent_ids: List[str]):
+        """Background task started by load_session: loads deferred histories one at a time."""
+        for agent_id in agent_ids:
+            agent = self._manager.agents.get(agent_id)
+            if agent and agent.history_deferred:
+                await agent.load_deferred_history()
+        logger.info(f"Finished loading {len(agent_ids)} deferred agent histories in the background.")
 
 
     async def load_session(self, project_name: str, session_name: str) -> Tuple[bool, str]:
-        """Loads dynamic agents, teams, and histories from a saved session file."""
+        """
+        Loads dynamic agents, teams, and histories from a saved session.
+
+        Reads the session journal's manifest; bootstrap agent histories are replayed from
+        their segments right away, while dynamic agents get their histories deferred (read
+        on first access or by a background prefetch). Sessions saved in the legacy
+        single-file format are still loaded and move to the journal on their next save.
+        """
         # BOOTSTRAP_AGENT_ID is now imported at the module level
 
-        session_file_path = settings.PROJECTS_BASE_DIR / project_name / session_name / "agent_session_data.json"
-        logger.info(f"Attempting to load session from: {session_file_path}")
-        if not session_file_path.is_file():
-            logger.error(f"Session file not found: {session_file_path}")
-            return False, f"Session file '{session_name}' not found in project '{project_name}'."
+        journal = SessionJournal(settings.PROJECTS_BASE_DIR / project_name / session_name)
+        session_file_path = journal.manifest_path
+        logger.info(f"Attempting to load session from: {journal.journal_dir}")
 
         try:
-            def load_sync():
-                 with open(session_file_path, 'r', encoding='utf-8') as f:
-                     return json.load(f)
-            session_data = await asyncio.to_thread(load_sync)
+            session_data = await asyncio.to_thread(journal.read_manifest_sync)
+            journal_entries: Optional[Dict[str, Dict[str, Any]]] = None
+            if session_data is not None:
+                journal_entries = session_data.get("agents", {})
+                loaded_histories = {}
+            else:
+                session_file_path = journal.legacy_path
+                if not session_file_path.is_file():
+                    logger.error(f"Session data not found: {journal.manifest_path}")
+                    return False, f"Session file '{session_name}' not found in project '{project_name}'."
+                def load_sync():
+                     with open(session_file_path, 'r', encoding='utf-8') as f:
+                         return json.load(f)
+                session_data = await asyncio.to_thread(load_sync)
+                loaded_histories = session_data.get("agent_histories", {})
             logger.info(f"Successfully loaded JSON data from {session_file_path}")
 
             loaded_teams_data = session_data.get("teams", {})
             loaded_agent_to_team_data = session_data.get("agent_to_team", {})
             loaded_dynamic_configs = session_data.get("dynamic_agents_config", {})
-            loaded_histories = session_data.get("agent_histories", {})
             loaded_states = session_data.get("agent_states", {}) # NEW: Load states
             logger.info(f"Loaded 'teams' keys: {list(loaded_teams_data.keys())}")
             logger.info(f"Loaded 'agent_to_team' keys: {list(loaded_agent_to_team_data.keys())}")
             logger.info(f"Loaded 'dynamic_agents_config' keys: {list(loaded_dynamic_configs.keys())}")
-            logger.info(f"Loaded 'agent_histories' keys: {list(loaded_histories.keys())}")
+            logger.info(f"Loaded history keys: {list((journal_entries if journal_entries is not None else loaded_histories).keys())}")
+
+            # Histories of the previous session are no longer deferred
+            if self._prefetch_task and not self._prefetch_task.done(): self._prefetch_task.cancel()
+            self._deferred_journal = journal if journal_entries is not None else None
+            self._deferred_entries = {}
 
             # Clear current dynamic state
             current_agent_ids = list(self._manager.agents.keys())
@@ -218,7 +268,7 @@ class SessionManager:
 
             # Restore histories
             loaded_history_count = 0; loaded_state_count = 0
-            agents_with_loaded_history = []; agents_with_loaded_state = []
+            agents_with_loaded_history = []; agents_with_loaded_state = []; agents_with_deferred_history = []
             all_recreated_or_bootstrap_ids = list(self._manager.agents.keys()) # Get all agents present after recreation
 
             for agent_id in all_recreated_or_bootstrap_ids:
@@ -227,7 +277,18 @@ class SessionManager:
 
                 # Restore History
                 history = loaded_histories.get(agent_id)
-                if history:
+                entry = journal_entries.get(agent_id) if journal_entries is not None else None
+                if entry and agent_id not in self._manager.bootstrap_agents:
+                    # Dynamic agents stay idle until activated: defer reading their segment
+                    agent.defer_history(functools.partial(journal.load_history_sync, agent_id, entry), entry.get("messages", 0), entry.get("estimated_tokens", 0))
+                    self._deferred_entries[agent_id] = entry
+                    agents_with_deferred_history.append(agent_id)
+                elif entry:
+                    history = await asyncio.to_thread(journal.load_history_sync, agent_id, entry)
+
+                if agent.history_deferred:
+                    pass
+                elif history:
                     if isinstance(history, list) and all(isinstance(msg, dict) and 'role' in msg and 'content' in msg for msg in history):
                         agent.message_history = history
                         loaded_history_count += 1
@@ -259,6 +320,7 @@ class SessionManager:
                 agent.set_status(AGENT_STATUS_IDLE)
 
             logger.info(f"Loaded histories for {loaded_history_count} agents: {agents_with_loaded_history}")
+            logger.info(f"Deferred histories for {len(agents_with_deferred_history)} agents: {agents_with_deferred_history}")
             logger.info(f"Loaded workflow states for {loaded_state_count} agents: {agents_with_loaded_state}")
             logger.debug(f"LOAD_DEBUG (After History/State Loading): Agents keys = {list(self._manager.agents.keys())}")
 
@@ -276,6 +338,8 @@ class SessionManager:
             if failed_creations: load_message += f" Failed to recreate {len(failed_creations)} agents."
             if BOOTSTRAP_AGENT_ID not in self._manager.agents: load_message += " CRITICAL WARNING: Admin AI instance seems missing!"
             await self._manager.send_to_ui({"type": "system_event", "event": "session_loaded", "project": project_name, "session": session_name, "message": load_message})
+            if agents_with_deferred_history:
+                self._prefetch_task = asyncio.create_task(self._prefetch_deferred_histories(agents_with_deferred_history))
             logger.debug(f"LOAD_DEBUG (End of Load Function): Agents keys = {list(self._manager.agents.keys())}")
             logger.info(f"Session load process complete for '{project_name}/{session_name}'.")
             return True, load_message
@@ -0,0 +1,127 @@
+# START OF FILE src/agents/stream_buffer.py
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+LOOP_MIN_PATTERN_LENGTH = 20
+LOOP_MIN_REPETITIONS = 4
+LOOP_MAX_PATTERN_LENGTH = 1000
+
+
+class StreamTextBuffer:
+    """
+    Append-only text buffer for streamed LLM output.
+
+    Chunks are collected in a list and joined at most once per read (the joined string
+    is cached until the next append), so appending a token never copies the whole response.
+    """
+
+    def __init__(self, initial: str = ""):
+        self._chunks: List[str] = [initial] if initial else []
+        self._length = len(initial)
+        self._joined: Optional[str] = initial
+
+    def append(self, chunk: str):
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        self._joined = None
+
+    def getvalue(self) -> str:
+        if self._joined is None:
+            self._joined = "".join(self._chunks)
+            self._chunks = [self._joined]
+        return self._joined
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __str__(self) -> str:
+        return self.getvalue()
+
+
+class AutoregressiveLoopDetector:
+    """
+    Streaming detector for a strictly repeating tail: some pattern of length p
+    (min_pattern_length <= p <= max_pattern_length) repeated min_repetitions times
+    at the very end of the text.
+
+    For each candidate period p it tracks the run of trailing positions i with
+    text[i] == text[i - p]; the tail is a loop exactly when that run reaches
+    (min_repetitions - 1) * p. A period only becomes a candidate when the current
+    min_pattern_length-gram also ended p characters earlier (looked up in a gram ->
+    positions index over the last max_pattern_length characters), at which point its
+    run is exactly min_pattern_length. Each character therefore costs O(gram length +
+    live candidates) and is_looping() is O(live candidates), independent of the text length.
+    """
+
+    def __init__(self, min_pattern_length: int = LOOP_MIN_PATTERN_LENGTH, min_repetitions: int = LOOP_MIN_REPETITIONS,
+                 max_pattern_length: int = LOOP_MAX_PATTERN_LENGTH):
+        self.min_pattern_length = min_pattern_length
+        self.min_repetitions = min_repetitions
+        self.max_pattern_length = max_pattern_length
+        self._ring_size = max_pattern_length + 1
+        self._ring: List[str] = [''] * self._ring_size
+        self._length = 0
+        self._gram = ""
+        self._gram_positions: Dict[str, Deque[int]] = {}
+        self._recent_grams: Deque[str] = deque()
+        self._runs: Dict[int, int] = {} # period -> trailing run of text[i] == text[i - period]
+
+    def feed(self, chunk: str):
+        for ch in chunk:
+            self._feed_char(ch)
+
+    def _feed_char(self, ch: str):
+        position = self._length
+        ring, ring_size = self._ring, self._ring_size
+
+        # Extend or drop the live candidate periods
+        runs = self._runs
+        for period in list(runs):
+            if ring[(position - period) % ring_size] == ch:
+                runs[period] += 1
+            else:
+                del runs[period]
+
+        ring[position % ring_size] = ch
+        self._length = position + 1
+
+        gram_length = self.min_pattern_length
+        self._gram = (self._gram + ch)[-gram_length:]
+        if len(self._gram) < gram_length:
+            return
+        gram = self._gram
+
+        # Periods whose run just reached gram_length: the same gram ended exactly `period` chars ago
+        positions = self._gram_positions.get(gram)
+        if positions:
+            for previous in positions:
+                period = position - previous
+                if period >= gram_length and period not in runs:
+                    runs[period] = gram_length
+        else:
+            positions = deque()
+            self._gram_positions[gram] = positions
+        positions.append(position)
+        self._recent_grams.append(gram)
+
+        # Forget grams that ended more than max_pattern_length chars ago
+        if len(self._recent_grams) > self.max_pattern_length:
+            old_gram = self._recent_grams.popleft()
+            old_positions = self._gram_positions[old_gram]
+            old_positions.popleft()
+            if not old_positions:
+                del self._gram_positions[old_gram]
+
+    def is_looping(self) -> bool:
+        """True if the text fed so far ends in a strictly repeating loop."""
+        repeats_needed = self.min_repetitions - 1
+        for period, run in self._runs.items():
+            if period <= self.max_pattern_length and run >= repeats_needed * period:
+                return True
+        return False
+# END OF FILE src/agents/stream_buffer.py
@@ -24,7 +24,8 @@ from src.config.settings import settings, BASE_DIR
 from src.workflows.base import BaseWorkflow, WorkflowResult
 from src.workflows.project_creation_workflow import ProjectCreationWorkflow
 from src.workflows.pm_kickoff_workflow import PMKickoffWorkflow
-from src.api.websocket_manager import broadcast
+from src.api.websocket_manager import broadcast_event
+from src.tools.task_index import task_index
 
 
 if TYPE_CHECKING:
@@ -101,6 +102,8 @@ class AgentWorkflowManager:
         }
         self.workflows: Dict[str, BaseWorkflow] = {}
         self._workflow_triggers: Dict[Tuple[str, str, str], BaseWorkflow] = {}
+        # Decomposition checks started by change_state, by worker id; awaited before the worker's next cycle
+        self._pending_validations: Dict[str, asyncio.Task] = {}
         self._discover_and_register_workflows()
         logger.info("AgentWorkflowManager initialized.")
 
@@ -308,100 +311,27 @@ class AgentWorkflowManager:
 
                     # --- DECOMPOSE TRANSITION VALIDATION ---
                     if current_state == WORKER_STATE_DECOMPOSE and requested_state == WORKER_STATE_WORK:
-                        valid_transition = True
-                        worker_actually_decomposed = False  # Track if this worker created real sub-tasks
-                        if hasattr(agent, 'manager') and hasattr(agent.manager, 'tool_executor') and 'project_management' in agent.manager.tool_executor.tools:
-                            pm_tool = agent.manager.tool_executor.tools['project_management']
+                        # Taskwarrior I/O runs on the session's task worker; the check finishes before the worker's next cycle
+                        if hasattr(agent, 'manager') and getattr(agent, 'current_task_id', None):
                             try:
                                 agent_proj = self._get_agent_project_name(agent, agent.manager)
                                 agent_session = agent.manager.current_session
-                                tw = pm_tool._get_taskwarrior_instance(agent_proj, agent_session) # type: ignore
-                                
-                                if tw and getattr(agent, 'current_task_id', None):
-                                    aliases = pm_tool._load_aliases(agent_proj, agent_session) # type: ignore
-                                    task_id_str = str(agent.current_task_id).strip()
-                                    if task_id_str in aliases:
-                                        task_id_str = aliases[task_id_str]
-                                    
-                                    try:
-                                        if '-' in task_id_str and len(task_id_str) > 10:
-                                            main_task = tw.tasks.get(uuid=task_id_str)
-                                        elif task_id_str.isdigit():
-                                            main_task = tw.tasks.get(id=int(task_id_str))
-                                        else:
-                                            main_task = None
-                                            
-                                        if main_task:
-                                            subtasks = tw.tasks.filter(tags=f"parent:{main_task['uuid']}")
-                                            
-                                            # --- FIX: Distinguish real sub-tasks (created by this worker) from
-                                            # unrelated kick-off tasks that merely depend on the parent ---
-                                            worker_subtasks = []
-                                            for st in subtasks:
-                                                try:
-                                                    assignee = str(st['assignee'] or '')
-                                                except (KeyError, TypeError):
-                                                    assignee = ''
-                                                if assignee == agent.agent_id:
-                                                    worker_subtasks.append(st)
-                                            
-                                            if len(worker_subtasks) > 0:
-                                                # Worker genuinely decomposed: mark parent as decomposed and reassign to PM
-                                                worker_actually_decomposed = True
-                                                try:
-                                                    main_task['task_progress'] = "decomposed"
-                                                    
-                                                    # Reassign task back to the PM to remove it from worker's active queue
-                                                    pm_id = None
-                                                    for pm_candidate in agent.manager.agents.values():
-                                                        if pm_candidate.agent_type == AGENT_TYPE_PM:
-                                                            pm_candidate_project_name = self._get_agent_project_name(pm_candidate, agent.manager)
-                                                            if pm_candidate_project_name == agent_proj and pm_candidate.agent_id not in agent.manager.bootstrap_agents:
-                                                                pm_id = pm_candidate.agent_id
-                                                                break
-                                                    if pm_id:
-                                                        main_task['assignee'] = pm_id
-                                                        
-                                                    main_task.save()
-                                                    asyncio.create_task(broadcast(json.dumps({"type": "project_tasks_updated", "project_name": agent_proj, "session_name": agent_session})))
-                                                    logger.info(f"WorkflowManager: Auto-marked decomposed parent task '{main_task['uuid']}' as decomposed for agent '{agent.agent_id}'.")
-                                                    
-                                                    # Provide feedback to the worker that this happened automatically
-                                                    auto_complete_msg = (
-                                                        f"[Framework Note] Since you successfully created sub-tasks for task '{agent.current_task_id}', "
-                                                        f"the system has automatically marked the original parent task as 'decomposed'. "
-                                                        f"You can now focus on executing the newly created sub-tasks."
-                                                    )
-                                                    if not hasattr(agent, 'message_history'):
-                                                        agent.message_history = []
-                                                    agent.message_history.append({"role": "system", "content": auto_complete_msg})
-                                                except Exception as e:
-                                                    # Ignore if already completed to avoid crashing
-                                                    if "completed" not in str(e).lower() and "Cannot complete a completed task" not in str(e):
-                                                        logger.error(f"WorkflowManager: Failed to auto-complete decomposed task '{getattr(main_task, 'uuid', task_id_str)}': {e}")
-                                            else:
-                                                # Worker skipped decomposition (no sub-tasks assigned to them).
-                                                # Allow the transition and let them work on the parent task directly.
-                                                logger.info(
-                                                    f"WorkflowManager: Worker '{agent.agent_id}' skipped decomposition for task "
-                                                    f"'{task_id_str}' (found {len(subtasks)} dependent task(s) but none assigned to this worker). "
-                                                    f"Allowing direct work on the original task."
-                                                )
-                                                # Provide feedback so the worker knows it's working on the original task
-                                                skip_decompose_msg = (
-                                                    f"[Framework Note] You chose to skip decomposition for task '{agent.current_task_id}'. "
-                                                    f"You will now work directly on this task. Focus on completing it efficiently."
-                                                )
-                                                if not hasattr(agent, 'message_history'):
-                                                    agent.message_history = []
-                                                agent.message_history.append({"role": "system", "content": skip_decompose_msg})
-                                        else:
-                                            logger.warning(f"WorkflowManager: Could not retrieve task '{task_id_str}' for validation. Proceeding without sub-task validation.")
-                                    except Exception as e:
-                                        logger.warning(f"WorkflowManager: Could not retrieve task '{task_id_str}' for validation: {e}. Proceeding without sub-task validation.")
+                                tw = task_index.get_taskwarrior(agent_proj, agent_session) if agent_proj and agent_session else None
+                                if tw and agent_session:
+                                    # PM of the worker's project: a decomposed parent task is reassigned to it
+                                    pm_id = None
+                                    for pm_candidate in agent.manager.agents.values():
+                                        if pm_candidate.agent_type == AGENT_TYPE_PM:
+                                            pm_candidate_project_name = self._get_agent_project_name(pm_candidate, agent.manager)
+                                            if pm_candidate_project_name == agent_proj and pm_candidate.agent_id not in agent.manager.bootstrap_agents:
+                                                pm_id = pm_candidate.agent_id
+                                                break
+                                    self._track_validation(agent.agent_id, asyncio.create_task(
+                                        self._validate_decomposition(agent, tw, agent_proj, agent_session, str(agent.current_task_id).strip(), pm_id)
+                                    ))
                             except Exception as e:
                                 logger.error(f"WorkflowManager: Error validating subtask creation for {agent.agent_id}: {e}", exc_info=True)
-                        
+
                         # --- DECOMPOSE TO WORK: CONTEXT CLEARING ---
                         # Condense history to prevent autoregressive looping where the agent
                         # repeatedly outputs `<request_state state='worker_work'/>`
@@ -498,6 +428,103 @@ class AgentWorkflowManager:
             logger.warning(f"WorkflowManager: Invalid state transition requested for agent '{agent.agent_id}' ({agent.agent_type}) to state '{requested_state}'. Allowed states: {self._valid_states.get(agent.agent_type, [])}")
             return False
 
+    def _track_validation(self, agent_id: str, task: asyncio.Task) -> None:
+        """Keeps a reference to a decomposition check until it finishes and logs its errors."""
+        self._pending_validations[agent_id] = task
+
+        def on_done(done: asyncio.Task) -> None:
+            if self._pending_validations.get(agent_id) is done:
+                del self._pending_validations[agent_id]
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"WorkflowManager: Decomposition validation for '{agent_id}' failed: {done.exception()}", exc_info=done.exception())
+
+        task.add_done_callback(on_done)
+
+    async def wait_for_pending_validation(self, agent_id: str) -> None:
+        """Waits for the agent's decomposition check, if one is running, so its Framework Note lands before the next cycle."""
+        task = self._pending_validations.get(agent_id)
+        if task is not None:
+            await asyncio.wait({task}) # Errors are logged by the done-callback
+
+    async def _validate_decomposition(self, agent: 'Agent', tw: Any, agent_proj: str, agent_session: str, task_ref: str, pm_id: Optional[str]) -> None:
+        """
+        After a worker leaves worker_decompose: if it created sub-tasks assigned to itself, marks the
+        parent task as decomposed and hands it back to the PM; otherwise lets it work on the parent.
+        """
+        def validate_sync() -> Tuple[Optional[str], int, int, Optional[str]]:
+            """(parent uuid or None if not found, sub-tasks of this worker, dependent tasks, save error)."""
+            task_id_str = task_index.get_aliases(agent_proj, agent_session).get(task_ref, task_ref)
+            if '-' in task_id_str and len(task_id_str) > 10:
+                main_task = tw.tasks.get(uuid=task_id_str)
+            elif task_id_str.isdigit():
+                main_task = tw.tasks.get(id=int(task_id_str))
+            else:
+                main_task = None
+            if not main_task:
+                return None, 0, 0, None
+
+            subtasks = tw.tasks.filter(tags=f"parent:{main_task['uuid']}")
+            # --- FIX: Distinguish real sub-tasks (created by this worker) from
+            # unrelated kick-off tasks that merely depend on the parent ---
+            worker_subtasks = []
+            for st in subtasks:
+                try:
+                    assignee = str(st['assignee'] or '')
+                except (KeyError, TypeError):
+                    assignee = ''
+                if assignee == agent.agent_id:
+                    worker_subtasks.append(st)
+
+            save_error = None
+            if worker_subtasks:
+                # Worker genuinely decomposed: mark parent as decomposed and reassign to PM
+                try:
+                    main_task['task_progress'] = "decomposed"
+                    # Reassign task back to the PM to remove it from worker's active queue
+                    if pm_id:
+                        main_task['assignee'] = pm_id
+                    main_task.save()
+                except Exception as e:
+                    save_error = str(e)
+            return str(main_task['uuid']), len(worker_subtasks), len(subtasks), save_error
+
+        try:
+            parent_uuid, worker_subtask_count, subtask_count, save_error = await task_index.run(agent_proj, agent_session, validate_sync)
+        except Exception as e:
+            logger.warning(f"WorkflowManager: Could not retrieve task '{task_ref}' for validation: {e}. Proceeding without sub-task validation.")
+            return
+
+        if parent_uuid is None:
+            logger.warning(f"WorkflowManager: Could not retrieve task '{task_ref}' for validation. Proceeding without sub-task validation.")
+        elif worker_subtask_count > 0:
+            if save_error is not None:
+                # Ignore if already completed to avoid crashing
+                if "completed" not in save_error.lower() and "Cannot complete a completed task" not in save_error:
+                    logger.error(f"WorkflowManager: Failed to auto-complete decomposed task '{parent_uuid}': {save_error}")
+                return
+            task_index.invalidate(agent_proj, agent_session)
+            asyncio.create_task(broadcast_event({"type": "project_tasks_updated", "project_name": agent_proj, "session_name": agent_session}))
+            logger.info(f"WorkflowManager: Auto-marked decomposed parent task '{parent_uuid}' as decomposed for agent '{agent.agent_id}'.")
+            # Provide feedback to the worker that this happened automatically
+            agent.message_history.append({"role": "system", "content": (
+                f"[Framework Note] Since you successfully created sub-tasks for task '{task_ref}', "
+                f"the system has automatically marked the original parent task as 'decomposed'. "
+                f"You can now focus on executing the newly created sub-tasks."
+            )})
+        else:
+            # Worker skipped decomposition (no sub-tasks assigned to them).
+            # Allow the transition and let them work on the parent task directly.
+            logger.info(
+                f"WorkflowManager: Worker '{agent.agent_id}' skipped decomposition for task "
+                f"'{task_ref}' (found {subtask_count} dependent task(s) but none assigned to this worker). "
+                f"Allowing direct work on the original task."
+            )
+            # Provide feedback so the worker knows it's working on the original task
+            agent.message_history.append({"role": "system", "content": (
+                f"[Framework Note] You chose to skip decomposition for task '{task_ref}'. "
+                f"You will now work directly on this task. Focus on completing it efficiently."
+            )})
+
     def _record_work_completion(self, agent: 'Agent', old_state: str, new_state: str) -> None:
         """Record work completion when transitioning out of work state."""
         try:
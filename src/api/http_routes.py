@@ -23,6 +23,7 @@ from src.core.database_manager import User
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from src.agents.manager import AgentManager
+from src.agents.session_journal import session_has_saved_state
 # Add direct import to resolve runtime NameError during FastAPI dependency evaluation
 from src.agents.manager import AgentManager
 # --- NEW: Import relevant agent status and state constants ---
@@ -147,6 +148,48 @@ async def get_provider_status(manager: AgentManager = Depends(get_agent_manager_
         logger.error(f"Error checking provider status: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to check provider status: {e}")
 
+@router.get("/api/config/providers/transport_metrics")
+async def get_provider_transport_metrics(current_user: User = Depends(get_current_user)):
+    """ API endpoint exposing the shared LLM HTTP transport pool metrics (open/idle/in-use connections per base URL). """
+    from src.llm_providers.http_transport import http_transport_pool
+    return JSONResponse(content=http_transport_pool.get_metrics())
+
+@router.get("/api/config/providers/scheduler_metrics")
+async def get_provider_scheduler_metrics(current_user: User = Depends(get_current_user)):
+    """ API endpoint exposing LLM request scheduler metrics (limits, queue depth and wait times per priority class). """
+    from src.llm_providers.request_scheduler import llm_scheduler
+    return JSONResponse(content=llm_scheduler.get_metrics())
+
+@router.get("/api/config/providers/model_performance")
+async def get_model_performance(rank_by: str = "throughput", provider: Optional[str] = None, manager: AgentManager = Depends(get_agent_manager_dependency), current_user: User = Depends(get_current_user)):
+    """ API endpoint ranking models by measured throughput ('throughput') or success rate/latency ('score'), with token and timing telemetry. """
+    try:
+        return JSONResponse(content=manager.performance_tracker.get_usage_report(provider=provider, rank_by=rank_by))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/api/metrics")
+async def get_metrics(period_seconds: Optional[float] = None, provider: Optional[str] = None, group_by: str = "agent_type", include_rollups: bool = False,
+                      manager: AgentManager = Depends(get_agent_manager_dependency), current_user: User = Depends(get_current_user)):
+    """ API endpoint exposing LLM call latency percentiles (p50/p90/p99) per provider/model/agent type, optionally over the last period_seconds. """
+    try:
+        latency = manager.performance_tracker.get_latency_report(provider=provider, period_seconds=period_seconds, group_by=group_by, include_rollups=include_rollups)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content={"period_seconds": period_seconds, "group_by": group_by, "latency": latency})
+
+@router.get("/api/websocket/metrics")
+async def get_websocket_metrics(current_user: User = Depends(get_current_user)):
+    """ API endpoint exposing per-client WebSocket delivery metrics (queue depth, lag, dropped frames). """
+    from src.api.websocket_manager import get_client_metrics
+    return JSONResponse(content=get_client_metrics())
+
+@router.get("/api/database/metrics")
+async def get_database_metrics(current_user: User = Depends(get_current_user)):
+    """ API endpoint exposing write-behind interaction log metrics (queue depth, batch sizes, flush latency). """
+    from src.core.database_manager import db_manager
+    return JSONResponse(content=db_manager.get_interaction_log_metrics())
+
 @router.post("/api/config/providers/setup", response_model=GeneralResponse)
 async def setup_initial_provider(setup_data: ProviderSetupInput, current_user: User = Depends(get_current_user)):
     """ API endpoint to set up an initial LLM provider by appending to .env. """
@@ -309,7 +352,7 @@ async def list_projects(current_user: User = Depends(get_current_user)):
 
 @router.get("/api/projects/{project_name}/sessions", response_model=List[SessionInfo])
 async def list_sessions(project_name: str, current_user: User = Depends(get_current_user)):
-    """ Lists available sessions within a specific project directory by checking for agent_session_data.json. """
+    """ Lists available sessions within a specific project directory (directories holding a saved session journal or legacy session file). """
     sessions = []
     project_dir = settings.PROJECTS_BASE_DIR / project_name
     if not project_dir.is_dir():
@@ -318,14 +361,11 @@ async def list_sessions(project_name: str, current_user: User = Depends(get_curr
         for item in project_dir.iterdir():
             # Check if it's a directory and not hidden
             if item.is_dir() and not item.name.startswith('.'):
-                # Look for the correct session data file name
-                session_file = item / "agent_session_data.json" # Correct filename
-                if session_file.is_file():
-                    # If the correct session file exists, list it
+                if session_has_saved_state(item):
                     sessions.append(SessionInfo(project_name=project_name, session_name=item.name))
                 else:
-                    # Log if a directory exists but doesn't contain the expected file
-                    logger.warning(f"Directory '{item.name}' in project '{project_name}' exists but missing '{session_file.name}', not listed as session.")
+                    # Log if a directory exists but doesn't contain saved session data
+                    logger.warning(f"Directory '{item.name}' in project '{project_name}' exists but holds no saved session data, not listed as session.")
         return sessions
     except Exception as e:
         logger.error(f"Error listing sessions in {project_dir}: {e}", exc_info=True)
@@ -678,54 +718,32 @@ def _build_exclusion_patterns(project_session_dir: Path) -> list:
     return patterns
 
 
-def _should_exclude(path: Path, base_dir: Path, patterns: list) -> bool:
-    """
-    Check if a file/directory path should be excluded based on the patterns list.
-    """
-    import fnmatch as fnm
-    
-    rel_path = path.relative_to(base_dir)
-    rel_str = str(rel_path)
-    name = path.name
-    
-    for pattern in patterns:
-        # Match against the filename
-        if fnm.fnmatch(name, pattern):
-            return True
-        # Match against any path component
-        for part in rel_path.parts:
-            if fnm.fnmatch(part, pattern):
-                return True
-        # Match against the full relative path
-        if fnm.fnmatch(rel_str, pattern):
-            return True
-    
-    return False
-
-
 @router.get("/api/projects/active/download")
 async def download_active_project(
     scope: str = "full",
+    compression: str = "auto",
     manager: AgentManager = Depends(get_agent_manager_dependency),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Creates a zip archive of the active project/session directory and returns it
-    as a download. Excludes .venv, __pycache__, .git, and .gitignore patterns.
+    Streams a zip archive of the active project/session directory as a download.
+    Excludes .venv, __pycache__, .git, and .gitignore patterns.
     
     Query params:
         scope: 'full' (entire session folder) or 'workspace' (shared_workspace only)
+        compression: 'auto' (deflate, but store already-compressed files), 'deflate' or 'store' (no compression)
     """
     from fastapi.responses import StreamingResponse
-    import zipfile
-    import io
     import re as re_module
+    from src.utils.archive_stream import stream_zip_archive, ARCHIVE_COMPRESSION_MODES
     
     project_name = manager.current_project
     session_name = manager.current_session
     
     if not project_name or not session_name:
         raise HTTPException(status_code=400, detail="No active project/session to download.")
+    if compression not in ARCHIVE_COMPRESSION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid compression '{compression}'. Use one of: {', '.join(ARCHIVE_COMPRESSION_MODES)}.")
     
     safe_project_name = re_module.sub(r'[^\w\-. ]', '_', project_name)
     session_dir = settings.PROJECTS_BASE_DIR / safe_project_name / session_name
@@ -740,31 +758,15 @@ async def download_active_project(
     if not target_dir.is_dir():
         raise HTTPException(status_code=404, detail=f"Directory not found: {target_dir.name}")
     
-    exclusion_patterns = _build_exclusion_patterns(session_dir)
-    logger.info(f"Creating zip archive of '{target_dir}' (scope={scope}) with {len(exclusion_patterns)} exclusion patterns.")
+    exclusion_patterns = await asyncio.to_thread(_build_exclusion_patterns, session_dir)
+    logger.info(f"Streaming zip archive of '{target_dir}' (scope={scope}, compression={compression}) with {len(exclusion_patterns)} exclusion patterns.")
     
-    # Build the zip in memory
-    zip_buffer = io.BytesIO()
-    file_count = 0
-    try:
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_path in sorted(target_dir.rglob('*')):
-                if file_path.is_file() and not _should_exclude(file_path, target_dir, exclusion_patterns):
-                    arcname = str(file_path.relative_to(target_dir))
-                    zf.write(file_path, arcname)
-                    file_count += 1
-        
-        zip_buffer.seek(0)
-        logger.info(f"Zip archive created: {zip_filename} with {file_count} files.")
-        
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
-            headers={"Content-Disposition": f"attachment; filename={zip_filename}"}
-        )
-    except Exception as e:
-        logger.error(f"Error creating zip archive: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to create archive: {e}")
+    # Built chunk by chunk in a worker thread; nothing is held in memory beyond a few chunks
+    return StreamingResponse(
+        stream_zip_archive(target_dir, exclusion_patterns, compression),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={zip_filename}"}
+    )
 
 # --- END: Project Lifecycle Endpoints ---
 
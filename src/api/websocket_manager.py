@@ -1,11 +1,15 @@
 # START OF FILE src/api/websocket_manager.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Deque, Tuple
+from collections import deque
 import json
 import asyncio # Import asyncio for create_task
 import logging # Added logging
+import time
 import uuid # Added for instance identification
 
+from src.config.settings import settings
+
 # Import AgentManager for type hinting (optional but good practice)
 # Use a forward reference string if AgentManager imports this module to avoid circular imports
 from typing import TYPE_CHECKING
@@ -33,34 +37,204 @@ def set_agent_manager(manager: 'AgentManager'):
     agent_manager_instance = manager
     logger.info("WebSocketManager: AgentManager instance set.") # Changed print to logger
 
-async def broadcast(message: str):
+class _ClientChannel:
     """
-    Sends a message to all active WebSocket connections.
+    Outbound side of one WebSocket connection: a bounded frame queue drained by its own writer task,
+    so a slow browser only delays itself and never the broadcaster (or the agent cycle behind it).
     """
-    disconnected_connections: List[WebSocket] = []
-    # Use a copy of the list to avoid issues if the list is modified during iteration
-    connections_to_notify = list(active_connections)
 
-    for connection in connections_to_notify:
+    def __init__(self, websocket: WebSocket, client_host: str):
+        self.websocket = websocket
+        self.client_host = client_host
+        self.max_queue = max(1, settings.WEBSOCKET_CLIENT_QUEUE_SIZE)
+        self._queue: Deque[Tuple[str, Optional[str], Optional[str], float]] = deque() # (frame, event_type, agent_id, enqueued_at)
+        self._has_frames = asyncio.Event()
+        self._has_room = asyncio.Event(); self._has_room.set()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+        # Lag metrics
+        self.connected_at = time.time()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+        self.frames_coalesced = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_send_ms = 0.0
+
+    def start(self):
+        self._writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, frame: str, event_type: Optional[str] = None, agent_id: Optional[str] = None) -> bool:
+        """Queues a frame without waiting. Returns False if the client is too far behind to keep."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue and not self._make_room(event_type, agent_id):
+            return event_type in settings.WEBSOCKET_LOW_PRIORITY_EVENTS # Dropped the new frame itself, or overflow
+        self._queue.append((frame, event_type, agent_id, time.monotonic()))
+        self._has_frames.set()
+        if len(self._queue) >= self.max_queue:
+            self._has_room.clear()
+        return True
+
+    def _make_room(self, event_type: Optional[str], agent_id: Optional[str]) -> bool:
+        # A state event (e.g. agent_status_update) supersedes the still-queued one of the same agent,
+        # so the UI always receives the latest state even under backpressure
+        if event_type in settings.WEBSOCKET_COALESCE_EVENTS and agent_id is not None:
+            for index, (_, queued_type, queued_agent, _) in enumerate(self._queue):
+                if queued_type == event_type and queued_agent == agent_id:
+                    del self._queue[index]
+                    self.frames_coalesced += 1
+                    return True
+        # Drop the oldest queued low-priority frame; if there is none, drop the new frame if it is low-priority
+        for index, (_, queued_type, _, _) in enumerate(self._queue):
+            if queued_type in settings.WEBSOCKET_LOW_PRIORITY_EVENTS:
+                del self._queue[index]
+                self.frames_dropped += 1
+                return True
+        if event_type in settings.WEBSOCKET_LOW_PRIORITY_EVENTS:
+            self.frames_dropped += 1
+        return False
+
+    async def send_text(self, frame: str):
+        """Queues a direct reply to this client, waiting for queue space instead of dropping."""
+        while not self.closed and len(self._queue) >= self.max_queue:
+            self._has_room.clear()
+            await self._has_room.wait()
+        if not self.closed:
+            self._queue.append((frame, None, None, time.monotonic()))
+            self._has_frames.set()
+
+    async def _writer(self):
         try:
-            await connection.send_text(message)
+            while not self.closed:
+                if not self._queue:
+                    self._has_frames.clear()
+                    await self._has_frames.wait()
+                    continue
+                frame, _, _, enqueued_at = self._queue.popleft()
+                if len(self._queue) < self.max_queue:
+                    self._has_room.set()
+                send_start = time.monotonic()
+                await self.websocket.send_text(frame)
+                now = time.monotonic()
+                self.last_send_ms = (now - send_start) * 1000
+                self.last_lag_ms = (now - enqueued_at) * 1000
+                self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+                self.frames_sent += 1
+                self.bytes_sent += len(frame)
+        except asyncio.CancelledError:
+            pass
         except WebSocketDisconnect:
-            logger.warning("Broadcast: WebSocketDisconnect detected.") # Changed print to logger
-            disconnected_connections.append(connection)
-        except RuntimeError as e:
-             # Handle cases where the connection might be closing
-             logger.warning(f"Broadcast: Runtime error sending to a websocket: {e}") # Changed print to logger
-             disconnected_connections.append(connection)
+            logger.warning(f"WebSocket writer: Disconnect detected for {self.client_host}.")
         except Exception as e:
-            logger.error(f"Broadcast: Error sending message to a websocket: {type(e).__name__} - {e}") # Changed print to logger
-            disconnected_connections.append(connection) # Assume connection is broken
+            logger.warning(f"WebSocket writer: Error sending to {self.client_host}: {type(e).__name__} - {e}")
+        finally:
+            self._mark_closed()
+
+    def _mark_closed(self):
+        self.closed = True
+        self._queue.clear()
+        self._has_room.set() # Release any send_text() waiters
+        _channels.pop(self.websocket, None)
+        if self.websocket in active_connections:
+            active_connections.remove(self.websocket)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self._mark_closed()
+        if self._writer_task and not self._writer_task.done() and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass # Already closed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        oldest_age_ms = (time.monotonic() - self._queue[0][3]) * 1000 if self._queue else 0.0
+        return {
+            "client": self.client_host,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "queued_frames": len(self._queue),
+            "oldest_queued_ms": round(oldest_age_ms, 1),
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_send_ms": round(self.last_send_ms, 1),
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_coalesced": self.frames_coalesced,
+        }
+
+
+# Outbound channel per accepted connection
+_channels: Dict[WebSocket, _ClientChannel] = {}
+
+# Pending streamed tokens per agent, merged into one response_chunk frame per flush
+_pending_chunks: Dict[str, List[str]] = {}
+_chunk_flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+def _enqueue_all(frame: str, event_type: Optional[str] = None, agent_id: Optional[str] = None):
+    """Hands one serialized frame to every client queue; disconnects clients that cannot keep up."""
+    for channel in list(_channels.values()):
+        if not channel.enqueue(frame, event_type, agent_id):
+            if channel.closed:
+                continue
+            logger.warning(f"Broadcast: Client {channel.client_host} is {len(channel._queue)} frames behind. Disconnecting it so it can resync.")
+            channel._mark_closed() # Stop queueing for it right away; the close itself needs the loop
+            asyncio.create_task(channel.close(code=1013, reason="Client too slow"))
+
+
+def _flush_chunks():
+    global _chunk_flush_handle
+    _chunk_flush_handle = None
+    if not _pending_chunks:
+        return
+    pending = list(_pending_chunks.items())
+    _pending_chunks.clear()
+    for agent_id, parts in pending:
+        _enqueue_all(json.dumps({"type": "response_chunk", "content": "".join(parts), "agent_id": agent_id}), "response_chunk")
+
+
+async def broadcast(message: str, event_type: Optional[str] = None, agent_id: Optional[str] = None):
+    """
+    Queues an already serialized message for all active WebSocket connections.
+    Returns immediately; each connection's writer task delivers it. event_type marks
+    low-priority frames (settings.WEBSOCKET_LOW_PRIORITY_EVENTS) that may be dropped for lagging clients,
+    and, with agent_id, state frames (settings.WEBSOCKET_COALESCE_EVENTS) that replace their queued predecessor.
+    Prefer broadcast_event(), which fills both in from the event itself.
+    """
+    _flush_chunks() # Keep streamed text ahead of whatever follows it
+    _enqueue_all(message, event_type, agent_id)
+
+
+async def broadcast_event(message_data: Dict[str, Any]):
+    """
+    Serializes an event once and queues it for every connection.
+    Plain response_chunk token events are merged per agent and flushed every
+    WEBSOCKET_CHUNK_COALESCE_MS, so the UI receives a few larger chunks instead of one frame per token.
+    """
+    global _chunk_flush_handle
+    coalesce_seconds = settings.WEBSOCKET_CHUNK_COALESCE_MS / 1000
+    if (coalesce_seconds > 0 and message_data.get("type") == "response_chunk"
+            and isinstance(message_data.get("content"), str) and message_data.keys() <= {"type", "content", "agent_id"}):
+        if not _channels:
+            return
+        _pending_chunks.setdefault(message_data.get("agent_id") or "", []).append(message_data["content"])
+        if _chunk_flush_handle is None:
+            _chunk_flush_handle = asyncio.get_running_loop().call_later(coalesce_seconds, _flush_chunks)
+        return
+    await broadcast(json.dumps(message_data), message_data.get("type"), message_data.get("agent_id"))
+
 
-    # Remove disconnected connections from the main active list
-    if disconnected_connections:
-        logger.info(f"Broadcast: Removing {len(disconnected_connections)} disconnected connection(s).") # Changed print to logger
-        for connection in disconnected_connections:
-            if connection in active_connections:
-                active_connections.remove(connection)
+def get_client_metrics() -> Dict[str, Any]:
+    """Per-connection delivery lag and queue depth."""
+    return {
+        "clients": [channel.get_metrics() for channel in list(_channels.values())],
+        "pending_chunk_agents": len(_pending_chunks),
+        "chunk_coalesce_ms": settings.WEBSOCKET_CHUNK_COALESCE_MS,
+        "queue_size": settings.WEBSOCKET_CLIENT_QUEUE_SIZE,
+    }
 
 
 @router.websocket("/ws")
@@ -80,11 +254,9 @@ async def websocket_endpoint(websocket: WebSocket):
         return
 
     await websocket.accept()
-    active_connections.append(websocket)
     client_host = websocket.client.host if websocket.client else "unknown"
-    logger.info(f"New WebSocket connection from {client_host} (user: {user.username}). Total clients: {len(active_connections)}") # Changed print to logger
 
-    # Send initial connection confirmation
+    # Send initial connection confirmation (before the writer task owns the socket)
     try:
         await websocket.send_text(json.dumps({
             "type": "status", 
@@ -94,9 +266,14 @@ async def websocket_endpoint(websocket: WebSocket):
             }))
     except Exception as e:
         logger.error(f"Error sending initial status to {client_host}: {e}") # Changed print to logger
-        active_connections.remove(websocket) # Remove if initial send fails
         return # Don't proceed if we can't even send the first message
 
+    channel = _ClientChannel(websocket, client_host)
+    _channels[websocket] = channel
+    active_connections.append(websocket)
+    channel.start()
+    logger.info(f"New WebSocket connection from {client_host} (user: {user.username}). Total clients: {len(active_connections)}") # Changed print to logger
+
     try:
         while True:
             # Wait for a message from the client
@@ -106,7 +283,7 @@ async def websocket_endpoint(websocket: WebSocket):
             if not agent_manager_instance:
                 # Fallback if AgentManager isn't initialized
                 logger.error("WebSocket Error: AgentManager not initialized. Cannot process message.")
-                await websocket.send_text(json.dumps({
+                await channel.send_text(json.dumps({
                     "type": "error",
                     "content": "Backend AgentManager is not available. Please contact administrator."
                 }))
@@ -120,7 +297,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 if message_type == "heartbeat":
                     # Respond to client heartbeat to maintain connection
-                    await websocket.send_text(json.dumps({"type": "heartbeat_ack"}))
+                    await channel.send_text(json.dumps({"type": "heartbeat_ack"}))
                 elif message_type == "submit_user_override":
                     logger.info(f"Received user override submission from {client_host}.")
                     # Pass the override data to the AgentManager asynchronously
@@ -157,7 +334,7 @@ async def websocket_endpoint(websocket: WebSocket):
                                 )
                             else:
                                 logger.error(f"AgentManager not available or missing 'resolve_cg_concern_approve' method for cg_concern_response from {client_host}.")
-                                await websocket.send_text(json.dumps({
+                                await channel.send_text(json.dumps({
                                     "type": "error",
                                     "content": "Backend cannot process CG concern approval at this time."
                                 }))
@@ -170,20 +347,20 @@ async def websocket_endpoint(websocket: WebSocket):
                                 )
                             else:
                                 logger.error(f"AgentManager not available or missing 'resolve_cg_concern_retry' method for cg_concern_response from {client_host}.")
-                                await websocket.send_text(json.dumps({
+                                await channel.send_text(json.dumps({
                                     "type": "error",
                                     "content": "Backend cannot process CG concern retry/feedback at this time."
                                 }))
                         else:
                             logger.warning(f"Unknown action '{action}' received in cg_concern_response from {client_host}.")
-                            await websocket.send_text(json.dumps({
+                            await channel.send_text(json.dumps({
                                 "type": "error",
                                 "content": f"Unknown action '{action}' for constitutional guardian response."
                             }))
                     else:
                         logger.warning(f"Received incomplete cg_concern_response from {client_host}: {message_data}")
                         # Optionally notify client of error
-                        await websocket.send_text(json.dumps({
+                        await channel.send_text(json.dumps({
                             "type": "error",
                             "content": "Incomplete constitutional guardian response received."
                         }))
@@ -191,7 +368,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     logger.info(f"Received request_full_agent_status from {client_host}.")
                     if agent_manager_instance:
                         all_agent_statuses = agent_manager_instance.get_agent_status()
-                        await websocket.send_text(json.dumps({
+                        await channel.send_text(json.dumps({
                             "type": "full_status",
                             "agents": all_agent_statuses,
                             "current_project": agent_manager_instance.current_project,
@@ -200,7 +377,7 @@ async def websocket_endpoint(websocket: WebSocket):
                         logger.info(f"Sent full_status update to {client_host} with {len(all_agent_statuses)} agents.")
                     else:
                         logger.error("AgentManager not available. Cannot send full_status.")
-                        await websocket.send_text(json.dumps({
+                        await channel.send_text(json.dumps({
                             "type": "error",
                             "content": "Backend AgentManager not available to provide full status."
                         }))
@@ -210,7 +387,7 @@ async def websocket_endpoint(websocket: WebSocket):
                         admin_agent = agent_manager_instance.agents.get("admin_ai")
                         if admin_agent:
                             # --- Chat page history (user + assistant with content only) ---
-                            await websocket.send_text(json.dumps({"type": "chat_history_start"}))
+                            await channel.send_text(json.dumps({"type": "chat_history_start"}))
                             for msg in admin_agent.message_history:
                                 role = msg.get("role")
                                 content = msg.get("content")
@@ -221,15 +398,15 @@ async def websocket_endpoint(websocket: WebSocket):
                                 if not content or not content.strip(): continue
                                 
                                 msg_type = "user" if role == "user" else "agent_response"
-                                await websocket.send_text(json.dumps({
+                                await channel.send_text(json.dumps({
                                     "type": msg_type,
                                     "agent_id": "admin_ai" if role != "user" else "human_user",
                                     "content": content
                                 }))
-                            await websocket.send_text(json.dumps({"type": "chat_history_end"}))
+                            await channel.send_text(json.dumps({"type": "chat_history_end"}))
                             
                             # --- Internal comms history (everything for the comms page) ---
-                            await websocket.send_text(json.dumps({"type": "internal_comms_history_start"}))
+                            await channel.send_text(json.dumps({"type": "internal_comms_history_start"}))
                             for msg in admin_agent.message_history:
                                 role = msg.get("role")
                                 content = msg.get("content", "")
@@ -240,7 +417,7 @@ async def websocket_endpoint(websocket: WebSocket):
                                     continue
                                 
                                 if role == "system":
-                                    await websocket.send_text(json.dumps({
+                                    await channel.send_text(json.dumps({
                                         "type": "internal_comms_message",
                                         "category": "system",
                                         "agent_id": "system",
@@ -253,14 +430,14 @@ async def websocket_endpoint(websocket: WebSocket):
                                             tc_name = tc.get("name", "unknown_tool")
                                             tc_args = tc.get("arguments", {})
                                             tc_summary = f"Tool call: {tc_name}({json.dumps(tc_args)[:200]})"
-                                            await websocket.send_text(json.dumps({
+                                            await channel.send_text(json.dumps({
                                                 "type": "internal_comms_message",
                                                 "category": "tool",
                                                 "agent_id": "admin_ai",
                                                 "content": tc_summary
                                             }))
                                     if content and content.strip():
-                                        await websocket.send_text(json.dumps({
+                                        await channel.send_text(json.dumps({
                                             "type": "internal_comms_message",
                                             "category": "agent",
                                             "agent_id": "admin_ai",
@@ -268,18 +445,18 @@ async def websocket_endpoint(websocket: WebSocket):
                                         }))
                                 elif role == "tool":
                                     tool_content = content[:500] if content else "(empty)"
-                                    await websocket.send_text(json.dumps({
+                                    await channel.send_text(json.dumps({
                                         "type": "internal_comms_message",
                                         "category": "tool",
                                         "agent_id": msg.get("tool_call_id", "tool"),
                                         "content": f"Tool result: {tool_content}"
                                     }))
-                            await websocket.send_text(json.dumps({"type": "internal_comms_history_end"}))
+                            await channel.send_text(json.dumps({"type": "internal_comms_history_end"}))
                             
                             logger.info(f"Sent chat history and internal comms history to {client_host}.")
                     else:
                         logger.error("AgentManager not available. Cannot send chat history.")
-                        await websocket.send_text(json.dumps({
+                        await channel.send_text(json.dumps({
                             "type": "error",
                             "content": "Backend AgentManager not available to provide chat history."
                         }))
@@ -298,7 +475,7 @@ async def websocket_endpoint(websocket: WebSocket):
                  logger.error(f"Error processing incoming WebSocket message from {client_host}: {e}", exc_info=True)
                  logger.error(f"Original raw data: {data}")
                  try:
-                     await websocket.send_text(json.dumps({"type": "error", "content": f"Error processing your message: {e}"}))
+                     await channel.send_text(json.dumps({"type": "error", "content": f"Error processing your message: {e}"}))
                  except: pass # Ignore send errors here
 
             # --- End message processing ---
@@ -309,12 +486,6 @@ async def websocket_endpoint(websocket: WebSocket):
         # Handle other potential errors during communication
         logger.error(f"WebSocket error for {client_host}: {type(e).__name__} - {e}") # Changed print to logger
     finally:
-        # Ensure connection removal on disconnect or error
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        # Ensure connection removal on disconnect or error; also stops the writer task and closes the socket
+        await channel.close()
         logger.info(f"WebSocket connection for {client_host} removed. Total clients: {len(active_connections)}") # Changed print to logger
-        # Optionally try to close the websocket gracefully if connection is still open
-        try:
-            await websocket.close()
-        except Exception:
-            pass # Ignore errors during close after potential prior error
@@ -7,6 +7,10 @@ import aiohttp
 import json
 import copy # Import copy for deepcopy in getters
 import ipaddress # For naming discovered providers
+import os
+import tempfile
+import time
+from pathlib import Path
 
 # Import the new network scanner utility
 from src.utils.network_utils import scan_for_local_apis
@@ -22,6 +26,11 @@ DEFAULT_OLLAMA_PORT = 11434
 DEFAULT_VLLM_PORT = 8000
 DEFAULT_LITELLM_PORT = 4000 # Adjust if your LiteLLM default is different
 
+# On-disk cache of Ollama /api/show details, keyed by model name + digest/modified_at
+DISCOVERY_CACHE_FILE_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "model_discovery_cache.json"
+DISCOVERY_CACHE_VERSION = 1
+DISCOVERY_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600 # Drop entries for models not seen in 30 days
+
 # --- NEW: TypedDict for ModelInfo ---
 from typing import TypedDict
 
@@ -58,6 +67,15 @@ class ModelRegistry:
         self.available_models: Dict[str, List[ModelInfo]] = {}
         self._reachable_providers: Dict[str, str] = {}
         self._verified_local_canonical_services: Set[Tuple[str, int]] = set()
+        self._discovery_cache: Dict[str, Dict[str, Any]] = {}
+        self._discovery_cache_dirty: bool = False
+        self._discovery_cache_hits: int = 0
+        self._discovery_cache_misses: int = 0
+        # Bounds concurrent /api/show calls across all endpoints, shared by every discovery run
+        self._discovery_semaphore = asyncio.Semaphore(max(1, self.settings.MODEL_DISCOVERY_CONCURRENCY))
+        # Lookup indexes over available_models (see _rebuild_model_indexes)
+        self._model_entries: Dict[Tuple[str, str], ModelInfo] = {}
+        self._model_providers: Dict[str, List[str]] = {}
         self._model_tier: str = getattr(self.settings, 'MODEL_TIER', 'FREE').upper()
         logger.info(f"ModelRegistry initialized. Effective MODEL_TIER='{self._model_tier}'.")
 
@@ -133,6 +151,163 @@ class ModelRegistry:
         
         return (stop_tokens if stop_tokens else None), num_ctx
 
+    # --- Ollama /api/show Details (with on-disk discovery cache) ---
+    def _extract_ollama_show_details(self, model_name: str, details_data: Dict[str, Any]) -> ModelInfo:
+        """
+        Extracts the ModelInfo fields we care about (parameter count, family, template,
+        stop tokens, num_ctx) from an Ollama /api/show response, as a partial ModelInfo.
+        """
+        extracted: ModelInfo = {}
+        # --- Extract parameter_size ---
+        details_block = details_data.get("details", {}) or {}
+        param_str = details_block.get("parameter_size")
+        if param_str:
+            num_params = self._parse_ollama_parameter_string_to_int(param_str)
+            if num_params is not None:
+                extracted["num_parameters"] = num_params
+                logger.debug(f"Ollama model '{model_name}': parameters '{param_str}' -> {num_params}")
+            else:
+                logger.debug(f"Ollama model '{model_name}': could not parse parameter string '{param_str}'.")
+        else:
+            logger.debug(f"Ollama model '{model_name}': 'parameter_size' not found in /api/show details.")
+
+        # --- Extract family ---
+        family = details_block.get("family")
+        if family:
+            extracted["family"] = family
+            logger.debug(f"Ollama model '{model_name}': family='{family}'")
+
+        # --- Extract template (for raw-template detection) ---
+        template = details_data.get("template")
+        if template:
+            extracted["model_template"] = template
+
+        # --- Extract stop tokens and num_ctx from parameters block ---
+        parameters_text = details_data.get("parameters")
+        if parameters_text:
+            parsed_stop, parsed_num_ctx = self._parse_ollama_parameters_string(parameters_text)
+            if parsed_stop:
+                extracted["model_stop_tokens"] = parsed_stop
+                logger.debug(f"Ollama model '{model_name}': stop_tokens={parsed_stop}")
+            if parsed_num_ctx is not None:
+                extracted["model_num_ctx"] = parsed_num_ctx
+                logger.debug(f"Ollama model '{model_name}': num_ctx={parsed_num_ctx} (from parameters block)")
+
+        # --- Fallback: Extract context_length from model_info dict ---
+        # Models like qwen3 don't put num_ctx in the parameters text block,
+        # but store it in model_info under keys like "qwen3.context_length".
+        if not extracted.get("model_num_ctx"):
+            model_info_data = details_data.get("model_info", {})
+            if isinstance(model_info_data, dict):
+                for key, val in model_info_data.items():
+                    if key.endswith(".context_length") and isinstance(val, int):
+                        extracted["model_num_ctx"] = val
+                        logger.debug(f"Ollama model '{model_name}': num_ctx={val} (from model_info key '{key}')")
+                        break
+        return extracted
+
+    def _warn_if_raw_template(self, model_name: str, template: Optional[str]):
+        # Warn about raw templates that won't work well with /api/chat
+        if not template: return
+        stripped_template = template.strip()
+        if stripped_template in ('{{ .Prompt }}', '{{ .Response }}', '{{ .System }}{{ .Prompt }}'):
+            logger.warning(f"Ollama model '{model_name}': Has RAW template '{stripped_template}'. "
+                           f"This model may not work correctly with /api/chat for multi-turn conversations. "
+                           f"Consider updating its Modelfile with a proper chat template.")
+
+    @staticmethod
+    def _discovery_cache_key(raw_model_data: Dict[str, Any]) -> Optional[str]:
+        """Cache key for an /api/tags entry. Models without a digest or modified_at are never cached."""
+        model_name = raw_model_data.get("name")
+        version = raw_model_data.get("digest") or raw_model_data.get("modified_at")
+        if not model_name or not version: return None
+        return f"{model_name}@{version}"
+
+    async def _fetch_ollama_model_info(self, session: aiohttp.ClientSession, base_url: str, raw_model_data: Dict[str, Any], provider_name: str) -> Optional[ModelInfo]:
+        """
+        Builds the ModelInfo for one /api/tags entry. Details come from the discovery cache when the
+        model's digest/modified_at is unchanged, otherwise from /api/show (bounded by the discovery semaphore).
+        Returns None for entries without a model name.
+        """
+        model_name = raw_model_data.get("name")
+        if not model_name:
+            return None
+        model_info_dict: ModelInfo = {"id": model_name, "provider": provider_name, "name": model_name}
+        cache_key = self._discovery_cache_key(raw_model_data) if self.settings.MODEL_DISCOVERY_CACHE_ENABLED else None
+
+        cached_entry = self._discovery_cache.get(cache_key) if cache_key else None
+        if cached_entry and isinstance(cached_entry.get("details"), dict):
+            model_info_dict.update(copy.deepcopy(cached_entry["details"]))
+            self._warn_if_raw_template(model_name, model_info_dict.get("model_template"))
+            cached_entry["last_seen"] = time.time()
+            self._discovery_cache_dirty = True
+            self._discovery_cache_hits += 1
+            logger.debug(f"Ollama model '{model_name}': details loaded from discovery cache.")
+            return model_info_dict
+
+        try:
+            show_url = f"{base_url}/api/show"
+            async with self._discovery_semaphore:
+                async with session.post(show_url, json={"name": model_name}, timeout=aiohttp.ClientTimeout(total=10)) as show_response: # Use POST as per Ollama docs
+                    if show_response.status != 200:
+                        logger.warning(f"Failed to get details for Ollama model '{model_name}' from {show_url}. Status: {show_response.status}")
+                        return model_info_dict
+                    details_data = await show_response.json(content_type=None)
+            details = self._extract_ollama_show_details(model_name, details_data)
+            self._warn_if_raw_template(model_name, details.get("model_template"))
+            model_info_dict.update(details)
+            self._discovery_cache_misses += 1
+            if cache_key:
+                self._discovery_cache[cache_key] = {"details": copy.deepcopy(details), "last_seen": time.time()}
+                self._discovery_cache_dirty = True
+        except Exception as detail_err:
+            logger.warning(f"Error fetching details for Ollama model '{model_name}': {detail_err}", exc_info=False)
+        return model_info_dict
+
+    def _load_discovery_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Reads the discovery cache file. Any unreadable or outdated file is treated as an empty cache."""
+        if not DISCOVERY_CACHE_FILE_PATH.exists(): return {}
+        try:
+            with open(DISCOVERY_CACHE_FILE_PATH, 'r', encoding='utf-8') as f: data = json.load(f)
+            if not isinstance(data, dict) or data.get("version") != DISCOVERY_CACHE_VERSION:
+                logger.info(f"Ignoring discovery cache {DISCOVERY_CACHE_FILE_PATH}: unknown format/version.")
+                return {}
+            entries = data.get("models", {})
+            return entries if isinstance(entries, dict) else {}
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Could not read discovery cache {DISCOVERY_CACHE_FILE_PATH}: {e}. Starting cold.")
+            return {}
+
+    async def _save_discovery_cache(self):
+        """Atomically writes the discovery cache, dropping entries not seen for DISCOVERY_CACHE_MAX_AGE_SECONDS."""
+        if not self._discovery_cache_dirty: return
+        cutoff = time.time() - DISCOVERY_CACHE_MAX_AGE_SECONDS
+        entries = {k: v for k, v in self._discovery_cache.items() if isinstance(v, dict) and v.get("last_seen", 0) >= cutoff}
+        temp_file_path: Optional[Path] = None
+        try:
+            await asyncio.to_thread(lambda: DISCOVERY_CACHE_FILE_PATH.parent.mkdir(parents=True, exist_ok=True))
+            temp_fd, temp_path_str = await asyncio.to_thread(
+                lambda: tempfile.mkstemp(suffix=".tmp", prefix=DISCOVERY_CACHE_FILE_PATH.name + '_', dir=DISCOVERY_CACHE_FILE_PATH.parent)
+            )
+            temp_file_path = Path(temp_path_str)
+
+            def write_json_sync():
+                with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+                    json.dump({"version": DISCOVERY_CACHE_VERSION, "models": entries}, f, indent=2)
+
+            await asyncio.to_thread(write_json_sync)
+            await asyncio.to_thread(os.replace, temp_file_path, DISCOVERY_CACHE_FILE_PATH)
+            temp_file_path = None
+            self._discovery_cache = entries
+            self._discovery_cache_dirty = False
+            logger.debug(f"Saved {len(entries)} entries to discovery cache {DISCOVERY_CACHE_FILE_PATH}.")
+        except Exception as e:
+            logger.error(f"Error saving discovery cache {DISCOVERY_CACHE_FILE_PATH}: {e}", exc_info=True)
+        finally:
+            if temp_file_path and temp_file_path.exists():
+                try: await asyncio.to_thread(os.remove, temp_file_path)
+                except Exception as rm_err: logger.error(f"Error removing temporary discovery cache file {temp_file_path}: {rm_err}")
+
     async def _verify_and_fetch_models(self, base_url: str) -> Optional[Tuple[str, str, List[ModelInfo]]]:
         """
         Verifies a potential local API endpoint and fetches its models.
@@ -172,74 +347,9 @@ class ModelRegistry:
                             logger.info(f"Verified Ollama endpoint at {base_url} ({unique_provider_name}). Found {len(raw_models_list)} models from /api/tags.")
                             verified_provider_name = unique_provider_name # Mark as Ollama for detailed fetching
 
-                            # Now fetch details for each model using /api/show
-                            for raw_model_data in raw_models_list:
-                                model_name = raw_model_data.get("name")
-                                if not model_name: continue
-
-                                model_info_dict: ModelInfo = {"id": model_name, "provider": unique_provider_name, "name": model_name}
-                                try:
-                                    show_url = f"{base_url}/api/show"
-                                    async with session.post(show_url, json={"name": model_name}, timeout=aiohttp.ClientTimeout(total=10)) as show_response: # Use POST as per Ollama docs
-                                        if show_response.status == 200:
-                                            details_data = await show_response.json(content_type=None)
-                                            # --- Extract parameter_size (existing) ---
-                                            details_block = details_data.get("details", {})
-                                            param_str = details_block.get("parameter_size")
-                                            if param_str:
-                                                num_params = self._parse_ollama_parameter_string_to_int(param_str)
-                                                if num_params is not None:
-                                                    model_info_dict["num_parameters"] = num_params
-                                                    logger.debug(f"Ollama model '{model_name}': parameters '{param_str}' -> {num_params}")
-                                                else:
-                                                    logger.debug(f"Ollama model '{model_name}': could not parse parameter string '{param_str}'.")
-                                            else:
-                                                logger.debug(f"Ollama model '{model_name}': 'parameter_size' not found in /api/show details.")
-                                            
-                                            # --- Extract family ---
-                                            family = details_block.get("family")
-                                            if family:
-                                                model_info_dict["family"] = family
-                                                logger.debug(f"Ollama model '{model_name}': family='{family}'")
-                                            
-                                            # --- Extract template (for raw-template detection) ---
-                                            template = details_data.get("template")
-                                            if template:
-                                                model_info_dict["model_template"] = template
-                                                # Warn about raw templates that won't work well with /api/chat
-                                                stripped_template = template.strip()
-                                                if stripped_template in ('{{ .Prompt }}', '{{ .Response }}', '{{ .System }}{{ .Prompt }}'):
-                                                    logger.warning(f"Ollama model '{model_name}': Has RAW template '{stripped_template}'. "
-                                                                   f"This model may not work correctly with /api/chat for multi-turn conversations. "
-                                                                   f"Consider updating its Modelfile with a proper chat template.")
-                                            
-                                            # --- Extract stop tokens and num_ctx from parameters block ---
-                                            parameters_text = details_data.get("parameters")
-                                            if parameters_text:
-                                                parsed_stop, parsed_num_ctx = self._parse_ollama_parameters_string(parameters_text)
-                                                if parsed_stop:
-                                                    model_info_dict["model_stop_tokens"] = parsed_stop
-                                                    logger.debug(f"Ollama model '{model_name}': stop_tokens={parsed_stop}")
-                                                if parsed_num_ctx is not None:
-                                                    model_info_dict["model_num_ctx"] = parsed_num_ctx
-                                                    logger.debug(f"Ollama model '{model_name}': num_ctx={parsed_num_ctx} (from parameters block)")
-                                            
-                                            # --- Fallback: Extract context_length from model_info dict ---
-                                            # Models like qwen3 don't put num_ctx in the parameters text block,
-                                            # but store it in model_info under keys like "qwen3.context_length".
-                                            if not model_info_dict.get("model_num_ctx"):
-                                                model_info_data = details_data.get("model_info", {})
-                                                if isinstance(model_info_data, dict):
-                                                    for key, val in model_info_data.items():
-                                                        if key.endswith(".context_length") and isinstance(val, int):
-                                                            model_info_dict["model_num_ctx"] = val
-                                                            logger.debug(f"Ollama model '{model_name}': num_ctx={val} (from model_info key '{key}')")
-                                                            break
-                                        else:
-                                            logger.warning(f"Failed to get details for Ollama model '{model_name}' from {show_url}. Status: {show_response.status}")
-                                except Exception as detail_err:
-                                    logger.warning(f"Error fetching details for Ollama model '{model_name}': {detail_err}", exc_info=False)
-                                final_models_list.append(model_info_dict)
+                            # Fetch details for each model concurrently (bounded), skipping /api/show for cached digests
+                            detail_tasks = [self._fetch_ollama_model_info(session, base_url, raw_model_data, unique_provider_name) for raw_model_data in raw_models_list]
+                            final_models_list = [m for m in await asyncio.gather(*detail_tasks) if m]
                             if not final_models_list and raw_models_list: # If detail fetching failed for all but tags worked
                                 logger.warning(f"Ollama endpoint {base_url}: Failed to fetch details for any models, using names from /api/tags only.")
                                 final_models_list = [ModelInfo(id=str(m.get("name")), provider=unique_provider_name) for m in raw_models_list if m.get("name")]
@@ -298,6 +408,16 @@ class ModelRegistry:
         self._reachable_providers.clear()
         self._raw_models = {}
         self._verified_local_canonical_services.clear()
+        discovery_start_time = time.perf_counter()
+
+        # Endpoints get their own semaphore, separate from the /api/show one (_discovery_semaphore),
+        # so an endpoint holding a slot can never starve its own model detail fetches.
+        discovery_concurrency = max(1, self.settings.MODEL_DISCOVERY_CONCURRENCY)
+        endpoint_semaphore = asyncio.Semaphore(discovery_concurrency)
+        self._discovery_cache_hits = 0; self._discovery_cache_misses = 0
+        if self.settings.MODEL_DISCOVERY_CACHE_ENABLED:
+            self._discovery_cache = await asyncio.to_thread(self._load_discovery_cache)
+            logger.info(f"Model Registry: Loaded {len(self._discovery_cache)} cached model detail entries from {DISCOVERY_CACHE_FILE_PATH}.")
 
         # --- 1. Discover Remote Providers (Conditional based on Tier) ---
         remote_discovery_tasks = []
@@ -324,6 +444,12 @@ class ModelRegistry:
         else: # current_tier == "LOCAL"
              logger.info("MODEL_TIER=LOCAL, skipping remote provider discovery.")
 
+        # Remote discovery only touches its own provider entries, so run it alongside local verification.
+        remote_discovery_future = None
+        if remote_discovery_tasks:
+            logger.info(f"Running {len(remote_discovery_tasks)} remote discovery tasks concurrently...")
+            remote_discovery_future = asyncio.gather(*remote_discovery_tasks, return_exceptions=True)
+
         # --- 2. Discover Local Providers (Runs for all tiers) ---
         # (No changes needed in local discovery itself)
         urls_to_verify = set()
@@ -368,7 +494,12 @@ class ModelRegistry:
         if urls_to_verify:
             logger.info(f"Verifying {len(urls_to_verify)} potential local endpoints...")
             urls_to_actually_verify = [url for url in urls_to_verify if url not in processed_urls]
-            verification_tasks = [self._verify_and_fetch_models(url) for url in urls_to_actually_verify]
+
+            async def _bounded_verify(url: str):
+                async with endpoint_semaphore:
+                    return await self._verify_and_fetch_models(url)
+
+            verification_tasks = [_bounded_verify(url) for url in urls_to_actually_verify]
             verification_results = await asyncio.gather(*verification_tasks, return_exceptions=True)
             logger.info(f"ModelRegistry: Received {len(verification_results)} results from local provider verification tasks.")
 
@@ -419,9 +550,8 @@ class ModelRegistry:
             logger.info(f"ModelRegistry: Successfully verified and registered the following local providers in this cycle: {local_providers_found_this_run}")
 
         # --- 3. Run Remote Discovery Tasks Concurrently ---
-        if remote_discovery_tasks:
-            logger.info(f"Running {len(remote_discovery_tasks)} remote discovery tasks concurrently...")
-            results = await asyncio.gather(*remote_discovery_tasks, return_exceptions=True)
+        if remote_discovery_future is not None:
+            results = await remote_discovery_future
             for i, result in enumerate(results):
                  if isinstance(result, Exception):
                      provider_map = []
@@ -432,10 +562,15 @@ class ModelRegistry:
                      logger.error(f"Error during model discovery for provider '{failed_task_provider}': {result}", exc_info=result)
         else: logger.info("No remote discovery tasks scheduled based on MODEL_TIER setting.")
 
+        if self.settings.MODEL_DISCOVERY_CACHE_ENABLED:
+            await self._save_discovery_cache()
+        logger.info(f"Model Registry: Discovery phase took {time.perf_counter() - discovery_start_time:.2f}s "
+                    f"(concurrency={discovery_concurrency}, /api/show cache hits={self._discovery_cache_hits}, misses={self._discovery_cache_misses}).")
+
         # --- 4. Final Filtering and Logging ---
         if not self._reachable_providers:
              logger.warning("No providers found reachable after all checks. Model registry will be empty.")
-             self.available_models = {}; return
+             self.available_models = {}; self._rebuild_model_indexes(); return
 
         self._apply_filters() # Call the refactored filtering method
         logger.info("Provider and model discovery/filtering complete.")
@@ -585,9 +720,29 @@ class ModelRegistry:
              logger.info(f"Removed {original_count - len(self.available_models)} providers with no available models after filtering.")
 
         logger.info(f"Filtering complete. Final available provider count: {len(self.available_models)}")
+        self._rebuild_model_indexes()
 
 
-    # --- Getter Methods (Unchanged) ---
+    # --- Lookup Indexes ---
+    def _rebuild_model_indexes(self):
+        """
+        Rebuilds the hash indexes over available_models. Called after _apply_filters, which is the
+        only place available_models changes.
+
+        _model_entries:     (provider, model_id) -> ModelInfo (first occurrence within a provider)
+        _model_providers:   model_id -> providers offering it, in available_models order
+        """
+        self._model_entries = {}
+        self._model_providers = {}
+        for provider_name, models in self.available_models.items():
+            for m in models:
+                model_id = m.get("id")
+                if not model_id or (provider_name, model_id) in self._model_entries: continue
+                self._model_entries[(provider_name, model_id)] = m
+                self._model_providers.setdefault(model_id, []).append(provider_name)
+        logger.debug(f"Model Registry: Indexed {len(self._model_entries)} models across {len(self.available_models)} providers.")
+
+    # --- Getter Methods ---
     def get_available_models_list(self, provider: Optional[str] = None) -> List[str]:
         """ Gets a list of available model IDs, optionally filtered by provider (base name or specific instance). """
         model_ids = set()
@@ -618,21 +773,19 @@ class ModelRegistry:
     def find_provider_for_model(self, model_id: str) -> Optional[str]:
         """ Finds the unique provider name (potentially dynamic) for a given model ID. """
         # 1. Exact match first (handles HuggingFace repos with slashes like 'wizardeur/Qwen3.5')
-        for provider_name, models in self.available_models.items():
-            if any(m.get("id") == model_id for m in models):
-                return provider_name
-                
+        providers = self._model_providers.get(model_id)
+        if providers: return providers[0]
+
         # 2. Fallback: try splitting off provider prefix (e.g. 'vllm/qwen3.5')
         target_model_name = model_id; provider_prefix_search = None
         if '/' in model_id: provider_prefix_search, target_model_name = model_id.split('/', 1)
-        for provider_name, models in self.available_models.items():
-            if any(m.get("id") == target_model_name for m in models):
-                if provider_prefix_search:
-                    base_provider_type = provider_name.split('-local-')[0].split('-proxy')[0]
-                    if base_provider_type == provider_prefix_search: return provider_name
-                else: return provider_name
-        if provider_prefix_search and provider_prefix_search in self.available_models:
-             if any(m.get("id") == target_model_name for m in self.available_models[provider_prefix_search]): return provider_prefix_search
+        providers = self._model_providers.get(target_model_name, [])
+        for provider_name in providers:
+            if provider_prefix_search:
+                base_provider_type = provider_name.split('-local-')[0].split('-proxy')[0]
+                if base_provider_type == provider_prefix_search: return provider_name
+            else: return provider_name
+        if provider_prefix_search and provider_prefix_search in providers: return provider_prefix_search
         logger.debug(f"Could not find provider for model ID '{model_id}' (target name: '{target_model_name}')")
         return None
 
@@ -646,34 +799,35 @@ class ModelRegistry:
             The ModelInfo dict if found, or None.
         """
         # 1. Exact match across all providers (crucial for HF repo IDs like 'wizardeur/Qwen3.5')
-        for provider_name, models in sorted(self.available_models.items(), 
-                                             key=lambda x: (0 if x[0].startswith("ollama-local") else 1)):
-            for m in models:
-                if m.get("id") == model_id:
-                    return m
-                    
+        model_info = self._lookup_preferred_model_info(model_id)
+        if model_info is not None:
+            return model_info
+
         # 2. Try stripping provider prefix
         target_model_name = model_id
         if '/' in model_id:
             _, target_model_name = model_id.split('/', 1)
-        
-            for provider_name, models in sorted(self.available_models.items(), 
-                                                 key=lambda x: (0 if x[0].startswith("ollama-local") else 1)):
-                for m in models:
-                    if m.get("id") == target_model_name:
-                        return m
-        
+            model_info = self._lookup_preferred_model_info(target_model_name)
+            if model_info is not None:
+                return model_info
+
         logger.debug(f"get_model_info: Could not find ModelInfo for model ID '{model_id}' (target: '{target_model_name}')")
         return None
 
+    def _lookup_preferred_model_info(self, model_id: str) -> Optional[ModelInfo]:
+        """ Returns the indexed ModelInfo for model_id, preferring local Ollama providers. """
+        providers = self._model_providers.get(model_id)
+        if not providers: return None
+        preferred = next((p for p in providers if p.startswith("ollama-local")), providers[0])
+        return self._model_entries.get((preferred, model_id))
+
     def get_formatted_available_models(self) -> str:
         """ Formats the available models for display using the helper method. """
         return self._format_model_list_output(include_header=True)
 
     def is_model_available(self, provider: str, model_id: str) -> bool:
         """ Checks if a specific model ID is available under a given provider name (potentially dynamic). """
-        if provider not in self.available_models: return False
-        return any(m.get("id") == model_id for m in self.available_models[provider])
+        return (provider, model_id) in self._model_entries
 
     def get_reachable_provider_url(self, provider: str) -> Optional[str]:
         """ Gets the base URL for a reachable provider (potentially dynamic). """
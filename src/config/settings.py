@@ -99,6 +99,10 @@ class Settings:
             logger.warning("Invalid LOCAL_API_SCAN_TIMEOUT value. Using default 0.5.")
             self.LOCAL_API_SCAN_TIMEOUT = 0.5
         logger.info(f"Local API Discovery settings: Enabled={self.LOCAL_API_SCAN_ENABLED}, Ports={self.LOCAL_API_SCAN_PORTS}, Timeout={self.LOCAL_API_SCAN_TIMEOUT}s")
+        try: self.MODEL_DISCOVERY_CONCURRENCY: int = int(os.getenv("MODEL_DISCOVERY_CONCURRENCY", "8"))
+        except ValueError: logger.warning("Invalid MODEL_DISCOVERY_CONCURRENCY, using 8."); self.MODEL_DISCOVERY_CONCURRENCY = 8
+        self.MODEL_DISCOVERY_CACHE_ENABLED: bool = os.getenv("MODEL_DISCOVERY_CACHE_ENABLED", "true").lower() == "true"
+        logger.info(f"Model discovery settings: Concurrency={self.MODEL_DISCOVERY_CONCURRENCY}, DetailsCache={self.MODEL_DISCOVERY_CACHE_ENABLED}")
 
         # --- Custom Local API URLs ---
         self.OLLAMA_API_URLS: List[str] = [url.strip() for url in os.getenv("OLLAMA_API_URLS", "").split(",") if url.strip()]
@@ -133,6 +137,12 @@ class Settings:
         # --- Native Tool Calling Config ---
         self.NATIVE_TOOL_CALLING_ENABLED: bool = os.getenv("NATIVE_TOOL_CALLING_ENABLED", "true").lower() == "true"
         logger.info(f"Settings Init: Native Tool Calling Enabled = {self.NATIVE_TOOL_CALLING_ENABLED}")
+        # --- Streaming XML tool-call detection: stop generation once a terminal tool call is complete ---
+        self.STREAM_TOOL_EARLY_STOP: bool = os.getenv("STREAM_TOOL_EARLY_STOP", "false").lower() == "true"
+        self.STREAM_TOOL_TERMINAL_TOOLS: List[str] = [name.strip() for name in os.getenv("STREAM_TOOL_TERMINAL_TOOLS", "").split(",") if name.strip()]
+        # --- Concurrent tool calls: independent reads of one turn run in parallel (1 = strictly sequential) ---
+        try: self.TOOL_PARALLEL_MAX_CONCURRENCY: int = max(1, int(os.getenv("TOOL_PARALLEL_MAX_CONCURRENCY", "4")))
+        except ValueError: logger.warning("Invalid TOOL_PARALLEL_MAX_CONCURRENCY, using default 4."); self.TOOL_PARALLEL_MAX_CONCURRENCY = 4
 
         # --- Retry/Failover Config ---
         try: self.MAX_STREAM_RETRIES: int = int(os.getenv("MAX_STREAM_RETRIES", "3"))
@@ -145,6 +155,17 @@ class Settings:
         except ValueError: logger.warning("Invalid MAX_CYCLE_TURNS, using default 15."); self.MAX_CYCLE_TURNS = 15
         try: self.SUMMARIZER_TRIGGER_THRESHOLD: int = int(os.getenv("SUMMARIZER_TRIGGER_THRESHOLD", "7000"))
         except ValueError: logger.warning("Invalid SUMMARIZER_TRIGGER_THRESHOLD, using default 7000."); self.SUMMARIZER_TRIGGER_THRESHOLD = 7000
+        try: self.SUMMARY_CACHE_MAX_ENTRIES: int = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "256"))
+        except ValueError: logger.warning("Invalid SUMMARY_CACHE_MAX_ENTRIES, using default 256."); self.SUMMARY_CACHE_MAX_ENTRIES = 256
+        self.SUMMARY_CACHE_FILE: Optional[str] = os.getenv("SUMMARY_CACHE_FILE") or None
+        # --- Token Counting ---
+        self.TOKENIZER_DIR: str = os.getenv("TOKENIZER_DIR", "data/tokenizers")
+        try: self.TOKEN_COUNT_CACHE_SIZE: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "20000"))
+        except ValueError: logger.warning("Invalid TOKEN_COUNT_CACHE_SIZE, using default 20000."); self.TOKEN_COUNT_CACHE_SIZE = 20000
+        # --- Prompt Layout: 'legacy' interleaves ephemeral context blocks into the history, 'prefix_stable' appends them as one trailing block ---
+        self.PROMPT_LAYOUT: str = os.getenv("PROMPT_LAYOUT", "legacy").strip().lower()
+        if self.PROMPT_LAYOUT not in ("legacy", "prefix_stable"):
+            logger.warning(f"Invalid PROMPT_LAYOUT '{self.PROMPT_LAYOUT}', using 'legacy'."); self.PROMPT_LAYOUT = "legacy"
         logger.info(f"Retry/Failover settings loaded: MaxRetries={self.MAX_STREAM_RETRIES}, Delay={self.RETRY_DELAY_SECONDS}s, MaxFailover={self.MAX_FAILOVER_ATTEMPTS}, MaxTurns={self.MAX_CYCLE_TURNS}")
 
         # --- PM Manage State Timer Interval ---
@@ -173,6 +194,27 @@ class Settings:
 
         # --- Project/Session Configuration ---
         self.PROJECTS_BASE_DIR: Path = Path(os.getenv("PROJECTS_BASE_DIR", str(BASE_DIR / "projects")))
+        # --- Shared Workspace Tree Snapshot (prompt injection) ---
+        try: self.WORKSPACE_TREE_MAX_AGE_SECONDS: float = float(os.getenv("WORKSPACE_TREE_MAX_AGE_SECONDS", "30.0"))
+        except ValueError: logger.warning("Invalid WORKSPACE_TREE_MAX_AGE_SECONDS, using 30.0."); self.WORKSPACE_TREE_MAX_AGE_SECONDS = 30.0
+        self.WORKSPACE_TREE_WATCH: bool = os.getenv("WORKSPACE_TREE_WATCH", "false").lower() == "true"
+        # --- UI WebSocket Delivery ---
+        try: self.WEBSOCKET_CLIENT_QUEUE_SIZE: int = int(os.getenv("WEBSOCKET_CLIENT_QUEUE_SIZE", "1000"))
+        except ValueError: logger.warning("Invalid WEBSOCKET_CLIENT_QUEUE_SIZE, using 1000."); self.WEBSOCKET_CLIENT_QUEUE_SIZE = 1000
+        try: self.WEBSOCKET_CHUNK_COALESCE_MS: float = float(os.getenv("WEBSOCKET_CHUNK_COALESCE_MS", "25.0"))
+        except ValueError: logger.warning("Invalid WEBSOCKET_CHUNK_COALESCE_MS, using 25.0."); self.WEBSOCKET_CHUNK_COALESCE_MS = 25.0
+        self.WEBSOCKET_LOW_PRIORITY_EVENTS: List[str] = [name.strip() for name in os.getenv("WEBSOCKET_LOW_PRIORITY_EVENTS", "agent_raw_response").split(",") if name.strip()]
+        self.WEBSOCKET_COALESCE_EVENTS: List[str] = [name.strip() for name in os.getenv("WEBSOCKET_COALESCE_EVENTS", "agent_status_update").split(",") if name.strip()]
+        # --- Interaction Logging (database write-behind) ---
+        self.DB_LOG_WRITE_BEHIND: bool = os.getenv("DB_LOG_WRITE_BEHIND", "true").lower() == "true"
+        try: self.DB_LOG_QUEUE_SIZE: int = int(os.getenv("DB_LOG_QUEUE_SIZE", "5000"))
+        except ValueError: logger.warning("Invalid DB_LOG_QUEUE_SIZE, using 5000."); self.DB_LOG_QUEUE_SIZE = 5000
+        try: self.DB_LOG_BATCH_SIZE: int = int(os.getenv("DB_LOG_BATCH_SIZE", "200"))
+        except ValueError: logger.warning("Invalid DB_LOG_BATCH_SIZE, using 200."); self.DB_LOG_BATCH_SIZE = 200
+        try: self.DB_LOG_FLUSH_INTERVAL_MS: float = float(os.getenv("DB_LOG_FLUSH_INTERVAL_MS", "250.0"))
+        except ValueError: logger.warning("Invalid DB_LOG_FLUSH_INTERVAL_MS, using 250.0."); self.DB_LOG_FLUSH_INTERVAL_MS = 250.0
+        # --- Knowledge Base Semantic Recall ---
+        self.KNOWLEDGE_SEMANTIC_INDEX: bool = os.getenv("KNOWLEDGE_SEMANTIC_INDEX", "false").lower() == "true"
 
         # --- Tool Configuration ---
         self.GITHUB_ACCESS_TOKEN: Optional[str] = os.getenv("GITHUB_ACCESS_TOKEN")
@@ -275,6 +317,50 @@ class Settings:
         try: self.OLLAMA_CONCURRENCY_LIMIT: int = int(os.getenv("OLLAMA_CONCURRENCY_LIMIT", "2")); logger.info(f"Loaded OLLAMA_CONCURRENCY_LIMIT: {self.OLLAMA_CONCURRENCY_LIMIT}")
         except ValueError: logger.warning("Invalid OLLAMA_CONCURRENCY_LIMIT, using 2."); self.OLLAMA_CONCURRENCY_LIMIT = 2
 
+        # --- LLM Request Scheduler (priority classes + adaptive per-endpoint limits) ---
+        self.LLM_SCHEDULER_PREEMPTION: bool = os.getenv("LLM_SCHEDULER_PREEMPTION", "true").lower() == "true"
+        self.LLM_SCHEDULER_ADAPTIVE: bool = os.getenv("LLM_SCHEDULER_ADAPTIVE", "true").lower() == "true"
+        try: self.LLM_SCHEDULER_MAX_LIMIT_FACTOR: float = max(1.0, float(os.getenv("LLM_SCHEDULER_MAX_LIMIT_FACTOR", "1.0")))
+        except ValueError: logger.warning("Invalid LLM_SCHEDULER_MAX_LIMIT_FACTOR, using 1.0."); self.LLM_SCHEDULER_MAX_LIMIT_FACTOR = 1.0
+        try: self.LLM_SCHEDULER_LATENCY_TOLERANCE: float = max(1.1, float(os.getenv("LLM_SCHEDULER_LATENCY_TOLERANCE", "2.0")))
+        except ValueError: logger.warning("Invalid LLM_SCHEDULER_LATENCY_TOLERANCE, using 2.0."); self.LLM_SCHEDULER_LATENCY_TOLERANCE = 2.0
+        try: self.LLM_SCHEDULER_AGING_SECONDS: float = float(os.getenv("LLM_SCHEDULER_AGING_SECONDS", "60.0"))
+        except ValueError: logger.warning("Invalid LLM_SCHEDULER_AGING_SECONDS, using 60.0."); self.LLM_SCHEDULER_AGING_SECONDS = 60.0
+
+        # --- LLM Usage Telemetry ---
+        self.LLM_STREAM_USAGE: bool = os.getenv("LLM_STREAM_USAGE", "true").lower() == "true"
+
+        # --- Model Performance Metrics (latency histograms, periodic snapshots) ---
+        try: self.PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS", "300.0"))
+        except ValueError: logger.warning("Invalid PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS, using 300.0."); self.PERFORMANCE_SNAPSHOT_INTERVAL_SECONDS = 300.0
+        try: self.LATENCY_ROLLUP_WINDOW_SECONDS: int = max(1, int(os.getenv("LATENCY_ROLLUP_WINDOW_SECONDS", "60")))
+        except ValueError: logger.warning("Invalid LATENCY_ROLLUP_WINDOW_SECONDS, using 60."); self.LATENCY_ROLLUP_WINDOW_SECONDS = 60
+        try: self.LATENCY_ROLLUP_RETENTION_HOURS: float = max(0.0, float(os.getenv("LATENCY_ROLLUP_RETENTION_HOURS", "24.0")))
+        except ValueError: logger.warning("Invalid LATENCY_ROLLUP_RETENTION_HOURS, using 24.0."); self.LATENCY_ROLLUP_RETENTION_HOURS = 24.0
+
+        # --- Ollama HTTP Transport Pool ---
+        try: self.OLLAMA_POOL_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_POOL_MAX_CONNECTIONS", "20")); logger.info(f"Loaded OLLAMA_POOL_MAX_CONNECTIONS: {self.OLLAMA_POOL_MAX_CONNECTIONS}")
+        except ValueError: logger.warning("Invalid OLLAMA_POOL_MAX_CONNECTIONS, using 20."); self.OLLAMA_POOL_MAX_CONNECTIONS = 20
+        try: self.OLLAMA_POOL_MAX_PER_HOST: int = int(os.getenv("OLLAMA_POOL_MAX_PER_HOST", "8")); logger.info(f"Loaded OLLAMA_POOL_MAX_PER_HOST: {self.OLLAMA_POOL_MAX_PER_HOST}")
+        except ValueError: logger.warning("Invalid OLLAMA_POOL_MAX_PER_HOST, using 8."); self.OLLAMA_POOL_MAX_PER_HOST = 8
+        try: self.OLLAMA_POOL_KEEPALIVE_SECONDS: float = float(os.getenv("OLLAMA_POOL_KEEPALIVE_SECONDS", "60.0")); logger.info(f"Loaded OLLAMA_POOL_KEEPALIVE_SECONDS: {self.OLLAMA_POOL_KEEPALIVE_SECONDS}")
+        except ValueError: logger.warning("Invalid OLLAMA_POOL_KEEPALIVE_SECONDS, using 60.0."); self.OLLAMA_POOL_KEEPALIVE_SECONDS = 60.0
+        try: self.OLLAMA_POOL_MAX_FAILURES: int = int(os.getenv("OLLAMA_POOL_MAX_FAILURES", "3")); logger.info(f"Loaded OLLAMA_POOL_MAX_FAILURES: {self.OLLAMA_POOL_MAX_FAILURES}")
+        except ValueError: logger.warning("Invalid OLLAMA_POOL_MAX_FAILURES, using 3."); self.OLLAMA_POOL_MAX_FAILURES = 3
+
+        # --- LLM Request Tracing (payload dumps) ---
+        self.LLM_TRACE_ENABLED: bool = os.getenv("LLM_TRACE_ENABLED", "true").lower() == "true"
+        try: self.LLM_TRACE_SAMPLE_RATE: float = max(0.0, min(1.0, float(os.getenv("LLM_TRACE_SAMPLE_RATE", "1.0"))))
+        except ValueError: logger.warning("Invalid LLM_TRACE_SAMPLE_RATE, using 1.0."); self.LLM_TRACE_SAMPLE_RATE = 1.0
+        try: self.LLM_TRACE_MAX_CHARS: int = int(os.getenv("LLM_TRACE_MAX_CHARS", "20000"))
+        except ValueError: logger.warning("Invalid LLM_TRACE_MAX_CHARS, using 20000."); self.LLM_TRACE_MAX_CHARS = 20000
+        self.LLM_TRACE_FILE: Optional[str] = os.getenv("LLM_TRACE_FILE") or None
+        try: self.LLM_TRACE_FILE_MAX_BYTES: int = int(os.getenv("LLM_TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+        except ValueError: logger.warning("Invalid LLM_TRACE_FILE_MAX_BYTES, using 10MB."); self.LLM_TRACE_FILE_MAX_BYTES = 10 * 1024 * 1024
+        try: self.LLM_TRACE_FILE_BACKUP_COUNT: int = int(os.getenv("LLM_TRACE_FILE_BACKUP_COUNT", "3"))
+        except ValueError: logger.warning("Invalid LLM_TRACE_FILE_BACKUP_COUNT, using 3."); self.LLM_TRACE_FILE_BACKUP_COUNT = 3
+        logger.info(f"LLM request tracing: Enabled={self.LLM_TRACE_ENABLED}, SampleRate={self.LLM_TRACE_SAMPLE_RATE}, MaxChars={self.LLM_TRACE_MAX_CHARS}, File={self.LLM_TRACE_FILE or 'main log (DEBUG only)'}")
+
         # --- Load Initial Configurations using ConfigManager ---
         raw_config_data: Dict[str, Any] = {}
         try:
@@ -2,13 +2,14 @@
 import asyncio
 import logging
 import json
+import time
 from contextlib import contextmanager, asynccontextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Generator, AsyncGenerator
+from typing import List, Optional, Dict, Any, Generator, AsyncGenerator, Tuple, cast
 import datetime # Added for update timestamp
 
 # SQLAlchemy imports
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON, Index, select, desc, func, update # Added update
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON, Index, LargeBinary, select, desc, func, update, and_, or_ # Added update
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func as sql_func # Alias sql functions
@@ -17,6 +18,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession # Use Async
 
 # Import settings for DB path and BASE_DIR
 from src.config.settings import settings, BASE_DIR
+from src.core.semantic_index import SemanticIndex, embed_text, vector_to_blob, blob_to_vector
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,55 @@ DEFAULT_DB_FILENAME = "trippleeffect_memory.db"
 DB_FILE_PATH = BASE_DIR / "data" / DEFAULT_DB_FILENAME
 DB_URL = f"sqlite+aiosqlite:///{DB_FILE_PATH}" # Use aiosqlite for async
 
+# --- Knowledge full-text search (SQLite FTS5) ---
+# External-content FTS5 index over long_term_knowledge.keywords/summary, kept in sync by triggers.
+# '_' is a token character so identifiers such as agent_thought or admin_ai stay one term.
+KNOWLEDGE_FTS_TABLE = "long_term_knowledge_fts"
+KNOWLEDGE_FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {KNOWLEDGE_FTS_TABLE} USING fts5(
+        keywords, summary, content='long_term_knowledge', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '_'")""",
+    f"""CREATE TRIGGER IF NOT EXISTS {KNOWLEDGE_FTS_TABLE}_ai AFTER INSERT ON long_term_knowledge BEGIN
+        INSERT INTO {KNOWLEDGE_FTS_TABLE}(rowid, keywords, summary) VALUES (new.id, new.keywords, new.summary);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {KNOWLEDGE_FTS_TABLE}_ad AFTER DELETE ON long_term_knowledge BEGIN
+        INSERT INTO {KNOWLEDGE_FTS_TABLE}({KNOWLEDGE_FTS_TABLE}, rowid, keywords, summary) VALUES ('delete', old.id, old.keywords, old.summary);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {KNOWLEDGE_FTS_TABLE}_au AFTER UPDATE OF keywords, summary ON long_term_knowledge BEGIN
+        INSERT INTO {KNOWLEDGE_FTS_TABLE}({KNOWLEDGE_FTS_TABLE}, rowid, keywords, summary) VALUES ('delete', old.id, old.keywords, old.summary);
+        INSERT INTO {KNOWLEDGE_FTS_TABLE}(rowid, keywords, summary) VALUES (new.id, new.keywords, new.summary);
+    END""",
+]
+# BM25 column weights (keywords, summary); the score is then scaled by (1 + importance_score).
+# Every match is ranked, so a keyword matching most rows costs O(matches) bm25() evaluations.
+KNOWLEDGE_FTS_SEARCH_SQL = f"""
+    SELECT k.* FROM {KNOWLEDGE_FTS_TABLE} AS f JOIN long_term_knowledge AS k ON k.id = f.rowid
+    WHERE f.{KNOWLEDGE_FTS_TABLE} MATCH :match_query
+      AND (:min_importance IS NULL OR k.importance_score >= :min_importance)
+    ORDER BY bm25(f.{KNOWLEDGE_FTS_TABLE}, 2.0, 1.0) * (1.0 + COALESCE(k.importance_score, 0.5)), k.created_at DESC
+    LIMIT :max_results
+"""
+KNOWLEDGE_MATCH_MODES = ("all", "any")
+KNOWLEDGE_ACCESS_FLUSH_SECONDS = 5.0 # last_accessed updates are batched and written this long after a search
+
+# --- Semantic recall ---
+SEMANTIC_SOURCE_KNOWLEDGE = "knowledge"
+SEMANTIC_SOURCE_THOUGHT = "thought"
+SEMANTIC_THOUGHT_ROLES = ("assistant_thought",) # Interaction roles whose content is embedded as agent thoughts
+
+
+def build_knowledge_match_query(query_keywords: List[str], match_mode: str = "all", prefix: bool = True) -> str:
+    """
+    FTS5 MATCH expression for the keywords: each keyword becomes a quoted phrase (optionally
+    a prefix phrase), joined with AND ('all') or OR ('any'). Returns '' if nothing is searchable.
+    """
+    terms = []
+    for keyword in query_keywords:
+        phrase = " ".join(keyword.replace('"', ' ').split())
+        if phrase:
+            terms.append(f'"{phrase}"' + ("*" if prefix else ""))
+    return (" OR " if match_mode == "any" else " AND ").join(terms)
+
 # Define the Base for declarative models
 from typing import Any
 Base: Any = declarative_base()
@@ -128,16 +179,52 @@ class LongTermKnowledge(Base):
     )
 
 
+class SemanticVector(Base):
+    """ Hashed n-gram embedding (float32 blob) of a knowledge item or an agent thought interaction. """
+    __tablename__ = 'semantic_vectors'
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False) # 'knowledge' (long_term_knowledge.id) or 'thought' (interactions.id)
+    source_id = Column(Integer, nullable=False)
+    agent_id = Column(String, nullable=True) # Author of a thought
+    vector = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (Index('ix_semantic_vector_source', 'source', 'source_id', unique=True),)
+
+
 # --- Database Manager Class ---
 
 class DatabaseManager:
-    """ Handles database connection, session management, and CRUD operations. """
+    """
+    Handles database connection, session management, and CRUD operations.
+
+    Interactions are logged write-behind by default: log_interaction() puts the row on a
+    bounded queue and a single background writer inserts queued rows in batches, one
+    transaction per batch, once DB_LOG_BATCH_SIZE rows are waiting or DB_LOG_FLUSH_INTERVAL_MS
+    has passed. close() flushes the queue before disposing of the engine.
+    """
 
     def __init__(self, db_url: str = DB_URL):
         self._engine = None # Initialize as None
         self._session_local = None # Initialize as None
         self.db_url = db_url
         # REMOVED: asyncio.create_task(self._initialize_db()) - Called from main.py lifespan
+        # --- Write-behind interaction log (created on first use, inside the running loop) ---
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._log_writer_task: Optional[asyncio.Task] = None
+        self._log_wakeup: Optional[asyncio.Event] = None
+        self._log_flush_waiters = 0
+        self._log_metrics: Dict[str, Any] = {
+            "batches_written": 0, "rows_written": 0, "rows_failed": 0,
+            "last_batch_size": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0,
+        }
+        # --- Knowledge search ---
+        self._knowledge_fts_available = False
+        self._pending_knowledge_access: Dict[int, datetime.datetime] = {} # knowledge id -> last access, not yet written
+        self._knowledge_access_flush_handle: Optional[asyncio.TimerHandle] = None
+        self._knowledge_access_flush_task: Optional[asyncio.Task] = None
+        # --- Semantic recall (loaded from semantic_vectors on first semantic search) ---
+        self._semantic_index: Optional[SemanticIndex] = None
+        self._semantic_index_load: Optional[asyncio.Task] = None
 
     async def _initialize_db(self):
         """ Asynchronously initializes the database engine and creates tables. """
@@ -170,14 +257,35 @@ class DatabaseManager:
                 await conn.execute(text("PRAGMA journal_mode=WAL"))
                 await conn.execute(text("PRAGMA busy_timeout=5000"))
             logger.info("Database tables created/verified successfully.")
+            await self._ensure_knowledge_fts()
 
         except Exception as e:
             logger.critical(f"CRITICAL: Database initialization failed: {e}", exc_info=True)
             self._engine = None
             self._session_local = None
 
+    async def _ensure_knowledge_fts(self):
+        """ Creates the knowledge FTS5 index and its sync triggers (SQLite only), populating it on first creation. """
+        if self._engine is None or self._engine.dialect.name != "sqlite":
+            return
+        try:
+            async with self._engine.begin() as conn:
+                existing = await conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": KNOWLEDGE_FTS_TABLE})
+                created = existing.first() is None
+                for statement in KNOWLEDGE_FTS_SCHEMA:
+                    await conn.execute(text(statement))
+                if created:
+                    await conn.execute(text(f"INSERT INTO {KNOWLEDGE_FTS_TABLE}({KNOWLEDGE_FTS_TABLE}) VALUES ('rebuild')"))
+                    logger.info(f"Created full-text index '{KNOWLEDGE_FTS_TABLE}' for long-term knowledge.")
+            self._knowledge_fts_available = True
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 unavailable ({e}). Knowledge search falls back to substring matching.")
+            self._knowledge_fts_available = False
+
     async def close(self):
-        """ Closes the database engine connection pool. """
+        """ Flushes queued interactions and knowledge access times, then closes the database engine connection pool. """
+        await self._stop_interaction_writer()
+        await self._flush_knowledge_access()
         if self._engine:
             logger.info("Closing database engine.")
             await self._engine.dispose()
@@ -387,23 +495,154 @@ class DatabaseManager:
         role: str,
         content: Optional[str] = None,
         tool_calls: Optional[List[Dict]] = None,
-        tool_results: Optional[List[Dict]] = None
+        tool_results: Optional[List[Dict]] = None,
+        wait: bool = False
         ) -> Optional[Interaction]:
-        """ Logs a message or tool interaction to the database. """
+        """
+        Logs a message or tool interaction to the database.
+
+        With write-behind enabled (DB_LOG_WRITE_BEHIND) the row is queued for the batch writer
+        and None is returned; the call only waits when the queue is full. Pass wait=True to
+        insert it immediately (after everything queued before it) and get the Interaction back.
+        """
+        row = {
+            "session_id": session_id,
+            "agent_id": agent_id,
+            "role": role,
+            "content": content,
+            "tool_calls_json": tool_calls, # Can be None
+            "tool_results_json": tool_results, # Can be None
+            "timestamp": datetime.datetime.now(datetime.timezone.utc), # Time of the event, not of the batch insert
+        }
+        if not wait and settings.DB_LOG_WRITE_BEHIND and self._session_local is not None:
+            queue = self._ensure_interaction_writer()
+            await queue.put(row)
+            self._log_wakeup.set() # type: ignore[union-attr]
+            return None
+
+        await self.flush_interactions() # Keep rows in logging order
         async with self.get_session() as session:
-             interaction = Interaction(
-                 session_id=session_id,
-                 agent_id=agent_id,
-                 role=role,
-                 content=content,
-                 tool_calls_json=tool_calls, # Can be None
-                 tool_results_json=tool_results # Can be None
-             )
+             interaction = Interaction(**row)
              session.add(interaction) # type: ignore
              await session.flush()
              await session.refresh(interaction)
              logger.debug(f"Logged interaction ID {interaction.id} (Agent: {agent_id}, Role: {role}) for Session ID {session_id}.")
-             return interaction
+        await self._index_thoughts([interaction])
+        return interaction
+
+    def _ensure_interaction_writer(self) -> asyncio.Queue:
+        if self._log_queue is None:
+            self._log_queue = asyncio.Queue(maxsize=max(1, settings.DB_LOG_QUEUE_SIZE))
+            self._log_wakeup = asyncio.Event()
+        if self._log_writer_task is None or self._log_writer_task.done():
+            self._log_writer_task = asyncio.create_task(self._interaction_writer_loop(self._log_queue, self._log_wakeup), name="db-interaction-writer") # type: ignore[arg-type]
+        return self._log_queue
+
+    async def _interaction_writer_loop(self, queue: asyncio.Queue, wakeup: asyncio.Event):
+        """ Single consumer of the interaction queue: collects a batch, writes it in one transaction. """
+        loop = asyncio.get_running_loop()
+        batch_size = max(1, settings.DB_LOG_BATCH_SIZE)
+        flush_interval = max(0.0, settings.DB_LOG_FLUSH_INTERVAL_MS / 1000.0)
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + flush_interval
+            while len(batch) < batch_size:
+                wakeup.clear() # Before the check, so a put racing with it still wakes us
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if self._log_flush_waiters or timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_interaction_batch(batch)
+            finally:
+                for _ in batch: queue.task_done()
+
+    async def _write_interaction_batch(self, batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        metrics = self._log_metrics
+        if self._session_local is None:
+            logger.error(f"Dropping {len(batch)} queued interactions: database is not initialized.")
+            metrics["rows_failed"] += len(batch)
+            return
+        written: List[Interaction] = []
+        try:
+            async with self.get_session() as session:
+                interactions = [Interaction(**row) for row in batch]
+                session.add_all(interactions) # type: ignore
+            written = interactions
+            metrics["rows_written"] += len(batch)
+        except Exception as e:
+            # Retry row by row so one bad row does not take the whole batch with it
+            logger.error(f"Batch insert of {len(batch)} interactions failed ({e}). Retrying rows individually.")
+            for row in batch:
+                try:
+                    async with self.get_session() as session:
+                        interaction = Interaction(**row)
+                        session.add(interaction) # type: ignore
+                    written.append(interaction)
+                    metrics["rows_written"] += 1
+                except Exception:
+                    metrics["rows_failed"] += 1
+        flush_ms = (time.perf_counter() - started) * 1000.0
+        metrics["batches_written"] += 1
+        metrics["last_batch_size"] = len(batch)
+        metrics["last_flush_ms"] = flush_ms
+        metrics["total_flush_ms"] += flush_ms
+        metrics["max_flush_ms"] = max(metrics["max_flush_ms"], flush_ms)
+        logger.debug(f"Wrote batch of {len(batch)} interactions in {flush_ms:.1f}ms.")
+        await self._index_thoughts(written)
+
+    async def flush_interactions(self):
+        """ Waits until every interaction queued so far has been written. """
+        if self._log_queue is None or self._log_writer_task is None or self._log_writer_task.done():
+            return
+        self._log_flush_waiters += 1
+        self._log_wakeup.set() # type: ignore[union-attr]
+        try:
+            await self._log_queue.join()
+        finally:
+            self._log_flush_waiters -= 1
+
+    async def _stop_interaction_writer(self, timeout: float = 10.0):
+        if self._log_writer_task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush_interactions(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out flushing interaction log; {self._log_queue.qsize() if self._log_queue else 0} rows not written.")
+        self._log_writer_task.cancel()
+        try:
+            await self._log_writer_task
+        except asyncio.CancelledError:
+            pass
+        self._log_writer_task = None
+        self._log_queue = None
+        self._log_wakeup = None
+
+    def get_interaction_log_metrics(self) -> Dict[str, Any]:
+        """ Write-behind interaction log metrics (queue depth, batch sizes, flush latency). """
+        metrics = self._log_metrics
+        batches = metrics["batches_written"]
+        return {
+            "write_behind": settings.DB_LOG_WRITE_BEHIND,
+            "queue_depth": self._log_queue.qsize() if self._log_queue else 0,
+            "queue_capacity": max(1, settings.DB_LOG_QUEUE_SIZE),
+            "batches_written": batches,
+            "rows_written": metrics["rows_written"],
+            "rows_failed": metrics["rows_failed"],
+            "last_batch_size": metrics["last_batch_size"],
+            "last_flush_ms": round(metrics["last_flush_ms"], 2),
+            "avg_flush_ms": round(metrics["total_flush_ms"] / batches, 2) if batches else 0.0,
+            "max_flush_ms": round(metrics["max_flush_ms"], 2),
+        }
 
     # --- Knowledge Base Methods ---
     async def save_knowledge(
@@ -426,47 +665,196 @@ class DatabaseManager:
             session.add(knowledge) # type: ignore
             await session.flush()
             await session.refresh(knowledge)
+            vector = None
+            if settings.KNOWLEDGE_SEMANTIC_INDEX:
+                vector = await asyncio.to_thread(embed_text, f"{knowledge.keywords}\n{summary}")
+                session.add(SemanticVector(source=SEMANTIC_SOURCE_KNOWLEDGE, source_id=knowledge.id, vector=vector_to_blob(vector))) # type: ignore
             logger.info(f"Saved knowledge ID {knowledge.id} (Keywords: '{keywords[:50]}...').")
-            return knowledge
+        if vector is not None and self._semantic_index is not None:
+            self._semantic_index.add(SEMANTIC_SOURCE_KNOWLEDGE, cast(int, knowledge.id), vector)
+        return knowledge
 
     async def search_knowledge(
         self,
         query_keywords: List[str],
         min_importance: Optional[float] = None,
-        max_results: int = 5
+        max_results: int = 5,
+        match_mode: str = "all",
+        prefix: bool = True
         ) -> List[LongTermKnowledge]:
-        """ Searches long-term knowledge based on keywords. """
+        """
+        Searches long-term knowledge (keywords and summary) for the given keywords.
+
+        match_mode 'all' requires every keyword, 'any' at least one; with prefix=True a keyword
+        also matches longer words starting with it. Results are ranked by BM25 relevance scaled
+        by importance_score over all matches. Uses the FTS5 index when available, substring
+        matching otherwise.
+        """
         if not query_keywords: return []
+        if match_mode not in KNOWLEDGE_MATCH_MODES: match_mode = "all"
         async with self.get_session() as session:
-            stmt = select(LongTermKnowledge)
-            # Simple keyword matching (can be improved with full-text search or vector search later)
-            keyword_filters = [LongTermKnowledge.keywords.contains(kw.lower()) for kw in query_keywords]
-            stmt = stmt.where(*keyword_filters) # Requires at least one keyword match
-
-            if min_importance is not None:
-                stmt = stmt.where(LongTermKnowledge.importance_score >= min_importance)
-
-            # Order by importance (desc) then creation time (desc)
-            stmt = stmt.order_by(desc(LongTermKnowledge.importance_score), desc(LongTermKnowledge.created_at))
-            stmt = stmt.limit(max_results)
+            if self._knowledge_fts_available:
+                match_query = build_knowledge_match_query(query_keywords, match_mode, prefix)
+                if not match_query: return []
+                stmt = select(LongTermKnowledge).from_statement(text(KNOWLEDGE_FTS_SEARCH_SQL)).params(
+                    match_query=match_query, min_importance=min_importance, max_results=max_results
+                )
+            else:
+                keyword_filters = [
+                    (LongTermKnowledge.keywords.contains(kw.lower()) | LongTermKnowledge.summary.contains(kw))
+                    for kw in query_keywords
+                ]
+                stmt = select(LongTermKnowledge).where(or_(*keyword_filters) if match_mode == "any" else and_(*keyword_filters))
+                if min_importance is not None:
+                    stmt = stmt.where(LongTermKnowledge.importance_score >= min_importance)
+                # Order by importance (desc) then creation time (desc)
+                stmt = stmt.order_by(desc(LongTermKnowledge.importance_score), desc(LongTermKnowledge.created_at)).limit(max_results)
 
             result = await session.execute(stmt)
-            knowledge_items = result.scalars().all()
-            logger.info(f"Knowledge search for '{query_keywords}' found {len(knowledge_items)} items.")
+            knowledge_items = list(result.scalars().all())
+            logger.info(f"Knowledge search for '{query_keywords}' ({match_mode}) found {len(knowledge_items)} items.")
+
+        if knowledge_items:
+            self._record_knowledge_access([item.id for item in knowledge_items])
+        return knowledge_items
+
+    def _record_knowledge_access(self, knowledge_ids: List[int]):
+        """ Defers last_accessed updates: they are written in one UPDATE a few seconds later (or on close). """
+        now_time = datetime.datetime.now(datetime.timezone.utc)
+        for knowledge_id in knowledge_ids:
+            self._pending_knowledge_access[knowledge_id] = now_time
+        if self._knowledge_access_flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._knowledge_access_flush_handle = loop.call_later(KNOWLEDGE_ACCESS_FLUSH_SECONDS, self._start_knowledge_access_flush)
+
+    def _start_knowledge_access_flush(self):
+        self._knowledge_access_flush_handle = None
+        self._knowledge_access_flush_task = asyncio.create_task(self._flush_knowledge_access())
+
+    async def _flush_knowledge_access(self):
+        if self._knowledge_access_flush_handle is not None:
+            self._knowledge_access_flush_handle.cancel()
+            self._knowledge_access_flush_handle = None
+        pending, self._pending_knowledge_access = self._pending_knowledge_access, {}
+        if not pending or self._session_local is None:
+            return
+        # One UPDATE per distinct access time (searches batched in the same window share one)
+        ids_by_time: Dict[datetime.datetime, List[int]] = {}
+        for knowledge_id, accessed_at in pending.items():
+            ids_by_time.setdefault(accessed_at, []).append(knowledge_id)
+        try:
+            async with self.get_session() as session:
+                for accessed_at, ids in ids_by_time.items():
+                    await session.execute(update(LongTermKnowledge).where(LongTermKnowledge.id.in_(ids)).values(last_accessed=accessed_at))
+            logger.debug(f"Updated last_accessed for {len(pending)} knowledge items.")
+        except Exception as e:
+            logger.error(f"Failed to update last_accessed for {len(pending)} knowledge items: {e}")
 
-            # Optional: Update last_accessed time for retrieved items
-            now_time = datetime.datetime.now(datetime.timezone.utc) # Get current time once
-            ids_to_update = [item.id for item in knowledge_items]
-            if ids_to_update:
-                update_stmt = (
-                     update(LongTermKnowledge)
-                     .where(LongTermKnowledge.id.in_(ids_to_update))
-                     .values(last_accessed=now_time)
-                 )
-                await session.execute(update_stmt)
-                # No need to refresh items here unless you need the updated timestamp immediately
 
-            return list(knowledge_items) # Return as list
+    # --- Semantic Recall ---
+    async def _index_thoughts(self, interactions: List[Interaction]):
+        """ Embeds agent thought interactions (after they were written) and stores their vectors. """
+        if not settings.KNOWLEDGE_SEMANTIC_INDEX:
+            return
+        # (interaction id, agent id, content) of each non-empty thought
+        thoughts = [
+            (cast(int, item.id), cast(str, item.agent_id), cast(str, item.content)) for item in interactions
+            if item.role in SEMANTIC_THOUGHT_ROLES and item.id is not None and item.content not in (None, "")
+        ]
+        if not thoughts:
+            return
+        try:
+            vectors = await asyncio.to_thread(lambda: [embed_text(content) for _, _, content in thoughts])
+            async with self.get_session() as session:
+                session.add_all([ # type: ignore
+                    SemanticVector(source=SEMANTIC_SOURCE_THOUGHT, source_id=interaction_id, agent_id=agent_id, vector=vector_to_blob(vector))
+                    for (interaction_id, agent_id, _), vector in zip(thoughts, vectors)
+                ])
+        except Exception as e:
+            logger.error(f"Failed to index {len(thoughts)} agent thoughts for semantic recall: {e}")
+            return
+        if self._semantic_index is not None:
+            for (interaction_id, agent_id, _), vector in zip(thoughts, vectors):
+                self._semantic_index.add(SEMANTIC_SOURCE_THOUGHT, interaction_id, vector, agent_id=agent_id)
+
+    async def _get_semantic_index(self) -> SemanticIndex:
+        if self._semantic_index_load is None:
+            # Created before loading so vectors saved meanwhile are added directly (add() ignores duplicates)
+            self._semantic_index = SemanticIndex()
+            self._semantic_index_load = asyncio.create_task(self._load_semantic_index(self._semantic_index))
+        try:
+            await asyncio.shield(self._semantic_index_load)
+        except Exception:
+            self._semantic_index, self._semantic_index_load = None, None # Retry on the next search
+            raise
+        return self._semantic_index # type: ignore[return-value]
+
+    async def _load_semantic_index(self, index: SemanticIndex):
+        """ Loads stored vectors and embeds knowledge items saved before semantic recall existed. """
+        started = time.perf_counter()
+        async with self.get_session() as session:
+            result = await session.execute(select(SemanticVector.source, SemanticVector.source_id, SemanticVector.agent_id, SemanticVector.vector))
+            rows = result.all()
+            missing_result = await session.execute(
+                select(LongTermKnowledge.id, LongTermKnowledge.keywords, LongTermKnowledge.summary)
+                .outerjoin(SemanticVector, and_(SemanticVector.source == SEMANTIC_SOURCE_KNOWLEDGE, SemanticVector.source_id == LongTermKnowledge.id))
+                .where(SemanticVector.id.is_(None))
+            )
+            missing = missing_result.all()
+        for source, source_id, agent_id, blob in rows:
+            vector = blob_to_vector(blob)
+            if vector is not None:
+                index.add(source, source_id, vector, agent_id=agent_id)
+        if missing:
+            vectors = await asyncio.to_thread(lambda: [embed_text(f"{keywords}\n{summary}") for _, keywords, summary in missing])
+            async with self.get_session() as session:
+                session.add_all([ # type: ignore
+                    SemanticVector(source=SEMANTIC_SOURCE_KNOWLEDGE, source_id=knowledge_id, vector=vector_to_blob(vector))
+                    for (knowledge_id, _, _), vector in zip(missing, vectors)
+                ])
+            for (knowledge_id, _, _), vector in zip(missing, vectors):
+                index.add(SEMANTIC_SOURCE_KNOWLEDGE, knowledge_id, vector)
+        logger.info(f"Semantic index loaded: {len(index)} vectors ({len(missing)} knowledge items backfilled) in {(time.perf_counter() - started) * 1000:.0f}ms.")
+
+    async def semantic_search(
+        self,
+        query: str,
+        max_results: int = 5,
+        include_thoughts: bool = True,
+        agent_id: Optional[str] = None,
+        min_similarity: float = 0.1
+        ) -> List[Tuple[str, Any, float]]:
+        """
+        Cosine top-k search over knowledge summaries (and agent thoughts) by meaning rather
+        than exact keywords. Returns (source, LongTermKnowledge or Interaction, similarity)
+        tuples, best first. With agent_id, only that agent's thoughts are searched. Empty if disabled.
+        """
+        if not settings.KNOWLEDGE_SEMANTIC_INDEX or not query.strip():
+            return []
+        index = await self._get_semantic_index()
+        sources = (SEMANTIC_SOURCE_KNOWLEDGE, SEMANTIC_SOURCE_THOUGHT) if include_thoughts else (SEMANTIC_SOURCE_KNOWLEDGE,)
+        if agent_id is not None: sources = (SEMANTIC_SOURCE_THOUGHT,)
+        query_vector = embed_text(query)
+        hits = await asyncio.to_thread(index.search, query_vector, max_results, sources, agent_id)
+        hits = [hit for hit in hits if hit[2] >= min_similarity]
+        if not hits:
+            return []
+
+        knowledge_ids = [source_id for source, source_id, _ in hits if source == SEMANTIC_SOURCE_KNOWLEDGE]
+        thought_ids = [source_id for source, source_id, _ in hits if source == SEMANTIC_SOURCE_THOUGHT]
+        async with self.get_session() as session:
+            knowledge_by_id = {cast(int, item.id): item for item in (await session.execute(select(LongTermKnowledge).where(LongTermKnowledge.id.in_(knowledge_ids)))).scalars()} if knowledge_ids else {}
+            thoughts_by_id = {cast(int, item.id): item for item in (await session.execute(select(Interaction).where(Interaction.id.in_(thought_ids)))).scalars()} if thought_ids else {}
+        results: List[Tuple[str, Any, float]] = []
+        for source, source_id, similarity in hits:
+            item = knowledge_by_id.get(source_id) if source == SEMANTIC_SOURCE_KNOWLEDGE else thoughts_by_id.get(source_id)
+            if item is not None: # Rows deleted since they were indexed are skipped
+                results.append((source, item, similarity))
+        accessed_ids = [item.id for source, item, _ in results if source == SEMANTIC_SOURCE_KNOWLEDGE]
+        if accessed_ids:
+            self._record_knowledge_access(accessed_ids)
+        logger.info(f"Semantic search for '{query[:50]}' found {len(results)} items.")
+        return results
 
 
 # --- Singleton Instance ---
@@ -475,7 +863,7 @@ db_manager = DatabaseManager()
 
 # --- Cleanup Function ---
 async def close_db_connection():
-    """ Function to be called during application shutdown. """
+    """ Function to be called during application shutdown. Flushes queued interaction logs first. """
     await db_manager.close()
 
 # --- Import needed for update() ---
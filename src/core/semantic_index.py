@@ -0,0 +1,130 @@
+# START OF FILE src/core/semantic_index.py
+import heapq
+import logging
+import math
+import operator
+import re
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional: it only speeds up the top-k scan
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np: Any = None
+    NUMPY_AVAILABLE = False
+
+EMBEDDING_DIM = 256
+NGRAM_SIZES = (3, 4, 5) # Character n-grams of each word (with boundary markers), plus the word itself
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def embed_text(text: str) -> array:
+    """
+    Hashed character n-gram embedding: every word and its boundary-marked 3-5-grams are
+    hashed (crc32) into EMBEDDING_DIM signed buckets, log-scaled and L2-normalized.
+    CPU-only and deterministic, so vectors stay valid across restarts. Returns a float32 array.
+    """
+    counts: Dict[int, float] = {}
+    for word in _WORD_RE.findall(text.lower()):
+        features = [word]
+        marked = f"<{word}>"
+        for n in NGRAM_SIZES:
+            if len(marked) > n:
+                features.extend(marked[i:i + n] for i in range(len(marked) - n + 1))
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            bucket = h % EMBEDDING_DIM
+            counts[bucket] = counts.get(bucket, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+    vector = array('f', bytes(4 * EMBEDDING_DIM))
+    for bucket, count in counts.items():
+        vector[bucket] = math.copysign(math.log1p(abs(count)), count)
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm > 0:
+        for i in range(EMBEDDING_DIM):
+            vector[i] /= norm
+    return vector
+
+
+def vector_to_blob(vector: array) -> bytes:
+    return vector.tobytes()
+
+
+def blob_to_vector(blob: bytes) -> Optional[array]:
+    vector = array('f')
+    vector.frombytes(blob)
+    return vector if len(vector) == EMBEDDING_DIM else None
+
+
+class SemanticIndex:
+    """
+    In-memory top-k cosine index over unit vectors, keyed by (source, source_id).
+
+    Rows are only ever appended (on the event loop); search() may run in a worker thread
+    and scans a consistent prefix of the rows. With NumPy the vectors live in one float32
+    matrix (grown by doubling) and a query is a single matrix-vector product plus
+    argpartition; without it the scan falls back to per-row dot products.
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[str, int]] = []
+        self.agent_ids: List[Optional[str]] = []
+        self._key_set = set()
+        self._vectors: List[array] = [] # Only used without NumPy
+        self._matrix: Any = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, source: str, source_id: int, vector: array, agent_id: Optional[str] = None):
+        key = (source, source_id)
+        if key in self._key_set or len(vector) != EMBEDDING_DIM:
+            return
+        with self._lock:
+            row = len(self.keys)
+            if NUMPY_AVAILABLE:
+                if self._matrix is None or row >= self._matrix.shape[0]:
+                    grown = np.zeros((max(256, row * 2), EMBEDDING_DIM), dtype=np.float32)
+                    if self._matrix is not None:
+                        grown[:row] = self._matrix[:row]
+                    self._matrix = grown
+                self._matrix[row] = np.frombuffer(vector.tobytes(), dtype=np.float32)
+            else:
+                self._vectors.append(vector)
+            self.agent_ids.append(agent_id)
+            self.keys.append(key)
+            self._key_set.add(key)
+
+    def search(self, query: array, top_k: int, sources: Optional[Tuple[str, ...]] = None, agent_id: Optional[str] = None) -> List[Tuple[str, int, float]]:
+        """(source, source_id, cosine similarity) of the top_k rows, best first. Thread-safe."""
+        with self._lock:
+            count = len(self.keys)
+            matrix = self._matrix
+        if count == 0 or top_k <= 0:
+            return []
+        keys, agent_ids = self.keys, self.agent_ids
+
+        def allowed(row: int) -> bool:
+            return (sources is None or keys[row][0] in sources) and (agent_id is None or agent_ids[row] == agent_id)
+
+        if NUMPY_AVAILABLE:
+            scores = matrix[:count] @ np.frombuffer(query.tobytes(), dtype=np.float32)
+            if sources is not None or agent_id is not None:
+                mask = np.fromiter((allowed(row) for row in range(count)), dtype=bool, count=count)
+                scores = np.where(mask, scores, -np.inf)
+            k = min(top_k, count)
+            top_rows = np.argpartition(-scores, k - 1)[:k]
+            ranked = sorted(((float(scores[row]), int(row)) for row in top_rows if np.isfinite(scores[row])), reverse=True)
+        else:
+            vectors = self._vectors
+            ranked = heapq.nlargest(top_k, (
+                (sum(map(operator.mul, vectors[row], query)), row) for row in range(count) if allowed(row)
+            ))
+        return [(keys[row][0], keys[row][1], score) for score, row in ranked]
+# END OF FILE src/core/semantic_index.py
@@ -7,6 +7,51 @@ MessageDict = Dict[str, Any]  # e.g., {"role": "user", "content": "..."}
 ToolDict = Dict[str, Any]     # Schema for a tool (still useful for describing tools, even if not passed directly)
 ToolResultDict = Dict[str, Any] # e.g., {"call_id": "...", "content": "..."} # Used for sending results back TO the generator
 
+
+def _tokens_per_second(tokens: int, duration_ms: Optional[float]) -> Optional[float]:
+    if not tokens or not duration_ms or duration_ms <= 0:
+        return None
+    return round(tokens / (duration_ms / 1000.0), 2)
+
+
+def _round_ms(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def build_usage_event(
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    ttft_ms: Optional[float] = None,
+    prefill_ms: Optional[float] = None,
+    decode_ms: Optional[float] = None,
+    load_ms: Optional[float] = None,
+    cached_prompt_tokens: Optional[int] = None,
+    timing_source: str = "server",
+) -> Dict[str, Any]:
+    """
+    Builds the normalized 'usage' event every provider yields once at the end of a stream.
+
+    Token counts come from the server. Durations are in milliseconds; timing_source says
+    whether they were reported by the server ('server', e.g. Ollama's done frame) or
+    measured around the stream by the provider ('client'), in which case prefill includes
+    network and queueing time. Throughputs are None when a count or duration is missing.
+    """
+    prompt_tokens = int(prompt_tokens or 0)
+    completion_tokens = int(completion_tokens or 0)
+    return {
+        "type": "usage",
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached_prompt_tokens": int(cached_prompt_tokens) if cached_prompt_tokens is not None else None,
+        "ttft_ms": _round_ms(ttft_ms),
+        "prefill_ms": _round_ms(prefill_ms),
+        "decode_ms": _round_ms(decode_ms),
+        "load_ms": _round_ms(load_ms),
+        "prefill_tokens_per_s": _tokens_per_second(prompt_tokens, prefill_ms),
+        "decode_tokens_per_s": _tokens_per_second(completion_tokens, decode_ms),
+        "timing_source": timing_source,
+    }
+
 class BaseLLMProvider(ABC):
     """
     Abstract Base Class for LLM provider implementations.
@@ -50,6 +95,8 @@ class BaseLLMProvider(ABC):
               for XML-formatted tool calls.
         - {'type': 'error', 'content': '...'} : If an error occurs during generation.
         - {'type': 'status', 'content': '...'} : Optional status updates from the provider.
+        - {'type': 'usage', ...} : Token counts and timings for the call, yielded once after the
+              last chunk when the API reports them (see build_usage_event).
         - {'type': 'tool_requests', ...} : (Potentially yielded by providers that DO support native tool calling,
                                              but the primary method is now XML parsing by the caller).
 
@@ -0,0 +1,209 @@
+# START OF FILE src/llm_providers/http_transport.py
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSPORT_HEADERS = {
+    'Accept': 'application/json, text/event-stream',
+}
+
+
+class _PooledTransport:
+    """A long-lived ClientSession + TCPConnector pair serving a single base URL."""
+
+    def __init__(self, base_url: str, session: aiohttp.ClientSession, connector: aiohttp.TCPConnector, loop: asyncio.AbstractEventLoop):
+        self.base_url = base_url
+        self.session = session
+        self.connector = connector
+        self.loop = loop
+        self.created_at = time.time()
+        self.last_used_at = self.created_at
+        self.in_flight = 0
+        self.total_requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.consecutive_failures = 0
+        self.retired = False
+
+    @property
+    def is_usable(self) -> bool:
+        return not self.retired and not self.session.closed and not self.loop.is_closed()
+
+
+class HttpTransportPool:
+    """
+    Shares one keep-alive aiohttp transport per base URL across all provider instances.
+
+    Providers borrow the pooled ClientSession for the duration of a request via
+    acquire()/release() instead of building a new session and connector per call,
+    so TCP handshakes, DNS lookups and connector setup are paid once per host.
+    Transports that keep failing at the connection level are retired: new requests
+    get a fresh transport while in-flight streams on the old one finish undisturbed,
+    and the old session is closed once its last request is released.
+    """
+
+    def __init__(self):
+        self._transports: Dict[str, _PooledTransport] = {}
+        self._retired: List[_PooledTransport] = []
+        self._evictions: Dict[str, int] = {}
+
+    def _build_trace_config(self, transport_ref: Dict[str, _PooledTransport]) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def _on_connection_create_end(session, ctx, params):
+            transport = transport_ref.get("transport")
+            if transport: transport.connections_created += 1
+
+        async def _on_connection_reuseconn(session, ctx, params):
+            transport = transport_ref.get("transport")
+            if transport: transport.connections_reused += 1
+
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+        return trace_config
+
+    def _build_transport(self, base_url: str) -> _PooledTransport:
+        loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(
+            limit=settings.OLLAMA_POOL_MAX_CONNECTIONS,
+            limit_per_host=settings.OLLAMA_POOL_MAX_PER_HOST,
+            keepalive_timeout=settings.OLLAMA_POOL_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        transport_ref: Dict[str, _PooledTransport] = {}
+        # Timeouts are supplied per request by the provider, so the session itself is unbounded.
+        session = aiohttp.ClientSession(
+            base_url=base_url,
+            connector=connector,
+            headers=DEFAULT_TRANSPORT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=None),
+            trace_configs=[self._build_trace_config(transport_ref)],
+        )
+        transport = _PooledTransport(base_url, session, connector, loop)
+        transport_ref["transport"] = transport
+        logger.info(f"HttpTransportPool: Created pooled transport for '{base_url}' "
+                    f"(limit={settings.OLLAMA_POOL_MAX_CONNECTIONS}, per_host={settings.OLLAMA_POOL_MAX_PER_HOST}, "
+                    f"keepalive={settings.OLLAMA_POOL_KEEPALIVE_SECONDS}s).")
+        return transport
+
+    def _get_transport(self, base_url: str) -> _PooledTransport:
+        transport = self._transports.get(base_url)
+        if transport and transport.is_usable and transport.loop is asyncio.get_running_loop():
+            return transport
+        if transport:
+            logger.info(f"HttpTransportPool: Transport for '{base_url}' is no longer usable. Rebuilding.")
+            self._retire(transport)
+        transport = self._build_transport(base_url)
+        self._transports[base_url] = transport
+        return transport
+
+    def acquire(self, base_url: str) -> aiohttp.ClientSession:
+        """Borrows the shared session for base_url. Every acquire() must be paired with release()."""
+        transport = self._get_transport(base_url)
+        transport.in_flight += 1
+        transport.total_requests += 1
+        transport.last_used_at = time.time()
+        return transport.session
+
+    async def release(self, session: aiohttp.ClientSession):
+        """Returns a borrowed session, closing it if it belonged to a retired transport that is now drained."""
+        transport = self._find_transport(session)
+        if not transport:
+            return
+        transport.in_flight = max(0, transport.in_flight - 1)
+        transport.last_used_at = time.time()
+        if transport.retired and transport.in_flight == 0:
+            await self._close_transport(transport)
+
+    def report_success(self, base_url: str):
+        transport = self._transports.get(base_url)
+        if transport: transport.consecutive_failures = 0
+
+    def report_failure(self, base_url: str, error: Optional[BaseException] = None) -> bool:
+        """
+        Records a connection-level failure for base_url. Once OLLAMA_POOL_MAX_FAILURES consecutive
+        failures are seen the transport is evicted. Returns True if an eviction happened.
+        """
+        transport = self._transports.get(base_url)
+        if not transport:
+            return False
+        transport.consecutive_failures += 1
+        if transport.consecutive_failures < settings.OLLAMA_POOL_MAX_FAILURES:
+            return False
+        logger.warning(f"HttpTransportPool: Evicting transport for '{base_url}' after {transport.consecutive_failures} "
+                       f"consecutive failures (last: {type(error).__name__ if error else 'N/A'}).")
+        self._evictions[base_url] = self._evictions.get(base_url, 0) + 1
+        self._transports.pop(base_url, None)
+        self._retire(transport)
+        return True
+
+    def _find_transport(self, session: aiohttp.ClientSession) -> Optional[_PooledTransport]:
+        for transport in list(self._transports.values()) + self._retired:
+            if transport.session is session:
+                return transport
+        return None
+
+    def _retire(self, transport: _PooledTransport):
+        transport.retired = True
+        if transport not in self._retired:
+            self._retired.append(transport)
+        if transport.in_flight == 0 and transport.loop is asyncio.get_running_loop():
+            asyncio.create_task(self._close_transport(transport))
+
+    async def _close_transport(self, transport: _PooledTransport):
+        if transport in self._retired:
+            self._retired.remove(transport)
+        if not transport.session.closed:
+            try:
+                await transport.session.close()
+                logger.debug(f"HttpTransportPool: Closed transport for '{transport.base_url}'.")
+            except Exception as e:
+                logger.error(f"HttpTransportPool: Error closing transport for '{transport.base_url}': {e}", exc_info=True)
+
+    async def close_all(self):
+        """Closes every pooled and retired transport. Called from the application lifespan shutdown."""
+        transports = list(self._transports.values()) + list(self._retired)
+        self._transports.clear()
+        for transport in transports:
+            transport.retired = True
+            await self._close_transport(transport)
+        self._retired.clear()
+        logger.info(f"HttpTransportPool: Closed {len(transports)} transport(s).")
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Returns per-base-URL pool metrics (open/idle/in-use connections and reuse counters)."""
+        metrics: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+        for base_url, transport in self._transports.items():
+            # aiohttp does not expose these publicly; read defensively.
+            idle_conns = getattr(transport.connector, '_conns', {}) or {}
+            acquired_conns = getattr(transport.connector, '_acquired', ()) or ()
+            idle = sum(len(conns) for conns in idle_conns.values())
+            in_use = len(acquired_conns)
+            metrics[base_url] = {
+                "open_connections": idle + in_use,
+                "idle_connections": idle,
+                "in_use_connections": in_use,
+                "in_flight_requests": transport.in_flight,
+                "total_requests": transport.total_requests,
+                "connections_created": transport.connections_created,
+                "connections_reused": transport.connections_reused,
+                "consecutive_failures": transport.consecutive_failures,
+                "evictions": self._evictions.get(base_url, 0),
+                "age_seconds": round(now - transport.created_at, 1),
+                "idle_seconds": round(now - transport.last_used_at, 1),
+            }
+        return metrics
+
+
+# --- Singleton Instance ---
+http_transport_pool = HttpTransportPool()
+# END OF FILE src/llm_providers/http_transport.py
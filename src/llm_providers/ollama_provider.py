@@ -4,26 +4,16 @@ import json
 import asyncio
 import logging
 import random
+import time
 from typing import List, Dict, Any, Optional, AsyncGenerator
 
-from .base import BaseLLMProvider, MessageDict, ToolDict, ToolResultDict
+from .base import BaseLLMProvider, MessageDict, ToolDict, ToolResultDict, build_usage_event
 from src.agents.constants import (
     MAX_RETRIES, RETRY_DELAY_SECONDS, RETRYABLE_STATUS_CODES, KNOWN_OLLAMA_OPTIONS
 )
 
 logger = logging.getLogger(__name__)
 
-# --- Concurrency Limiter ---
-_ollama_semaphores = {}
-
-def get_ollama_semaphore() -> asyncio.Semaphore:
-    loop = asyncio.get_running_loop()
-    if loop not in _ollama_semaphores:
-        limit = getattr(settings, 'OLLAMA_CONCURRENCY_LIMIT', 2)
-        _ollama_semaphores[loop] = asyncio.Semaphore(limit)
-    return _ollama_semaphores[loop]
-# ---------------------------
-
 RETRYABLE_AIOHTTP_EXCEPTIONS = (
     aiohttp.ClientConnectionError,
     aiohttp.ClientPayloadError,
@@ -36,13 +26,38 @@ DEFAULT_READ_TIMEOUT = 1800.0
 DEFAULT_TOTAL_TIMEOUT = 3600.0 
 
 from src.config.settings import settings 
-import copy
+from src.llm_providers.http_transport import http_transport_pool
+from src.llm_providers.request_tracing import request_tracer
+from src.llm_providers.request_scheduler import llm_scheduler
+
+
+def _ns_to_ms(value: Any) -> Optional[float]:
+    return value / 1e6 if isinstance(value, (int, float)) and value > 0 else None
+
+
+def usage_from_done_frame(frame: Dict[str, Any], ttft_ms: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Normalized usage event from Ollama's final (done=true) frame, whose durations are in
+    nanoseconds. ttft_ms is the client-measured time to the first content chunk; without it
+    the server's load + prompt eval time is used. None if the frame carries no counters.
+    """
+    if "eval_count" not in frame and "prompt_eval_count" not in frame:
+        return None
+    load_ms = _ns_to_ms(frame.get("load_duration"))
+    prefill_ms = _ns_to_ms(frame.get("prompt_eval_duration"))
+    if ttft_ms is None and (load_ms or prefill_ms):
+        ttft_ms = (load_ms or 0.0) + (prefill_ms or 0.0)
+    return build_usage_event(
+        prompt_tokens=frame.get("prompt_eval_count"), completion_tokens=frame.get("eval_count"),
+        ttft_ms=ttft_ms, prefill_ms=prefill_ms, decode_ms=_ns_to_ms(frame.get("eval_duration")),
+        load_ms=load_ms, timing_source="server",
+    )
 
 class OllamaProvider(BaseLLMProvider):
     """
     LLM Provider implementation for local Ollama models using aiohttp.
     Handles streaming by reading raw bytes and splitting by newline.
-    Creates a new ClientSession for each request to ensure clean state.
+    Borrows a keep-alive ClientSession from the shared HttpTransportPool per request.
     """
 
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model_registry=None, **kwargs):
@@ -52,14 +67,16 @@ class OllamaProvider(BaseLLMProvider):
         if api_key and api_key != 'ollama': logger.warning("OllamaProvider Warning: API key provided but not used.")
         self._model_registry = model_registry  # Reference to ModelRegistry for per-model metadata lookup
         self._session_timeout_config = kwargs.pop('timeout', None) # Pop before logging ignored, as it's handled
+        self._request_timeout = self._build_request_timeout()
+        self._transport_pool = http_transport_pool
         if kwargs: # Log any other unexpected kwargs passed to constructor
             logger.warning(f"OllamaProvider __init__: Ignoring unexpected kwargs: {kwargs}")
             
         self.streaming_mode = True 
         mode_str = "Streaming"
-        logger.info(f"OllamaProvider initialized with aiohttp. Effective Base URL: {self.base_url}. Mode: {mode_str}. Sessions created per-request. ModelRegistry: {'available' if model_registry else 'not provided'}.")
+        logger.info(f"OllamaProvider initialized with aiohttp. Effective Base URL: {self.base_url}. Mode: {mode_str}. Sessions borrowed from shared transport pool. ModelRegistry: {'available' if model_registry else 'not provided'}.")
 
-    async def _create_request_session(self) -> aiohttp.ClientSession:
+    def _build_request_timeout(self) -> aiohttp.ClientTimeout:
         if isinstance(self._session_timeout_config, aiohttp.ClientTimeout):
             timeout = self._session_timeout_config
         elif isinstance(self._session_timeout_config, (int, float)):
@@ -72,22 +89,10 @@ class OllamaProvider(BaseLLMProvider):
                  total=DEFAULT_TOTAL_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT, sock_read=DEFAULT_READ_TIMEOUT
              )
              if self._session_timeout_config is not None: logger.warning(f"Invalid timeout config '{self._session_timeout_config}', using defaults.")
-
-        connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-        headers = {
-            'Accept': 'application/json, text/event-stream',
-        }
-        session = aiohttp.ClientSession(
-            base_url=self.base_url,
-            timeout=timeout,
-            connector=connector,
-            headers=headers 
-        )
-        logger.debug(f"OllamaProvider: Created new aiohttp ClientSession for request. Timeout: {timeout}")
-        return session
+        return timeout
 
     async def close_session(self):
-        logger.debug("OllamaProvider: close_session called (no-op - sessions are per-request).")
+        logger.debug("OllamaProvider: close_session called (no-op - the shared transport pool is closed at application shutdown).")
         pass
 
     async def stream_completion(
@@ -101,36 +106,10 @@ class OllamaProvider(BaseLLMProvider):
         **kwargs
     ) -> AsyncGenerator[Dict[str, Any], Optional[List[ToolResultDict]]]:
 
-        logger.debug(f"OllamaProvider.stream_completion received messages (length {len(messages)}):")
-        for i, msg_to_log in enumerate(messages):
-            content_preview = str(msg_to_log.get('content'))[:200] 
-            tool_calls_preview = msg_to_log.get('tool_calls')
-            log_line = f"  [{i}] Role: {msg_to_log.get('role')}, Content: {content_preview}{'...' if len(str(msg_to_log.get('content'))) > 200 else ''}"
-            if tool_calls_preview:
-                try:
-                    tool_calls_str = json.dumps(tool_calls_preview)
-                    log_line += f", ToolCalls: {tool_calls_str}"
-                except TypeError:
-                    log_line += f", ToolCalls: [UnserializableData:{type(tool_calls_preview).__name__}]"
-                except Exception as e_json: 
-                    log_line += f", ToolCalls: [SerializationError:{str(e_json)}]"
-            if msg_to_log.get('role') == 'tool':
-                if 'name' in msg_to_log: 
-                    log_line += f", ToolName: {msg_to_log['name']}"
-                if 'tool_call_id' in msg_to_log:
-                    log_line += f", ToolCallID: {msg_to_log['tool_call_id']}"
-            tool_results_db_preview = msg_to_log.get('tool_results_json') 
-            if tool_results_db_preview: 
-                try:
-                    tool_results_db_str = json.dumps(tool_results_db_preview)
-                    log_line += f", ToolResults (from DB?): {tool_results_db_str}"
-                except TypeError:
-                    log_line += f", ToolResults (from DB?): [UnserializableData:{type(tool_results_db_preview).__name__}]"
-                except Exception as e_json:
-                    log_line += f", ToolResults (from DB?): [SerializationError:{str(e_json)}]"
-            logger.debug(log_line)
-
-        session = await self._create_request_session()
+        trace_request = request_tracer.should_trace()
+        if trace_request:
+            request_tracer.trace_messages("OllamaProvider.stream_completion received", model, messages)
+
         chat_endpoint = "/api/chat"
 
         if tools or tool_choice: logger.debug(f"OllamaProvider ignoring tools/tool_choice arguments as XML parsing is primary.")
@@ -283,28 +262,8 @@ class OllamaProvider(BaseLLMProvider):
             use_streaming_mode = False
             logger.info("OllamaProvider: Native tool calling enabled. Attaching tools and forcing stream=False.")
         
-        try:
-            full_payload_json_str_for_debug = json.dumps(payload, indent=2)
-            logger.debug(f"OllamaProvider '{model}': EXACT JSON payload being sent to {chat_endpoint} (before request):\n{full_payload_json_str_for_debug}")
-        except Exception as e_debug_log:
-            logger.error(f"OllamaProvider '{model}': Could not serialize payload for detailed pre-request logging: {e_debug_log}")
-
-        try:
-            payload_for_log_str = json.dumps(payload, indent=2)
-            if len(payload_for_log_str) > 2000: 
-                 payload_copy_for_log = copy.deepcopy(payload) 
-                 if "messages" in payload_copy_for_log and isinstance(payload_copy_for_log["messages"], list):
-                      messages_summary_str = f"[Summarized: {len(payload_copy_for_log['messages'])} messages. First role: {payload_copy_for_log['messages'][0].get('role') if payload_copy_for_log['messages'] else 'N/A'}, Last role: {payload_copy_for_log['messages'][-1].get('role') if payload_copy_for_log['messages'] else 'N/A'}]"
-                      payload_copy_for_log["messages"] = messages_summary_str  # type: ignore[assignment]
-                      payload_for_log_str_summary = json.dumps(payload_copy_for_log, indent=2)
-                      logger.debug(f"OllamaProvider: Payload being sent to {chat_endpoint} (Messages Summarized for Log):\n{payload_for_log_str_summary}")
-                 else:
-                      logger.debug(f"OllamaProvider: Payload being sent to {chat_endpoint}:\n{payload_for_log_str}")
-            else:
-                 logger.debug(f"OllamaProvider: Payload being sent to {chat_endpoint}:\n{payload_for_log_str}")
-        except Exception as e_payload_log:
-            logger.error(f"OllamaProvider: Could not serialize/log payload: {e_payload_log}")
-            logger.debug(f"OllamaProvider: Basic payload info - model={payload.get('model')}, num_messages={len(payload.get('messages', []))}, options={payload.get('options')}")  # type: ignore[arg-type]
+        if trace_request:
+            request_tracer.trace_payload("OllamaProvider", model, payload, label=f"EXACT JSON payload being sent to {chat_endpoint}")
 
         mode_log = "Streaming" if self.streaming_mode else "Non-Streaming"
         options_log = valid_options 
@@ -314,10 +273,11 @@ class OllamaProvider(BaseLLMProvider):
         last_exception = None
         response: Optional[aiohttp.ClientResponse] = None
 
-        semaphore = get_ollama_semaphore()
-        logger.debug(f"OllamaProvider '{model}': Waiting for semaphore (limit {semaphore._value})...")
-        async with semaphore:
-            logger.debug(f"OllamaProvider '{model}': Semaphore acquired!")
+        # Priority-aware concurrency slot for this Ollama endpoint (replaces the flat semaphore)
+        async with llm_scheduler.slot(f"ollama:{self.base_url}", getattr(settings, 'OLLAMA_CONCURRENCY_LIMIT', 2), group="ollama") as slot:
+            logger.debug(f"OllamaProvider '{model}': Scheduler slot acquired ({slot.priority.name}, waited {slot.wait_seconds:.2f}s).")
+            session = self._transport_pool.acquire(self.base_url)
+            attempt_start = time.monotonic() # Reset per attempt; read after the loop for TTFT/usage
             try: 
                 for attempt in range(MAX_RETRIES + 1):
                     last_exception = None
@@ -329,11 +289,15 @@ class OllamaProvider(BaseLLMProvider):
                             custom_headers = session.headers.copy() 
                             custom_headers['Content-Type'] = 'application/json' 
                             
+                            attempt_start = time.monotonic()
                             response = await session.post(
                                 chat_endpoint,
                                 data=json_payload_str.encode('utf-8'), 
-                                headers=custom_headers 
+                                headers=custom_headers,
+                                timeout=self._request_timeout
                             )
+                            self._transport_pool.report_success(self.base_url)
+                            slot.record_latency(time.monotonic() - attempt_start)
                         except TypeError as ser_err:
                             logger.error(f"OllamaProvider: TypeError during manual JSON serialization of payload: {ser_err}", exc_info=True)
                             logger.error(f"Problematic payload structure (details may be limited by error): {payload}")
@@ -346,7 +310,6 @@ class OllamaProvider(BaseLLMProvider):
                             else:
                                 logger.error(f"Max retries reached after serialization error.")
                                 yield {"type": "error", "content": f"[OllamaProvider Error]: Failed to serialize payload after retries - {ser_err}", "_exception_obj": ser_err}
-                                if session and not session.closed: await session.close() 
                                 return 
                             
                         req_info = response.request_info
@@ -389,13 +352,11 @@ class OllamaProvider(BaseLLMProvider):
                                 else:
                                     logger.error(f"Max retries ({MAX_RETRIES}) after status {response_status}.")
                                     yield {"type": "error", "content": f"[Ollama Error]: Max retries. Last: Status {response_status} - {response_text[:100]}", "_exception_obj": last_exception}
-                                    if session and not session.closed: await session.close()
                                     return
                             else: 
                                 client_err = aiohttp.ClientResponseError(req_info, response.history, status=response_status, message=f"Status {response_status}", headers=response.headers)
                                 logger.error(f"Ollama API Client Error: Status {response_status}, Resp: {response_text[:200]}")
                                 yield {"type": "error", "content": f"[Ollama Error]: Client Error {response_status} - {response_text[:100]}", "_exception_obj": client_err}
-                                if session and not session.closed: await session.close()
                                 return
                         else: 
                             logger.info(f"API call headers OK (Status {response_status}) attempt {attempt + 1}. Start stream.")
@@ -408,14 +369,14 @@ class OllamaProvider(BaseLLMProvider):
                             backoff_delay = RETRY_DELAY_SECONDS * (2 ** attempt) + random.uniform(0, 1)
                             logger.info(f"Waiting {backoff_delay:.2f}s...")
                             if response and not response.closed: response.release()
-                            if session and not session.closed: await session.close() 
-                            session = await self._create_request_session() 
+                            if self._transport_pool.report_failure(self.base_url, e):
+                                await self._transport_pool.release(session)
+                                session = self._transport_pool.acquire(self.base_url)
                             await asyncio.sleep(backoff_delay)
                             continue
                         else:
                             logger.error(f"Max retries ({MAX_RETRIES}) reached after {type(e).__name__}.")
                             yield {"type": "error", "content": f"[Ollama Error]: Max retries after connection/timeout. Last: {e}", "_exception_obj": e}
-                            if session and not session.closed: await session.close()
                             return
                     except Exception as e:
                         last_exception = e
@@ -424,21 +385,20 @@ class OllamaProvider(BaseLLMProvider):
                              backoff_delay = RETRY_DELAY_SECONDS * (2 ** attempt) + random.uniform(0, 1)
                              logger.info(f"Waiting {backoff_delay:.2f}s...")
                              if response and not response.closed: response.release()
-                             if session and not session.closed: await session.close()
-                             session = await self._create_request_session()
+                             if self._transport_pool.report_failure(self.base_url, e):
+                                 await self._transport_pool.release(session)
+                                 session = self._transport_pool.acquire(self.base_url)
                              await asyncio.sleep(backoff_delay)
                              continue
                         else:
                              logger.error(f"Max retries ({MAX_RETRIES}) after unexpected error.")
                              yield {"type": "error", "content": f"[Ollama Error]: Unexpected Error after retries - {type(e).__name__}", "_exception_obj": e}
-                             if session and not session.closed: await session.close()
                              return
 
                 if response is None or response.status >= 400: 
                     logger.error(f"Ollama API request failed. Last exception: {type(last_exception).__name__ if last_exception else 'N/A'}")
                     err_content = f"[Ollama Error]: API request failed after {MAX_RETRIES} retries. Error: {type(last_exception).__name__ if last_exception else 'Request Failed'}"
                     yield {"type": "error", "content": err_content, "_exception_obj": last_exception}
-                    if session and not session.closed: await session.close()
                     return
 
                 byte_buffer = b""
@@ -455,6 +415,7 @@ class OllamaProvider(BaseLLMProvider):
                         chunk_read_timeout = DEFAULT_READ_TIMEOUT  # 240s per chunk
                         stream_iter = response.content.iter_any().__aiter__()
                         keep_alive_count = 0
+                        ttft_ms: Optional[float] = None
                         while True:
                             try:
                                 chunk = await asyncio.wait_for(stream_iter.__anext__(), timeout=chunk_read_timeout)
@@ -490,14 +451,17 @@ class OllamaProvider(BaseLLMProvider):
                                             "content" in chunk_data["message"]:
                                              content_chunk = chunk_data["message"]["content"]
                                              if content_chunk: 
+                                                 if ttft_ms is None: ttft_ms = (time.monotonic() - attempt_start) * 1000
                                                  # logger.debug(f"OllamaProvider: Yielding response_chunk: {content_chunk[:100]}...") # Disabled to prevent log spam
                                                  yield {"type": "response_chunk", "content": content_chunk}
                                     if chunk_data.get("done", False):
                                         total_duration = chunk_data.get("total_duration")
                                         logger.debug(f"Received done=true. Total duration: {total_duration}ns")
+                                        if not stream_error_occurred:
+                                            usage_event = usage_from_done_frame(chunk_data, ttft_ms)
+                                            if usage_event: yield usage_event
                                         if total_duration: yield {"type": "status", "content": f"Ollama turn finished ({total_duration / 1e9:.2f}s)"}
                                         stream_error_occurred = False 
-                                        if session and not session.closed: await session.close()
                                         return 
                                 except json.JSONDecodeError as e:
                                     logger.error(f"JSONDecodeError: {e} - Line: {line[:200]}")
@@ -511,7 +475,6 @@ class OllamaProvider(BaseLLMProvider):
                                     stream_error_occurred = True
                             if stream_error_occurred: break 
                         if stream_error_occurred: 
-                            if session and not session.closed: await session.close()
                             return
 
                         logger.debug(f"Finished streaming loop (iter_any). Processed lines: {processed_lines}. Error occurred: {stream_error_occurred}")
@@ -526,9 +489,12 @@ class OllamaProvider(BaseLLMProvider):
                                         content_chunk = chunk_data["message"]["content"]
                                         if content_chunk:
                                             logger.debug("Yielding final content chunk from buffer.")
+                                            if ttft_ms is None: ttft_ms = (time.monotonic() - attempt_start) * 1000
                                             yield {"type": "response_chunk", "content": content_chunk}
                                     if chunk_data.get("done", False):
                                         logger.debug("Processed final 'done' from remaining buffer.")
+                                        usage_event = usage_from_done_frame(chunk_data, ttft_ms)
+                                        if usage_event: yield usage_event
                                         total_duration = chunk_data.get("total_duration")
                                         if total_duration: yield {"type": "status", "content": f"Ollama turn finished ({total_duration / 1e9:.2f}s)"}
                                     else:
@@ -550,6 +516,7 @@ class OllamaProvider(BaseLLMProvider):
                                  accumulated_tool_calls = []
                                  accumulated_content = ""
                                  is_done = False
+                                 done_frame: Dict[str, Any] = {}
                                  has_error = None
                                  for line in lines:
                                      if not line.strip(): continue
@@ -564,6 +531,7 @@ class OllamaProvider(BaseLLMProvider):
                                              accumulated_content += msg["content"]
                                          if chunk_data.get("done"):
                                              is_done = True
+                                             done_frame = chunk_data
                                      except json.JSONDecodeError:
                                          logger.error(f"Failed to decode NDJSON fallback line: {line[:100]}...")
                                  
@@ -574,6 +542,7 @@ class OllamaProvider(BaseLLMProvider):
                                      },
                                      "done": is_done
                                  }
+                                 response_data.update({k: v for k, v in done_frame.items() if k.endswith(("_count", "_duration"))})
                                  if accumulated_tool_calls:
                                      response_data["message"]["tool_calls"] = accumulated_tool_calls
                                  if has_error:
@@ -608,7 +577,10 @@ class OllamaProvider(BaseLLMProvider):
                                  else:
                                      logger.warning("Non-streaming message content empty.")
 
-                                 if response_data.get("done", False): logger.debug("Non-streaming done=true.")
+                                 if response_data.get("done", False):
+                                     logger.debug("Non-streaming done=true.")
+                                     usage_event = usage_from_done_frame(response_data) # TTFT falls back to load + prompt eval time
+                                     if usage_event: yield usage_event
                                  else: logger.warning("Non-streaming missing done=true.")
                              else:
                                  logger.error(f"Unexpected non-streaming structure: {response_data}"); yield {"type": "error", "content": "[Ollama Error]: Unexpected non-streaming structure."}
@@ -631,7 +603,7 @@ class OllamaProvider(BaseLLMProvider):
                      yield {"type": "error", "content": f"[Ollama Error]: Network error during stream - {conn_err}", "_exception_obj": conn_err}
                      stream_error_occurred = True
                 except asyncio.TimeoutError as timeout_err: 
-                    read_timeout = getattr(session.timeout, 'sock_read', 'N/A')
+                    read_timeout = getattr(self._request_timeout, 'sock_read', 'N/A')
                     logger.error(f"Ollama timeout during stream read (read={read_timeout}s): {timeout_err}", exc_info=False)
                     stream_error_obj = timeout_err
                     yield {"type": "error", "content": f"[Ollama Error]: Timeout waiting for stream data (read={read_timeout}s)", "_exception_obj": timeout_err}
@@ -649,9 +621,8 @@ class OllamaProvider(BaseLLMProvider):
                 else:
                     logger.warning(f"OllamaProvider: stream_completion finished for model {model}, but error encountered during stream.")
             finally:
-                if session and not session.closed:
-                    await session.close()
-                    logger.debug("OllamaProvider: Closed per-request aiohttp ClientSession.")
+                await self._transport_pool.release(session)
+                logger.debug("OllamaProvider: Released pooled aiohttp ClientSession.")
 
     async def _read_response_safe(self, response: aiohttp.ClientResponse) -> str:
         try:
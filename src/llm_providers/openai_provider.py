@@ -7,7 +7,9 @@ import time
 import httpx
 from typing import List, Dict, Any, Optional, AsyncGenerator
 
-from .base import BaseLLMProvider, MessageDict, ToolDict, ToolResultDict
+from .base import BaseLLMProvider, MessageDict, ToolDict, ToolResultDict, build_usage_event
+from .request_tracing import request_tracer
+from .request_scheduler import llm_scheduler
 from src.config.settings import settings
 from src.agents.constants import (
     MAX_RETRIES, RETRY_DELAY_SECONDS, RETRYABLE_STATUS_CODES, RETRYABLE_EXCEPTIONS
@@ -36,20 +38,25 @@ OPENAI_COMPLETIONS_VALID_KWARGS = {
     "stream_options", "temperature", "tool_choice", "tools", "top_p", "user",
 }
 
-# --- Concurrency Limiter ---
-_openai_semaphores = {}
 
-def get_openai_semaphore(is_vllm: bool = False) -> asyncio.Semaphore:
-    loop = asyncio.get_running_loop()
-    key = (loop, is_vllm)
-    if key not in _openai_semaphores:
-        if is_vllm:
-            limit = getattr(settings, 'VLLM_CONCURRENCY_LIMIT', 2)
-        else:
-            limit = getattr(settings, 'OPENAI_CONCURRENCY_LIMIT', 50)
-        _openai_semaphores[key] = asyncio.Semaphore(limit)
-    return _openai_semaphores[key]
-# ---------------------------
+def usage_from_stream(usage: Any, request_start: float, first_token_at: Optional[float], last_token_at: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Normalized usage event for an OpenAI-compatible stream. Token counts come from the final
+    chunk's usage (sent when stream_options.include_usage is set); the API reports no
+    timings, so TTFT (time.monotonic() from request start to first delta, used as prefill
+    time) and decode time (first to last delta) are measured client-side.
+    """
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    ttft_ms = (first_token_at - request_start) * 1000 if first_token_at is not None else None
+    decode_ms = (last_token_at - first_token_at) * 1000 if first_token_at is not None and last_token_at is not None else None
+    return build_usage_event(
+        prompt_tokens=getattr(usage, "prompt_tokens", 0), completion_tokens=getattr(usage, "completion_tokens", 0),
+        ttft_ms=ttft_ms, prefill_ms=ttft_ms, decode_ms=decode_ms,
+        cached_prompt_tokens=getattr(details, "cached_tokens", None) if details is not None else None,
+        timing_source="client",
+    )
 
 class OpenAIProvider(BaseLLMProvider):
     """
@@ -119,26 +126,30 @@ class OpenAIProvider(BaseLLMProvider):
                 api_params[k] = v
             else:
                 logger.warning(f"OpenAIProvider stream_completion: Ignoring unsupported kwarg '{k}' for OpenAI chat completions.")
+        if settings.LLM_STREAM_USAGE and "stream_options" not in api_params:
+            api_params["stream_options"] = {"include_usage": True} # Final chunk carries token usage
+
+        if request_tracer.should_trace():
+            request_tracer.trace_payload(self.__class__.__name__, model, api_params, label="FULL JSON equivalent of api_params being sent")
 
         is_vllm = self.__class__.__name__ == "VllmProvider"
-        semaphore = get_openai_semaphore(is_vllm)
-        logger.debug(f"OpenAIProvider '{model}': Waiting for semaphore (limit {semaphore._value})...")
-        
-        async with semaphore:
-            logger.debug(f"OpenAIProvider '{model}': Semaphore acquired!")
+        if is_vllm:
+            scheduler_key, concurrency_limit = f"vllm:{self._openai_client.base_url}", getattr(settings, 'VLLM_CONCURRENCY_LIMIT', 2)
+        else:
+            scheduler_key, concurrency_limit = f"openai:{self._openai_client.base_url}", getattr(settings, 'OPENAI_CONCURRENCY_LIMIT', 50)
+
+        # Priority-aware concurrency slot for this endpoint (replaces the flat semaphore)
+        async with llm_scheduler.slot(scheduler_key, concurrency_limit, group="vllm" if is_vllm else "openai") as slot:
+            logger.debug(f"OpenAIProvider '{model}': Scheduler slot acquired ({slot.priority.name}, waited {slot.wait_seconds:.2f}s).")
+            attempt_start = time.monotonic() # Reset per attempt; read after the loop for usage timing
             for attempt in range(MAX_RETRIES + 1):
                 try:
                     log_params = {k: v for k, v in api_params.items() if k != 'messages'}
                     logger.info(f"OpenAIProvider making API call (Attempt {attempt + 1}/{MAX_RETRIES + 1}). Params: {log_params}")
 
-                    try:
-                        full_api_params_json_str = json.dumps(api_params, indent=2, default=str) 
-                        logger.debug(f"OpenAIProvider '{model}': FULL JSON equivalent of api_params being sent:\n{full_api_params_json_str}")
-                    except Exception as e_full_params_log:
-                        logger.error(f"OpenAIProvider '{model}': CRITICAL - Could not serialize FULL api_params for logging: {e_full_params_log}")
-                        logger.debug(f"OpenAIProvider '{model}': Fallback api_params parts: model={api_params.get('model')}, options_subset={ {k:v for k,v in api_params.items() if k not in ['messages']} }")
-
+                    attempt_start = time.monotonic()
                     response_stream = await self._openai_client.chat.completions.create(**api_params)
+                    slot.record_latency(time.monotonic() - attempt_start)
                     logger.info(f"API call successful on attempt {attempt + 1}.")
                     last_exception = None
                     break 
@@ -204,14 +215,22 @@ class OpenAIProvider(BaseLLMProvider):
         try:
             finish_reason = None
             tool_calls_accumulator = {}
+            stream_usage = None
+            first_token_at: Optional[float] = None
+            last_token_at: Optional[float] = None
             try:
                 async for chunk in response_stream:
                     raw_chunk_data_for_log = None
                     try:
+                         if getattr(chunk, "usage", None) is not None:
+                             stream_usage = chunk.usage
                          delta = chunk.choices[0].delta if chunk.choices else None
                          if chunk.choices and chunk.choices[0].finish_reason:
                              finish_reason = chunk.choices[0].finish_reason
                          if not delta: continue
+                         if delta.content or delta.tool_calls:
+                             last_token_at = time.monotonic()
+                             if first_token_at is None: first_token_at = last_token_at
                          
                          if delta.tool_calls:
                              for tc_chunk in delta.tool_calls:
@@ -243,6 +262,9 @@ class OpenAIProvider(BaseLLMProvider):
                         logger.info(f"OpenAIProvider yielding native_tool_calls: {final_tool_calls}")
                         yield {"type": "native_tool_calls", "tool_calls": final_tool_calls}
 
+                usage_event = usage_from_stream(stream_usage, attempt_start, first_token_at, last_token_at)
+                if usage_event: yield usage_event
+
             except openai.APIError as stream_api_err:
                 logger.error(f"OpenAI APIError occurred during stream processing: {stream_api_err}", exc_info=True)
                 try: logger.error(f"APIError details: Status={getattr(stream_api_err, 'status_code', 'N/A')}, Body={getattr(stream_api_err, 'body', 'N/A')}")
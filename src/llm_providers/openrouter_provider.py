@@ -7,6 +7,8 @@ import time
 from typing import List, Dict, Any, Optional, AsyncGenerator
 
 from .base import BaseLLMProvider, MessageDict, ToolDict, ToolResultDict
+from .openai_provider import usage_from_stream
+from .request_tracing import request_tracer
 from src.config.settings import settings 
 from src.agents.constants import (
     MAX_RETRIES, RETRY_DELAY_SECONDS, RETRYABLE_STATUS_CODES, RETRYABLE_EXCEPTIONS
@@ -119,24 +121,19 @@ class OpenRouterProvider(BaseLLMProvider):
                 api_params[k] = v
             else:
                 logger.warning(f"OpenRouterProvider stream_completion: Ignoring unsupported kwarg '{k}' for OpenAI chat completions.")
+        if settings.LLM_STREAM_USAGE and "stream_options" not in api_params:
+            api_params["stream_options"] = {"include_usage": True} # Final chunk carries token usage
 
+        if request_tracer.should_trace():
+            request_tracer.trace_payload("OpenRouterProvider", model, api_params, label="FULL JSON equivalent of api_params being sent")
+
+        attempt_start = time.monotonic() # Reset per attempt; read after the loop for usage timing
         for attempt in range(MAX_RETRIES + 1):
             try:
                 log_params = {k: v for k, v in api_params.items() if k != 'messages'} # For concise logging
                 logger.info(f"OpenRouterProvider making API call (Attempt {attempt + 1}/{MAX_RETRIES + 1}). Params: {log_params}")
                 
-                try:
-                    full_api_params_json_str = json.dumps(api_params, indent=2, default=str) 
-                    logger.debug(f"OpenRouterProvider '{model}': FULL JSON equivalent of api_params being sent:\n{full_api_params_json_str}")
-                except Exception as e_full_params_log:
-                    logger.error(f"OpenRouterProvider '{model}': CRITICAL - Could not serialize FULL api_params for logging: {e_full_params_log}")
-                    logger.debug(f"OpenRouterProvider '{model}': Fallback api_params parts: model={api_params.get('model')}, options_subset={ {k:v for k,v in api_params.items() if k not in ['messages']} }")
-                    if "messages" in api_params:
-                        logger.debug(f"OpenRouterProvider '{model}': Fallback - Number of messages in api_params: {len(api_params['messages'])}")
-                        for i_msg, msg_item in enumerate(api_params['messages']):
-                            try: logger.debug(f"OpenRouterProvider '{model}': Fallback - Msg [{i_msg}]: {json.dumps(msg_item, default=str)}")
-                            except: logger.debug(f"OpenRouterProvider '{model}': Fallback - Msg [{i_msg}] (not fully serializable): role={msg_item.get('role')}, content_type={type(msg_item.get('content'))}, tool_calls_type={type(msg_item.get('tool_calls'))}")
-                
+                attempt_start = time.monotonic()
                 response_stream = await self._openai_client.chat.completions.create(**api_params)
                 logger.info(f"API call successful on attempt {attempt + 1}.")
                 last_exception = None 
@@ -202,15 +199,22 @@ class OpenRouterProvider(BaseLLMProvider):
 
         try:
             finish_reason = None
+            stream_usage = None
+            first_token_at: Optional[float] = None
+            last_token_at: Optional[float] = None
             try:
                 async for chunk in response_stream:
                     raw_chunk_data_for_log = None
                     try:
+                        if getattr(chunk, "usage", None) is not None:
+                            stream_usage = chunk.usage
                         delta = chunk.choices[0].delta if chunk.choices else None
                         if chunk.choices and chunk.choices[0].finish_reason:
                             finish_reason = chunk.choices[0].finish_reason
                         if not delta: continue
                         if delta.content:
+                            last_token_at = time.monotonic()
+                            if first_token_at is None: first_token_at = last_token_at
                             yield {"type": "response_chunk", "content": delta.content}
                     except Exception as chunk_proc_err:
                         logger.error(f"Error processing OpenRouter chunk content: {chunk_proc_err}", exc_info=True)
@@ -218,6 +222,8 @@ class OpenRouterProvider(BaseLLMProvider):
                         except Exception: pass
                         yield {"type": "error", "content": f"[OpenRouterProvider Error]: Error processing stream chunk - {type(chunk_proc_err).__name__}", "_exception_obj": chunk_proc_err}
                         return 
+                usage_event = usage_from_stream(stream_usage, attempt_start, first_token_at, last_token_at)
+                if usage_event: yield usage_event
             except openai.APIError as stream_api_err:
                 logger.error(f"OpenRouter APIError occurred during stream processing: {stream_api_err}", exc_info=True)
                 try: logger.error(f"APIError details: Status={stream_api_err.status_code}, Body={stream_api_err.body}")
@@ -0,0 +1,397 @@
+# START OF FILE src/llm_providers/request_scheduler.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Scheduling classes for LLM requests. Lower values are served first."""
+    INTERACTIVE = 0   # Admin AI turns (the human is waiting)
+    GOVERNANCE = 1    # Constitutional Guardian verdicts and health-monitor evaluations
+    SUMMARIZATION = 2 # Context summarization blocking an agent's next cycle
+    BACKGROUND = 3    # PM and worker cycles
+
+
+# (priority, agent_id) of the LLM request being issued by the current task
+_request_context: ContextVar[Tuple[RequestPriority, Optional[str]]] = ContextVar(
+    "llm_request_context", default=(RequestPriority.BACKGROUND, None)
+)
+
+
+@contextmanager
+def llm_request_context(priority: RequestPriority, agent_id: Optional[str] = None):
+    """Tags every LLM request issued inside the block with a priority class and agent id."""
+    token = _request_context.set((priority, agent_id))
+    try:
+        yield
+    finally:
+        try: _request_context.reset(token)
+        except ValueError: pass # Exited from another context (e.g. an async generator finalized elsewhere)
+
+
+async def stream_with_request_context(stream: AsyncIterator[Any], priority: RequestPriority, agent_id: Optional[str] = None) -> AsyncIterator[Any]:
+    """
+    Iterates a provider stream with llm_request_context() set only while the provider runs.
+    Use this instead of wrapping a yielding loop in llm_request_context(), which would leak
+    the tag into whatever code consumes the events between yields.
+    """
+    while True:
+        with llm_request_context(priority, agent_id):
+            try:
+                event = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+        yield event
+
+
+def priority_for_agent(agent: Any) -> RequestPriority:
+    from src.agents.constants import AGENT_TYPE_ADMIN
+    return RequestPriority.INTERACTIVE if getattr(agent, 'agent_type', None) == AGENT_TYPE_ADMIN else RequestPriority.BACKGROUND
+
+
+class _Waiter:
+    def __init__(self, priority: RequestPriority, agent_id: Optional[str], loop: asyncio.AbstractEventLoop):
+        self.priority = priority
+        self.agent_id = agent_id
+        self.future: asyncio.Future = loop.create_future()
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class _ClassStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.preempted = 0
+
+
+class _ConcurrencyGroup:
+    """Hard concurrency cap shared by all endpoints of one provider family (e.g. every Ollama node)."""
+
+    def __init__(self, name: str, configured_limit: int, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self.loop = loop
+        self.configured_limit = max(1, configured_limit)
+        self.limit = max(self.configured_limit, int(self.configured_limit * settings.LLM_SCHEDULER_MAX_LIMIT_FACTOR))
+        self.active = 0
+        self.endpoints: Dict[str, "_EndpointScheduler"] = {}
+
+    def queued(self) -> int:
+        return sum(endpoint.queued() for endpoint in self.endpoints.values())
+
+    def dispatch(self):
+        """Hands free slots to the best queued request across the group's endpoints."""
+        while self.active < self.limit:
+            now = time.monotonic()
+            best: Optional[Tuple[float, int, float]] = None
+            best_endpoint: Optional[_EndpointScheduler] = None
+            for endpoint in self.endpoints.values():
+                if endpoint.active >= endpoint.limit:
+                    continue
+                head = endpoint._peek_next(now)
+                if head is None:
+                    continue
+                rank = head[0]
+                if best is None or rank < best:
+                    best, best_endpoint = rank, endpoint
+            if best_endpoint is None:
+                return
+            waiter = best_endpoint._pop_next()
+            if waiter is None:
+                return
+            best_endpoint._grant(waiter)
+
+
+class _EndpointScheduler:
+    """Priority queue plus (adaptive) concurrency limit for one endpoint."""
+
+    def __init__(self, key: str, configured_limit: int, group: _ConcurrencyGroup):
+        self.key = key
+        self.group = group
+        self.loop = group.loop
+        self.configured_limit = max(1, configured_limit)
+        self.limit = self.configured_limit
+        self.max_limit = max(self.configured_limit, int(self.configured_limit * settings.LLM_SCHEDULER_MAX_LIMIT_FACTOR))
+        self.active = 0
+        # priority -> agent_id -> FIFO of that agent's waiters (round-robin across agents)
+        self.queues: Dict[RequestPriority, "OrderedDict[Optional[str], Deque[_Waiter]]"] = {p: OrderedDict() for p in RequestPriority}
+        self.pending_grants: List[_Waiter] = [] # Granted a slot but not yet resumed
+        self.stats: Dict[RequestPriority, _ClassStats] = {p: _ClassStats() for p in RequestPriority}
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+        self.latency_samples = 0
+        self.samples_since_adjust = 0
+        self.limit_increases = 0
+        self.limit_decreases = 0
+
+    # --- Queue helpers ---
+    def queued(self) -> int:
+        return sum(len(dq) for queue in self.queues.values() for dq in queue.values())
+
+    def _enqueue(self, waiter: _Waiter, front: bool = False):
+        queue = self.queues[waiter.priority]
+        dq = queue.get(waiter.agent_id)
+        if dq is None:
+            dq = deque()
+            queue[waiter.agent_id] = dq
+            if front: queue.move_to_end(waiter.agent_id, last=False)
+        if front: dq.appendleft(waiter)
+        else: dq.append(waiter)
+
+    def _remove(self, waiter: _Waiter):
+        queue = self.queues[waiter.priority]
+        dq = queue.get(waiter.agent_id)
+        if dq and waiter in dq:
+            dq.remove(waiter)
+            if not dq: del queue[waiter.agent_id]
+
+    def _effective_priority(self, waiter: _Waiter, now: float) -> float:
+        # Aging: every LLM_SCHEDULER_AGING_SECONDS spent waiting promotes a request by one class
+        aging = settings.LLM_SCHEDULER_AGING_SECONDS
+        boost = int((now - waiter.enqueued_at) / aging) if aging > 0 else 0
+        return waiter.priority - boost
+
+    def _peek_next(self, now: float) -> Optional[Tuple[Tuple[float, int, float], RequestPriority]]:
+        """(rank, class) of the request _pop_next would return; lower ranks are served first."""
+        best: Optional[Tuple[Tuple[float, int, float], RequestPriority]] = None
+        for priority, queue in self.queues.items():
+            if not queue:
+                continue
+            head = next(iter(queue.values()))[0] # Next agent in this class's round-robin
+            rank = (self._effective_priority(head, now), int(priority), head.enqueued_at)
+            if best is None or rank < best[0]:
+                best = (rank, priority)
+        return best
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        head = self._peek_next(time.monotonic())
+        if head is None:
+            return None
+        queue = self.queues[head[1]]
+        agent_id, dq = next(iter(queue.items()))
+        waiter = dq.popleft()
+        if dq: queue.move_to_end(agent_id)
+        else: del queue[agent_id]
+        return waiter
+
+    def has_capacity(self) -> bool:
+        return self.active < self.limit and self.group.active < self.group.limit
+
+    def _grant(self, waiter: _Waiter):
+        self.active += 1
+        self.group.active += 1
+        waiter.granted = True
+        self.pending_grants.append(waiter)
+        waiter.future.set_result(None)
+
+    def try_preempt(self, waiter: _Waiter) -> bool:
+        """Moves a granted-but-not-started slot from a lower-priority request to waiter."""
+        victims = [w for w in self.pending_grants if w.priority > waiter.priority]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda w: (w.priority, -w.enqueued_at))
+        self.pending_grants.remove(victim)
+        victim.granted = False
+        victim.future = self.loop.create_future() # Victim wakes up, sees a new future and waits again
+        self._enqueue(victim, front=True)
+        self.stats[victim.priority].preempted += 1
+        logger.debug(f"RequestScheduler[{self.key}]: Preempted queued {victim.priority.name} request of '{victim.agent_id}' for {waiter.priority.name} request of '{waiter.agent_id}'.")
+        self.active -= 1
+        self.group.active -= 1
+        self._grant(waiter)
+        return True
+
+    def started(self, waiter: _Waiter):
+        if waiter in self.pending_grants:
+            self.pending_grants.remove(waiter)
+        wait = time.monotonic() - waiter.enqueued_at
+        stats = self.stats[waiter.priority]
+        stats.requests += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+
+    def release(self):
+        self.active = max(0, self.active - 1)
+        self.group.active = max(0, self.group.active - 1)
+        self.group.dispatch()
+
+    # --- Adaptive limit ---
+    def record_latency(self, seconds: float):
+        self.latency_samples += 1
+        self.latency_ewma = seconds if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * seconds
+        if self.latency_baseline is None or seconds < self.latency_baseline:
+            self.latency_baseline = seconds
+        else:
+            # Let the baseline drift up slowly so one lucky sample does not pin it forever
+            self.latency_baseline += (self.latency_ewma - self.latency_baseline) * 0.01
+        if not settings.LLM_SCHEDULER_ADAPTIVE:
+            return
+        self.samples_since_adjust += 1
+        if self.samples_since_adjust < max(3, self.limit):
+            return
+        self.samples_since_adjust = 0
+        tolerance = settings.LLM_SCHEDULER_LATENCY_TOLERANCE
+        if self.latency_ewma > self.latency_baseline * tolerance and self.limit > 1:
+            self.limit -= 1
+            self.limit_decreases += 1
+            logger.info(f"RequestScheduler[{self.key}]: Latency {self.latency_ewma:.2f}s vs baseline {self.latency_baseline:.2f}s. Concurrency limit lowered to {self.limit}.")
+        elif self.latency_ewma <= self.latency_baseline * (1 + (tolerance - 1) / 2) and self.queued() > 0 and self.limit < self.max_limit:
+            self.limit += 1
+            self.limit_increases += 1
+            logger.info(f"RequestScheduler[{self.key}]: Latency steady with requests queued. Concurrency limit raised to {self.limit}.")
+            self.group.dispatch()
+
+
+class _SchedulerSlot:
+    """Async context manager holding one concurrency slot of an endpoint."""
+
+    def __init__(self, scheduler: 'LLMRequestScheduler', key: str, configured_limit: int, group: str):
+        self._scheduler = scheduler
+        self._key = key
+        self._configured_limit = configured_limit
+        self._group = group
+        self._endpoint: Optional[_EndpointScheduler] = None
+        self.priority, self.agent_id = _request_context.get()
+        self.wait_seconds = 0.0
+
+    async def __aenter__(self) -> '_SchedulerSlot':
+        endpoint = self._scheduler._get_endpoint(self._key, self._configured_limit, self._group)
+        waiter = _Waiter(self.priority, self.agent_id, endpoint.loop)
+        if endpoint.has_capacity() and endpoint.group.queued() == 0:
+            endpoint._grant(waiter)
+        elif endpoint.has_capacity():
+            # Requests queued on other endpoints of the group cannot use this endpoint's free slot:
+            # queue behind same-endpoint waiters and let the group hand it out by rank right away
+            endpoint._enqueue(waiter)
+            endpoint.group.dispatch()
+        elif not (settings.LLM_SCHEDULER_PREEMPTION and endpoint.try_preempt(waiter)):
+            endpoint._enqueue(waiter)
+            logger.debug(f"RequestScheduler[{self._key}]: {self.priority.name} request of '{self.agent_id}' queued "
+                         f"(active {endpoint.active}/{endpoint.limit}, group '{endpoint.group.name}' active "
+                         f"{endpoint.group.active}/{endpoint.group.limit}, queued {endpoint.queued()}).")
+        while True:
+            future = waiter.future
+            try:
+                await future
+            except asyncio.CancelledError:
+                if waiter.future is future and waiter.granted:
+                    # Cancelled after being granted: hand the slot on
+                    if waiter in endpoint.pending_grants: endpoint.pending_grants.remove(waiter)
+                    endpoint.release()
+                else:
+                    endpoint._remove(waiter)
+                raise
+            if waiter.future is future:
+                break
+        endpoint.started(waiter)
+        self.wait_seconds = time.monotonic() - waiter.enqueued_at
+        self._endpoint = endpoint
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._endpoint is not None:
+            self._endpoint.release()
+            self._endpoint = None
+        return False
+
+    def record_latency(self, seconds: float):
+        """Reports time-to-response-headers for one attempt; drives the adaptive limit."""
+        if self._endpoint is not None:
+            self._endpoint.record_latency(seconds)
+
+
+class LLMRequestScheduler:
+    """
+    Priority-aware admission control for LLM requests, one queue per endpoint.
+
+    Replaces the flat FIFO semaphores of the Ollama and OpenAI-compatible providers.
+    Requests are tagged via llm_request_context() with a RequestPriority class and
+    the issuing agent. Free slots go to the highest class first (waiting requests
+    are promoted one class per LLM_SCHEDULER_AGING_SECONDS so background work never
+    starves), and round-robin across agents within a class. With
+    LLM_SCHEDULER_PREEMPTION a higher-priority request may take over a slot that was
+    granted to a lower-priority request which has not started yet. With
+    LLM_SCHEDULER_ADAPTIVE each endpoint's limit moves between 1 and
+    LLM_SCHEDULER_MAX_LIMIT_FACTOR x the configured limit based on observed latency;
+    the default factor of 1.0 keeps the configured limit as a hard cap. Endpoints of
+    one provider family share a group whose total concurrency never exceeds that same
+    cap, as the old per-provider semaphores guaranteed.
+    """
+
+    def __init__(self):
+        self._endpoints: Dict[str, _EndpointScheduler] = {}
+        self._groups: Dict[str, _ConcurrencyGroup] = {}
+
+    def _get_group(self, name: str, configured_limit: int, loop: asyncio.AbstractEventLoop) -> _ConcurrencyGroup:
+        group = self._groups.get(name)
+        if group is None or group.loop is not loop:
+            group = _ConcurrencyGroup(name, configured_limit, loop)
+            self._groups[name] = group
+        return group
+
+    def _get_endpoint(self, key: str, configured_limit: int, group_name: str) -> _EndpointScheduler:
+        loop = asyncio.get_running_loop()
+        endpoint = self._endpoints.get(key)
+        if endpoint is None or endpoint.loop is not loop:
+            group = self._get_group(group_name, configured_limit, loop)
+            endpoint = _EndpointScheduler(key, configured_limit, group)
+            group.endpoints[key] = endpoint
+            self._endpoints[key] = endpoint
+            logger.info(f"RequestScheduler: Created scheduler for '{key}' (limit={endpoint.limit}, max={endpoint.max_limit}, "
+                        f"group='{group.name}' limit={group.limit}, adaptive={settings.LLM_SCHEDULER_ADAPTIVE}, "
+                        f"preemption={settings.LLM_SCHEDULER_PREEMPTION}).")
+        return endpoint
+
+    def slot(self, key: str, configured_limit: int, group: Optional[str] = None) -> _SchedulerSlot:
+        """
+        Usage: async with llm_scheduler.slot(key, limit, group) as slot: ... slot.record_latency(t)
+        Endpoints sharing a group (default: the key itself) share one hard cap of limit x MAX_LIMIT_FACTOR.
+        """
+        return _SchedulerSlot(self, key, configured_limit, group or key)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Returns per-endpoint limits, queue depths, wait times and latency estimates."""
+        metrics: Dict[str, Dict[str, Any]] = {}
+        for key, endpoint in self._endpoints.items():
+            classes: Dict[str, Dict[str, Any]] = {}
+            for priority in RequestPriority:
+                stats = endpoint.stats[priority]
+                classes[priority.name.lower()] = {
+                    "queued": sum(len(dq) for dq in endpoint.queues[priority].values()),
+                    "requests": stats.requests,
+                    "avg_wait_ms": round(stats.total_wait / stats.requests * 1000, 1) if stats.requests else 0.0,
+                    "max_wait_ms": round(stats.max_wait * 1000, 1),
+                    "preempted": stats.preempted,
+                }
+            metrics[key] = {
+                "limit": endpoint.limit,
+                "configured_limit": endpoint.configured_limit,
+                "max_limit": endpoint.max_limit,
+                "active": endpoint.active,
+                "queued": endpoint.queued(),
+                "group": endpoint.group.name,
+                "group_limit": endpoint.group.limit,
+                "group_active": endpoint.group.active,
+                "latency_ewma_ms": round(endpoint.latency_ewma * 1000, 1) if endpoint.latency_ewma is not None else None,
+                "latency_baseline_ms": round(endpoint.latency_baseline * 1000, 1) if endpoint.latency_baseline is not None else None,
+                "latency_samples": endpoint.latency_samples,
+                "limit_increases": endpoint.limit_increases,
+                "limit_decreases": endpoint.limit_decreases,
+                "classes": classes,
+            }
+        return metrics
+
+
+# --- Singleton Instance ---
+llm_scheduler = LLMRequestScheduler()
+# END OF FILE src/llm_providers/request_scheduler.py
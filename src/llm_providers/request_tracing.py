@@ -0,0 +1,111 @@
+# START OF FILE src/llm_providers/request_tracing.py
+import json
+import logging
+import logging.handlers
+import random
+from pathlib import Path
+from typing import Any, Callable, List, Union
+
+from src.config.settings import settings, BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+TRACE_LOGGER_NAME = "src.llm_providers.trace"
+MESSAGE_PREVIEW_CHARS = 200
+
+
+class RequestTracer:
+    """
+    Provider-wide, lazy request tracing for LLM payloads.
+
+    Payload dumps are only serialized when a trace sink is active: either the
+    dedicated rotating trace file (LLM_TRACE_FILE) or the main log at DEBUG level.
+    Requests are sampled by LLM_TRACE_SAMPLE_RATE and each dump is capped at
+    LLM_TRACE_MAX_CHARS, so tracing never costs event-loop time when it is off.
+
+    Usage: decide once per request with should_trace(), then call the trace_*
+    methods only inside that branch.
+    """
+
+    def __init__(self):
+        self._trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+        self._file_sink_configured = False
+        self._file_sink_active = False
+
+    def _ensure_file_sink(self):
+        if self._file_sink_configured:
+            return
+        self._file_sink_configured = True
+        if not settings.LLM_TRACE_FILE:
+            return
+        trace_path = Path(settings.LLM_TRACE_FILE)
+        if not trace_path.is_absolute():
+            trace_path = BASE_DIR / "logs" / trace_path
+        try:
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                trace_path,
+                maxBytes=settings.LLM_TRACE_FILE_MAX_BYTES,
+                backupCount=settings.LLM_TRACE_FILE_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            handler.setLevel(logging.DEBUG)
+            self._trace_logger.addHandler(handler)
+            self._trace_logger.setLevel(logging.DEBUG)
+            self._trace_logger.propagate = False # Keep payload dumps out of the main log
+            self._file_sink_active = True
+            logger.info(f"RequestTracer: Writing LLM request traces to rotating file {trace_path}.")
+        except Exception as e:
+            logger.error(f"RequestTracer: Could not open trace file '{trace_path}': {e}. Falling back to main log at DEBUG.")
+
+    def is_enabled(self) -> bool:
+        """True if any trace sink would actually record a dump."""
+        if not settings.LLM_TRACE_ENABLED:
+            return False
+        self._ensure_file_sink()
+        return self._file_sink_active or self._trace_logger.isEnabledFor(logging.DEBUG)
+
+    def should_trace(self) -> bool:
+        """Sampling decision for one request. Cheap when tracing is disabled."""
+        if not self.is_enabled():
+            return False
+        rate = settings.LLM_TRACE_SAMPLE_RATE
+        return rate >= 1.0 or random.random() < rate
+
+    def _cap(self, text: str) -> str:
+        max_chars = settings.LLM_TRACE_MAX_CHARS
+        if max_chars > 0 and len(text) > max_chars:
+            return f"{text[:max_chars]}\n... [trace truncated: {len(text) - max_chars} more chars]"
+        return text
+
+    def trace_payload(self, source: str, model: str, payload: Union[Any, Callable[[], Any]], label: str = "payload"):
+        """Writes a size-capped JSON dump of payload. Accepts the payload itself or a zero-arg factory."""
+        try:
+            data = payload() if callable(payload) else payload
+            dumped = json.dumps(data, indent=2, default=str)
+        except Exception as e:
+            dumped = f"[Unserializable {label}: {type(e).__name__}: {e}]"
+        self._trace_logger.debug(f"{source} '{model}': {label}:\n{self._cap(dumped)}")
+
+    def trace_messages(self, source: str, model: str, messages: List[dict]):
+        """Writes one preview line per message (role, truncated content, tool call metadata)."""
+        lines = [f"{source} '{model}': messages (length {len(messages)}):"]
+        for i, msg in enumerate(messages):
+            content = str(msg.get('content'))
+            line = f"  [{i}] Role: {msg.get('role')}, Content: {content[:MESSAGE_PREVIEW_CHARS]}{'...' if len(content) > MESSAGE_PREVIEW_CHARS else ''}"
+            for key, label in (('tool_calls', 'ToolCalls'), ('tool_results_json', 'ToolResults')):
+                value = msg.get(key)
+                if value:
+                    try: line += f", {label}: {json.dumps(value, default=str)[:MESSAGE_PREVIEW_CHARS]}"
+                    except Exception: line += f", {label}: [UnserializableData:{type(value).__name__}]"
+            if msg.get('role') == 'tool':
+                if 'name' in msg: line += f", ToolName: {msg['name']}"
+                if 'tool_call_id' in msg: line += f", ToolCallID: {msg['tool_call_id']}"
+            lines.append(line)
+        self._trace_logger.debug(self._cap("\n".join(lines)))
+
+
+# --- Singleton Instance ---
+request_tracer = RequestTracer()
+# END OF FILE src/llm_providers/request_tracing.py
@@ -83,6 +83,11 @@ from src.config.model_registry import DEFAULT_OLLAMA_PORT
 # --- Import Database Manager ---
 from src.core.database_manager import db_manager, close_db_connection # Import manager and close function
 
+# --- Import shared LLM HTTP transport pool ---
+from src.llm_providers.http_transport import http_transport_pool
+from src.utils.workspace_snapshot import workspace_snapshot
+from src.tools.task_index import task_index
+
 # --- Global placeholder for the manager and proxy process ---
 agent_manager_instance: Optional[AgentManager] = None
 ollama_proxy_process: Optional[subprocess.Popen] = None
@@ -170,7 +175,17 @@ async def lifespan(app: FastAPI):
     else:
             logger.warning("Lifespan: AgentManager instance not found in app.state during shutdown.")
 
-    # 2. Close Database Connection Pool (Important: Do this *after* AgentManager cleanup)
+    # 2. Close pooled LLM HTTP transports (after providers are done streaming)
+    logger.info("Lifespan: Closing shared LLM HTTP transport pool...")
+    try:
+        await http_transport_pool.close_all()
+        logger.info("Lifespan: LLM HTTP transport pool closed.")
+    except Exception as e:
+        logger.error(f"Lifespan: Error closing LLM HTTP transport pool: {e}", exc_info=True)
+    workspace_snapshot.close()
+    task_index.close()
+
+    # 3. Close Database Connection Pool (Important: Do this *after* AgentManager cleanup)
     logger.info("Lifespan: Closing database connection pool...")
     try:
         await close_db_connection() # Call the close function from database_manager
@@ -31,7 +31,7 @@ from typing import Any, Dict, List, Optional
 import aiofiles
 import aiohttp
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 
 logger = logging.getLogger(__name__)
 
@@ -461,6 +461,9 @@ class AssetSearchTool(BaseTool):
     # execute
     # ------------------------------------------------------------------
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS if (tool_args.get("action") or "").strip().lower() in ("list_sources", "search") else ToolEffects()
+
     async def execute(
         self,
         agent_id: str,
@@ -1,5 +1,6 @@
 # START OF FILE src/tools/base.py
 from abc import ABC, abstractmethod
+import posixpath
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from pathlib import Path
@@ -13,6 +14,46 @@ class ToolParameter(BaseModel):
     required: bool = Field(default=True, description="Whether the parameter is required.")
     aliases: List[str] = Field(default_factory=list, description="A list of semantic aliases for this parameter allowing auto-mapping.")
 
+# Tool Call Effects (used to run independent tool calls of one turn concurrently)
+class ToolEffects(BaseModel):
+    """
+    What one tool call touches. Resource keys are '<namespace>:<path>' (e.g. 'fs:src/app.py',
+    'task:<uuid>', 'kb:'); paths nest on '/', and an empty path covers the whole namespace.
+    A write with no resources is exclusive: it conflicts with every other call.
+    """
+    mode: str = Field(default="write", description="'read' or 'write'.")
+    resources: List[str] = Field(default_factory=list, description="Resource keys the call reads or writes.")
+
+    @property
+    def exclusive(self) -> bool:
+        return self.mode != "read" and not self.resources
+
+READ_EFFECTS = ToolEffects(mode="read") # Reads nothing that calls of the same turn can write (e.g. remote APIs)
+
+
+def _resource_keys_overlap(a: str, b: str) -> bool:
+    namespace_a, _, path_a = a.partition(":")
+    namespace_b, _, path_b = b.partition(":")
+    if namespace_a != namespace_b:
+        return False
+    return not path_a or not path_b or path_a == path_b or path_a.startswith(path_b + "/") or path_b.startswith(path_a + "/")
+
+
+def effects_conflict(a: ToolEffects, b: ToolEffects) -> bool:
+    """True if two calls must not run concurrently (and so keep their original order)."""
+    if a.exclusive or b.exclusive:
+        return True
+    if a.mode == "read" and b.mode == "read":
+        return False
+    return any(_resource_keys_overlap(key_a, key_b) for key_a in a.resources for key_b in b.resources)
+
+
+def normalize_resource_path(path: Any) -> str:
+    """Normalizes a workspace-relative path for resource keys ('' for the workspace root)."""
+    normalized = posixpath.normpath(str(path).strip().replace("\\", "/")).lstrip("/")
+    return "" if normalized in (".", "") else normalized
+
+
 # Abstract Base Class for Tools
 class BaseTool(ABC):
     """
@@ -68,6 +109,15 @@ class BaseTool(ABC):
         """
         pass
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        """
+        Declares what a call with these arguments reads or writes, so the cycle handler can
+        run independent calls of one turn concurrently. Called before execution with the raw
+        arguments. The default is an exclusive write (the call runs alone, in order);
+        override for tools or actions that only read.
+        """
+        return ToolEffects()
+
     def get_schema(self) -> Dict[str, Any]:
         """Returns a dictionary describing the tool's schema (name, description, parameters)."""
         return {
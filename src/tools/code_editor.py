@@ -8,6 +8,7 @@ import re
 
 from src.tools.base import BaseTool, ToolParameter
 from src.config.settings import settings
+from src.utils.workspace_snapshot import workspace_snapshot
 from diff_match_patch import diff_match_patch
 
 logger = logging.getLogger(__name__)
@@ -317,6 +318,7 @@ class CodeEditorTool(BaseTool):
             
             # Save if all success
             await asyncio.to_thread(abs_path.write_text, content, encoding="utf-8")
+            workspace_snapshot.invalidate(abs_path)
             return {
                 "status": "success",
                 "message": f"Successfully applied {successful} edits to '{filename}'."
@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 import subprocess
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, ToolEffects, normalize_resource_path
 from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -22,6 +22,9 @@ class CodebaseSearchTool(BaseTool):
         ToolParameter(name="scope", type="string", description="Target scope: 'private', 'shared', or 'projects'. Defaults to 'shared'.", required=False),
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return ToolEffects(mode="read", resources=[f"fs:{normalize_resource_path(tool_args.get('path') or '.')}"])
+
     async def execute(self, agent_id: str, agent_sandbox_path: Path, project_name: Optional[str] = None, session_name: Optional[str] = None, **kwargs: Any) -> Any:
         query = kwargs.get("query")
         if not query:
@@ -8,6 +8,7 @@ import os
 import signal
 
 from src.tools.base import BaseTool, ToolParameter
+from src.utils.workspace_snapshot import workspace_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -234,6 +235,9 @@ class CommandExecutionTool(BaseTool):
                     "message": f"Command execution timed out after {timeout} seconds. Interactive commands (like nano, vim, prompts) are not supported. If you meant to start a server or a long-running process, you MUST use the `&` symbol to background it. For example: `python server.py &` or `npm start &`."
                 }
                 
+            # Commands can create/remove files anywhere under cwd
+            workspace_snapshot.invalidate(cwd_path)
+
             stdout_str = stdout_bytes.decode('utf-8', errors='replace')
             stderr_str = stderr_bytes.decode('utf-8', errors='replace')
             
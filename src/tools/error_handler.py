@@ -30,7 +30,7 @@ class ToolErrorHandler:
         
         # Common action corrections across tools
         self.global_action_corrections = {
-            'search': ['search_knowledge', 'search_agent_thoughts'],
+            'search': ['search_knowledge', 'semantic_search', 'search_agent_thoughts'],
             'save': ['save_knowledge', 'write', 'save_file'],
             'store': ['save_knowledge', 'write'],
             'find': ['search_knowledge', 'search', 'list'],
@@ -15,7 +15,7 @@ from src.tools.base import BaseTool
 from src.tools.manage_team import ManageTeamTool
 from src.agents.constants import AGENT_TYPE_ADMIN, AGENT_TYPE_PM, AGENT_TYPE_WORKER, WORKER_STATE_DECOMPOSE, WORKER_STATE_REPORT, WORKER_STATE_WAIT, PM_STATE_BUILD_TEAM_TASKS
 from src.tools.project_management import ProjectManagementTool
-from src.api.websocket_manager import broadcast
+from src.api.websocket_manager import broadcast_event
 from src.tools.error_handler import tool_error_handler, ErrorType
 
 
@@ -423,6 +423,13 @@ class ToolExecutor:
         
         return fallback_response
 
+    @staticmethod
+    async def _emit_event(deferred_events: Optional[List[Dict[str, Any]]], event: Dict[str, Any]):
+        if deferred_events is not None:
+            deferred_events.append(event)
+        else:
+            await broadcast_event(event)
+
     async def execute_tool(
         self,
         agent_id: str,
@@ -431,8 +438,14 @@ class ToolExecutor:
         tool_args: Dict[str, Any], 
         project_name: Optional[str] = None, 
         session_name: Optional[str] = None,  
-        manager: Optional[Any] = None # Type hint as 'AgentManager' if possible, else Any
+        manager: Optional[Any] = None, # Type hint as 'AgentManager' if possible, else Any
+        deferred_events: Optional[List[Dict[str, Any]]] = None
     ) -> Any:
+        """
+        Runs one tool call. deferred_events marks a speculative run (a read prefetched before the
+        agent cycle reaches the call): the tool_execution_* UI events are appended to it for the
+        caller to publish once the call is actually consumed, and the agent's state is left alone.
+        """
         # Enhanced logging for tool execution lifecycle
         execution_id = f"{agent_id}_{tool_name}_{hash(str(tool_args))}_{int(time.time())}"[-12:]
         logger.info(f"[TOOL_EXEC_START] ID:{execution_id} | Tool:'{tool_name}' | Agent:'{agent_id}' | Args:{tool_args}")
@@ -465,14 +478,14 @@ class ToolExecutor:
 
         # Emit WebSocket event for tool execution start
         try:
-            await broadcast(json.dumps({
+            await self._emit_event(deferred_events, {
                 "type": "tool_execution_start",
                 "agent_id": agent_id,
                 "tool_name": tool_name,
                 "tool_args": tool_args,
                 "execution_id": execution_id,
                 "timestamp": time.time()
-            }))
+            })
         except Exception as e:
             logger.warning(f"Failed to broadcast tool_execution_start event: {e}")
         
@@ -700,7 +713,7 @@ class ToolExecutor:
             self._update_execution_stats(success=success, retried=retry_was_used)
             
             # Handle state restoration
-            if original_state and current_agent_instance_for_tool_call and \
+            if deferred_events is None and original_state and current_agent_instance_for_tool_call and \
                hasattr(current_agent_instance_for_tool_call, 'state') and \
                current_agent_instance_for_tool_call.state != original_state:
                 logger.debug(f"ToolExecutor: Restoring original state '{original_state}' for agent '{agent_id}' after tool execution.")
@@ -712,7 +725,7 @@ class ToolExecutor:
                 
                 # Emit WebSocket event for failed tool execution
                 try:
-                    await broadcast(json.dumps({
+                    await self._emit_event(deferred_events, {
                         "type": "tool_execution_complete",
                         "agent_id": agent_id,
                         "tool_name": tool_name,
@@ -720,7 +733,7 @@ class ToolExecutor:
                         "success": False,
                         "error_message": error_message[:200],  # Truncate for event
                         "timestamp": time.time()
-                    }))
+                    })
                 except Exception as e:
                     logger.warning(f"Failed to broadcast tool_execution_complete (failure) event: {e}")
                 
@@ -755,7 +768,7 @@ class ToolExecutor:
                     else: 
                         result_summary = result[:200]
                 
-                await broadcast(json.dumps({
+                await self._emit_event(deferred_events, {
                     "type": "tool_execution_complete",
                     "agent_id": agent_id,
                     "tool_name": tool_name,
@@ -763,7 +776,7 @@ class ToolExecutor:
                     "success": True,
                     "result_summary": result_summary,
                     "timestamp": time.time()
-                }))
+                })
             except Exception as e:
                 logger.warning(f"Failed to broadcast tool_execution_complete event: {e}")
             
@@ -843,7 +856,7 @@ class ToolExecutor:
             self._update_execution_stats(success=False)
             
             # Restore state on critical error
-            if original_state and current_agent_instance_for_tool_call and \
+            if deferred_events is None and original_state and current_agent_instance_for_tool_call and \
                hasattr(current_agent_instance_for_tool_call, 'state'): 
                 logger.debug(f"ToolExecutor: Restoring original state '{original_state}' after critical error for agent '{agent_id}'")
                 current_agent_instance_for_tool_call.state = original_state
@@ -12,11 +12,27 @@ from diff_match_patch import diff_match_patch # Added for search_replace_block
 import git # Added for git integration
 from git.exc import InvalidGitRepositoryError, GitCommandError
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, ToolEffects, normalize_resource_path
 from src.config.settings import settings # For PROJECTS_BASE_DIR
+from src.utils.workspace_snapshot import workspace_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Actions that can change the directory tree (invalidate the cached workspace snapshot)
+WORKSPACE_MUTATING_ACTIONS = {"write", "append", "insert_lines", "replace_lines", "find_replace", "regex_replace",
+                              "search_replace_block", "mkdir", "delete", "copy", "move", "rename",
+                              "git_checkout", "git_pull", "git_init"}
+
+# Effect declarations for concurrent tool scheduling (aliases as auto-corrected in execute)
+FS_READ_ACTIONS = {"read", "read_file", "read_with_lines", "exists", "file_exists", "check_exists", "stat", "file_info"}
+FS_LIST_ACTIONS = {"list", "list_files", "list_directory", "tree", "tree_view", "recursive_list", "find_files"}
+FS_REPO_READ_ACTIONS = {"git_status", "git_diff", "git_log", "status", "diff", "log"}
+FS_PATH_WRITE_ACTIONS = {"write", "write_file", "create_file", "create", "new_file", "save_file", "save", "append",
+                         "insert_lines", "insert_line", "add_lines", "add_line", "replace_lines", "replace_line",
+                         "find_replace", "regex_replace", "search_replace_block", "mkdir", "create_directory",
+                         "create_folder", "make_directory", "make_dir", "delete", "delete_file", "remove_file", "remove"}
+FS_MOVE_ACTIONS = {"copy", "move", "move_file", "rename", "rename_file"}
+
 class FileSystemTool(BaseTool):
     """
     Tool for reading, writing, listing files/directories, creating directories,
@@ -210,6 +226,31 @@ class FileSystemTool(BaseTool):
                 return v
         return None
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        """Reads and writes are keyed by path; git actions other than status/diff/log run exclusively."""
+        action = tool_args.get("action")
+        _fo = self._first_of
+        path = _fo(tool_args.get("filename"), tool_args.get("filepath"), tool_args.get("file"), tool_args.get("path"), tool_args.get("file_path"),
+                   tool_args.get("file_name"), tool_args.get("target_file"), tool_args.get("name"), tool_args.get("dir"), tool_args.get("directory"),
+                   tool_args.get("folder"), tool_args.get("target_dir"))
+        if action in FS_REPO_READ_ACTIONS:
+            return ToolEffects(mode="read", resources=["fs:"])
+        if action in FS_LIST_ACTIONS:
+            return ToolEffects(mode="read", resources=[f"fs:{normalize_resource_path(path or '.')}"])
+        if not isinstance(path, str) or not path.strip():
+            return ToolEffects()
+        key = f"fs:{normalize_resource_path(path)}"
+        if action in FS_READ_ACTIONS:
+            return ToolEffects(mode="read", resources=[key])
+        if action in FS_PATH_WRITE_ACTIONS:
+            return ToolEffects(mode="write", resources=[key])
+        if action in FS_MOVE_ACTIONS:
+            destination = tool_args.get("destination_path")
+            if isinstance(destination, str) and destination.strip():
+                return ToolEffects(mode="write", resources=[key, f"fs:{normalize_resource_path(destination)}"])
+            return ToolEffects(mode="write", resources=[f"fs:{normalize_resource_path(os.path.dirname(normalize_resource_path(path)) or '.')}"])
+        return ToolEffects()
+
     async def execute(
         self,
         agent_id: str,
@@ -535,6 +576,9 @@ class FileSystemTool(BaseTool):
         if result is None:
             return {"status": "error", "message": "Unknown state in file system tool."} # Should not be reached
 
+        if action in WORKSPACE_MUTATING_ACTIONS and result.get("status") == "success":
+            workspace_snapshot.invalidate(base_path)
+
         # Append auto-correction feedback to successful results so the agent learns
         if auto_corrected_from and result.get("status") == "success":
             correction_note = (
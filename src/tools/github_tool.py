@@ -8,7 +8,7 @@ import base64
 import json
 import time # Added for rate limit logging
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -247,6 +247,9 @@ class GitHubTool(BaseTool):
 
         return all_items
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS if tool_args.get("action") in ("list_repos", "list_files", "read_file") else ToolEffects()
+
     async def execute(
         self,
         agent_id: str,
@@ -1,15 +1,19 @@
 # START OF FILE src/tools/knowledge_base.py
 import asyncio
 import logging
+import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, ToolEffects
 # Import the database manager instance
 from src.core.database_manager import db_manager
 
 logger = logging.getLogger(__name__)
 
+RRF_K = 60 # Reciprocal rank fusion constant for merging semantic and keyword hits
+SEMANTIC_QUERY_MAX_KEYWORDS = 12
+
 class KnowledgeBaseTool(BaseTool):
     """
     Tool for interacting with the long-term knowledge base stored in the database.
@@ -22,7 +26,8 @@ class KnowledgeBaseTool(BaseTool):
     description: str = (
         "Interacts with the long-term central project knowledge base. Actions: "
         "'save_knowledge' (saves architecture, APIs, or learnings with keywords), "
-        "'search_knowledge' (searches for project knowledge using keywords), "
+        "'search_knowledge' (ranked full-text search of project knowledge by keywords), "
+        "'semantic_search' (finds knowledge and past agent thoughts by meaning from a free-text query), "
         "'search_agent_thoughts' (searches past thoughts). "
         "All agents MUST use this tool to share information, APIs, architectures, and updates with the rest of the team instead of using a whiteboard."
     )
@@ -30,7 +35,7 @@ class KnowledgeBaseTool(BaseTool):
         ToolParameter(
             name="action",
             type="string",
-            description="The operation to perform: 'save_knowledge', 'search_knowledge', or 'search_agent_thoughts'.",
+            description="The operation to perform: 'save_knowledge', 'search_knowledge', 'semantic_search', or 'search_agent_thoughts'.",
             required=True,
         ),
         # Parameters for save_knowledge
@@ -59,6 +64,12 @@ class KnowledgeBaseTool(BaseTool):
             description="Comma-separated keywords to search for in the knowledge base. Required for 'search_knowledge'.",
             required=False, # Dynamically required
         ),
+        ToolParameter(
+            name="match_mode",
+            type="string",
+            description="Optional: 'all' (default) returns items matching every keyword, 'any' items matching at least one. Keywords also match longer words they prefix.",
+            required=False,
+        ),
         ToolParameter(
             name="min_importance",
             type="float",
@@ -71,6 +82,19 @@ class KnowledgeBaseTool(BaseTool):
             description="Optional: Maximum number of results to return for 'search_knowledge' or 'search_agent_thoughts'. Defaults to 5.",
             required=False,
         ),
+        # Parameters for semantic_search
+        ToolParameter(
+            name="query",
+            type="string",
+            description="Free-text description of what you are looking for. Required for 'semantic_search'.",
+            required=False, # Dynamically required
+        ),
+        ToolParameter(
+            name="include_thoughts",
+            type="boolean",
+            description="Optional: Whether 'semantic_search' also returns past agent thoughts. Defaults to true.",
+            required=False,
+        ),
         # Parameters for search_agent_thoughts
         ToolParameter(
             name="agent_identifier",
@@ -86,6 +110,11 @@ class KnowledgeBaseTool(BaseTool):
         ),
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        if tool_args.get("action") in ("search_knowledge", "semantic_search", "search_agent_thoughts"):
+            return ToolEffects(mode="read", resources=["kb:"])
+        return ToolEffects(mode="write", resources=["kb:"]) if tool_args.get("action") == "save_knowledge" else ToolEffects()
+
     async def execute(
         self,
         agent_id: str, # The agent calling the tool (likely admin_ai)
@@ -97,7 +126,7 @@ class KnowledgeBaseTool(BaseTool):
         """Executes the knowledge base action."""
         action = kwargs.get("action")
         logger.info(f"Agent {agent_id} requesting KnowledgeBaseTool action '{action}' with params: {kwargs}")
-        valid_actions = ["save_knowledge", "search_knowledge", "search_agent_thoughts"]
+        valid_actions = ["save_knowledge", "search_knowledge", "semantic_search", "search_agent_thoughts"]
         
         # Check for common mistakes and provide helpful suggestions
         action_suggestions = {
@@ -108,6 +137,8 @@ class KnowledgeBaseTool(BaseTool):
             "lookup": "search_knowledge",
             "retrieve": "search_knowledge",
             "get": "search_knowledge",
+            "semantic": "semantic_search",
+            "recall": "semantic_search",
             "search_thoughts": "search_agent_thoughts",
             "get_thoughts": "search_agent_thoughts"
         }
@@ -187,10 +218,15 @@ class KnowledgeBaseTool(BaseTool):
                     except (ValueError, TypeError):
                         pass
 
+                match_mode = str(kwargs.get("match_mode") or "all").strip().lower()
+                if match_mode not in ("all", "any"):
+                    return {"status": "error", "message": f"Invalid 'match_mode' '{match_mode}'. Use 'all' or 'any'."}
+
                 found_items = await db_manager.search_knowledge(
                     query_keywords=query_keywords,
                     min_importance=min_importance,
-                    max_results=max_results
+                    max_results=max_results,
+                    match_mode=match_mode
                 )
 
                 if not found_items:
@@ -200,6 +236,25 @@ class KnowledgeBaseTool(BaseTool):
                 message = f"Found {len(found_items)} knowledge item(s) matching '{query_keywords_str}'."
                 return {"status": "success", "message": message, "items": items_data}
             
+            elif action == "semantic_search":
+                query = kwargs.get("query") or kwargs.get("query_keywords")
+                if not query or not str(query).strip():
+                    return {"status": "error", "message": "'query' parameter is required for 'semantic_search'."}
+                query = str(query).strip()
+
+                max_results = 5
+                if kwargs.get("max_results"):
+                    try:
+                        max_results = int(kwargs["max_results"])
+                    except (ValueError, TypeError):
+                        pass
+                include_thoughts = str(kwargs.get("include_thoughts", "true")).strip().lower() not in ("false", "0", "no")
+
+                items_data = await self._semantic_search(query, max_results, include_thoughts)
+                if not items_data:
+                    return {"status": "success", "message": f"No knowledge or thoughts found related to '{query}'.", "items": []}
+                return {"status": "success", "message": f"Found {len(items_data)} item(s) related to '{query}'.", "items": items_data}
+
             elif action == "search_agent_thoughts":
                 agent_identifier = kwargs.get("agent_identifier")
                 if not agent_identifier:
@@ -234,6 +289,39 @@ class KnowledgeBaseTool(BaseTool):
 
         return {"status": "error", "message": f"Unexpected execution path in KnowledgeBaseTool for action {action}."}
 
+    async def _semantic_search(self, query: str, max_results: int, include_thoughts: bool) -> List[Dict[str, Any]]:
+        """Runs semantic and keyword (any-match) search concurrently and merges them by reciprocal rank fusion."""
+        keywords = list(dict.fromkeys(word for word in re.findall(r"\w+", query.lower()) if len(word) >= 3))[:SEMANTIC_QUERY_MAX_KEYWORDS]
+        semantic_hits, keyword_hits = await asyncio.gather(
+            db_manager.semantic_search(query, max_results=max_results, include_thoughts=include_thoughts),
+            db_manager.search_knowledge(query_keywords=keywords, max_results=max_results, match_mode="any") if keywords else asyncio.sleep(0, result=[]),
+        )
+
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        def entry_for(source: str, item: Any) -> Dict[str, Any]:
+            key = (source, item.id)
+            if key not in merged:
+                if source == "thought":
+                    data = {"id": item.id, "source": "thought", "agent_id": item.agent_id, "thought": item.content,
+                            "timestamp": item.timestamp.strftime('%Y-%m-%d %H:%M:%S') if item.timestamp else 'N/A'}
+                else:
+                    data = {"id": item.id, "source": "knowledge", "score": f"{item.importance_score or 0.0:.2f}", "keywords": item.keywords, "summary": item.summary}
+                merged[key] = {"data": data, "rrf": 0.0, "matched_by": []}
+            return merged[key]
+
+        for rank, (source, item, similarity) in enumerate(semantic_hits):
+            entry = entry_for(source, item)
+            entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+            entry["matched_by"].append("semantic")
+            entry["data"]["similarity"] = f"{similarity:.2f}"
+        for rank, item in enumerate(keyword_hits):
+            entry = entry_for("knowledge", item)
+            entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+            entry["matched_by"].append("keyword")
+
+        ranked = sorted(merged.values(), key=lambda entry: entry["rrf"], reverse=True)[:max_results]
+        return [dict(entry["data"], matched_by=entry["matched_by"]) for entry in ranked]
+
     def get_detailed_usage(self, agent_context: Optional[Dict[str, Any]] = None, sub_action: Optional[str] = None) -> str:
         """Returns detailed usage instructions for the KnowledgeBaseTool."""
         
@@ -242,7 +330,7 @@ class KnowledgeBaseTool(BaseTool):
 **Description:** Interacts with the long-term knowledge base for saving and searching information across sessions and agents.
 
 **CRITICAL - Valid Actions Only:** The following actions are the ONLY valid actions. Do NOT use variations like 'search' or 'save':
-- save_knowledge, search_knowledge, search_agent_thoughts
+- save_knowledge, search_knowledge, semantic_search, search_agent_thoughts
 
 **COMMON MISTAKES TO AVOID:**
 * ❌ DON'T use 'search' - use 'search_knowledge' instead
@@ -268,11 +356,21 @@ Saves architecture decisions, API specs, or learnings with keywords for the team
         elif sub_action == "search_knowledge" or sub_action in ["search", "find", "query"]:
             return base_usage + """
 **Action: search_knowledge**
-Searches for project knowledge and architectures using keywords.
-   * `<query_keywords>` (string, required): Comma-separated keywords to search for.
+Searches project knowledge (keywords and summaries) and returns the most relevant items first.
+   * `<query_keywords>` (string, required): Comma-separated keywords to search for. A keyword also matches words it prefixes (e.g. 'auth' finds 'authentication').
+   * `<match_mode>` (string, optional): 'all' (default) requires every keyword, 'any' at least one.
    * `<min_importance>` (float, optional): Minimum importance score for results.
    * `<max_results>` (integer, optional): Maximum results. Defaults to 5.
    * Example: `{"action": "search_knowledge", "query_keywords": "architecture,api"}`
+"""
+        elif sub_action == "semantic_search" or sub_action in ["semantic", "recall"]:
+            return base_usage + """
+**Action: semantic_search**
+Finds knowledge items and past agent thoughts related to a free-text query, even when they use different words. Keyword matches are merged in.
+   * `<query>` (string, required): What you are looking for, in plain words.
+   * `<include_thoughts>` (boolean, optional): Also return past agent thoughts. Defaults to true.
+   * `<max_results>` (integer, optional): Maximum results. Defaults to 5.
+   * Example: `{"action": "semantic_search", "query": "how do users log in to the backend"}`
 """
         elif sub_action == "search_agent_thoughts":
             return base_usage + """
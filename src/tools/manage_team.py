@@ -2,7 +2,7 @@
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, ToolEffects
 import logging
 import json # For potentially validating JSON config strings later
 
@@ -114,6 +114,11 @@ class ManageTeamTool(BaseTool):
         # --- End NEW Parameter ---
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        if tool_args.get("action") in ("list_agents", "list_teams", "get_agent_details"):
+            return ToolEffects(mode="read", resources=["team:"])
+        return ToolEffects()
+
     async def execute(self, agent_id: str, agent_sandbox_path: Path, project_name: Optional[str] = None, session_name: Optional[str] = None, **kwargs: Any) -> Any:
         """
         Validates parameters based on the specific management action requested.
@@ -5,7 +5,7 @@ from typing import Dict, Any, Optional, TYPE_CHECKING # Import TYPE_CHECKING
 import re
 import json
 import asyncio
-from src.api.websocket_manager import broadcast
+from src.api.websocket_manager import broadcast_event
 
 # Import tasklib safely
 try:
@@ -18,12 +18,16 @@ except ImportError:
     TASKLIB_AVAILABLE = False
 
 
-from .base import BaseTool, ToolParameter
+from .base import BaseTool, ToolParameter, ToolEffects
+from .task_index import task_index, view_in_project
 from src.config.settings import BASE_DIR
 from typing import List
 
 logger = logging.getLogger(__name__)
 
+# Actions that change tasks; cached task views are invalidated after each of them
+TASK_MUTATING_ACTIONS = {"add_task", "add_tasks", "modify_task", "modify_tasks", "complete_task"}
+
 class ProjectManagementTool(BaseTool):
     name = "project_management"
     auth_level: str = "worker"
@@ -43,6 +47,7 @@ class ProjectManagementTool(BaseTool):
         ToolParameter(name="depends", type="str", required=False, description="Dependency task UUID."),
         ToolParameter(name="assignee_agent_id", type="str", required=False, description="Agent ID for assignment."),
         ToolParameter(name="dry_run", type="boolean", required=False, description="If true, simulates the action without saving to the database. Useful to verify complex state changes."),
+        ToolParameter(name="tasks", type="list", required=False, description="For add_tasks/modify_tasks: list of task objects, each taking the same parameters as add_task/modify_task."),
     ]
 
     def __init__(self, project_name: Optional[str] = None, session_name: Optional[str] = None):
@@ -50,38 +55,12 @@ class ProjectManagementTool(BaseTool):
             logger.error("Tasklib library is not installed. ProjectManagementTool will not function.")
 
     def _get_taskwarrior_instance(self, project_name: str, session_name: str) -> Any:
-        if not TASKLIB_AVAILABLE:
-            return None
-        data_path = BASE_DIR / "projects" / project_name / session_name / "task_data"
-        try:
-            data_path.mkdir(parents=True, exist_ok=True)
-            taskrc_path = data_path / '.taskrc'
-            if not taskrc_path.exists():
-                with open(taskrc_path, 'w') as f:
-                    f.write("uda.assignee.type=string\nuda.assignee.label=Assignee\n")
-                    f.write("uda.task_progress.type=string\nuda.task_progress.label=Task Progress\n")
-            else:
-                # Patch existing taskrc
-                with open(taskrc_path, 'r') as f:
-                    content = f.read()
-                if "uda.task_progress.type" not in content:
-                    with open(taskrc_path, 'a') as f:
-                        f.write("\nuda.task_progress.type=string\nuda.task_progress.label=Task Progress\n")
-            return TaskWarrior(data_location=str(data_path), taskrc_location=str(taskrc_path))
-        except Exception as e:
-             logger.error(f"Failed to initialize TaskWarrior at {data_path}: {e}", exc_info=True)
-             return None
+        # One shared handle per session (see TaskIndexService)
+        return task_index.get_taskwarrior(project_name, session_name)
 
     def _load_aliases(self, project_name: str, session_name: str) -> Dict[str, str]:
-        import json
-        alias_path = BASE_DIR / "projects" / project_name / session_name / "task_data" / "task_aliases.json"
-        if alias_path.exists():
-            try:
-                with open(alias_path, "r") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+        # Copy of the cached map: callers add entries before calling _save_aliases
+        return dict(task_index.get_aliases(project_name, session_name))
 
     def _save_aliases(self, project_name: str, session_name: str, aliases: Dict[str, str]):
         import json
@@ -89,9 +68,17 @@ class ProjectManagementTool(BaseTool):
         try:
             with open(alias_path, "w") as f:
                 json.dump(aliases, f, indent=2)
+            task_index.set_aliases(project_name, session_name, aliases)
         except Exception as e:
             logger.error(f"Failed to save aliases: {e}")
 
+    def _run_task_write(self, func, tw, project_name: str, session_name: str, *args: Any, with_views: bool = False) -> Dict[str, Any]:
+        """Worker-thread entry for task writes: loads the alias map (and the current tasks) right before func runs."""
+        aliases = self._load_aliases(project_name, session_name)
+        if with_views:
+            args = (*args, task_index.export_views_sync(tw))
+        return func(tw, aliases, project_name, session_name, *args)
+
     def _map_task_progress(self, raw_progress: Optional[str]) -> tuple[str, str]:
         """
         Maps a varied text description to a standard 'task_progress' UDA value
@@ -124,6 +111,15 @@ class ProjectManagementTool(BaseTool):
         # Fallback if unknown but provided
         return progress_norm, "pending"
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        # Aliases, numeric ids and UUIDs can all name the same task, so task writes claim the whole task list
+        action = tool_args.get("action")
+        if action in ("list_tasks", "get_dependency_graph"):
+            return ToolEffects(mode="read", resources=["task:"])
+        if action in TASK_MUTATING_ACTIONS:
+            return ToolEffects(mode="write", resources=["task:"])
+        return ToolEffects()
+
     async def execute(
         self,
         agent_id: str,
@@ -169,6 +165,10 @@ class ProjectManagementTool(BaseTool):
             "decompose": "add_task",
             "new_task": "add_task", 
             "add": "add_task",
+            "bulk_add_tasks": "add_tasks",
+            "create_tasks": "add_tasks",
+            "bulk_modify_tasks": "modify_tasks",
+            "update_tasks": "modify_tasks",
             "create": "add_task",
             "list": "list_tasks",
             "show": "list_tasks",
@@ -217,12 +217,12 @@ class ProjectManagementTool(BaseTool):
         if not action:
             return {
                 "status": "error", 
-                "message": "Missing required 'action' parameter. Must be one of: add_task, list_tasks, modify_task, complete_task, get_dependency_graph.",
+                "message": "Missing required 'action' parameter. Must be one of: add_task, add_tasks, list_tasks, modify_task, modify_tasks, complete_task, get_dependency_graph.",
                 "error_type": "missing_parameter",
-                "valid_actions": ["add_task", "list_tasks", "modify_task", "complete_task", "get_dependency_graph"]
+                "valid_actions": ["add_task", "add_tasks", "list_tasks", "modify_task", "modify_tasks", "complete_task", "get_dependency_graph"]
             }
         
-        valid_actions = ["add_task", "list_tasks", "modify_task", "complete_task", "get_dependency_graph"]
+        valid_actions = ["add_task", "add_tasks", "list_tasks", "modify_task", "modify_tasks", "complete_task", "get_dependency_graph"]
         if action not in valid_actions:
             if action in action_suggestions:
                 corrected_action = action_suggestions[action]
@@ -252,28 +252,43 @@ class ProjectManagementTool(BaseTool):
         if not tw:
             return {"status": "error", "message": "Failed to initialize TaskWarrior backend."}
 
+        result: Dict[str, Any] = {}
         try:
-            aliases = self._load_aliases(project_name, session_name)
-            
+            # Reads are answered from the session's in-memory task snapshot; writes run on its Taskwarrior worker thread,
+            # which also reads the alias map and the current tasks so concurrent writes cannot interleave
             if action == "add_task":
-                return await self._execute_add_task(tw, aliases, project_name, session_name, agent_id, kwargs)
+                result = await task_index.run(project_name, session_name, self._run_task_write, self._execute_add_task, tw, project_name, session_name, agent_id, kwargs, with_views=True)
+            elif action == "add_tasks":
+                result = await task_index.run(project_name, session_name, self._run_task_write, self._execute_add_tasks, tw, project_name, session_name, agent_id, kwargs, with_views=True)
+            elif action == "modify_tasks":
+                result = await task_index.run(project_name, session_name, self._run_task_write, self._execute_modify_tasks, tw, project_name, session_name, agent_id, kwargs)
             elif action == "list_tasks":
-                return await self._execute_list_tasks(tw, agent_id, kwargs)
+                result = await self._execute_list_tasks(project_name, session_name, agent_id, kwargs)
             elif action == "modify_task":
-                return await self._execute_modify_task(tw, aliases, project_name, session_name, agent_id, kwargs)
+                result = await task_index.run(project_name, session_name, self._run_task_write, self._execute_modify_task, tw, project_name, session_name, agent_id, kwargs)
             elif action == "complete_task":
-                return await self._execute_complete_task(tw, aliases, project_name, session_name, kwargs)
+                result = await task_index.run(project_name, session_name, self._run_task_write, self._execute_complete_task, tw, project_name, session_name, kwargs)
             elif action == "get_dependency_graph":
-                return await self._execute_get_dependency_graph(tw, kwargs)
+                result = await self._execute_get_dependency_graph(project_name, session_name, kwargs)
             else:
-                return {"status": "error", "message": f"Unknown action: '{action}'."}
+                result = {"status": "error", "message": f"Unknown action: '{action}'."}
+            return result
 
         except Exception as e:
             logger.error(f"Error executing ProjectManagementTool action '{action}': {e}", exc_info=True)
             return {"status": "error", "message": f"An unexpected error occurred: {e}"}
+        finally:
+            if action in TASK_MUTATING_ACTIONS:
+                task_index.invalidate(project_name, session_name)
+                if "tasks_changed" in result: # Batch actions
+                    tasks_changed = result["tasks_changed"] > 0
+                else:
+                    tasks_changed = result.get("status") == "success" and not result.get("dry_run") and not result.get("is_duplicate")
+                if tasks_changed:
+                    asyncio.create_task(broadcast_event({"type": "project_tasks_updated", "project_name": project_name, "session_name": session_name}))
 
 
-    async def _execute_add_task(self, tw, aliases, project_name, session_name, agent_id, kwargs):
+    def _execute_add_task(self, tw, aliases, project_name, session_name, agent_id, kwargs, existing_views, persist_aliases=True):
             # Auto-map hallucinated parameter names common with LLMs
             if "task_title" in kwargs and not kwargs.get("title"): kwargs["title"] = kwargs.get("task_title")
             if "task_description" in kwargs and not kwargs.get("description"): kwargs["description"] = kwargs.get("task_description")
@@ -296,28 +311,25 @@ class ProjectManagementTool(BaseTool):
                 return {"status": "error", "message": "Missing 'title' or 'description' for 'add_task'."}
 
             import difflib
-            existing_tasks = tw.tasks.pending()
-            if kwargs.get("project_filter"):
-                existing_tasks = existing_tasks.filter(project=kwargs["project_filter"])
+            existing_tasks = [t for t in existing_views if t['status'] == 'pending' and view_in_project(t, kwargs.get("project_filter"))]
                 
             target_desc_lower = main_desc.lower()
             for t in existing_tasks:
-                existing_desc = (t['description'] or "").lower() if 'description' in t else ""
+                existing_desc = (t['description'] or "").lower()
                 if len(target_desc_lower) < 5 or len(existing_desc) < 5:
                     continue
                 
                 similarity = difflib.SequenceMatcher(None, target_desc_lower, existing_desc).ratio()
                 if similarity > 0.8 or target_desc_lower in existing_desc or existing_desc in target_desc_lower:
                     logger.warning(f"ProjectManagementTool: Prevented duplicate task creation: '{main_desc}' is very similar ({similarity:.2f}) to existing task UUID {t['uuid']}")
-                    depends_list = [dep['uuid'] for dep in t['depends']] if 'depends' in t and t['depends'] else []
                     return {
                         "status": "success",
-                        "message": f"Task skipped to prevent duplication. An existing task ('{t['description'] if 'description' in t else ''}') is >80% similar.",
+                        "message": f"Task skipped to prevent duplication. An existing task ('{t['description'] or ''}') is >80% similar.",
                         "task_uuid": t['uuid'],
-                        "task_id": t['id'] if 'id' in t else 0,
-                        "description": t['description'] if 'description' in t else '',
-                        "assignee": t['assignee'] if 'assignee' in t and t['assignee'] else 'None',
-                        "depends": depends_list,
+                        "task_id": t['id'],
+                        "description": t['description'] or '',
+                        "assignee": t['assignee'] if t['assignee'] else 'None',
+                        "depends": list(t['depends']),
                         "is_duplicate": True
                     }
 
@@ -432,7 +444,6 @@ class ProjectManagementTool(BaseTool):
                 is_dry_run = str(kwargs.get("dry_run")).lower() == "true"
                 if not is_dry_run:
                     task.save()
-                    asyncio.create_task(broadcast(json.dumps({"type": "project_tasks_updated", "project_name": project_name, "session_name": session_name})))
                     
                     # --- DECOMPOSE DEPENDENCY TRANSFER ---
                     manager = kwargs.get("manager")
@@ -457,7 +468,6 @@ class ProjectManagementTool(BaseTool):
                                         if parent_in_deps:
                                             pending_task['depends'].add(task)
                                             pending_task.save()
-                                            asyncio.create_task(broadcast(json.dumps({"type": "project_tasks_updated", "project_name": project_name, "session_name": session_name})))
                                             logger.info(f"ProjectManagementTool: Transferred dependency to sub-task '{task['uuid']}' for dependent task '{pending_task['uuid']}'.")
                             except Exception as e:
                                 logger.warning(f"ProjectManagementTool: Failed to transfer dependencies for parent task '{agent.current_task_id}': {e}")
@@ -484,7 +494,8 @@ class ProjectManagementTool(BaseTool):
                     logger.warning(f"ProjectManagementTool: Ignored 'task_id'={user_task_id} in add_task because it is a UUID format. Aliases should be custom names like 'task_1'.")
                 else:
                     aliases[user_task_id] = task['uuid']
-                    self._save_aliases(project_name, session_name, aliases)
+                    if persist_aliases:
+                        self._save_aliases(project_name, session_name, aliases)
                 
             depends_list = [t['uuid'] for t in (task['depends'] if task['depends'] is not None else [])]
             return {
@@ -498,29 +509,121 @@ class ProjectManagementTool(BaseTool):
                 "dry_run": is_dry_run
             }
 
-    async def _execute_list_tasks(self, tw, agent_id, kwargs):
-            tasks_query = tw.tasks.all()
-            if kwargs.get("project_filter"): tasks_query = tasks_query.filter(project=kwargs["project_filter"])
+    def _parse_batch_items(self, kwargs) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """(task objects, None), or ([], error message) if 'tasks' is not a non-empty list of objects."""
+        items = kwargs.get("tasks")
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except json.JSONDecodeError as e:
+                return [], f"'tasks' must be a JSON list of task objects. Detail: {e}"
+        if not isinstance(items, list) or not items:
+            return [], "Missing or empty 'tasks' list."
+        if not all(isinstance(item, dict) for item in items):
+            return [], "Every entry in 'tasks' must be an object with the same parameters as the single-task action."
+        return items, None
+
+    def _batch_result(self, action, results, tasks_changed, is_dry_run) -> Dict[str, Any]:
+        failed = [r for r in results if r.get("status") != "success"]
+        if not failed:
+            status, summary = "success", f"All {len(results)} task(s) processed"
+        elif len(failed) == len(results):
+            status, summary = "error", f"All {len(results)} task(s) failed"
+        else:
+            status, summary = "partial_success", f"{len(results) - len(failed)} of {len(results)} task(s) processed, {len(failed)} failed"
+        return {
+            "status": status,
+            "message": f"{action}: {summary}{'. (DRY RUN)' if is_dry_run else '.'}",
+            "results": results,
+            "tasks_changed": tasks_changed,
+            "dry_run": is_dry_run
+        }
+
+    def _execute_add_tasks(self, tw, aliases, project_name, session_name, agent_id, kwargs, existing_views):
+            """Adds many tasks in one worker call: one task snapshot, one alias-file write and one UI update."""
+            items, error = self._parse_batch_items(kwargs)
+            if error:
+                return {"status": "error", "message": error}
+
+            is_dry_run = str(kwargs.get("dry_run")).lower() == "true"
+            shared_keys = {key: kwargs[key] for key in ("project_filter", "manager", "dry_run") if key in kwargs}
+            known_views = list(existing_views) # Tasks created earlier in the batch count for duplicate detection
+            aliases_before = dict(aliases)
+            results: List[Dict[str, Any]] = []
+            tasks_changed = 0
+            for item in items:
+                item_kwargs = {**item, **shared_keys}
+                try:
+                    result = self._execute_add_task(tw, aliases, project_name, session_name, agent_id, item_kwargs, known_views, persist_aliases=False)
+                except Exception as e:
+                    logger.error(f"ProjectManagementTool: add_tasks entry failed: {e}", exc_info=True)
+                    result = {"status": "error", "message": f"An unexpected error occurred: {e}"}
+                if item.get("task_id"):
+                    result["alias"] = item["task_id"]
+                results.append(result)
+                if result.get("status") == "success" and not result.get("is_duplicate") and not is_dry_run:
+                    tasks_changed += 1
+                    known_views.append({
+                        "uuid": result["task_uuid"], "id": result["task_id"], "description": result["description"],
+                        "status": "pending", "project": kwargs.get("project_filter"),
+                        "assignee": result.get("assignee"), "depends": result.get("depends", []),
+                    })
+
+            if aliases != aliases_before:
+                self._save_aliases(project_name, session_name, aliases)
+            return self._batch_result("add_tasks", results, tasks_changed, is_dry_run)
+
+    def _execute_modify_tasks(self, tw, aliases, project_name, session_name, agent_id, kwargs):
+            """Applies many modify_task updates in one worker call with a single UI update."""
+            items, error = self._parse_batch_items(kwargs)
+            if error:
+                return {"status": "error", "message": error}
+
+            is_dry_run = str(kwargs.get("dry_run")).lower() == "true"
+            shared_keys = {key: kwargs[key] for key in ("project_filter", "manager", "dry_run") if key in kwargs}
+            results: List[Dict[str, Any]] = []
+            tasks_changed = 0
+            for item in items:
+                try:
+                    result = self._execute_modify_task(tw, aliases, project_name, session_name, agent_id, {**item, **shared_keys})
+                except Exception as e:
+                    logger.error(f"ProjectManagementTool: modify_tasks entry failed: {e}", exc_info=True)
+                    result = {"status": "error", "message": f"An unexpected error occurred: {e}"}
+                results.append(result)
+                if result.get("status") == "success" and not is_dry_run:
+                    tasks_changed += 1
+            return self._batch_result("modify_tasks", results, tasks_changed, is_dry_run)
+
+    async def _execute_list_tasks(self, project_name, session_name, agent_id, kwargs):
+            # Gracefully handle corrupted TaskWarrior data (e.g. malformed tags causing Invalid JSON)
+            try:
+                all_views = await task_index.get_task_views(project_name, session_name)
+            except Exception as tw_err:
+                err_str = str(tw_err)
+                if "Invalid JSON" in err_str or "JSONDecodeError" in err_str:
+                    logger.error(f"ProjectManagementTool: TaskWarrior data corruption detected: {err_str[:200]}")
+                    return {
+                        "status": "error",
+                        "message": "TaskWarrior data contains corrupted entries (likely malformed tags). Total tasks in DB: unknown. Consider modifying the corrupted task's tags to fix this.",
+                        "error_type": "data_corruption"
+                    }
+                raise  # re-raise non-JSON errors
+
+            project_views = [t for t in all_views if view_in_project(t, kwargs.get("project_filter"))]
+            tasks = project_views
             
             # Allow new task_progress_filter or legacy status_filter
             if "task_progress_filter" in kwargs:
-                tasks_query = tasks_query.filter(task_progress=kwargs["task_progress_filter"])
+                tasks = [t for t in tasks if t['task_progress'] == kwargs["task_progress_filter"]]
             elif "status_filter" in kwargs:
                 if kwargs["status_filter"] != "all":
-                    tasks_query = tasks_query.filter(status=kwargs["status_filter"])
+                    tasks = [t for t in tasks if t['status'] == kwargs["status_filter"]]
                 # else: "all" means no status filtering at all
             else:
                 # Default: filter out completed tasks to save tokens
-                tasks_query = tasks_query.pending()
+                tasks = [t for t in tasks if t['status'] == 'pending']
             
-            completed_count = 0
-            try:
-                all_tasks_query = tw.tasks.all()
-                if kwargs.get("project_filter"): 
-                    all_tasks_query = all_tasks_query.filter(project=kwargs["project_filter"])
-                completed_count = len(all_tasks_query.completed())
-            except Exception as e:
-                logger.debug(f"Could not fetch completed tasks count: {e}")
+            completed_count = sum(1 for t in project_views if t['status'] == 'completed')
             
             has_filters = any([
                 kwargs.get("task_progress_filter"),
@@ -535,29 +638,10 @@ class ProjectManagementTool(BaseTool):
             if "assignee_filter" in kwargs: 
                 a_filter = str(kwargs["assignee_filter"]).strip()
                 if a_filter.lower() not in ["none", "null", "unassigned"]:
-                    tasks_query = tasks_query.filter(assignee=a_filter)
+                    tasks = [t for t in tasks if t['assignee'] == a_filter]
             elif agent_id and agent_id.startswith("W"):
                 # Auto-filter for the specific worker if no filter is provided
-                tasks_query = tasks_query.filter(assignee=agent_id)
-            
-            # Gracefully handle corrupted TaskWarrior data (e.g. malformed tags causing Invalid JSON)
-            try:
-                tasks = tasks_query.all()
-            except Exception as tw_err:
-                err_str = str(tw_err)
-                if "Invalid JSON" in err_str or "JSONDecodeError" in err_str:
-                    logger.error(f"ProjectManagementTool: TaskWarrior data corruption detected: {err_str[:200]}")
-                    # Fallback: try fetching without filters to identify scope
-                    try:
-                        raw_count = len(tw.tasks.all())
-                    except Exception:
-                        raw_count = "unknown"
-                    return {
-                        "status": "error",
-                        "message": f"TaskWarrior data contains corrupted entries (likely malformed tags). Total tasks in DB: {raw_count}. Consider modifying the corrupted task's tags to fix this.",
-                        "error_type": "data_corruption"
-                    }
-                raise  # re-raise non-JSON errors
+                tasks = [t for t in tasks if t['assignee'] == agent_id]
             
             if "assignee_filter" in kwargs and str(kwargs["assignee_filter"]).strip().lower() in ["none", "null", "unassigned"]:
                 tasks = [t for t in tasks if t['assignee'] is None or str(t['assignee']).strip() == ""]
@@ -576,7 +660,7 @@ class ProjectManagementTool(BaseTool):
                     mode = str(kwargs.get("tags_filter_mode", "include")).lower().strip()
                     filtered_tasks = []
                     for task in tasks:
-                        task_tags = set(str(tag).lower() for tag in (task['tags'] if task['tags'] is not None else []))
+                        task_tags = set(str(tag).lower() for tag in task['tags'])
                         
                         # Magic tags based on assignee status to accommodate LLM behavior
                         is_assigned = task['assignee'] is not None and str(task['assignee']).strip() != ""
@@ -603,24 +687,15 @@ class ProjectManagementTool(BaseTool):
             minimal_task_list = []
             decomposed_hidden_count = 0
             for task in tasks:
-                try:
-                    t_prog = task['task_progress']
-                except KeyError:
-                    t_prog = None
-                    
+                t_prog = task['task_progress']
                 if not t_prog:
                     # Fallback for old tasks that lacked the UDA
-                    try:
-                        t_status = task['status']
-                    except KeyError:
-                        t_status = None
-                    t_prog = "finished" if t_status == "completed" else "todo"
+                    t_prog = "finished" if task['status'] == "completed" else "todo"
                 
                 # Auto-hide decomposed parent tasks from default queries.
                 # These are shell tasks that have been broken into sub-tasks;
                 # showing them to the PM causes confusion and reassignment loops.
-                task_tags = list(task['tags']) if task['tags'] else []
-                if not include_decomposed and (t_prog == 'decomposed' or 'decomposed' in task_tags):
+                if not include_decomposed and (t_prog == 'decomposed' or 'decomposed' in task['tags']):
                     decomposed_hidden_count += 1
                     continue
                     
@@ -628,8 +703,8 @@ class ProjectManagementTool(BaseTool):
                     "uuid": task['uuid'], 
                     "description": task['description'], 
                     "task_progress": t_prog, 
-                    "assignee": task['assignee'] if task['assignee'] is not None else None,
-                    "depends": [t['uuid'] for t in (task['depends'] if task['depends'] is not None else [])]
+                    "assignee": task['assignee'],
+                    "depends": list(task['depends'])
                 })
             
             hidden_note = f" ({completed_count} completed"
@@ -638,7 +713,7 @@ class ProjectManagementTool(BaseTool):
             hidden_note += " tasks hidden by default)."
             return {"status": "success", "message": f"Found {len(minimal_task_list)} task(s).{hidden_note}", "tasks": minimal_task_list}
 
-    async def _execute_modify_task(self, tw, aliases, project_name, session_name, agent_id, kwargs):
+    def _execute_modify_task(self, tw, aliases, project_name, session_name, agent_id, kwargs):
             task_id = kwargs.get("task_id") or kwargs.get("task_uuid")
             if task_id is None or task_id == "":
                 return {"status": "error", "message": "Missing 'task_id' for 'modify_task'."}
@@ -826,7 +901,6 @@ class ProjectManagementTool(BaseTool):
             is_dry_run = str(kwargs.get("dry_run")).lower() == "true"
             if not is_dry_run:
                 task.save()
-                asyncio.create_task(broadcast(json.dumps({"type": "project_tasks_updated", "project_name": project_name, "session_name": session_name})))
             else:
                 logger.info("ProjectManagementTool: 'modify_task' dry_run succeeded. Database not modified.")
                 
@@ -845,7 +919,7 @@ class ProjectManagementTool(BaseTool):
                 "dry_run": is_dry_run
             }
 
-    async def _execute_complete_task(self, tw, aliases, project_name, session_name, kwargs):
+    def _execute_complete_task(self, tw, aliases, project_name, session_name, kwargs):
             task_id = kwargs.get("task_id") or kwargs.get("task_uuid")
             if task_id is None or task_id == "":
                 return {"status": "error", "message": "Missing 'task_id' for 'complete_task'."}
@@ -914,8 +988,6 @@ class ProjectManagementTool(BaseTool):
                     task.done() # This triggers Taskwarrior to set status=completed
                     task['task_progress'] = "finished"
                     task.save()
-                    asyncio.create_task(broadcast(json.dumps({"type": "project_tasks_updated", "project_name": project_name, "session_name": session_name})))
-                    
 
                 else:
                     logger.info("ProjectManagementTool: 'complete_task' dry_run succeeded. Database not modified.")
@@ -932,13 +1004,10 @@ class ProjectManagementTool(BaseTool):
                 "dry_run": str(kwargs.get("dry_run")).lower() == "true"
             }
 
-    async def _execute_get_dependency_graph(self, tw, kwargs):
+    async def _execute_get_dependency_graph(self, project_name, session_name, kwargs):
         try:
-            tasks_query = tw.tasks.pending()
-            if kwargs.get("project_filter"): 
-                tasks_query = tasks_query.filter(project=kwargs["project_filter"])
-            
-            tasks = tasks_query.all()
+            all_views = await task_index.get_task_views(project_name, session_name)
+            tasks = [t for t in all_views if t['status'] == 'pending' and view_in_project(t, kwargs.get("project_filter"))]
             
             if not tasks:
                 return {"status": "success", "message": "No pending tasks found to graph.", "graph": "graph TD;\n  Empty[No pending tasks]"}
@@ -952,26 +1021,15 @@ class ProjectManagementTool(BaseTool):
                 desc = str(t['description'] or "Unnamed Task").replace('"', "'")
                 assignee = t['assignee'] or "Unassigned"
                 
-                # Check for id, old tasks might not have it loaded in memory depending on tasklib 
-                t_id = "?"
-                try: t_id = t['id']
-                except Exception: pass
+                t_id = t['id'] or "?"
                 
                 mermaid_lines.append(f'  {uuid_short}["[{t_id}] {desc} ({assignee})"];')
 
             # Create edges
             for t in tasks:
                 t_uuid = str(t['uuid'])[:8]
-                if t['depends']:
-                    for dep in t['depends']:
-                        try:
-                            if isinstance(dep, str):
-                                dep_uuid = dep[:8]
-                            else:
-                                dep_uuid = str(dep['uuid'])[:8]
-                            mermaid_lines.append(f"  {dep_uuid} --> {t_uuid};")
-                        except Exception as dep_err:
-                            logger.warning(f"Error parsing dependency for graph: {dep_err}")
+                for dep_uuid in t['depends']:
+                    mermaid_lines.append(f"  {dep_uuid[:8]} --> {t_uuid};")
 
             graph_output = "\n".join(mermaid_lines)
             
@@ -1018,6 +1076,40 @@ Creates a new task.
       "tags": "+backend,+api"
     }}
     ```
+"""
+        elif sub_action == "add_tasks":
+            return common_header + f"""
+**Action: add_tasks**
+Creates several tasks in one call (much faster than repeated add_task calls). Entries are processed in order,
+so a later entry may depend on an earlier entry's `task_id` alias.
+*   `<tasks>` (list, required): Task objects, each accepting the same parameters as add_task (`description`, `task_id`, `priority`, `tags`, `assignee_agent_id`, `depends`, `task_progress`).
+*   Returns one result per entry; the call is 'partial_success' if only some entries succeeded.
+*   Example:
+    ```json
+    {{
+      "action": "add_tasks",
+      "tasks": [
+        {{"task_id": "task_1", "description": "Design the database schema", "priority": "H"}},
+        {{"task_id": "task_2", "description": "Implement the user API", "depends": "task_1"}}
+      ]
+    }}
+    ```
+"""
+        elif sub_action == "modify_tasks":
+            return common_header + f"""
+**Action: modify_tasks**
+Applies several modify_task updates in one call.
+*   `<tasks>` (list, required): Objects each containing a `task_id` plus the modify_task fields to change.
+*   Example:
+    ```json
+    {{
+      "action": "modify_tasks",
+      "tasks": [
+        {{"task_id": "task_1", "assignee_agent_id": "{project_name_placeholder}_worker_1", "tags": "+{project_name_placeholder}_worker_1,assigned"}},
+        {{"task_id": "task_2", "task_progress": "waiting"}}
+      ]
+    }}
+    ```
 """
         elif sub_action == "list_tasks":
             return common_header + f"""
@@ -1087,10 +1179,12 @@ Generates a Mermaid.js diagram illustrating the dependencies between all pending
         return common_header + """
 **Available Actions Summary:**
 1.  **add_task:** Creates a new task.
-2.  **list_tasks:** Lists existing tasks.
-3.  **modify_task:** Modifies an existing task.
-4.  **complete_task:** Marks a task as completed.
-5.  **get_dependency_graph:** Returns a visual graph of task blocking relationships.
+2.  **add_tasks:** Creates several tasks in one call.
+3.  **list_tasks:** Lists existing tasks.
+4.  **modify_task:** Modifies an existing task.
+5.  **modify_tasks:** Modifies several tasks in one call.
+6.  **complete_task:** Marks a task as completed.
+7.  **get_dependency_graph:** Returns a visual graph of task blocking relationships.
 
 **To get detailed instructions and parameter lists for a specific action, call the 'tool_information' tool:**
     ```json
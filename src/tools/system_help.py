@@ -7,7 +7,7 @@ import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 from src.config.settings import BASE_DIR
 
 if TYPE_CHECKING:
@@ -29,6 +29,9 @@ class SystemHelpTool(BaseTool):
         ToolParameter(name="agent_id_filter", type="string", description="Filter logs by agent ID.", required=False),
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS
+
     async def execute(self, agent_id: str, manager: 'AgentManager', **kwargs: Any) -> Dict[str, Any]: # type: ignore[reportIncompatibleMethodOverride]
         action = kwargs.get("action")
         if not action or action not in ["get_time", "search_logs"]:
@@ -0,0 +1,245 @@
+# START OF FILE src/tools/task_index.py
+import asyncio
+import functools
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config.settings import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Import tasklib safely
+try:
+    from tasklib import TaskWarrior
+    TASKLIB_AVAILABLE = True
+except ImportError:
+    TaskWarrior: Any = None
+    TASKLIB_AVAILABLE = False
+
+
+def _task_data_path(project_name: str, session_name: str):
+    return BASE_DIR / "projects" / project_name / session_name / "task_data"
+
+
+def _task_field(task: Any, field: str) -> Any:
+    try:
+        return task[field]
+    except (KeyError, AttributeError):
+        return None
+
+
+def _task_view(task: Any) -> Dict[str, Any]:
+    """Plain-dict snapshot of a task (safe to cache and share). depends holds dependency UUIDs."""
+    tags = _task_field(task, 'tags')
+    depends = _task_field(task, 'depends')
+    return {
+        "uuid": str(task['uuid']),
+        "id": _task_field(task, 'id') or 0,
+        "description": _task_field(task, 'description'),
+        "status": _task_field(task, 'status'),
+        "task_progress": _task_field(task, 'task_progress'),
+        "assignee": _task_field(task, 'assignee'),
+        "project": _task_field(task, 'project'),
+        "priority": _task_field(task, 'priority'),
+        "tags": sorted(str(tag) for tag in tags) if tags else [],
+        "depends": [str(dep) if isinstance(dep, str) else str(dep['uuid']) for dep in depends] if depends else [],
+    }
+
+
+def view_in_project(view: Dict[str, Any], project_name: Optional[str]) -> bool:
+    """Mirrors Taskwarrior's project:<name> filter (the project itself and its sub-projects)."""
+    if not project_name:
+        return True
+    project = view.get("project") or ""
+    return project == project_name or project.startswith(project_name + ".")
+
+
+class _SessionTaskIndex:
+    def __init__(self):
+        self.tw: Any = None
+        self.aliases: Optional[Dict[str, str]] = None
+        self.worker: Optional[ThreadPoolExecutor] = None # Serializes this session's Taskwarrior I/O off the event loop
+        self.views: Optional[List[Dict[str, Any]]] = None # Every task in the session, in export order
+        self.load_task: Optional[asyncio.Task] = None
+        self.pending_by_assignee: Dict[str, List[Dict[str, Any]]] = {}
+        self.tasks_by_id: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.generation: int = 0 # Bumped on every invalidation
+
+
+class TaskIndexService:
+    """
+    Per-session Taskwarrior handle, worker thread and in-memory task snapshot.
+
+    Holds one TaskWarrior handle and the task alias map per (project, session). All
+    Taskwarrior subprocess I/O issued through run() executes on that session's single
+    worker thread, so it never blocks the event loop and never races itself. Reads are
+    batched: one export per invalidation fills a snapshot of plain task dicts that serves
+    list_tasks, the dependency graph, the worker task report and the task focus reminder
+    (concurrent readers await the same load). The snapshot is dropped by invalidate(),
+    which ProjectManagementTool (and the few framework paths that save tasks directly)
+    call after mutating tasks.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], _SessionTaskIndex] = {}
+
+    def _get_session(self, project_name: str, session_name: str) -> _SessionTaskIndex:
+        key = (project_name, session_name)
+        index = self._sessions.get(key)
+        if index is None:
+            index = _SessionTaskIndex()
+            self._sessions[key] = index
+        return index
+
+    def _create_taskwarrior(self, project_name: str, session_name: str) -> Any:
+        data_path = _task_data_path(project_name, session_name)
+        try:
+            data_path.mkdir(parents=True, exist_ok=True)
+            taskrc_path = data_path / '.taskrc'
+            if not taskrc_path.exists():
+                with open(taskrc_path, 'w') as f:
+                    f.write("uda.assignee.type=string\nuda.assignee.label=Assignee\n")
+                    f.write("uda.task_progress.type=string\nuda.task_progress.label=Task Progress\n")
+            else:
+                # Patch existing taskrc
+                with open(taskrc_path, 'r') as f:
+                    content = f.read()
+                if "uda.task_progress.type" not in content:
+                    with open(taskrc_path, 'a') as f:
+                        f.write("\nuda.task_progress.type=string\nuda.task_progress.label=Task Progress\n")
+            return TaskWarrior(data_location=str(data_path), taskrc_location=str(taskrc_path))
+        except Exception as e:
+            logger.error(f"Failed to initialize TaskWarrior at {data_path}: {e}", exc_info=True)
+            return None
+
+    # --- Handles and aliases ---
+    def get_taskwarrior(self, project_name: str, session_name: str) -> Any:
+        """Returns the session's shared TaskWarrior handle, creating it (and its .taskrc) on first use."""
+        if not TASKLIB_AVAILABLE or not project_name or not session_name:
+            return None
+        index = self._get_session(project_name, session_name)
+        if index.tw is None:
+            index.tw = self._create_taskwarrior(project_name, session_name)
+        return index.tw
+
+    def get_aliases(self, project_name: str, session_name: str) -> Dict[str, str]:
+        """Returns the cached alias -> UUID map. Callers must not mutate it; use set_aliases."""
+        index = self._get_session(project_name, session_name)
+        if index.aliases is None:
+            alias_path = _task_data_path(project_name, session_name) / "task_aliases.json"
+            aliases: Dict[str, str] = {}
+            if alias_path.exists():
+                try:
+                    with open(alias_path, "r") as f:
+                        aliases = json.load(f)
+                except Exception:
+                    aliases = {}
+            index.aliases = aliases
+        return index.aliases
+
+    def set_aliases(self, project_name: str, session_name: str, aliases: Dict[str, str]):
+        """Records a freshly saved alias map."""
+        self._get_session(project_name, session_name).aliases = dict(aliases)
+
+    def resolve_task_id(self, project_name: str, session_name: str, task_id: str) -> str:
+        resolved_id = str(task_id).strip()
+        return self.get_aliases(project_name, session_name).get(resolved_id, resolved_id)
+
+    def invalidate(self, project_name: Optional[str] = None, session_name: Optional[str] = None):
+        """Drops cached task views for one session (or for every session if no project is given)."""
+        for (proj, sess), index in self._sessions.items():
+            if project_name is None or (proj == project_name and (session_name is None or sess == session_name)):
+                index.generation += 1
+                index.views = None
+                index.load_task = None # An export already in flight may predate the write; later readers start a new one
+                index.pending_by_assignee.clear()
+                index.tasks_by_id.clear()
+
+    async def run(self, project_name: str, session_name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Runs blocking Taskwarrior code on the session's dedicated worker thread."""
+        index = self._get_session(project_name, session_name)
+        if index.worker is None:
+            index.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"taskwarrior-{project_name}")
+        return await asyncio.get_running_loop().run_in_executor(index.worker, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """Stops the worker threads. Called from the application lifespan shutdown."""
+        for index in self._sessions.values():
+            if index.worker is not None:
+                index.worker.shutdown(wait=False)
+                index.worker = None
+
+    # --- Cached views ---
+    @staticmethod
+    def export_views_sync(tw: Any) -> List[Dict[str, Any]]:
+        """
+        Blocking: fresh views of every task. For code already running on the session worker
+        (e.g. task writes), where the snapshot may predate a write queued just ahead of it.
+        """
+        return [_task_view(task) for task in tw.tasks.all()]
+
+    async def _load_views(self, project_name: str, session_name: str, index: _SessionTaskIndex, tw: Any) -> List[Dict[str, Any]]:
+        generation = index.generation
+        views = await self.run(project_name, session_name, self.export_views_sync, tw)
+        if index.generation == generation: # Don't cache results that raced an invalidation
+            index.views = views
+        return views
+
+    async def get_task_views(self, project_name: str, session_name: str) -> List[Dict[str, Any]]:
+        """
+        Every task in the session as plain dicts (uuid, id, description, status, task_progress,
+        assignee, project, priority, tags, depends). Callers must not mutate the returned views.
+        Raises whatever tasklib raises if the export fails (e.g. corrupted task data).
+        """
+        tw = self.get_taskwarrior(project_name, session_name)
+        if not tw:
+            return []
+        index = self._get_session(project_name, session_name)
+        if index.views is not None:
+            return index.views
+        if index.load_task is None or index.load_task.done():
+            index.load_task = asyncio.create_task(self._load_views(project_name, session_name, index, tw))
+        return await asyncio.shield(index.load_task)
+
+    async def get_pending_tasks_for_assignee(self, project_name: str, session_name: str, assignee: str) -> List[Dict[str, Any]]:
+        """Pending tasks assigned to assignee (plain dicts, see get_task_views)."""
+        index = self._get_session(project_name, session_name)
+        cached = index.pending_by_assignee.get(assignee)
+        if cached is not None:
+            return cached
+        generation = index.generation
+        views = await self.get_task_views(project_name, session_name)
+        tasks = [view for view in views if view["status"] == "pending" and view["assignee"] == assignee]
+        if index.generation == generation:
+            index.pending_by_assignee[assignee] = tasks
+        return tasks
+
+    async def get_task(self, project_name: str, session_name: str, task_id: str) -> Optional[Dict[str, Any]]:
+        """Looks up one task by alias, UUID or numeric ID. Returns a plain dict or None."""
+        resolved_id = self.resolve_task_id(project_name, session_name, task_id)
+        index = self._get_session(project_name, session_name)
+        if resolved_id in index.tasks_by_id:
+            return index.tasks_by_id[resolved_id]
+        if not (('-' in resolved_id and len(resolved_id) > 10) or resolved_id.isdigit()):
+            return None
+
+        generation = index.generation
+        try:
+            views = await self.get_task_views(project_name, session_name)
+        except Exception as e:
+            logger.debug(f"TaskIndexService: Could not load tasks for {project_name}/{session_name}: {e}")
+            return None
+        if resolved_id.isdigit():
+            task_view = next((view for view in views if view["id"] and view["id"] == int(resolved_id)), None) # Completed tasks have id 0
+        else:
+            task_view = next((view for view in views if view["uuid"] == resolved_id), None)
+        if index.generation == generation:
+            index.tasks_by_id[resolved_id] = task_view
+        return task_view
+
+
+# --- Singleton Instance ---
+task_index = TaskIndexService()
+# END OF FILE src/tools/task_index.py
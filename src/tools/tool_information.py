@@ -3,7 +3,7 @@ import logging
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from pathlib import Path
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 from src.tools.error_handler import tool_error_handler, ErrorType
 # --- NEW: Import agent type constants ---
 from src.agents.constants import AGENT_TYPE_ADMIN, AGENT_TYPE_PM, AGENT_TYPE_WORKER
@@ -55,6 +55,9 @@ class ToolInformationTool(BaseTool):
         ),
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS
+
     async def execute( # type: ignore[reportIncompatibleMethodOverride]
         self,
         agent_id: str,
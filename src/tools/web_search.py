@@ -7,7 +7,7 @@ import aiohttp
 from bs4 import BeautifulSoup
 import urllib.parse
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -34,6 +34,9 @@ class WebSearchTool(BaseTool):
         ToolParameter(name="language", type="string", description="Optional language code (e.g. 'en', 'fr').", required=False),
     ]
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS
+
     async def execute(self, agent_id: str, **kwargs: Any) -> Dict[str, Any]: # type: ignore[reportIncompatibleMethodOverride]
         action = kwargs.get("action", "search").strip().lower()
 
@@ -38,7 +38,7 @@ except ImportError:
     BS4_AVAILABLE = False
     logger.warning("beautifulsoup4 not installed. HTML stripping will be basic. Run: pip install beautifulsoup4")
 
-from src.tools.base import BaseTool, ToolParameter
+from src.tools.base import BaseTool, ToolParameter, READ_EFFECTS, ToolEffects
 
 
 def _strip_html(html: str) -> str:
@@ -220,6 +220,9 @@ class ZimSearchTool(BaseTool):
     # Main entry point                                                     #
     # ------------------------------------------------------------------ #
 
+    def get_effects(self, tool_args: Dict[str, Any]) -> ToolEffects:
+        return READ_EFFECTS
+
     async def execute(
         self,
         agent_id: str,
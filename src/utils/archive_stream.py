@@ -0,0 +1,165 @@
+# START OF FILE src/utils/archive_stream.py
+import asyncio
+import fnmatch
+import io
+import logging
+import os
+import re
+import threading
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Pattern
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+ARCHIVE_QUEUE_CHUNKS = 16 # Chunks buffered between the zip worker thread and the response
+
+# Stored as-is in "auto" mode: deflating these costs CPU and saves next to nothing
+ALREADY_COMPRESSED_SUFFIXES = {
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.whl', '.jar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.mp3', '.mp4', '.mkv', '.mov',
+    '.avi', '.webm', '.ogg', '.flac', '.pdf', '.woff', '.woff2', '.zim',
+}
+
+ARCHIVE_COMPRESSION_MODES = ("auto", "deflate", "store")
+
+
+class ExclusionMatcher:
+    """
+    fnmatch-style exclusion patterns compiled into one regex.
+
+    A path is excluded if any of its components or its full relative path matches a
+    pattern. Walks only need to test directory names (a matching directory is pruned
+    with everything below it) plus each file's name and relative path.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self._regex: Optional[Pattern[str]] = None
+        if self.patterns:
+            self._regex = re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in self.patterns))
+
+    def matches(self, text: str) -> bool:
+        return bool(self._regex and self._regex.match(text))
+
+    def excludes_file(self, name: str, rel_path: str) -> bool:
+        return self.matches(name) or self.matches(rel_path)
+
+
+def iter_archive_files(base_dir: Path, matcher: ExclusionMatcher):
+    """Yields (path, arcname) for every non-excluded file under base_dir, in sorted order."""
+    base_str = str(base_dir)
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = sorted(d for d in dirs if not matcher.matches(d))
+        rel_root = os.path.relpath(root, base_str)
+        for name in sorted(files):
+            rel_path = name if rel_root == '.' else os.path.join(rel_root, name)
+            if not matcher.excludes_file(name, rel_path):
+                yield os.path.join(root, name), rel_path
+
+
+class _ArchiveAborted(Exception):
+    pass
+
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    Writable, unseekable file object handed to ZipFile; forwards ~64KB chunks to the event loop.
+    tell() raises io.UnsupportedOperation, so ZipFile writes data descriptors instead of seeking back.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, cancelled: threading.Event):
+        super().__init__()
+        self._queue = queue
+        self._loop = loop
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= ARCHIVE_CHUNK_SIZE:
+            self._emit()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._emit()
+
+    def close(self):
+        self._buffer.clear() # Unsent data of an aborted archive is dropped; _write_archive flushes on success
+        super().close()
+
+    def _emit(self):
+        if self._cancelled.is_set():
+            raise _ArchiveAborted()
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        # Blocks this worker thread while the queue is full (backpressure from the client)
+        asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop).result()
+
+
+def _write_archive(writer: _ChunkWriter, base_dir: Path, matcher: ExclusionMatcher, compression: str) -> int:
+    file_count = 0
+    default_type = zipfile.ZIP_STORED if compression == "store" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(writer, 'w', default_type) as zf:
+        for file_path, arcname in iter_archive_files(base_dir, matcher):
+            compress_type = default_type
+            if compression == "auto" and os.path.splitext(arcname)[1].lower() in ALREADY_COMPRESSED_SUFFIXES:
+                compress_type = zipfile.ZIP_STORED
+            try:
+                zf.write(file_path, arcname, compress_type=compress_type)
+            except (FileNotFoundError, PermissionError) as e:
+                logger.warning(f"Archive: Skipping '{arcname}': {e}")
+                continue
+            file_count += 1
+    writer.flush()
+    return file_count
+
+
+async def stream_zip_archive(base_dir: Path, exclusion_patterns: List[str], compression: str = "auto") -> AsyncIterator[bytes]:
+    """
+    Async generator of zip archive bytes for base_dir, for use with StreamingResponse.
+
+    The directory walk and compression run in a worker thread and hand over fixed-size
+    chunks through a small bounded queue, so memory stays at a few chunks regardless of
+    archive size and the event loop is never blocked. compression is 'auto' (deflate,
+    but store already-compressed formats), 'deflate' or 'store'.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=ARCHIVE_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    matcher = ExclusionMatcher(exclusion_patterns)
+    done = object()
+
+    def run():
+        try:
+            file_count = _write_archive(_ChunkWriter(queue, loop, cancelled), base_dir, matcher, compression)
+            logger.info(f"Archive: Streamed zip of '{base_dir}' with {file_count} files.")
+        except _ArchiveAborted:
+            logger.info(f"Archive: Download of '{base_dir}' cancelled by the client.")
+        except Exception as e:
+            logger.error(f"Archive: Error while streaming zip of '{base_dir}': {e}", exc_info=True)
+        finally:
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        cancelled.set()
+        while not queue.empty(): # Unblock a worker waiting on a full queue
+            queue.get_nowait()
+        await worker
+# END OF FILE src/utils/archive_stream.py
@@ -0,0 +1,223 @@
+# START OF FILE src/utils/token_counter.py
+import json
+import logging
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.settings import settings, BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+try:
+    from tokenizers import Tokenizer as HFTokenizer  # Optional: offline HuggingFace tokenizer.json files
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    HFTokenizer = None  # type: ignore[assignment,misc]
+    TOKENIZERS_AVAILABLE = False
+
+try:
+    import tiktoken  # Optional: BPE encodings for OpenAI models
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None  # type: ignore[assignment]
+    TIKTOKEN_AVAILABLE = False
+
+# Approximate chat-template overhead (role markers, separators) per message
+MESSAGE_OVERHEAD_TOKENS = 5
+
+# Characters per token for ASCII-dominated text (prose + code). gpt (cl100k/o200k) and qwen are
+# measured with tests/bench/bench_token_counter.py; llama 3's vocabulary extends cl100k. The rest
+# are estimates from vocabulary size: larger vocabularies pack more characters into a token.
+FAMILY_CHARS_PER_TOKEN: Dict[str, float] = {
+    "llama": 4.4,
+    "qwen": 4.4,
+    "gemma": 4.1,
+    "mistral": 3.5,
+    "mixtral": 3.5,
+    "phi": 3.6,
+    "deepseek": 3.8,
+    "gpt": 4.4,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.8
+# Non-ASCII text (CJK, emoji, accented scripts) tokenizes far denser than ASCII;
+# each extra UTF-8 byte is counted at this many tokens.
+NON_ASCII_TOKENS_PER_EXTRA_BYTE = 0.25
+
+
+def _normalize_family(family: Optional[str]) -> Optional[str]:
+    """'qwen3' -> 'qwen', 'gemma3' -> 'gemma', 'llama3.2' -> 'llama'."""
+    if not family:
+        return None
+    return re.sub(r'[\d._-]+$', '', family.strip().lower()) or None
+
+
+class _HeuristicBackend:
+    """Calibrated chars-per-token estimate. Always available."""
+
+    def __init__(self, family: Optional[str]):
+        self.chars_per_token = FAMILY_CHARS_PER_TOKEN.get(family or "", DEFAULT_CHARS_PER_TOKEN)
+        self.name = f"heuristic:{family or 'default'}"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        extra_bytes = len(text.encode('utf-8', errors='replace')) - len(text)
+        return int(len(text) / self.chars_per_token + extra_bytes * NON_ASCII_TOKENS_PER_EXTRA_BYTE) + 1
+
+
+class _HFTokenizerBackend:
+    def __init__(self, name: str, tokenizer: Any):
+        self.name = name
+        self._tokenizer = tokenizer
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class _TiktokenBackend:
+    def __init__(self, name: str, encoding: Any):
+        self.name = name
+        self._encoding = encoding
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class TokenCounter:
+    """
+    Token counting service used for context-size decisions.
+
+    Picks a backend per model: an offline HuggingFace tokenizer.json for the model's family
+    (from ModelRegistry metadata, looked up in TOKENIZER_DIR), tiktoken for OpenAI models, or
+    a per-family calibrated heuristic. Per-message counts are cached (LRU) so each cycle only
+    tokenizes messages it has not seen before.
+    """
+
+    def __init__(self):
+        self._backends: Dict[str, Any] = {}
+        self._model_backend_keys: Dict[str, str] = {}
+        self._message_cache: "OrderedDict[Tuple[str, str, Optional[str]], int]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _tokenizer_dir(self) -> Path:
+        path = Path(settings.TOKENIZER_DIR)
+        return path if path.is_absolute() else BASE_DIR / path
+
+    def _resolve_family(self, model_id: Optional[str]) -> Tuple[Optional[str], bool]:
+        """Returns (family, from_registry). Falls back to guessing from the model name."""
+        if not model_id:
+            return None, False
+        try:
+            from src.config.settings import model_registry
+            model_info = model_registry.get_model_info(model_id)
+            family = model_info.get("family") if model_info else None
+            if family:
+                return family, True
+        except Exception as e:
+            logger.debug(f"TokenCounter: Could not resolve family for '{model_id}' from registry: {e}")
+        # Fall back to the model name itself (e.g. 'ollama/qwen3:8b' -> 'qwen3')
+        base_name = model_id.split('/')[-1].split(':')[0].lower()
+        return (re.split(r'[-_]', base_name)[0] or None), False
+
+    def _load_hf_backend(self, family: str) -> Optional[_HFTokenizerBackend]:
+        if not TOKENIZERS_AVAILABLE or HFTokenizer is None:
+            return None
+        tokenizer_dir = self._tokenizer_dir()
+        normalized = _normalize_family(family)
+        candidates = [tokenizer_dir / f"{family}.json", tokenizer_dir / family / "tokenizer.json"]
+        if normalized and normalized != family:
+            candidates += [tokenizer_dir / f"{normalized}.json", tokenizer_dir / normalized / "tokenizer.json"]
+        for candidate in candidates:
+            if candidate.is_file():
+                try:
+                    backend = _HFTokenizerBackend(f"hf:{family}", HFTokenizer.from_file(str(candidate)))
+                    logger.info(f"TokenCounter: Loaded tokenizer for family '{family}' from {candidate}.")
+                    return backend
+                except Exception as e:
+                    logger.warning(f"TokenCounter: Failed to load tokenizer {candidate}: {e}")
+        return None
+
+    def _load_tiktoken_backend(self, model_id: str) -> Optional[_TiktokenBackend]:
+        if not TIKTOKEN_AVAILABLE or tiktoken is None:
+            return None
+        model_name = model_id.split('/')[-1]
+        try:
+            try: encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError: encoding = tiktoken.get_encoding("o200k_base")
+            return _TiktokenBackend(f"tiktoken:{encoding.name}", encoding)
+        except Exception as e: # Encoding files may be unavailable offline
+            logger.warning(f"TokenCounter: tiktoken unavailable for '{model_id}': {e}")
+            return None
+
+    def get_backend(self, model_id: Optional[str] = None) -> Any:
+        """Returns (and memoizes) the counting backend for a model id."""
+        backend_key = self._model_backend_keys.get(model_id or "")
+        if backend_key:
+            return self._backends[backend_key]
+
+        family, from_registry = self._resolve_family(model_id)
+        backend = None
+        if family:
+            backend = self._backends.get(f"family:{family}")
+            if backend is None:
+                backend = self._load_hf_backend(family)
+        if backend is None and model_id and _normalize_family(family) == "gpt":
+            backend = self._load_tiktoken_backend(model_id)
+        if backend is None:
+            backend = _HeuristicBackend(_normalize_family(family))
+
+        backend_key = f"family:{family}" if family else "default"
+        self._backends.setdefault(backend_key, backend)
+        # Name-based guesses are not memoized so registry metadata wins once discovery completes
+        if from_registry or not model_id:
+            self._model_backend_keys[model_id or ""] = backend_key
+        logger.debug(f"TokenCounter: Using backend '{self._backends[backend_key].name}' for model '{model_id}'.")
+        return self._backends[backend_key]
+
+    def count_text(self, text: str, model_id: Optional[str] = None) -> int:
+        return self.get_backend(model_id).count(text)
+
+    def count_message(self, message: Dict[str, Any], model_id: Optional[str] = None) -> int:
+        return self._count_message_with(self.get_backend(model_id), message)
+
+    def _count_message_with(self, backend: Any, message: Dict[str, Any]) -> int:
+        content = message.get('content') or ''
+        if not isinstance(content, str):
+            content = str(content)
+        tool_calls_text: Optional[str] = None
+        if message.get("tool_calls"):
+            try: tool_calls_text = json.dumps(message["tool_calls"])
+            except (TypeError, ValueError): pass # Ignore if not serializable
+
+        cache_key = (backend.name, content, tool_calls_text)
+        cached = self._message_cache.get(cache_key)
+        if cached is not None:
+            self._message_cache.move_to_end(cache_key)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        tokens = backend.count(content) + MESSAGE_OVERHEAD_TOKENS
+        if tool_calls_text:
+            tokens += backend.count(tool_calls_text)
+        self._message_cache[cache_key] = tokens
+        while len(self._message_cache) > max(0, settings.TOKEN_COUNT_CACHE_SIZE):
+            self._message_cache.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, Any]], model_id: Optional[str] = None) -> int:
+        """Token count of a message list, including per-message template overhead."""
+        backend = self.get_backend(model_id) # Resolved once, not per message
+        return sum(self._count_message_with(backend, msg) for msg in messages)
+
+
+# --- Singleton Instance ---
+token_counter = TokenCounter()
+# END OF FILE src/utils/token_counter.py
@@ -0,0 +1,165 @@
+# START OF FILE src/utils/workspace_snapshot.py
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer  # Optional: push invalidation on filesystem events
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None  # type: ignore[assignment,misc]
+    FileSystemEventHandler = object  # type: ignore[assignment,misc]
+    WATCHDOG_AVAILABLE = False
+
+WORKSPACE_TREE_EXCLUDE_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env', 'dist', 'build', '.idea', '.vscode'}
+WORKSPACE_TREE_MAX_FILES = 200
+WORKSPACE_TREE_MAX_DEPTH = 4
+
+
+def build_workspace_tree_lines(workspace_path: Path) -> List[str]:
+    """Bounded tree listing of a workspace (blocking; run it in a worker thread)."""
+    tree_lines: List[str] = []
+    if not workspace_path.exists():
+        return tree_lines
+    file_count = 0
+    workspace_str = str(workspace_path)
+    for root, dirs, files in os.walk(workspace_path):
+        # Prune excluded directories from traversal
+        dirs[:] = sorted(d for d in dirs if d not in WORKSPACE_TREE_EXCLUDE_DIRS)
+        level = root.replace(workspace_str, '').count(os.sep)
+        # Nothing below MAX_DEPTH is listed, so don't descend into it at all
+        if level >= WORKSPACE_TREE_MAX_DEPTH:
+            dirs[:] = []
+        if level > WORKSPACE_TREE_MAX_DEPTH:
+            continue
+
+        indent = '  ' * level
+        if level > 0:
+            tree_lines.append(f"{indent}|-- {os.path.basename(root)}/")
+
+        for f in sorted(files):
+            if file_count >= WORKSPACE_TREE_MAX_FILES:
+                break
+            tree_lines.append(f"{indent}  |-- {f}")
+            file_count += 1
+
+        if file_count >= WORKSPACE_TREE_MAX_FILES:
+            tree_lines.append(f"{indent}  |-- ... (Truncated: Maximum {WORKSPACE_TREE_MAX_FILES} files returned)")
+            break
+    return tree_lines
+
+
+class _WorkspaceSnapshot:
+    def __init__(self, workspace_path: Path):
+        self.workspace_path = workspace_path
+        self.tree_lines: Optional[List[str]] = None
+        self.built_at: float = 0.0
+        self.generation: int = 0 # Bumped on every invalidation
+        self.built_generation: int = -1
+        self.build_task: Optional[asyncio.Task] = None
+        self.observer = None
+
+
+class _InvalidateOnChange(FileSystemEventHandler):  # type: ignore[misc,valid-type]
+    def __init__(self, service: 'WorkspaceSnapshotService', workspace_path: Path, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._service = service
+        self._workspace_path = workspace_path
+        self._loop = loop
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed', 'closed_no_write'): return
+        try: self._loop.call_soon_threadsafe(self._service.invalidate, self._workspace_path)
+        except RuntimeError: pass # Loop already closed during shutdown
+
+
+class WorkspaceSnapshotService:
+    """
+    Shares one in-memory, bounded tree of each session's shared_workspace across all agents.
+
+    The tree is built once in a worker thread (concurrent requests await the same build)
+    and reused until a file-writing tool invalidates it, a filesystem watcher reports a
+    change (WORKSPACE_TREE_WATCH, requires 'watchdog'), or it is older than
+    WORKSPACE_TREE_MAX_AGE_SECONDS (catches writes from background shell processes).
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, _WorkspaceSnapshot] = {}
+
+    def _get_snapshot(self, workspace_path: Path) -> _WorkspaceSnapshot:
+        workspace_path = workspace_path.resolve()
+        key = str(workspace_path)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = _WorkspaceSnapshot(workspace_path)
+            self._snapshots[key] = snapshot
+            self._start_watcher(snapshot)
+        return snapshot
+
+    def _start_watcher(self, snapshot: _WorkspaceSnapshot):
+        if not (settings.WORKSPACE_TREE_WATCH and WATCHDOG_AVAILABLE and Observer is not None) or not snapshot.workspace_path.exists():
+            return
+        try:
+            observer = Observer()
+            observer.schedule(_InvalidateOnChange(self, snapshot.workspace_path, asyncio.get_running_loop()), str(snapshot.workspace_path), recursive=True)
+            observer.daemon = True
+            observer.start()
+            snapshot.observer = observer
+            logger.info(f"WorkspaceSnapshotService: Watching {snapshot.workspace_path} for changes.")
+        except Exception as e:
+            logger.warning(f"WorkspaceSnapshotService: Could not watch {snapshot.workspace_path}: {e}. Relying on tool invalidation and max age.")
+
+    def _is_fresh(self, snapshot: _WorkspaceSnapshot) -> bool:
+        if snapshot.tree_lines is None or snapshot.built_generation != snapshot.generation:
+            return False
+        max_age = settings.WORKSPACE_TREE_MAX_AGE_SECONDS
+        return max_age <= 0 or (time.monotonic() - snapshot.built_at) < max_age
+
+    async def _build(self, snapshot: _WorkspaceSnapshot) -> List[str]:
+        generation = snapshot.generation
+        start_time = time.perf_counter()
+        tree_lines = await asyncio.to_thread(build_workspace_tree_lines, snapshot.workspace_path)
+        snapshot.tree_lines = tree_lines
+        snapshot.built_at = time.monotonic()
+        snapshot.built_generation = generation # Stays stale if invalidated while building
+        logger.debug(f"WorkspaceSnapshotService: Rebuilt tree for {snapshot.workspace_path} "
+                     f"({len(tree_lines)} lines) in {(time.perf_counter() - start_time) * 1000:.1f}ms.")
+        return tree_lines
+
+    async def get_tree_lines(self, workspace_path: Path) -> List[str]:
+        """Returns the (possibly cached) bounded tree lines for workspace_path."""
+        snapshot = self._get_snapshot(workspace_path)
+        if self._is_fresh(snapshot):
+            return snapshot.tree_lines or []
+        if snapshot.build_task is None or snapshot.build_task.done():
+            snapshot.build_task = asyncio.create_task(self._build(snapshot))
+        return await asyncio.shield(snapshot.build_task)
+
+    def invalidate(self, path: Optional[Union[str, Path]] = None):
+        """Marks every snapshot containing path (or all snapshots if path is None) as stale."""
+        target = str(Path(path).resolve()) if path is not None else None
+        for key, snapshot in self._snapshots.items():
+            if target is None or target == key or target.startswith(key + os.sep) or key.startswith(target + os.sep):
+                snapshot.generation += 1
+
+    def close(self):
+        """Stops filesystem watchers. Called from the application lifespan shutdown."""
+        for snapshot in self._snapshots.values():
+            if snapshot.observer is not None:
+                try: snapshot.observer.stop()
+                except Exception as e: logger.debug(f"WorkspaceSnapshotService: Error stopping watcher: {e}")
+                snapshot.observer = None
+        self._snapshots.clear()
+
+
+# --- Singleton Instance ---
+workspace_snapshot = WorkspaceSnapshotService()
+# END OF FILE src/utils/workspace_snapshot.py
@@ -3,7 +3,7 @@ import logging
 import json
 import os
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from .base import BaseWorkflow, WorkflowResult
 from src.agents.constants import (
@@ -131,37 +131,49 @@ class PMKickoffWorkflow(BaseWorkflow):
 
         # --- Mark Initial Project Task as Decomposed ---
         try:
-            from src.tools.project_management import ProjectManagementTool, TASKLIB_AVAILABLE
-            if TASKLIB_AVAILABLE and project_context and manager.current_session:
-                pm_tool = ProjectManagementTool()
-                tw = pm_tool._get_taskwarrior_instance(project_context, manager.current_session)
-                if tw:
+            from src.tools.task_index import task_index
+            session_name = manager.current_session
+            tw = task_index.get_taskwarrior(project_context, session_name) if session_name else None
+            if tw and session_name:
+                def mark_kickoff_decomposed_sync() -> List[str]:
                     # Find any pending tasks tagged with 'project_kickoff'
-                    initial_tasks = tw.tasks.pending().filter('+project_kickoff', project=project_context)
-                    for task in initial_tasks:
+                    marked = []
+                    for task in tw.tasks.pending().filter('+project_kickoff', project=project_context):
                         task['task_progress'] = 'decomposed'
                         task.save()
-                        logger.info(f"PMKickoffWorkflow: Marked initial project task '{task['uuid']}' as decomposed.")
+                        marked.append(str(task['uuid']))
+                    return marked
+
+                # Runs on the session's task worker, off the event loop
+                for task_uuid in await task_index.run(project_context, session_name, mark_kickoff_decomposed_sync):
+                    logger.info(f"PMKickoffWorkflow: Marked initial project task '{task_uuid}' as decomposed.")
+                task_index.invalidate(project_context, session_name)
         except Exception as e:
             logger.warning(f"PMKickoffWorkflow: Failed to mark initial project task as decomposed: {e}")
 
-        # --- Create Kickoff Sub-tasks ---
+        # --- Create Kickoff Sub-tasks (one batched add_tasks call) ---
+        batch_task_entries: List[Dict[str, Any]] = []
         for i, task_info in enumerate(task_info_list):
-            task_desc = task_info["description"]
-            task_tool_args = {
-                "action": "add_task",
-                "description": f"Kick-off Task {i+1}: {task_desc}",
+            task_entry = {
+                "description": f"Kick-off Task {i+1}: {task_info['description']}",
                 "priority": "H",
-                "project_filter": project_context,
                 "tags": ["kickoff", "pm_decomposed", f"task_order_{i+1}"]
             }
             if task_info.get("id"):
-                task_tool_args["task_id"] = task_info["id"]
+                task_entry["task_id"] = task_info["id"]
             if task_info.get("depends_on"):
-                task_tool_args["depends"] = task_info["depends_on"]
+                task_entry["depends"] = task_info["depends_on"]
+            batch_task_entries.append(task_entry)
+
+        if batch_task_entries:
+            task_tool_args = {
+                "action": "add_tasks",
+                "project_filter": project_context,
+                "tasks": batch_task_entries
+            }
             try:
-                logger.debug(f"PMKickoffWorkflow: Attempting to create task via ToolExecutor: {task_tool_args}")
-                task_result = await manager.tool_executor.execute_tool(
+                logger.debug(f"PMKickoffWorkflow: Attempting to create {len(batch_task_entries)} tasks via ToolExecutor: {task_tool_args}")
+                batch_result = await manager.tool_executor.execute_tool(
                     agent_id=agent.agent_id, 
                     agent_sandbox_path=agent.sandbox_path,
                     tool_name="project_management",
@@ -170,22 +182,30 @@ class PMKickoffWorkflow(BaseWorkflow):
                     session_name=manager.current_session,
                     manager=manager 
                 )
-
-                if isinstance(task_result, dict) and task_result.get("status") == "success":
-                    task_id = task_result.get("task_id", "N/A")
-                    task_uuid = task_result.get("task_uuid", "N/A")
-                    created_tasks_info.append(f"Task '{task_desc[:30]}...' (ID: {task_id}, UUID: {task_uuid})")
-                    logger.info(f"PMKickoffWorkflow: Successfully created task (ID: {task_id}): {task_desc}")
-                else:
+                entry_results = batch_result.get("results") if isinstance(batch_result, dict) else None
+                if not isinstance(entry_results, list) or len(entry_results) != len(task_info_list):
                     all_tasks_created_successfully = False
-                    error_detail = task_result.get("message", "Unknown error") if isinstance(task_result, dict) else str(task_result)
-                    failed_tasks_info.append(f"Task '{task_desc[:30]}...': {error_detail}")
-                    logger.error(f"PMKickoffWorkflow: Failed to create task '{task_desc}': {error_detail}. Full result: {task_result}")
+                    error_detail = batch_result.get("message", "Unknown error") if isinstance(batch_result, dict) else str(batch_result)
+                    failed_tasks_info.append(f"Batch task creation: {error_detail}")
+                    logger.error(f"PMKickoffWorkflow: Batch task creation failed: {error_detail}. Full result: {batch_result}")
+                else:
+                    for task_info, task_result in zip(task_info_list, entry_results):
+                        task_desc = task_info["description"]
+                        if task_result.get("status") == "success":
+                            task_id = task_result.get("task_id", "N/A")
+                            task_uuid = task_result.get("task_uuid", "N/A")
+                            created_tasks_info.append(f"Task '{task_desc[:30]}...' (ID: {task_id}, UUID: {task_uuid})")
+                            logger.info(f"PMKickoffWorkflow: Successfully created task (ID: {task_id}): {task_desc}")
+                        else:
+                            all_tasks_created_successfully = False
+                            error_detail = task_result.get("message", "Unknown error")
+                            failed_tasks_info.append(f"Task '{task_desc[:30]}...': {error_detail}")
+                            logger.error(f"PMKickoffWorkflow: Failed to create task '{task_desc}': {error_detail}. Full result: {task_result}")
 
             except Exception as e:
                 all_tasks_created_successfully = False
-                failed_tasks_info.append(f"Task '{task_desc[:30]}...': Exception - {str(e)}")
-                logger.error(f"PMKickoffWorkflow: Exception creating task '{task_desc}': {e}", exc_info=True)
+                failed_tasks_info.append(f"Batch task creation: Exception - {str(e)}")
+                logger.error(f"PMKickoffWorkflow: Exception creating kickoff tasks: {e}", exc_info=True)
 
         # --- Create Project Directory Structure ---
         # --- Create Project Directory Structure ---
@@ -0,0 +1,2 @@
+# START OF FILE tests/__init__.py
+# END OF FILE tests/__init__.py
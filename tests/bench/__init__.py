@@ -0,0 +1,7 @@
+# START OF FILE tests/bench/__init__.py
+"""
+Benchmarks for the framework's hot paths. They are not collected by pytest; run one from
+the repository root as a module, e.g. python -m tests.bench.bench_model_lookup (add --help
+for the options a benchmark takes).
+"""
+# END OF FILE tests/bench/__init__.py
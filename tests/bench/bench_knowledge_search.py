@@ -0,0 +1,109 @@
+# START OF FILE tests/bench/bench_knowledge_search.py
+"""
+Benchmark for DatabaseManager.search_knowledge on 100k knowledge rows: the legacy
+LIKE scan on keywords (plus its per-search last_accessed UPDATE) vs the FTS5 index,
+and the substring fallback used when FTS5 is unavailable.
+
+A temporary SQLite database is initialised by DatabaseManager (tables, FTS5 index and
+triggers) and filled with ROWS rows: 4 keywords and a 40-word summary each, drawn from
+the words of this repo's docs with a Zipf-like skew, so some words are common and most
+are rare. Each query runs QUERIES times through the async engine.
+
+The FTS5 path ranks every match by BM25 x importance, so for keywords matching half the
+table it is slower than the legacy scan, which orders by importance alone and can stop
+after the first max_results matches it walks in the importance index.
+"""
+import asyncio
+import datetime
+import random
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import desc, select, update
+
+from src.core.database_manager import DatabaseManager, LongTermKnowledge
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+ROWS = 100_000
+QUERIES = 20
+RANDOM_SEED = 1
+
+
+async def legacy_search_knowledge(db: DatabaseManager, query_keywords: List[str], min_importance: Optional[float] = None, max_results: int = 5):
+    """search_knowledge before the FTS5 index."""
+    async with db.get_session() as session:
+        stmt = select(LongTermKnowledge).where(*[LongTermKnowledge.keywords.contains(kw.lower()) for kw in query_keywords])
+        if min_importance is not None:
+            stmt = stmt.where(LongTermKnowledge.importance_score >= min_importance)
+        stmt = stmt.order_by(desc(LongTermKnowledge.importance_score), desc(LongTermKnowledge.created_at)).limit(max_results)
+        knowledge_items = (await session.execute(stmt)).scalars().all()
+        ids_to_update = [item.id for item in knowledge_items]
+        if ids_to_update:
+            await session.execute(update(LongTermKnowledge).where(LongTermKnowledge.id.in_(ids_to_update)).values(last_accessed=datetime.datetime.now(datetime.timezone.utc)))
+        return list(knowledge_items)
+
+
+def seed(db_path: Path) -> List[str]:
+    """Inserts ROWS rows through the FTS triggers; returns the vocabulary, most common word first."""
+    docs = " ".join(path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "docs").glob("*.md")))
+    vocabulary = list(dict.fromkeys(word.lower() for word in re.findall(r"[A-Za-z_]{3,}", docs)))
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    rng = random.Random(RANDOM_SEED)
+    rows = [(",".join(rng.choices(vocabulary, weights, k=4)), " ".join(rng.choices(vocabulary, weights, k=40)), round(rng.random(), 2)) for _ in range(ROWS)]
+    with sqlite3.connect(db_path) as conn:
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO long_term_knowledge (keywords, summary, importance_score, created_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)", rows)
+        print(f"Inserted {ROWS} rows (FTS triggers included) in {time.perf_counter() - start:.1f} s; vocabulary {len(vocabulary)} words")
+    return vocabulary
+
+
+async def _ms_per_query(search, keywords: List[str]) -> tuple:
+    results = await search(keywords)
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        await search(keywords)
+    return (time.perf_counter() - start) / QUERIES * 1000, len(results)
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "knowledge.db"
+        db = DatabaseManager(db_url=f"sqlite+aiosqlite:///{db_path}")
+        await db._initialize_db()
+        assert db._knowledge_fts_available, "SQLite build without FTS5"
+        vocabulary = seed(db_path)
+        queries = {
+            "2 common keywords": vocabulary[3:5],
+            "1 mid-frequency keyword": vocabulary[200:201],
+            "2 rare keywords": vocabulary[-400:-398],
+        }
+
+        async def fts(keywords):
+            return await db.search_knowledge(keywords)
+
+        async def fallback(keywords):
+            db._knowledge_fts_available = False
+            try:
+                return await db.search_knowledge(keywords)
+            finally:
+                db._knowledge_fts_available = True
+
+        async def legacy(keywords):
+            return await legacy_search_knowledge(db, keywords)
+
+        print(f"{'query':26s} {'legacy LIKE ms':>15s} {'FTS5 ms':>9s} {'fallback ms':>12s}  (results legacy/FTS5)")
+        for label, keywords in queries.items():
+            legacy_ms, legacy_hits = await _ms_per_query(legacy, keywords)
+            fts_ms, fts_hits = await _ms_per_query(fts, keywords)
+            fallback_ms, _ = await _ms_per_query(fallback, keywords)
+            print(f"{label:26s} {legacy_ms:>15.2f} {fts_ms:>9.2f} {fallback_ms:>12.2f}  ({legacy_hits}/{fts_hits})  {keywords}")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# END OF FILE tests/bench/bench_knowledge_search.py
@@ -0,0 +1,102 @@
+# START OF FILE tests/bench/bench_loop_detector.py
+"""
+Benchmark for autoregressive loop detection on synthetic 32k-char streams: the legacy
+detect_autoregressive_loop over a += string buffer vs StreamTextBuffer +
+AutoregressiveLoopDetector, both checked every 25 chunks as in Agent.process_message.
+
+Streams are cut into 1-8 char chunks (roughly one token each):
+  - non-looping: 32k chars of this repo's docs, the detector's worst case (never fires)
+  - looping: 2k chars of docs, then a short (60-char) or long (700-char) pattern repeated
+    until 32k chars; the stream stops at the first detection
+The legacy detector is kept below for comparison; both must fire at the same chunk.
+"""
+import random
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.agents.stream_buffer import AutoregressiveLoopDetector, StreamTextBuffer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+STREAM_CHARS = 32000
+CHECK_EVERY_CHUNKS = 25
+RANDOM_SEED = 1
+
+
+def legacy_detect_autoregressive_loop(text: str, min_pattern_length: int = 20, min_repetitions: int = 4) -> bool:
+    text_len = len(text)
+    if text_len < min_pattern_length * min_repetitions:
+        return False
+    max_pattern = min(1000, text_len // min_repetitions)
+    for pattern_length in range(min_pattern_length, max_pattern + 1):
+        pattern = text[-pattern_length:]
+        is_loop = True
+        for i in range(1, min_repetitions):
+            start_idx = -(pattern_length * (i + 1))
+            end_idx = -(pattern_length * i)
+            segment = text[start_idx:] if end_idx == 0 else text[start_idx:end_idx]
+            if segment != pattern:
+                is_loop = False
+                break
+        if is_loop:
+            return True
+    return False
+
+
+def _chunks(text: str) -> List[str]:
+    rng = random.Random(RANDOM_SEED)
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 8)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def run_legacy(chunks: List[str]) -> Optional[int]:
+    text_buffer = ""
+    for count, chunk in enumerate(chunks, 1):
+        text_buffer += chunk
+        if count % CHECK_EVERY_CHUNKS == 0 and legacy_detect_autoregressive_loop(text_buffer):
+            return count
+    return None
+
+
+def run_streaming(chunks: List[str]) -> Optional[int]:
+    stream_buffer = StreamTextBuffer()
+    detector = AutoregressiveLoopDetector()
+    for count, chunk in enumerate(chunks, 1):
+        stream_buffer.append(chunk)
+        detector.feed(chunk)
+        if count % CHECK_EVERY_CHUNKS == 0 and detector.is_looping():
+            return count
+    return None
+
+
+def main():
+    docs = "\n\n".join(path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "docs").glob("*.md")))
+    prefix = docs[:2000]
+    short_pattern = "I will now check the task list again to be sure. "[:60].ljust(60, ".")
+    long_pattern = docs[5000:5700]
+    streams = {
+        "non-looping": docs[:STREAM_CHARS],
+        "loop, 60-char pattern": (prefix + short_pattern * STREAM_CHARS)[:STREAM_CHARS],
+        "loop, 700-char pattern": (prefix + long_pattern * STREAM_CHARS)[:STREAM_CHARS],
+    }
+    print(f"{'stream':24s} {'chunks':>7s} {'fired at chunk':>15s} {'legacy ms':>10s} {'streaming ms':>13s}")
+    for label, text in streams.items():
+        assert len(text) == STREAM_CHARS, label
+        chunks = _chunks(text)
+        start = time.perf_counter()
+        legacy_fired = run_legacy(chunks)
+        legacy_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        streaming_fired = run_streaming(chunks)
+        streaming_ms = (time.perf_counter() - start) * 1000
+        assert legacy_fired == streaming_fired, (label, legacy_fired, streaming_fired)
+        print(f"{label:24s} {len(chunks):>7d} {str(streaming_fired or '-'):>15s} {legacy_ms:>10.1f} {streaming_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
+# END OF FILE tests/bench/bench_loop_detector.py
@@ -0,0 +1,84 @@
+# START OF FILE tests/bench/bench_model_discovery.py
+"""
+Startup benchmark for Ollama model discovery: cold (every model needs /api/show) vs warm
+(details come from the on-disk discovery cache, keyed by digest).
+
+A local aiohttp server stands in for Ollama, with MODELS entries in /api/tags and
+SHOW_LATENCY_S per /api/show call (roughly what Ollama takes to read a model's metadata).
+Cold discovery is timed with MODEL_DISCOVERY_CONCURRENCY=1 (the old one-at-a-time
+behaviour) and with the configured default.
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+import src.config.model_registry as model_registry_module
+from src.config.model_registry import ModelRegistry
+from src.config.settings import settings
+
+MODELS = 48
+SHOW_LATENCY_S = 0.15
+
+
+async def _start_fake_ollama() -> web.AppRunner:
+    tags = {"models": [{"name": f"model-{i}:7b", "digest": f"sha256:{i:064x}"} for i in range(MODELS)]}
+
+    async def api_tags(request):
+        return web.json_response(tags)
+
+    async def api_show(request):
+        await asyncio.sleep(SHOW_LATENCY_S)
+        return web.json_response({
+            "details": {"family": "qwen3", "parameter_size": "7.6B"},
+            "parameters": 'num_ctx 32768\nstop "<|im_end|>"',
+            "template": "{{ .System }} {{ .Prompt }} ...",
+        })
+
+    app = web.Application()
+    app.router.add_get("/api/tags", api_tags)
+    app.router.add_post("/api/show", api_show)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def _discover(base_url: str, concurrency: int, warm: bool) -> float:
+    settings.MODEL_DISCOVERY_CONCURRENCY = concurrency
+    registry = ModelRegistry(settings)
+    start = time.perf_counter()
+    if warm:
+        registry._discovery_cache = await asyncio.to_thread(registry._load_discovery_cache)
+    result = await registry._verify_and_fetch_models(base_url)
+    await registry._save_discovery_cache()
+    elapsed = time.perf_counter() - start
+    assert result is not None and len(result[2]) == MODELS
+    assert all(model.get("model_num_ctx") == 32768 for model in result[2])
+    return elapsed
+
+
+async def main():
+    runner = await _start_fake_ollama()
+    port = runner.addresses[0][1]
+    base_url = f"http://127.0.0.1:{port}"
+    default_concurrency = settings.MODEL_DISCOVERY_CONCURRENCY
+    settings.MODEL_DISCOVERY_CACHE_ENABLED = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_file = Path(tmp) / "model_discovery_cache.json"
+            model_registry_module.DISCOVERY_CACHE_FILE_PATH = cache_file
+            print(f"{MODELS} models, /api/show latency {SHOW_LATENCY_S * 1000:.0f} ms")
+            for label, concurrency in (("cold, sequential (concurrency=1)", 1), (f"cold, concurrency={default_concurrency}", default_concurrency)):
+                cache_file.unlink(missing_ok=True)
+                print(f"  {label:34s} {await _discover(base_url, concurrency, warm=False):7.2f} s")
+            print(f"  {'warm (discovery cache)':34s} {await _discover(base_url, default_concurrency, warm=True):7.2f} s")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# END OF FILE tests/bench/bench_model_discovery.py
@@ -0,0 +1,58 @@
+# START OF FILE tests/bench/bench_model_lookup.py
+"""
+Micro-benchmark for ModelRegistry lookups: the hash indexes vs the sort-and-scan they replaced.
+
+get_model_info runs on every LLM request and every cycle. The legacy implementation is kept
+below for comparison. Each registry has one local Ollama provider and one remote provider
+(half the models each). The lookups are an exact id on the remote provider (the scan's worst
+case), a prefixed id ('openrouter/...') and a miss.
+"""
+import timeit
+from typing import Dict, List, Optional
+
+from src.config.model_registry import ModelInfo, ModelRegistry
+from src.config.settings import settings
+
+MODEL_COUNTS = [50, 500, 5000]
+CALLS = 2000
+
+
+def _legacy_get_model_info(available_models: Dict[str, List[ModelInfo]], model_id: str) -> Optional[ModelInfo]:
+    for provider_name, models in sorted(available_models.items(), key=lambda x: (0 if x[0].startswith("ollama-local") else 1)):
+        for m in models:
+            if m.get("id") == model_id:
+                return m
+    if '/' in model_id:
+        _, target_model_name = model_id.split('/', 1)
+        for provider_name, models in sorted(available_models.items(), key=lambda x: (0 if x[0].startswith("ollama-local") else 1)):
+            for m in models:
+                if m.get("id") == target_model_name:
+                    return m
+    return None
+
+
+def main():
+    registry = ModelRegistry(settings)
+    print(f"{'models':>7} {'lookup':>10} {'legacy us/call':>15} {'indexed us/call':>16}")
+    for count in MODEL_COUNTS:
+        half = count // 2
+        registry.available_models = {
+            "ollama-local": [{"id": f"local-{i}:7b", "provider": "ollama-local"} for i in range(half)],
+            "openrouter": [{"id": f"vendor/remote-{i}", "provider": "openrouter"} for i in range(count - half)],
+        }
+        registry._rebuild_model_indexes()
+        lookups = {
+            "exact": f"vendor/remote-{count - half - 1}",
+            "prefixed": f"openrouter/vendor/remote-{count - half - 1}",
+            "miss": "missing-model",
+        }
+        for label, model_id in lookups.items():
+            assert registry.get_model_info(model_id) is _legacy_get_model_info(registry.available_models, model_id)
+            legacy = timeit.timeit(lambda: _legacy_get_model_info(registry.available_models, model_id), number=CALLS)
+            indexed = timeit.timeit(lambda: registry.get_model_info(model_id), number=CALLS)
+            print(f"{count:>7} {label:>10} {legacy / CALLS * 1e6:>15.2f} {indexed / CALLS * 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
+# END OF FILE tests/bench/bench_model_lookup.py
@@ -0,0 +1,164 @@
+# START OF FILE tests/bench/bench_prompt_layout.py
+"""
+Prefill benchmark for PROMPT_LAYOUT: tokens the backend has to prefill per cycle with the
+'legacy' layout vs 'prefix_stable', read from the normalized provider usage events.
+
+A worker in worker_work runs CYCLES cycles through the real PromptAssembler. Each cycle
+adds a tool call and its result (chunks of this repo's sources) to the history, and every
+other cycle writes a file to the shared workspace, so the workspace tree block changes.
+Every WAKEUP_EVERY cycles the PM sends a message, which stays unread (and listed in the
+acknowledgement block) for two cycles. The system prompt is the worker_work prompt
+from prompts.yaml; task views come from a fixed list instead of Taskwarrior.
+
+Prefill per cycle is prompt_tokens - cached_prompt_tokens of the cycle's usage event, the
+figure ModelPerformanceTracker reports as avg_prefill_tokens. With --ollama-model each
+prompt is sent to an Ollama server (one output token) and the events come from its done
+frames; Ollama's prompt_eval_count already leaves out the prefix it reused from its cache.
+Without a server the events are simulated: each prompt is rendered with a ChatML template
+and the longest common prefix with the previous cycle's prompt is reported as cached, i.e.
+an ideal single-slot prefix cache. Simulated tokens are counted with TokenCounter for
+MODEL_ID (a real tokenizer when one is installed, the heuristic otherwise).
+"""
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, cast
+
+import yaml
+
+from src.agents.core import Agent
+from src.agents.cycle_components.prompt_assembler import PromptAssembler
+from src.config.settings import settings
+from src.llm_providers.base import build_usage_event
+from src.llm_providers.http_transport import http_transport_pool
+from src.llm_providers.ollama_provider import OllamaProvider
+from src.tools.task_index import task_index
+from src.utils.token_counter import token_counter
+from src.utils.workspace_snapshot import workspace_snapshot
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+CYCLES = 30
+WAKEUP_EVERY = 8
+RESULT_CHARS = 1200
+MODEL_ID = "gpt-4o"
+PROJECT, SESSION, AGENT_ID = "bench_project", "bench_session", "W1"
+ACTIVE_TASK = "0b0e6c4e-8f0a-4a57-9d52-2f1f7e0c0001"
+
+
+def render(messages: List[Dict[str, Any]]) -> str:
+    return "".join(f"<|im_start|>{msg['role']}\n{msg.get('content') or ''}{msg.get('tool_calls') or ''}<|im_end|>\n" for msg in messages)
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def simulated_usage(previous: str, prompt: str) -> Dict[str, Any]:
+    """Usage event of an ideal prefix cache holding the previous cycle's prompt."""
+    common = _common_prefix_length(previous, prompt)
+    return build_usage_event(prompt_tokens=token_counter.count_text(prompt, MODEL_ID), completion_tokens=0,
+                             cached_prompt_tokens=token_counter.count_text(prompt[:common], MODEL_ID), timing_source="client")
+
+
+async def ollama_usage(provider: OllamaProvider, model: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    usage: Optional[Dict[str, Any]] = None
+    async for event in provider.stream_completion(messages=messages, model=model, temperature=0.0, max_tokens=1):
+        if event.get("type") == "usage":
+            usage = event
+        elif event.get("type") == "error":
+            raise RuntimeError(event.get("content"))
+    if usage is None:
+        raise RuntimeError(f"Ollama returned no usage counters for '{model}'")
+    return usage
+
+
+def prefill_tokens(usage: Dict[str, Any]) -> int:
+    return usage["prompt_tokens"] - (usage.get("cached_prompt_tokens") or 0)
+
+
+async def run_layout(layout: str, workspace_root: Path, provider: Optional[OllamaProvider] = None, ollama_model: str = "") -> List[Dict[str, int]]:
+    settings.PROMPT_LAYOUT = layout
+    workspace = workspace_root / PROJECT / SESSION / "shared_workspace"
+    workspace.mkdir(parents=True)
+    (workspace / "README.md").write_text("project\n")
+    system_prompt = yaml.safe_load((REPO_ROOT / "prompts.yaml").read_text(encoding="utf-8"))["worker_work_prompt"]
+    sources = "".join(path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "src" / "tools").glob("*.py")))
+
+    # Only the attributes PromptAssembler reads; the LLM is never called through the agent
+    manager: Any = SimpleNamespace(current_project=PROJECT, current_session=SESSION,
+                                   workflow_manager=SimpleNamespace(get_system_prompt=lambda agent, manager: system_prompt))
+    agent = Agent({"agent_id": AGENT_ID, "config": {"model": MODEL_ID, "agent_type": "worker"}}, llm_provider=cast(Any, provider), manager=cast(Any, None))
+    agent.state = "worker_work"
+    agent.active_task_id = ACTIVE_TASK
+    agent.message_history = [{"role": "user", "content": "Implement the CSV export for the report module.", "message_id": "msg_start"}]
+    assembler = PromptAssembler(manager)
+    previous, results = "", []
+    for cycle in range(CYCLES):
+        context: Any = SimpleNamespace(agent=agent)
+        await assembler.prepare_llm_call_data(context)
+        if provider is not None:
+            usage = await ollama_usage(provider, ollama_model, context.history_for_call)
+        else:
+            prompt = render(context.history_for_call)
+            usage = simulated_usage(previous, prompt)
+            previous = prompt
+        results.append({"prompt": usage["prompt_tokens"], "prefill": prefill_tokens(usage)})
+
+        # The turn: a tool call and its result; a file written every other cycle; a PM message now and then
+        call_id = f"call_{cycle}"
+        history = agent.message_history
+        history.append({"role": "assistant", "content": f"Reading the next module (step {cycle}).",
+                        "tool_calls": [{"id": call_id, "name": "file_system", "arguments": {"action": "read", "filename": f"src/module_{cycle}.py"}}]})
+        history.append({"role": "tool", "tool_call_id": call_id, "name": "file_system", "content": sources[cycle * RESULT_CHARS:(cycle + 1) * RESULT_CHARS]})
+        if cycle % 2 == 1:
+            (workspace / "src").mkdir(exist_ok=True)
+            (workspace / "src" / f"export_{cycle}.py").write_text("pass\n")
+            workspace_snapshot.invalidate(workspace / "src" / f"export_{cycle}.py")
+        if cycle % WAKEUP_EVERY == WAKEUP_EVERY - 1:
+            history.append({"role": "user", "content": f"[From PM1]: Status check #{cycle}, please also cover the JSON export.", "message_id": f"msg_pm_{cycle}"})
+        elif cycle % WAKEUP_EVERY == 1 and cycle > 1:
+            agent.read_message_ids[f"msg_pm_{cycle - 2}"] = 0.0 # Acknowledged two cycles later
+    workspace_snapshot.close()
+    return results
+
+
+async def main(ollama_model: Optional[str], ollama_url: Optional[str]):
+    task_views = [
+        {"uuid": ACTIVE_TASK, "id": 1, "description": "Implement the CSV export for the report module, with unit tests",
+         "status": "pending", "task_progress": "in_progress", "assignee": AGENT_ID, "project": PROJECT, "priority": None, "tags": [], "depends": []},
+        {"uuid": "0b0e6c4e-8f0a-4a57-9d52-2f1f7e0c0002", "id": 2, "description": "Add the JSON export",
+         "status": "pending", "task_progress": "todo", "assignee": AGENT_ID, "project": PROJECT, "priority": None, "tags": [], "depends": []},
+    ]
+
+    async def get_task_views(project_name, session_name):
+        return task_views
+
+    task_index.get_task_views = get_task_views
+    provider = OllamaProvider(base_url=ollama_url) if ollama_model else None
+    if provider is not None:
+        print(f"{CYCLES} worker_work cycles, usage events from Ollama ({provider.base_url}, model {ollama_model})")
+    else:
+        print(f"{CYCLES} worker_work cycles, simulated usage events, tokens counted with the {token_counter.get_backend(MODEL_ID).name} backend for {MODEL_ID}")
+    print(f"  {'layout':14s} {'avg prefill/cycle':>18s} {'total prefill':>14s} {'last prompt':>12s} {'last prefill':>13s}")
+    for layout in ("legacy", "prefix_stable"):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.PROJECTS_BASE_DIR = Path(tmp)
+            results = await run_layout(layout, Path(tmp), provider, ollama_model or "")
+        steady = [r["prefill"] for r in results[1:]] # The first cycle prefills everything either way
+        print(f"  {layout:14s} {sum(steady) / len(steady):>18.0f} {sum(steady):>14d} {results[-1]['prompt']:>12d} {results[-1]['prefill']:>13d}")
+    await http_transport_pool.close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefill per cycle for the legacy and prefix_stable prompt layouts")
+    parser.add_argument("--ollama-model", help="Send each cycle's prompt to this Ollama model and read its usage events")
+    parser.add_argument("--ollama-url", help="Ollama base URL (default: the provider's default)")
+    args = parser.parse_args()
+    asyncio.run(main(args.ollama_model, args.ollama_url))
+# END OF FILE tests/bench/bench_prompt_layout.py
@@ -0,0 +1,134 @@
+# START OF FILE tests/bench/bench_session_journal.py
+"""
+Save/load benchmark for sessions with 10k+ messages: the legacy single-file session
+(json.dumps check per agent + json.dump(indent=2) of everything on every save) vs the
+append-only SessionJournal.
+
+The session has a PM with PM_MESSAGES messages plus ADMIN_MESSAGES for admin_ai and
+WORKER_MESSAGES for each of WORKERS workers. Messages are this repo's docs and sources cut
+into user/assistant/tool turns, with tool calls on the assistant turns. Timed:
+  - one save after a cycle in which the PM and one worker each added two messages,
+    averaged over SAVES saves (the case autosave hits all the time);
+  - a save after the PM's history was summarized (its segment is compacted);
+  - loading everything vs only the bootstrap agents (dynamic agents are deferred).
+The manifest is built the way SessionManager builds it.
+"""
+import gc
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.agents.message_history import MessageHistory
+from src.agents.session_journal import JOURNAL_FORMAT_VERSION, SessionJournal, segment_file_name
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+PM_MESSAGES = 10000
+ADMIN_MESSAGES = 2000
+WORKER_MESSAGES = 1500
+WORKERS = 4
+SAVES = 20
+LOAD_RUNS = 3
+BOOTSTRAP_AGENTS = ("admin_ai", "PM1")
+
+
+def _corpus() -> List[str]:
+    text = "\n".join(path.read_text(encoding="utf-8") for path in sorted((REPO_ROOT / "docs").glob("*.md")) + sorted((REPO_ROOT / "src").rglob("*.py"))[:60])
+    return [text[i:i + 600] for i in range(0, len(text), 600)]
+
+
+def make_message(corpus: List[str], i: int) -> Dict[str, Any]:
+    content = corpus[i % len(corpus)]
+    kind = i % 3
+    if kind == 0:
+        return {"role": "user", "content": content, "message_id": f"m{i}"}
+    if kind == 1:
+        return {"role": "assistant", "content": content[:200], "message_id": f"m{i}",
+                "tool_calls": [{"id": f"call_{i}", "name": "file_system", "arguments": {"action": "read", "filename": f"file_{i}.py"}}]}
+    return {"role": "tool", "content": content, "tool_call_id": f"call_{i - 1}", "name": "file_system", "message_id": f"m{i}"}
+
+
+def legacy_save(path: Path, histories: Dict[str, MessageHistory]):
+    session_data = {"project": "bench", "session": "s", "timestamp": time.time(), "teams": {}, "agent_to_team": {},
+                    "dynamic_agents_config": {}, "agent_histories": {}, "agent_states": {}}
+    for agent_id, history in histories.items():
+        json.dumps(history)
+        session_data["agent_histories"][agent_id] = history
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(session_data, f, indent=2)
+
+
+def legacy_load(path: Path) -> Dict[str, List[Dict[str, Any]]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["agent_histories"]
+
+
+def journal_save(journal: SessionJournal, histories: Dict[str, MessageHistory]):
+    manifest = {"format": JOURNAL_FORMAT_VERSION, "project": "bench", "session": "s", "timestamp": time.time(), "teams": {},
+                "agent_to_team": {}, "dynamic_agents_config": {}, "agent_states": {}, "agents": {}}
+    writes = []
+    for agent_id, history in histories.items():
+        write = journal.plan_history_write(agent_id, history)
+        if write:
+            writes.append(write)
+        manifest["agents"][agent_id] = {"segment": segment_file_name(agent_id), "messages": len(history), "estimated_tokens": history.token_total()}
+    journal.write_sync(writes, manifest)
+    journal.apply_checkpoints(writes)
+
+
+def journal_load(journal: SessionJournal, agent_ids) -> Dict[str, MessageHistory]:
+    manifest = journal.read_manifest_sync()
+    assert manifest is not None, "journal_save() writes the manifest first"
+    return {agent_id: journal.load_history_sync(agent_id, entry) for agent_id, entry in manifest["agents"].items() if agent_id in agent_ids}
+
+
+def _ms(func, *args) -> float:
+    gc.collect() # Don't bill one side for garbage the other left behind
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def _best_ms(func, *args) -> float:
+    return min(_ms(func, *args) for _ in range(LOAD_RUNS))
+
+
+def main():
+    corpus = _corpus()
+    sizes = {"admin_ai": ADMIN_MESSAGES, "PM1": PM_MESSAGES} | {f"W{i + 1}": WORKER_MESSAGES for i in range(WORKERS)}
+    histories = {agent_id: MessageHistory(make_message(corpus, i) for i in range(size)) for agent_id, size in sizes.items()}
+    total = sum(len(history) for history in histories.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "agent_session_data.json"
+        journal = SessionJournal(Path(tmp) / "session")
+        legacy_first = _ms(legacy_save, legacy_path, histories)
+        journal_first = _ms(journal_save, journal, histories)
+        journal_bytes = sum(path.stat().st_size for path in journal.journal_dir.iterdir())
+        print(f"{total} messages over {len(histories)} agents (PM {PM_MESSAGES}); legacy file {legacy_path.stat().st_size / 1e6:.1f} MB, journal {journal_bytes / 1e6:.1f} MB")
+        print(f"  {'first save (full snapshot)':40s} legacy {legacy_first:8.1f} ms   journal {journal_first:8.1f} ms")
+
+        legacy_total = journal_total = 0.0
+        for save in range(SAVES):
+            for agent_id in ("PM1", f"W{save % WORKERS + 1}"):
+                for _ in range(2):
+                    histories[agent_id].append(make_message(corpus, len(histories[agent_id])))
+            legacy_total += _ms(legacy_save, legacy_path, histories)
+            journal_total += _ms(journal_save, journal, histories)
+        print(f"  {'save after a cycle (+4 messages)':40s} legacy {legacy_total / SAVES:8.1f} ms   journal {journal_total / SAVES:8.1f} ms")
+
+        pm_history = histories["PM1"]
+        pm_history[:PM_MESSAGES // 2] = [{"role": "system", "content": "[Summary of earlier context] " + corpus[0], "message_id": "summary"}]
+        print(f"  {'save after summarizing the PM':40s} legacy {_ms(legacy_save, legacy_path, histories):8.1f} ms   journal {_ms(journal_save, journal, histories):8.1f} ms (compaction)")
+
+        legacy_histories = legacy_load(legacy_path)
+        loaded = journal_load(journal, set(histories))
+        assert all(list(loaded[agent_id]) == legacy_histories[agent_id] == list(histories[agent_id]) for agent_id in histories)
+        print(f"  {'load, every agent':40s} legacy {_best_ms(legacy_load, legacy_path):8.1f} ms   journal {_best_ms(journal_load, journal, set(histories)):8.1f} ms")
+        print(f"  {'load, bootstrap agents (rest deferred)':40s} legacy {'n/a':>8s}      journal {_best_ms(journal_load, journal, set(BOOTSTRAP_AGENTS)):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
+# END OF FILE tests/bench/bench_session_journal.py
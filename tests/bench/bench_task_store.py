@@ -0,0 +1,156 @@
+# START OF FILE tests/bench/bench_task_store.py
+"""
+Benchmark for ProjectManagementTool list_tasks/add_task at 500+ tasks: the legacy
+synchronous tasklib queries on the event loop vs the task snapshot (TaskIndexService)
+with writes on the session's Taskwarrior worker.
+
+Each session is seeded with TASK_COUNTS tasks (a fifth of them completed) spread over
+AGENTS workers, imported in one 'task import'. AGENTS workers then list their tasks at
+the same time, as happens when the PM activates them; a probe task measures how long the
+event loop is blocked. The snapshot is timed cold (right after a write) and warm.
+add_task is timed one call at a time, with a fresh description so the duplicate check
+never short-circuits it.
+
+Needs the Taskwarrior CLI ('task') on PATH. The bench uses a throwaway project under
+projects/ and removes it afterwards.
+"""
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+from src.config.settings import BASE_DIR
+from src.tools.project_management import ProjectManagementTool
+from src.tools.task_index import TASKLIB_AVAILABLE, task_index
+
+TASK_COUNTS = [500, 1000]
+AGENTS = 8
+ADDS = 10
+RANDOM_SEED = 1
+WORDS = ("parse config render page write tests fix login cache api schema migrate docs deploy "
+         "refactor module validate input export report index search upload image queue worker").split()
+
+
+def _description(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(8)) + f" #{rng.randrange(10 ** 9)}"
+
+
+def seed_tasks(tw, project_name: str, count: int, rng: random.Random):
+    tasks = []
+    for i in range(count):
+        tasks.append({
+            "uuid": str(uuid.uuid4()),
+            "description": _description(rng),
+            "status": "completed" if i % 5 == 0 else "pending",
+            "entry": "20260101T000000Z",
+            "project": project_name,
+            "assignee": f"W{i % AGENTS + 1}",
+            "task_progress": "completed" if i % 5 == 0 else "todo",
+        })
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(tasks, f)
+    try:
+        tw.execute_command(["import", f.name])
+    finally:
+        os.unlink(f.name)
+
+
+def legacy_list_tasks(tw, project_name: str, agent_id: str) -> int:
+    """The old _execute_list_tasks queries for a worker, run synchronously on the event loop."""
+    tasks = tw.tasks.all().filter(project=project_name).pending().filter(assignee=agent_id).all()
+    len(tw.tasks.all().filter(project=project_name).completed())
+    return len(tasks)
+
+
+def legacy_add_task(tw, project_name: str, description: str):
+    """The old _execute_add_task's Taskwarrior calls: the duplicate check's pending export and the save."""
+    from tasklib import Task
+    for existing in tw.tasks.pending():
+        existing['description']
+    task = Task(tw, description=description)
+    task['project'] = project_name
+    task.save()
+
+
+async def run_concurrently(make_call) -> tuple:
+    """Runs AGENTS calls at once; returns (wall ms, longest event loop stall ms)."""
+    longest_stall = 0.0
+    done = False
+
+    async def probe():
+        nonlocal longest_stall
+        while not done:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.001)
+            longest_stall = max(longest_stall, (time.perf_counter() - tick) * 1000 - 1)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(make_call(f"W{i + 1}") for i in range(AGENTS)))
+    wall = (time.perf_counter() - start) * 1000
+    done = True
+    await probe_task
+    return wall, longest_stall
+
+
+async def bench_session(tool: ProjectManagementTool, project_name: str, count: int, rng: random.Random):
+    session_name = f"tasks_{count}"
+    tw = task_index.get_taskwarrior(project_name, session_name)
+    seed_tasks(tw, project_name, count, rng)
+    task_index.invalidate(project_name, session_name)
+    sandbox = BASE_DIR / "projects" / project_name
+    print(f"{count} tasks ({count // 5} completed), {AGENTS} workers listing concurrently")
+
+    async def legacy_list(agent_id):
+        legacy_list_tasks(tw, project_name, agent_id)
+
+    async def tool_list(agent_id):
+        result = await tool.execute(agent_id, sandbox, project_name=project_name, session_name=session_name, action="list_tasks")
+        assert result.get("status") == "success", result
+
+    wall, stall = await run_concurrently(legacy_list)
+    print(f"  list, legacy:          wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+    task_index.invalidate(project_name, session_name)
+    wall, stall = await run_concurrently(tool_list)
+    print(f"  list, snapshot cold:   wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+    wall, stall = await run_concurrently(tool_list)
+    print(f"  list, snapshot warm:   wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+
+    start = time.perf_counter()
+    for _ in range(ADDS):
+        legacy_add_task(tw, project_name, _description(rng))
+    print(f"  add_task, legacy:      {(time.perf_counter() - start) * 1000 / ADDS:8.1f} ms/call (all on the event loop)")
+    task_index.invalidate(project_name, session_name)
+    start = time.perf_counter()
+    for _ in range(ADDS):
+        result = await tool.execute("PM1", sandbox, project_name=project_name, session_name=session_name, action="add_task",
+                                    title=_description(rng), description="benchmark task", assignee_agent_id="W1")
+        assert result.get("status") == "success" and not result.get("is_duplicate"), result
+    print(f"  add_task, worker:      {(time.perf_counter() - start) * 1000 / ADDS:8.1f} ms/call (off the event loop)")
+    wall, stall = await run_concurrently(tool_list)
+    print(f"  list after the adds:   wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+
+
+async def main():
+    if not TASKLIB_AVAILABLE or shutil.which("task") is None:
+        print("Taskwarrior ('task') and tasklib are required for this benchmark; install them and re-run.")
+        return
+    project_name = f"_bench_task_store_{os.getpid()}"
+    rng = random.Random(RANDOM_SEED)
+    tool = ProjectManagementTool()
+    try:
+        for count in TASK_COUNTS:
+            await bench_session(tool, project_name, count, rng)
+    finally:
+        task_index.close()
+        shutil.rmtree(BASE_DIR / "projects" / project_name, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# END OF FILE tests/bench/bench_task_store.py
@@ -0,0 +1,172 @@
+# START OF FILE tests/bench/bench_token_counter.py
+"""
+Accuracy and throughput benchmark for TokenCounter vs the legacy chars/4 estimate
+(len(content) // 4 + 5 per message, the old ContextSummarizer.estimate_token_count).
+
+Accuracy: the corpus is real agent-context text from this repo (prompts, docs, Python
+sources, JSON tool results) plus a few non-ASCII messages. It is counted with reference
+tokenizers and with each estimate. Reference tokenizers are whatever is available offline:
+  - tiktoken encodings (cl100k_base, o200k_base) for the 'gpt' family; point
+    TIKTOKEN_CACHE_DIR at a directory holding the cached encoding files.
+  - tiktoken-format BPE files given as --bpe FAMILY=PATH, e.g. Qwen's qwen.tiktoken.
+  - HuggingFace tokenizer.json files in TOKENIZER_DIR, named after the family.
+The TokenCounter column is the backend it picks for a model of that family: the tokenizer
+when one is installed for the family, otherwise the calibrated per-family heuristic, which
+is also shown on its own (what TokenCounter falls back to without the tokenizer).
+
+Throughput: CYCLES cycles over a history that grows by two messages per cycle, each cycle
+recounting the whole history, as CycleHandler does before every LLM call.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.config.settings import settings
+from src.utils import token_counter as token_counter_module
+from src.utils.token_counter import MESSAGE_OVERHEAD_TOKENS, TokenCounter, _HeuristicBackend, _normalize_family
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+CHUNK_CHARS = 1500
+CYCLES = 200
+START_MESSAGES = 100
+
+# Qwen's pre-tokenization pattern (from its tokenization_qwen.py)
+QWEN_PATTERN = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+
+NON_ASCII_MESSAGES = [
+    "Die Aufgabe wurde abgeschlossen. Nächster Schritt: Überprüfung der Änderungen durch den Projektmanager.",
+    "任务已完成。请检查工作区中的文件并报告任何错误。下一步是运行测试。",
+    "タスクを完了しました。ファイルを確認して、テストを実行してください。",
+    "Status: ✅ build passed, ⚠️ 2 warnings, 🚀 deploying to staging — café, naïve, résumé.",
+]
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS) if text[i:i + CHUNK_CHARS].strip()]
+
+
+def build_corpus() -> List[Tuple[str, Dict[str, Any]]]:
+    """(kind, message) pairs in the shapes agents keep in their history."""
+    corpus: List[Tuple[str, Dict[str, Any]]] = []
+    for chunk in _chunks((REPO_ROOT / "prompts.yaml").read_text(encoding="utf-8"))[:40]:
+        corpus.append(("prompt", {"role": "system", "content": chunk}))
+    for doc in sorted((REPO_ROOT / "docs").glob("*.md")) + [REPO_ROOT / "README.md"]:
+        for chunk in _chunks(doc.read_text(encoding="utf-8"))[:10]:
+            corpus.append(("prose", {"role": "assistant", "content": chunk}))
+    sources = sorted((REPO_ROOT / "src").rglob("*.py"))
+    for source in sources[:40]:
+        for chunk in _chunks(source.read_text(encoding="utf-8"))[:3]:
+            corpus.append(("code", {"role": "tool", "content": chunk}))
+    for source in sources[40:80]:
+        chunk = source.read_text(encoding="utf-8")[:CHUNK_CHARS]
+        corpus.append(("json", {"role": "tool", "content": json.dumps({"status": "success", "path": str(source.relative_to(REPO_ROOT)), "content": chunk})}))
+        corpus.append(("json", {"role": "assistant", "content": "", "tool_calls": [{"id": "call_1", "name": "file_system", "arguments": {"action": "write", "filename": source.name, "content": chunk[:400]}}]}))
+    for text in NON_ASCII_MESSAGES:
+        corpus.append(("non-ascii", {"role": "user", "content": text * 5}))
+    return corpus
+
+
+def legacy_count(message: Dict[str, Any]) -> int:
+    chars = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"]))
+    return chars // 4 + 5
+
+
+def _message_text_count(count_text: Callable[[str], int], message: Dict[str, Any]) -> int:
+    tokens = count_text(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+    if message.get("tool_calls"):
+        tokens += count_text(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def load_references(bpe_args: List[str]) -> List[Tuple[str, str, Callable[[str], int]]]:
+    """(label, model id whose family it tokenizes, count function) for each available reference."""
+    references = []
+    if token_counter_module.TIKTOKEN_AVAILABLE:
+        import tiktoken
+        for encoding_name, model_id in (("cl100k_base", "gpt-4"), ("o200k_base", "gpt-4o")):
+            try:
+                encoding = tiktoken.get_encoding(encoding_name)
+                references.append((f"tiktoken:{encoding_name}", model_id, lambda text, e=encoding: len(e.encode(text, disallowed_special=()))))
+            except Exception as e:
+                print(f"(skipping {encoding_name}: {e.__class__.__name__})")
+        for bpe_arg in bpe_args:
+            family, path = bpe_arg.split("=", 1)
+            from tiktoken.load import load_tiktoken_bpe
+            encoding = tiktoken.Encoding(name=family, pat_str=QWEN_PATTERN, mergeable_ranks=load_tiktoken_bpe(path), special_tokens={})
+            references.append((f"bpe:{Path(path).name}", f"{family}:8b", lambda text, e=encoding: len(e.encode(text, disallowed_special=()))))
+    if token_counter_module.TOKENIZERS_AVAILABLE:
+        tokenizer_dir = Path(settings.TOKENIZER_DIR)
+        tokenizer_dir = tokenizer_dir if tokenizer_dir.is_absolute() else REPO_ROOT / tokenizer_dir
+        for path in sorted(tokenizer_dir.glob("*.json")):
+            tokenizer = token_counter_module.HFTokenizer.from_file(str(path))
+            references.append((f"hf:{path.name}", f"{path.stem}:latest", lambda text, t=tokenizer: len(t.encode(text, add_special_tokens=False).ids)))
+    return references
+
+
+def _error_pct(estimates: List[int], truths: List[int]) -> Tuple[float, float]:
+    """(total error %, mean absolute per-message error %)."""
+    total = (sum(estimates) - sum(truths)) / sum(truths) * 100
+    per_message = sum(abs(e - t) / t for e, t in zip(estimates, truths)) / len(truths) * 100
+    return total, per_message
+
+
+def accuracy(corpus: List[Tuple[str, Dict[str, Any]]], references) -> None:
+    print(f"Accuracy ({len(corpus)} messages): total-count error %, mean |per-message error| % in brackets")
+    print(f"  {'reference':24s} {'kind':10s} {'legacy chars/4':>18s} {'family heuristic':>18s} {'TokenCounter':>18s}  backend")
+    for label, model_id, reference_count in references:
+        counter = TokenCounter()
+        backend = counter.get_backend(model_id)
+        heuristic = _HeuristicBackend(_normalize_family(counter._resolve_family(model_id)[0]))
+        kinds = sorted({kind for kind, _ in corpus}) + ["all"]
+        for kind in kinds:
+            messages = [msg for k, msg in corpus if kind in ("all", k)]
+            truths = [_message_text_count(reference_count, msg) for msg in messages]
+            legacy = _error_pct([legacy_count(msg) for msg in messages], truths)
+            estimate = _error_pct([_message_text_count(heuristic.count, msg) for msg in messages], truths)
+            ours = _error_pct([counter.count_message(msg, model_id) for msg in messages], truths)
+            print(f"  {label:24s} {kind:10s} {legacy[0]:+8.1f} ({legacy[1]:5.1f}) {estimate[0]:+8.1f} ({estimate[1]:5.1f}) {ours[0]:+8.1f} ({ours[1]:5.1f})  {backend.name}")
+
+
+def throughput(corpus: List[Tuple[str, Dict[str, Any]]], references) -> None:
+    messages = [msg for _, msg in corpus]
+    history = [messages[i % len(messages)] | {"content": f"{i} {messages[i % len(messages)].get('content', '')}"} for i in range(START_MESSAGES + 2 * CYCLES)]
+
+    def run_cycles(count_history: Callable[[List[Dict[str, Any]]], int]) -> float:
+        start = time.perf_counter()
+        for cycle in range(CYCLES):
+            count_history(history[:START_MESSAGES + 2 * cycle])
+        return (time.perf_counter() - start) / CYCLES * 1000
+
+    print(f"Throughput: {CYCLES} cycles, history growing {START_MESSAGES} -> {START_MESSAGES + 2 * CYCLES} messages (ms per cycle)")
+    print(f"  {'legacy chars/4':44s} {run_cycles(lambda h: sum(legacy_count(m) for m in h)):8.3f}")
+    heuristic = _HeuristicBackend("qwen")
+    heuristic_counter = TokenCounter()
+    print(f"  {'heuristic backend, uncached':44s} {run_cycles(lambda h: sum(_message_text_count(heuristic.count, m) for m in h)):8.3f}")
+    print(f"  {'TokenCounter (heuristic, per-message cache)':44s} {run_cycles(lambda h: heuristic_counter.count_messages(h, 'qwen3:8b')):8.3f}")
+    for label, model_id, reference_count in references:
+        cached = TokenCounter()
+        if cached.get_backend(model_id).name.startswith("heuristic"):
+            continue
+        print(f"  {label + ', uncached':44s} {run_cycles(lambda h: sum(_message_text_count(reference_count, m) for m in h)):8.3f}")
+        print(f"  {'TokenCounter (' + label + ', cache)':44s} {run_cycles(lambda h: cached.count_messages(h, model_id)):8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and throughput benchmark for TokenCounter")
+    parser.add_argument("--bpe", action="append", default=[], metavar="FAMILY=PATH", help="tiktoken-format BPE file for a model family")
+    args = parser.parse_args()
+    corpus = build_corpus()
+    references = load_references(args.bpe)
+    if not references:
+        print("No reference tokenizer available offline; install tiktoken/tokenizers and provide encoding files.")
+    accuracy(corpus, references)
+    throughput(corpus, references)
+
+
+if __name__ == "__main__":
+    main()
+# END OF FILE tests/bench/bench_token_counter.py
@@ -0,0 +1,122 @@
+# START OF FILE tests/bench/bench_tool_scheduler.py
+"""
+Benchmark for multi-read agent turns: tool calls run one after another (concurrency 1,
+the old behaviour) vs the ToolCallScheduler at TOOL_PARALLEL_MAX_CONCURRENCY.
+
+Each turn is a list of real tool calls, scheduled with the tools' own get_effects and
+executed with tool.execute (the InteractionHandler bookkeeping around it is left out):
+  - file_system reads of files copied from this repo into a temporary sandbox,
+  - a codebase_search over that sandbox,
+  - web_search get_page calls against a local aiohttp server that answers after
+    PAGE_LATENCY_S (roughly a remote page fetch).
+The mixed turn also writes one of the files it reads and reads it again, so the write must
+wait for the earlier read and the re-read for the write; the bench checks that order.
+"""
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from aiohttp import web
+
+from src.agents.cycle_components.tool_call_scheduler import ToolCallScheduler
+from src.config.settings import settings
+from src.tools.codebase_search import CodebaseSearchTool
+from src.tools.file_system import FileSystemTool
+from src.tools.web_search import WebSearchTool
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+PAGE_LATENCY_S = 0.3
+RUNS = 3
+AGENT_ID = "W1"
+
+
+async def _start_page_server() -> web.AppRunner:
+    page = "<html><body><h1>Docs</h1>" + "".join(f"<p>Paragraph {i} about the API.</p><a href='/p{i}'>p{i}</a>" for i in range(50)) + "</body></html>"
+
+    async def handle(request):
+        await asyncio.sleep(PAGE_LATENCY_S)
+        return web.Response(text=page, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+def build_turns(base_url: str) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    reads = [("file_system", {"action": "read", "filename": name}) for name in ("src/agents/core.py", "src/agents/cycle_handler.py", "src/tools/base.py", "docs/FRAMEWORK.md")]
+    search = ("codebase_search", {"query": "def get_effects", "path": "src/tools", "scope": "private"})
+    pages = [("web_search", {"action": "get_page", "url": f"{base_url}/page{i}"}) for i in range(2)]
+    write = ("file_system", {"action": "write", "filename": "src/tools/base.py", "content": "# rewritten\n", "force_overwrite": True})
+    return {
+        "4 reads + search (local only)": reads + [search],
+        "4 reads + search + 2 pages": reads + [search] + pages,
+        "mixed, with write + re-read": reads[:3] + [pages[0], write, reads[2], search, pages[1]],
+    }
+
+
+async def run_turn(tools, sandbox: Path, calls: List[Tuple[str, Dict[str, Any]]], max_concurrency: int, log: List[Tuple[str, int]]) -> float:
+    async def execute(index: int, speculative: bool):
+        name, args = calls[index]
+        log.append(("start", index))
+        result = await tools[name].execute(agent_id=AGENT_ID, agent_sandbox_path=sandbox, **args)
+        log.append(("end", index))
+        assert result.get("status") == "success", (name, args, result)
+        return result
+
+    scheduler = ToolCallScheduler(execute, [tools[name].get_effects(args) for name, args in calls], max_concurrency=max_concurrency)
+    start = time.perf_counter()
+    scheduler.start()
+    for index in range(len(calls)):
+        await scheduler.run(index)
+    scheduler.close()
+    return (time.perf_counter() - start) * 1000
+
+
+def check_write_order(calls: List[Tuple[str, Dict[str, Any]]], log: List[Tuple[str, int]]):
+    """Every write starts after the earlier reads of its file ended, and later reads start after it."""
+    position = {event: k for k, event in enumerate(log)}
+    for i, (_, args) in enumerate(calls):
+        if args.get("action") != "write":
+            continue
+        for j, (_, other) in enumerate(calls):
+            if j != i and other.get("filename") == args["filename"]:
+                first, second = (j, i) if j < i else (i, j)
+                assert position[("start", second)] > position[("end", first)], (first, second, log)
+
+
+async def main():
+    runner = await _start_page_server()
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    tools = {"file_system": FileSystemTool(), "codebase_search": CodebaseSearchTool(), "web_search": WebSearchTool()}
+    concurrency = settings.TOOL_PARALLEL_MAX_CONCURRENCY
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            sandbox = Path(tmp) / "sandbox"
+            print(f"page latency {PAGE_LATENCY_S * 1000:.0f} ms, best of {RUNS} runs")
+            print(f"  {'turn':30s} {'concurrency=1':>14s} {f'concurrency={concurrency}':>15s}")
+            for label, calls in build_turns(base_url).items():
+                timings = {}
+                for max_concurrency in (1, concurrency):
+                    best = float("inf")
+                    for _ in range(RUNS):
+                        shutil.rmtree(sandbox, ignore_errors=True)
+                        for folder in ("src", "docs"):
+                            shutil.copytree(REPO_ROOT / folder, sandbox / folder, ignore=shutil.ignore_patterns("__pycache__"))
+                        log: List[Tuple[str, int]] = []
+                        best = min(best, await run_turn(tools, sandbox, calls, max_concurrency, log))
+                        check_write_order(calls, log)
+                    timings[max_concurrency] = best
+                print(f"  {label:30s} {timings[1]:>11.1f} ms {timings[concurrency]:>12.1f} ms")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# END OF FILE tests/bench/bench_tool_scheduler.py
@@ -0,0 +1,127 @@
+# START OF FILE tests/bench/bench_workspace_tree.py
+"""
+Benchmark for the shared workspace tree on a 50k-file workspace: the legacy per-cycle
+os.walk on the event loop vs WorkspaceSnapshotService.
+
+The generated workspace holds 150 project files near the top, 20k files under
+node_modules/, 5k under .git/ and 25k in a deeply nested frontend/ tree (below the
+depth limit, so none of them are listed but the legacy walk still visits them all).
+AGENTS agents prepare a cycle at the same time, as happens when the PM activates
+its workers; a probe task measures how long the event loop is blocked.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from src.utils.workspace_snapshot import WorkspaceSnapshotService, build_workspace_tree_lines
+
+AGENTS = 12
+
+
+def create_workspace(root: Path) -> int:
+    def touch(directory: Path, count: int, prefix: str) -> int:
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(count):
+            (directory / f"{prefix}{i}.txt").touch()
+        return count
+
+    files = 0
+    for package in range(5):
+        files += touch(root / "app" / f"pkg{package}", 30, "module")
+    for package in range(400):
+        files += touch(root / "node_modules" / f"dep{package}" / "lib", 50, "file")
+    for shard in range(50):
+        files += touch(root / ".git" / "objects" / f"{shard:02x}", 100, "obj")
+    for feature in range(50):
+        for component in range(10):
+            files += touch(root / "frontend" / "src" / "features" / f"f{feature}" / "components" / f"c{component}", 50, "part")
+    return files
+
+
+def legacy_tree_lines(workspace_path: Path) -> List[str]:
+    """PromptAssembler._generate_workspace_tree_report's walk before the snapshot service."""
+    exclude_dirs = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env', 'dist', 'build', '.idea', '.vscode'}
+    max_files, max_depth = 200, 4
+    tree_lines: List[str] = []
+    file_count = 0
+    for root, dirs, files in os.walk(workspace_path):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        level = str(root).replace(str(workspace_path), '').count(os.sep)
+        if level > max_depth:
+            continue
+        indent = '  ' * level
+        if level > 0:
+            tree_lines.append(f"{indent}|-- {os.path.basename(root)}/")
+        for f in files:
+            if file_count >= max_files:
+                break
+            tree_lines.append(f"{indent}  |-- {f}")
+            file_count += 1
+        if file_count >= max_files:
+            tree_lines.append(f"{indent}  |-- ... (Truncated: Maximum {max_files} files returned)")
+            break
+    return tree_lines
+
+
+async def run_cycles(prepare) -> tuple:
+    """Runs AGENTS concurrent cycle preparations; returns (wall ms, longest event loop stall ms)."""
+    longest_stall = 0.0
+    done = False
+
+    async def probe():
+        nonlocal longest_stall
+        while not done:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.001)
+            longest_stall = max(longest_stall, (time.perf_counter() - tick) * 1000 - 1)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(prepare() for _ in range(AGENTS)))
+    wall = (time.perf_counter() - start) * 1000
+    done = True
+    await probe_task
+    return wall, longest_stall
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(tmp) / "shared_workspace"
+        file_count = create_workspace(workspace)
+        print(f"Workspace: {file_count} files; {AGENTS} agents preparing a cycle concurrently")
+
+        start = time.perf_counter()
+        legacy_lines = legacy_tree_lines(workspace)
+        print(f"  legacy os.walk, one call:                {(time.perf_counter() - start) * 1000:8.1f} ms ({len(legacy_lines)} lines)")
+        start = time.perf_counter()
+        new_lines = build_workspace_tree_lines(workspace)
+        print(f"  snapshot build (depth-pruned), one call: {(time.perf_counter() - start) * 1000:8.1f} ms ({len(new_lines)} lines)")
+
+        async def legacy_prepare():
+            legacy_tree_lines(workspace) # Ran synchronously inside the async cycle preparation
+
+        wall, stall = await run_cycles(legacy_prepare)
+        print(f"  legacy, {AGENTS} cycles:         wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+
+        service = WorkspaceSnapshotService()
+
+        async def snapshot_prepare():
+            await service.get_tree_lines(workspace)
+
+        wall, stall = await run_cycles(snapshot_prepare)
+        print(f"  snapshot, cold, {AGENTS} cycles: wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+        wall, stall = await run_cycles(snapshot_prepare)
+        print(f"  snapshot, warm, {AGENTS} cycles: wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+        service.invalidate(workspace / "app" / "pkg0" / "module0.txt") # A FileSystemTool write
+        wall, stall = await run_cycles(snapshot_prepare)
+        print(f"  snapshot, after a write:       wall {wall:8.1f} ms, longest loop stall {stall:8.1f} ms")
+        service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# END OF FILE tests/bench/bench_workspace_tree.py
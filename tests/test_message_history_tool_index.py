@@ -0,0 +1,159 @@
+# START OF FILE tests/test_message_history_tool_index.py
+"""
+Agreement test for the MessageHistory tool-call index.
+
+MessageHistory.last_successful_tool_result / last_identical_failure replaced two reverse
+history scans in CycleHandler (_detect_cross_cycle_duplicate_tool_call and
+_detect_cross_cycle_identical_failure). The legacy scans are kept below as oracles and
+compared against the index on random histories in the format the agents store
+(tool_calls with top-level name/arguments), built both in one go and by appending.
+
+The index normalizes tool calls the same way for both checks, so duplicate detection now
+also recognizes calls stored as tool_calls_json, as OpenAI-style function.name/arguments
+and with JSON-string arguments, which the legacy duplicate scan ignored. Those cases are
+covered separately.
+"""
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.agents.message_history import MessageHistory
+
+HISTORIES = 300
+RANDOM_SEED = 1
+
+TOOL_NAMES = ["file_system", "manage_team", "web_search"]
+ARGUMENT_SETS = [
+    {"action": "read", "path": "a"}, {"action": "read", "path": "b"},
+    {"action": "create_agent", "role": "Coder"}, {"action": "create_agent", "role": "coder "},
+    {"q": "x"},
+]
+RESULT_CONTENTS = ['{"status": "success"}', '{"status": "error"}', "[Tool Execution Failed] x", "ERROR: boom", "ok", "", "[Error] y"]
+
+
+# --- Legacy scans (CycleHandler before the tool-call index) ---
+def _legacy_duplicate_result(history: List[Dict[str, Any]], tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+    current_sig = (tool_name, json.dumps(tool_args, sort_keys=True))
+
+    def is_equivalent(sig1, sig2) -> bool:
+        if sig1 == sig2:
+            return True
+        if sig1[0] != sig2[0] or sig1[0] != "manage_team":
+            return False
+        args1, args2 = json.loads(sig1[1]), json.loads(sig2[1])
+        if args1.get("action") == "create_agent" and args2.get("action") == "create_agent":
+            r1, r2 = args1.get("role"), args2.get("role")
+            return bool(r1 and r2 and str(r1).strip().lower() == str(r2).strip().lower())
+        return False
+
+    for i in range(len(history) - 1, -1, -1):
+        msg = history[i]
+        if msg.get("role") != "assistant":
+            continue
+        for tc in msg.get("tool_calls", []):
+            if not is_equivalent((tc.get("name"), json.dumps(tc.get("arguments", {}), sort_keys=True)), current_sig):
+                continue
+            for result_msg in history[i + 1:]:
+                if result_msg.get("role") != "tool" or result_msg.get("tool_call_id") != tc.get("id"):
+                    continue
+                content = result_msg.get("content", "")
+                try:
+                    data = json.loads(content)
+                    if isinstance(data, dict) and data.get("status") == "error":
+                        continue
+                except (json.JSONDecodeError, TypeError):
+                    pass
+                if isinstance(content, str) and (
+                    "[Tool Execution Failed]" in content or "[Framework Error]" in content
+                    or "[Error]" in content or content.strip() == ""
+                ):
+                    continue
+                return content
+    return None
+
+
+def _legacy_identical_failure(history: List[Dict[str, Any]], tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+    current_sig = (tool_name, json.dumps(tool_args, sort_keys=True))
+    for i in range(len(history) - 1, 0, -1):
+        msg = history[i]
+        if msg.get("role") != "assistant":
+            continue
+        tool_calls = msg.get("tool_calls_json") or msg.get("tool_calls")
+        if not tool_calls:
+            continue
+        try:
+            tool_calls = json.loads(tool_calls) if isinstance(tool_calls, str) else tool_calls
+        except json.JSONDecodeError:
+            continue
+        for tc in tool_calls:
+            prev_name = tc.get("name") or tc.get("function", {}).get("name")
+            prev_args = tc.get("arguments") or tc.get("function", {}).get("arguments")
+            if isinstance(prev_args, str):
+                try: prev_args = json.loads(prev_args)
+                except json.JSONDecodeError: prev_args = {}
+            prev_sig = (str(prev_name) if prev_name is not None else "", json.dumps(prev_args, sort_keys=True))
+            if prev_sig != current_sig:
+                continue
+            if i + 1 < len(history):
+                result_msg = history[i + 1]
+                if result_msg.get("role") == "tool" and (not tc.get("id") or result_msg.get("tool_call_id") == tc.get("id")):
+                    content = result_msg.get("content", "")
+                    if isinstance(content, str) and (
+                        "[Tool Execution Failed]" in content or "[Framework Error]" in content
+                        or "[Error]" in content or "ERROR:" in content or content.strip() == ""
+                    ):
+                        return content
+    return None
+
+
+def _random_history(rng: random.Random, length: int) -> List[Dict[str, Any]]:
+    history: List[Dict[str, Any]] = [{"role": "system", "content": "sys"}]
+    call_id = 0
+    while len(history) < length:
+        calls = []
+        for _ in range(rng.randint(1, 2)):
+            call_id += 1
+            calls.append({"id": f"c{call_id}", "name": rng.choice(TOOL_NAMES), "arguments": rng.choice(ARGUMENT_SETS)})
+        history.append({"role": "assistant", "content": "", "tool_calls": calls})
+        for call in calls:
+            history.append({"role": "tool", "tool_call_id": call["id"], "name": call["name"], "content": rng.choice(RESULT_CONTENTS)})
+        if rng.random() < 0.3:
+            history.append({"role": "user", "content": "u"})
+    return history
+
+
+def test_index_agrees_with_legacy_scans():
+    rng = random.Random(RANDOM_SEED)
+    for _ in range(HISTORIES):
+        messages = _random_history(rng, rng.randint(2, 60))
+        built = MessageHistory(messages)
+        appended = MessageHistory(messages[:len(messages) // 2])
+        appended.last_successful_tool_result("warm_up", {}) # Build the index, then grow it incrementally
+        for msg in messages[len(messages) // 2:]:
+            appended.append(msg)
+        for tool_name in TOOL_NAMES:
+            for tool_args in ARGUMENT_SETS:
+                expected_duplicate = _legacy_duplicate_result(messages, tool_name, tool_args)
+                expected_failure = _legacy_identical_failure(messages, tool_name, tool_args)
+                for history in (built, appended):
+                    assert history.last_successful_tool_result(tool_name, tool_args) == expected_duplicate
+                    assert history.last_identical_failure(tool_name, tool_args) == expected_failure
+
+
+@pytest.mark.parametrize("assistant_message", [
+    {"role": "assistant", "tool_calls_json": json.dumps([{"id": "c1", "name": "web_search", "arguments": {"q": "x"}}])},
+    {"role": "assistant", "tool_calls": [{"id": "c1", "function": {"name": "web_search", "arguments": {"q": "x"}}}]},
+    {"role": "assistant", "tool_calls": [{"id": "c1", "name": "web_search", "arguments": '{"q": "x"}'}]},
+])
+def test_duplicate_detection_normalizes_stored_call_formats(assistant_message: Dict[str, Any]):
+    history = MessageHistory([
+        {"role": "system", "content": "sys"},
+        assistant_message,
+        {"role": "tool", "tool_call_id": "c1", "name": "web_search", "content": "results"},
+    ])
+    assert history.last_successful_tool_result("web_search", {"q": "x"}) == "results"
+    assert history.last_successful_tool_result("web_search", {"q": "y"}) is None
+
+# END OF FILE tests/test_message_history_tool_index.py
@@ -0,0 +1,213 @@
+# START OF FILE tests/test_request_scheduler.py
+"""
+Tests for the LLM request scheduler: admission order, preemption, aging,
+the adaptive limit and the per-group concurrency cap.
+"""
+import asyncio
+from typing import Optional
+
+import pytest
+
+from src.config.settings import settings
+from src.llm_providers.request_scheduler import LLMRequestScheduler, RequestPriority, llm_request_context
+
+
+@pytest.fixture(autouse=True)
+def _fixed_limits(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_ADAPTIVE", False)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_PREEMPTION", True)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_LIMIT_FACTOR", 1.0)
+
+
+def test_idle_endpoint_serves_while_group_peer_has_backlog():
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        release_busy = asyncio.Event()
+        started = []
+
+        async def request(key: str, limit: int, name: str):
+            async with scheduler.slot(key, limit, group="ollama"):
+                started.append(name)
+                await release_busy.wait()
+
+        # Group cap 3 (set by the first endpoint); the busy endpoint only takes 1 at a time
+        idle_probe = asyncio.create_task(request("ollama:idle", 3, "idle-0"))
+        await asyncio.sleep(0)
+        busy = [asyncio.create_task(request("ollama:busy", 1, f"busy-{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert started == ["idle-0", "busy-0"] # busy-1 and busy-2 queue behind the busy endpoint's limit
+
+        # The idle endpoint still has capacity (1/3) and so does the group (2/3)
+        idle = asyncio.create_task(request("ollama:idle", 3, "idle-1"))
+        await asyncio.wait_for(_wait_for(lambda: "idle-1" in started), timeout=1.0)
+        metrics = scheduler.get_metrics()
+        assert metrics["ollama:idle"]["group_active"] == 3
+        assert metrics["ollama:busy"]["queued"] == 2
+
+        release_busy.set()
+        await asyncio.gather(idle_probe, idle, *busy)
+        assert sorted(started) == ["busy-0", "busy-1", "busy-2", "idle-0", "idle-1"]
+        assert scheduler.get_metrics()["ollama:idle"]["group_active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_group_cap_holds_across_endpoints():
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        in_flight, peak = 0, 0
+
+        async def request(key: str):
+            nonlocal in_flight, peak
+            async with scheduler.slot(key, 2, group="ollama"):
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.005)
+                in_flight -= 1
+
+        await asyncio.gather(*(request(f"ollama:node{i % 3}") for i in range(12)))
+        assert peak == 2
+
+    asyncio.run(scenario())
+
+
+def test_admission_order_by_class_then_round_robin_across_agents():
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        admitted = []
+        hold = asyncio.Event()
+
+        first = asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w0", "first", admitted, hold))
+        await _wait_for(lambda: admitted == ["first"])
+        queued = [
+            asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w1", "w1a", admitted)),
+            asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w1", "w1b", admitted)),
+            asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w2", "w2a", admitted)),
+            asyncio.create_task(_request(scheduler, RequestPriority.INTERACTIVE, "admin", "admin", admitted)),
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.get_metrics()["ollama"]["queued"] == 4
+
+        hold.set()
+        await asyncio.gather(first, *queued)
+        # Interactive first, then background round-robin: w1, w2, back to w1
+        assert admitted == ["first", "admin", "w1a", "w2a", "w1b"]
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("preemption, expected, preempted", [
+    (True, ["first", "admin", "bg"], 1), # Admin takes over the slot granted to 'bg' before it started
+    (False, ["first", "bg", "admin"], 0),
+])
+def test_interactive_request_preempts_granted_background_slot(monkeypatch, preemption, expected, preempted):
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_PREEMPTION", preemption)
+
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        admitted = []
+        hold = asyncio.Event()
+
+        async def first_then_admin():
+            with llm_request_context(RequestPriority.BACKGROUND, "w0"):
+                async with scheduler.slot("ollama", 1):
+                    admitted.append("first")
+                    await hold.wait()
+            # The release above granted the slot to 'bg', which has not resumed yet
+            with llm_request_context(RequestPriority.INTERACTIVE, "admin"):
+                async with scheduler.slot("ollama", 1):
+                    admitted.append("admin")
+
+        first = asyncio.create_task(first_then_admin())
+        await _wait_for(lambda: admitted == ["first"])
+        bg = asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w1", "bg", admitted))
+        await asyncio.sleep(0.01)
+
+        hold.set()
+        await asyncio.gather(first, bg)
+        assert admitted == expected
+        assert scheduler.get_metrics()["ollama"]["classes"]["background"]["preempted"] == preempted
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("aging_seconds, expected", [
+    (0.05, ["first", "old-bg", "new-summary"]), # Aged three classes, the background request jumps ahead
+    (60.0, ["first", "new-summary", "old-bg"]), # Not aged yet, class order holds
+])
+def test_aged_request_jumps_its_class(monkeypatch, aging_seconds, expected):
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_AGING_SECONDS", aging_seconds)
+
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        admitted = []
+        hold = asyncio.Event()
+
+        first = asyncio.create_task(_request(scheduler, RequestPriority.INTERACTIVE, "admin", "first", admitted, hold))
+        await _wait_for(lambda: admitted == ["first"])
+        old = asyncio.create_task(_request(scheduler, RequestPriority.BACKGROUND, "w1", "old-bg", admitted))
+        await asyncio.sleep(0.16)
+        new = asyncio.create_task(_request(scheduler, RequestPriority.SUMMARIZATION, "w2", "new-summary", admitted))
+        await asyncio.sleep(0)
+
+        hold.set()
+        await asyncio.gather(first, old, new)
+        assert admitted == expected
+
+    asyncio.run(scenario())
+
+
+def test_adaptive_limit_follows_latency(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_ADAPTIVE", True)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_LIMIT_FACTOR", 2.0)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_LATENCY_TOLERANCE", 2.0)
+
+    async def scenario():
+        scheduler = LLMRequestScheduler()
+        admitted = []
+        hold = asyncio.Event()
+        slots = []
+
+        async def held(name: str):
+            async with scheduler.slot("ollama", 2) as slot:
+                slots.append(slot)
+                admitted.append(name)
+                await hold.wait()
+
+        tasks = [asyncio.create_task(held(f"r{i}")) for i in range(4)]
+        await _wait_for(lambda: len(admitted) == 2)
+        assert scheduler.get_metrics()["ollama"]["queued"] == 2
+
+        # Steady latency with requests queued: the limit grows one step and admits another request
+        for _ in range(3): slots[0].record_latency(0.1)
+        await _wait_for(lambda: len(admitted) == 3)
+        metrics = scheduler.get_metrics()["ollama"]
+        assert (metrics["limit"], metrics["limit_increases"], metrics["queued"]) == (3, 1, 1)
+
+        # Latency well above the baseline: the limit shrinks back
+        for _ in range(3): slots[0].record_latency(1.0)
+        metrics = scheduler.get_metrics()["ollama"]
+        assert (metrics["limit"], metrics["limit_decreases"]) == (2, 1)
+        await asyncio.sleep(0.01)
+        assert len(admitted) == 3 # Still at the limit, r3 keeps waiting
+
+        hold.set()
+        await asyncio.gather(*tasks)
+        assert len(admitted) == 4
+
+    asyncio.run(scenario())
+
+
+async def _request(scheduler: LLMRequestScheduler, priority: RequestPriority, agent_id: str, name: str, admitted: list, hold: Optional[asyncio.Event] = None):
+    with llm_request_context(priority, agent_id):
+        async with scheduler.slot("ollama", 1):
+            admitted.append(name)
+            if hold is not None:
+                await hold.wait()
+
+
+async def _wait_for(predicate):
+    while not predicate():
+        await asyncio.sleep(0.001)
+
+# END OF FILE tests/test_request_scheduler.py
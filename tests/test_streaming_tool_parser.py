@@ -0,0 +1,109 @@
+# START OF FILE tests/test_streaming_tool_parser.py
+"""
+Differential test for StreamingToolCallParser.
+
+Each corpus response is fed to the streaming parser in many random chunkings and the
+calls it reports are compared against the batch parser (find_and_parse_xml_tool_calls)
+run on the complete response. The streaming parser must never report a call the batch
+parser would not return, must report every call that is final once its block closes
+(outside an unclosed <think>),
+and its first ready call must already be returned by the batch parser for the text seen so far.
+"""
+import json
+import random
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.agents.agent_tool_parser import (
+    THINK_BLOCK_PATTERN, THINK_OPEN_PATTERN, StreamingToolCallParser, find_and_parse_xml_tool_calls
+)
+from src.agents.core import MARKDOWN_FENCE_XML_PATTERN
+from src.tools.base import BaseTool, ToolParameter
+
+CHUNKINGS_PER_RESPONSE = 200
+RANDOM_SEED = 1
+
+
+class _CorpusTool(BaseTool):
+    def __init__(self, name: str, parameter_names: List[str]):
+        self.name = name
+        self.parameters = [ToolParameter(name=p, type="string", description=p, required=False) for p in parameter_names]
+
+    async def execute(self, agent_id: str, agent_sandbox_path: Path, project_name: Optional[str] = None, session_name: Optional[str] = None, **kwargs: Any) -> Any:
+        return None
+
+    def get_detailed_usage(self, agent_context: Optional[Dict[str, Any]] = None, sub_action: Optional[str] = None) -> str:
+        return self.name
+
+
+TOOLS: Dict[str, BaseTool] = {
+    "file_system": _CorpusTool("file_system", ["action", "filename", "content"]),
+    "send_message": _CorpusTool("send_message", ["target_agent_id", "message_content"]),
+    "project_management": _CorpusTool("project_management", ["action", "task_description"]),
+}
+_TOOL_NAMES = '|'.join(re.escape(name.lower()) for name in TOOLS)
+# Compiled the same way as in Agent.__init__
+RAW_PATTERN = re.compile(rf"<({_TOOL_NAMES})(?:\s+[^>]*)?(?:>[\s\S]*?</\1>|/>)", re.IGNORECASE | re.DOTALL)
+MARKDOWN_PATTERN = re.compile(MARKDOWN_FENCE_XML_PATTERN.format(tool_names=_TOOL_NAMES), re.IGNORECASE | re.DOTALL | re.MULTILINE)
+
+CORPUS = [
+    'a <file_system action="list"/> b',
+    "<file_system><action>read</action></file_system><file_system><action>read</action></file_system>",
+    "Sure. <file_system><action>read</action><filename>a.py</filename></file_system> and then I will wait and ramble on for a long time...",
+    "<think>maybe <send_message><target_agent_id>x</target_agent_id></send_message></think>ok "
+    "<send_message><target_agent_id>pm</target_agent_id><message_content>hi <b>there</b></message_content></send_message>",
+    "```xml\n<project_management><action>list_tasks</action></project_management>\n```\nmore text",
+    'two: <file_system action="list"/> and <file_system><action>read</action><filename>b</filename></file_system> end',
+    '<tool_call>{"name": "file_system", "arguments": {"action": "list"}}</tool_call> trailing words',
+    "no tools here, just <b>html</b> text",
+    "<send_message><target_agent_id>a</target_agent_id><message_content>x < y & z</message_content></send_message>",
+    "<think>unfinished <file_system><action>list</action></file_system>",
+]
+
+
+def _batch_calls(text: str):
+    return find_and_parse_xml_tool_calls(THINK_BLOCK_PATTERN.sub("", text).strip(), TOOLS, RAW_PATTERN, MARKDOWN_PATTERN, "test")["valid_calls"]
+
+
+def _signature(call) -> str:
+    return f"{call[0]}:{json.dumps(call[1], sort_keys=True, default=str)}"
+
+
+def _random_chunks(text: str, rng: random.Random) -> List[str]:
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 12)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+@pytest.mark.parametrize("response", CORPUS)
+def test_streaming_matches_batch_parser(response: str):
+    rng = random.Random(RANDOM_SEED)
+    final_text = THINK_BLOCK_PATTERN.sub("", response).strip()
+    batch = _batch_calls(response)
+    expected = Counter(_signature(call) for call in batch if StreamingToolCallParser._is_final(call, final_text))
+    if len(THINK_OPEN_PATTERN.findall(response)) > response.lower().count("</think>"):
+        expected = Counter() # Tool-like XML inside an unclosed <think> is never reported early
+
+    for _ in range(CHUNKINGS_PER_RESPONSE):
+        parser = StreamingToolCallParser(TOOLS, RAW_PATTERN, MARKDOWN_PATTERN, "test")
+        reported, first_ready = [], None
+        for chunk in _random_chunks(response, rng):
+            ready = parser.feed(chunk)
+            if ready and first_ready is None:
+                first_ready = (parser.text, ready[0])
+            reported.extend(ready)
+
+        got = Counter(_signature(call) for call in reported)
+        assert not got - Counter(_signature(call) for call in batch), f"Reported calls the batch parser does not return: {reported}"
+        assert got == expected, f"Streaming calls {dict(got)} != final batch calls {dict(expected)}"
+        if first_ready is not None:
+            assert _signature(first_ready[1]) in {_signature(call) for call in _batch_calls(first_ready[0])}
+
+# END OF FILE tests/test_streaming_tool_parser.py
@@ -0,0 +1,68 @@
+# START OF FILE tests/test_summary_cache.py
+"""
+Tests for the context summary cache: stable prefix keys and the append-only persisted log.
+"""
+import asyncio
+from typing import Any, cast
+
+from src.agents.cycle_components.context_summarizer import ContextSummarizer
+from src.agents.cycle_components.summary_cache import SummaryCache
+from src.config.settings import settings
+
+
+def _history(length: int):
+    history = [{"role": "system", "content": "sys"}]
+    for i in range(1, length):
+        history.append({"role": "user" if i % 2 else "assistant", "content": f"message {i}"})
+    return history
+
+
+def test_first_chunk_key_is_stable_while_history_grows():
+    summarizer = ContextSummarizer(manager=cast(Any, None)) # Chunking and cache keys never touch the manager
+    block = summarizer.prefix_block_messages
+    keys = []
+    for length in range(4 * block + 1, 6 * block + 1):
+        chunk1, chunk2 = summarizer._split_context_into_chunks(_history(length))
+        assert (len(chunk1) - 1) % block == 0 # The prefix ends on a block boundary
+        assert chunk2[-1]["content"] == f"message {length - 1}"
+        keys.append(SummaryCache.make_key("agent", chunk1))
+    # Growing by two blocks moves the split point at most once
+    assert len(set(keys)) <= 2
+    assert keys.count(keys[0]) >= block
+
+
+def test_put_appends_and_log_is_compacted(monkeypatch, tmp_path):
+    cache_file = tmp_path / "summary_cache.jsonl"
+    monkeypatch.setattr(settings, "SUMMARY_CACHE_FILE", str(cache_file))
+    monkeypatch.setattr(settings, "SUMMARY_CACHE_MAX_ENTRIES", 3)
+
+    async def scenario():
+        cache = SummaryCache()
+        for i in range(5):
+            await cache.put(f"k{i}", f"summary {i}")
+        assert len(cache_file.read_text().splitlines()) == 1 + 5 # Header plus one appended record per put
+        await cache.put("k5", "summary 5")
+        await cache.put("k6", "summary 6") # The log reached twice the entry limit, so it is rewritten
+        assert len(cache_file.read_text().splitlines()) == 1 + 3
+
+        reloaded = SummaryCache()
+        assert await reloaded.get("k3") is None
+        assert [await reloaded.get(f"k{i}") for i in (4, 5, 6)] == ["summary 4", "summary 5", "summary 6"]
+
+    asyncio.run(scenario())
+
+
+def test_torn_record_is_skipped_on_load(monkeypatch, tmp_path):
+    cache_file = tmp_path / "summary_cache.jsonl"
+    monkeypatch.setattr(settings, "SUMMARY_CACHE_FILE", str(cache_file))
+
+    async def scenario():
+        cache = SummaryCache()
+        await cache.put("k0", "summary 0")
+        with open(cache_file, "a", encoding="utf-8") as f:
+            f.write('["k1", "summ') # Crash mid-append
+        assert await SummaryCache().get("k0") == "summary 0"
+
+    asyncio.run(scenario())
+
+# END OF FILE tests/test_summary_cache.py
@@ -0,0 +1,45 @@
+# START OF FILE tests/test_task_index.py
+"""
+Tests for TaskIndexService's snapshot invalidation.
+"""
+import asyncio
+import threading
+
+from src.tools.task_index import TaskIndexService
+
+
+def test_reader_after_invalidate_does_not_reuse_inflight_export(monkeypatch):
+    service = TaskIndexService()
+    monkeypatch.setattr(service, "get_taskwarrior", lambda project, session: object())
+    tasks = ["before-write"]
+    first_export_started, finish_first_export = threading.Event(), threading.Event()
+
+    def export(tw):
+        snapshot = list(tasks)
+        if not first_export_started.is_set():
+            first_export_started.set()
+            finish_first_export.wait(5)
+        return [{"uuid": name} for name in snapshot]
+
+    monkeypatch.setattr(service, "export_views_sync", export)
+
+    async def scenario():
+        early_reader = asyncio.create_task(service.get_task_views("p", "s"))
+        await asyncio.to_thread(first_export_started.wait, 5)
+        tasks.append("written") # A task write lands while the first export is still running
+        service.invalidate("p", "s")
+        late_reader = asyncio.create_task(service.get_task_views("p", "s"))
+        await asyncio.sleep(0)
+        finish_first_export.set()
+        early, late = await early_reader, await late_reader
+        assert [view["uuid"] for view in early] == ["before-write"]
+        assert [view["uuid"] for view in late] == ["before-write", "written"]
+        # Only the post-invalidation export is cached
+        assert [view["uuid"] for view in await service.get_task_views("p", "s")] == ["before-write", "written"]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        service.close()
+
+# END OF FILE tests/test_task_index.py
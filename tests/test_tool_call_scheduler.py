@@ -0,0 +1,57 @@
+# START OF FILE tests/test_tool_call_scheduler.py
+"""
+Tests for ToolCallScheduler: prefetch gating, speculative execution and cleanup.
+"""
+import asyncio
+
+from src.agents.cycle_components.tool_call_scheduler import ToolCallScheduler
+from src.tools.base import ToolEffects
+
+
+def _read(path: str) -> ToolEffects:
+    return ToolEffects(mode="read", resources=[f"fs:{path}"])
+
+
+def test_only_marked_reads_are_prefetched_and_speculatively():
+    async def scenario():
+        calls = []
+
+        async def execute(index: int, speculative: bool):
+            calls.append((index, speculative))
+            await asyncio.sleep(0.01)
+            return index
+
+        effects = [_read("a"), _read("b"), ToolEffects(mode="write", resources=["fs:c"]), _read("d")]
+        scheduler = ToolCallScheduler(execute, effects, max_concurrency=4, prefetch=[True, False, True, True])
+        scheduler.start()
+        await asyncio.sleep(0)
+        assert sorted(calls) == [(0, True), (3, True)] # Call 1 is not marked; the write only runs when claimed
+        results = [await scheduler.run(i) for i in range(len(effects))]
+        scheduler.close()
+        assert results == [0, 1, 2, 3]
+        assert sorted(calls) == [(0, True), (1, False), (2, False), (3, True)]
+
+    asyncio.run(scenario())
+
+
+def test_close_cancels_unclaimed_prefetches():
+    async def scenario():
+        cancelled = []
+
+        async def execute(index: int, speculative: bool):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+
+        scheduler = ToolCallScheduler(execute, [_read("a"), _read("b")], max_concurrency=2)
+        scheduler.start()
+        await asyncio.sleep(0)
+        scheduler.close() # e.g. the cycle's tool loop raised before claiming anything
+        await asyncio.sleep(0)
+        assert sorted(cancelled) == [0, 1]
+
+    asyncio.run(scenario())
+
+# END OF FILE tests/test_tool_call_scheduler.py
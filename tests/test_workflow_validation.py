@@ -0,0 +1,44 @@
+# START OF FILE tests/test_workflow_validation.py
+"""
+Tests for the tracking of decomposition checks started by AgentWorkflowManager.change_state.
+"""
+import asyncio
+import logging
+
+from src.agents.workflow_manager import AgentWorkflowManager
+
+
+def test_next_cycle_waits_for_pending_validation():
+    async def scenario():
+        manager = AgentWorkflowManager()
+        history = []
+
+        async def validate():
+            await asyncio.sleep(0.01)
+            history.append("[Framework Note] decomposed")
+
+        manager._track_validation("worker", asyncio.create_task(validate()))
+        await manager.wait_for_pending_validation("worker")
+        assert history == ["[Framework Note] decomposed"]
+        assert "worker" not in manager._pending_validations
+        await manager.wait_for_pending_validation("worker") # Nothing pending: returns at once
+
+    asyncio.run(scenario())
+
+
+def test_validation_errors_are_logged_not_raised(caplog):
+    async def scenario():
+        manager = AgentWorkflowManager()
+
+        async def validate():
+            raise RuntimeError("taskwarrior unavailable")
+
+        manager._track_validation("worker", asyncio.create_task(validate()))
+        await manager.wait_for_pending_validation("worker")
+        await asyncio.sleep(0)
+
+    with caplog.at_level(logging.ERROR, logger="src.agents.workflow_manager"):
+        asyncio.run(scenario())
+    assert "taskwarrior unavailable" in caplog.text
+
+# END OF FILE tests/test_workflow_validation.py